@@ -1,7 +1,13 @@
 from django import forms
 from django.contrib.auth import get_user_model
+from django.db.models import Q
+from django.urls import reverse, reverse_lazy
+from urllib.parse import urlencode
 
-from .models import Aluno, Curso, Faculdade
+from core.utils.autocomplete import AutocompleteSelect
+from core.utils.planilhas import EXTENSOES
+
+from .models import Aluno, Curso, Faculdade, sem_aluno
 
 User = get_user_model()
 
@@ -51,7 +57,11 @@ class AlunoForm(forms.ModelForm):
             "cep",
         ]
         widgets = {
-            "user": forms.Select(attrs={"class": TAILWIND_SELECT}),
+            "user": AutocompleteSelect(
+                reverse_lazy("user_autocomplete"),
+                attrs={"class": TAILWIND_SELECT},
+                placeholder="Digite o nome ou CPF do usuário",
+            ),
             "curso": forms.Select(attrs={"class": TAILWIND_SELECT}),
             "matricula": forms.TextInput(attrs={"class": TAILWIND_INPUT, "placeholder": "Matrícula"}),
             "data_ingresso": forms.DateInput(attrs={"class": TAILWIND_INPUT, "type": "date"}),
@@ -77,9 +87,32 @@ class AlunoForm(forms.ModelForm):
             self.fields["user"].initial = user_preenchido_id
             self.fields["user"].queryset = User.objects.filter(pk=user_preenchido_id)
         else:
-            # Apenas usuários que ainda não têm vínculo com aluno (ao editar, inclui o próprio usuário)
-            from .models import Aluno as AlunoModel
-            usuarios_com_aluno = list(AlunoModel.objects.values_list("user_id", flat=True))
-            if self.instance and self.instance.pk and self.instance.user_id:
-                usuarios_com_aluno = [pk for pk in usuarios_com_aluno if pk != self.instance.user_id]
-            self.fields["user"].queryset = User.objects.exclude(pk__in=usuarios_com_aluno).order_by("first_name", "username")
+            # Apenas usuários com papel ALUNO ainda sem cadastro de aluno (ao editar, inclui o próprio usuário)
+            elegiveis = Q(role=User.Role.ALUNO) & Q(sem_aluno(self.instance.pk))
+            if self.instance.pk and self.instance.user_id:
+                elegiveis |= Q(pk=self.instance.user_id)
+            self.fields["user"].queryset = User.objects.filter(elegiveis)
+            # O autocomplete aplica o mesmo filtro
+            parametros = {"role": User.Role.ALUNO, "sem_aluno": 1}
+            if self.instance.pk:
+                parametros["exceto_aluno"] = self.instance.pk
+            self.fields["user"].widget.url = f"{reverse('user_autocomplete')}?{urlencode(parametros)}"
+
+
+class AlunoImportacaoForm(forms.Form):
+    arquivo = forms.FileField(
+        label="Arquivo",
+        help_text="CSV (separado por ; ou ,) ou XLSX, com o cabeçalho na primeira linha.",
+        widget=forms.ClearableFileInput(attrs={"class": TAILWIND_INPUT, "accept": ",".join(EXTENSOES)}),
+    )
+    validar_apenas = forms.BooleanField(
+        label="Só validar (não grava nada)",
+        required=False,
+        widget=forms.CheckboxInput(attrs={"class": "h-4 w-4 text-primary-600 border-gray-300 rounded"}),
+    )
+
+    def clean_arquivo(self):
+        arquivo = self.cleaned_data["arquivo"]
+        if not arquivo.name.lower().endswith(EXTENSOES):
+            raise forms.ValidationError(f"Envie um arquivo {' ou '.join(EXTENSOES)}.")
+        return arquivo
@@ -0,0 +1,302 @@
+"""
+Importação de alunos em lote a partir de CSV ou XLSX.
+
+O arquivo é lido linha a linha (``csv.reader`` ou openpyxl em modo
+``read_only``) e cada linha é validada assim que lida; as válidas acumulam
+em lotes de ``LOTE`` que são conferidos contra o banco (CPF e matrícula já
+cadastrados) e gravados com ``bulk_create`` — uma consulta por lote em vez
+de uma por linha. Os cursos são resolvidos por id ou nome numa tabela
+carregada uma única vez.
+
+Senhas: sem a coluna ``senha`` o usuário nasce com senha inutilizável e
+nenhum hash é calculado; ele entra em ``sem_senha`` e só consegue entrar
+depois de definir a senha pelo link de primeiro acesso
+(``apps/usuarios/primeiro_acesso.py``). Com a coluna, os hashes de cada lote
+são calculados em threads — o PBKDF2 do hashlib libera o GIL.
+
+``bulk_create`` não dispara signals: o índice de busca e a versão dos dados
+dos relatórios são atualizados aqui.
+
+Colunas (cabeçalho sem diferença de acentos/maiúsculas): ``cpf`` e ``nome``
+obrigatórias; ``sobrenome``, ``email``, ``matricula``, ``curso`` (id ou
+nome), ``data_ingresso`` (dd/mm/aaaa ou aaaa-mm-dd), ``situacao`` e ``senha``
+opcionais.
+"""
+
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth.hashers import make_password
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import transaction
+
+from apps.relatorios.cache import incrementar_versao
+from apps.usuarios import busca
+from apps.usuarios.models import User
+from core.utils import planilhas
+from core.utils.planilhas import data_celula, normalizar, texto_celula
+
+from .models import Aluno, Curso
+
+# Linhas conferidas e gravadas por vez
+LOTE = 500
+
+# Threads usadas no hash das senhas informadas no arquivo
+HASH_WORKERS = 4
+
+# Cabeçalho normalizado -> campo
+COLUNAS = {
+    "cpf": "cpf",
+    "nome": "nome",
+    "first_name": "nome",
+    "sobrenome": "sobrenome",
+    "last_name": "sobrenome",
+    "email": "email",
+    "e_mail": "email",
+    "matricula": "matricula",
+    "curso": "curso",
+    "curso_id": "curso",
+    "data_ingresso": "data_ingresso",
+    "data_de_ingresso": "data_ingresso",
+    "ingresso": "data_ingresso",
+    "situacao": "situacao",
+    "senha": "senha",
+}
+OBRIGATORIAS = ("cpf", "nome")
+
+CABECALHO_ERROS = ("linha", "cpf", "erro")
+
+
+def ler_linhas(arquivo, nome):
+    """Linhas do arquivo de alunos (``core.utils.planilhas.ler_linhas``)."""
+    return planilhas.ler_linhas(arquivo, nome, COLUNAS, OBRIGATORIAS)
+
+
+class TabelaCursos:
+    """Cursos por id e por nome (sem acentos/maiúsculas), carregados numa consulta."""
+
+    def __init__(self):
+        self.ids = set()
+        self.por_nome = {}
+        for pk, nome in Curso.objects.values_list("pk", "nome"):
+            self.ids.add(pk)
+            self.por_nome.setdefault(normalizar(nome), []).append(pk)
+
+    def resolver(self, valor):
+        """Id do curso; ValidationError se não existe ou o nome é ambíguo."""
+        texto = texto_celula(valor)
+        if texto.isdigit() and int(texto) in self.ids:
+            return int(texto)
+        encontrados = self.por_nome.get(normalizar(texto), [])
+        if len(encontrados) == 1:
+            return encontrados[0]
+        if encontrados:
+            raise ValidationError(f"Há mais de um curso chamado “{texto}”; informe o id.")
+        raise ValidationError(f"Curso “{texto}” não encontrado.")
+
+
+def _data(valor):
+    try:
+        return data_celula(valor)
+    except ValueError:
+        raise ValidationError(f"Data de ingresso inválida: “{texto_celula(valor)}”.")
+
+
+_SITUACOES = {
+    normalizar(texto): valor
+    for valor, rotulo in Aluno.Situacao.choices
+    for texto in (valor, rotulo)
+}
+
+
+def _limite(modelo, campo, texto, rotulo):
+    maximo = modelo._meta.get_field(campo).max_length
+    if len(texto) > maximo:
+        raise ValidationError(f"{rotulo} com mais de {maximo} caracteres.")
+    return texto
+
+
+def validar_linha(dados, cursos):
+    """
+    Valores da linha prontos para gravar.
+
+    Raises:
+        ValidationError: com todas as mensagens da linha
+    """
+    valores = {}
+    erros = []
+
+    def campo(nome, funcao):
+        try:
+            valores[nome] = funcao()
+        except ValidationError as erro:
+            erros.extend(erro.messages)
+
+    def cpf():
+        # CPF numérico no XLSX perde os zeros à esquerda
+        bruto = dados.get("cpf")
+        texto = str(int(bruto)).zfill(11) if isinstance(bruto, (int, float)) else re.sub(r"[.\-\s]", "", texto_celula(bruto))
+        if not texto.isdigit() or len(texto) != 11:
+            raise ValidationError("Informe um CPF válido com 11 dígitos.")
+        return texto
+
+    def nome():
+        texto = texto_celula(dados.get("nome"))
+        if not texto:
+            raise ValidationError("Nome obrigatório.")
+        return _limite(User, "first_name", texto, "Nome")
+
+    def email():
+        texto = texto_celula(dados.get("email"))
+        if texto:
+            try:
+                validate_email(texto)
+            except ValidationError:
+                raise ValidationError(f"E-mail inválido: “{texto}”.")
+        return texto
+
+    def situacao():
+        texto = texto_celula(dados.get("situacao"))
+        if not texto:
+            return Aluno.Situacao.ATIVO
+        if normalizar(texto) not in _SITUACOES:
+            raise ValidationError(f"Situação inválida: “{texto}”.")
+        return _SITUACOES[normalizar(texto)]
+
+    def senha():
+        texto = texto_celula(dados.get("senha"))
+        if texto and len(texto) < 8:
+            raise ValidationError("Senha com menos de 8 caracteres.")
+        return texto or None
+
+    campo("cpf", cpf)
+    campo("nome", nome)
+    campo("sobrenome", lambda: _limite(User, "last_name", texto_celula(dados.get("sobrenome")), "Sobrenome"))
+    campo("email", email)
+    campo("matricula", lambda: _limite(Aluno, "matricula", texto_celula(dados.get("matricula")), "Matrícula") or None)
+    campo("curso_id", lambda: cursos.resolver(dados["curso"]) if texto_celula(dados.get("curso")) else None)
+    campo("data_ingresso", lambda: _data(dados["data_ingresso"]) if texto_celula(dados.get("data_ingresso")) else None)
+    campo("situacao", situacao)
+    campo("senha", senha)
+    if erros:
+        raise ValidationError(erros)
+    return valores
+
+
+def _hashes(senhas):
+    """Hash de cada senha; None vira senha inutilizável (sem custo de hash)."""
+    informadas = [senha for senha in senhas if senha]
+    if not informadas:
+        return [make_password(None) for _ in senhas]
+    with ThreadPoolExecutor(max_workers=min(HASH_WORKERS, len(informadas))) as executor:
+        calculados = iter(list(executor.map(make_password, informadas)))
+    return [next(calculados) if senha else make_password(None) for senha in senhas]
+
+
+class Importacao:
+    """
+    Uma importação em andamento.
+
+    Uso::
+
+        importacao = Importacao()
+        importacao.executar(ler_linhas(arquivo, nome))
+        importacao.importados, importacao.erros
+    """
+
+    def __init__(self, validar_apenas=False, lote=LOTE):
+        self.validar_apenas = validar_apenas
+        self.lote = lote
+        self.lidas = 0
+        self.importados = 0
+        # (linha, cpf, mensagem)
+        self.erros = []
+        self.user_ids = []
+        # Usuários criados sem senha (precisam do link de primeiro acesso)
+        self.sem_senha = []
+
+    def executar(self, linhas):
+        """Valida e grava todas as ``linhas``; tudo numa transação."""
+        cursos = TabelaCursos()
+        cpfs = {}
+        matriculas = {}
+        pendentes = []
+        with transaction.atomic():
+            for numero, dados in linhas:
+                self.lidas += 1
+                try:
+                    valores = validar_linha(dados, cursos)
+                except ValidationError as erro:
+                    self._erro(numero, dados.get("cpf"), " ".join(erro.messages))
+                    continue
+                if valores["cpf"] in cpfs:
+                    self._erro(numero, valores["cpf"], f"CPF repetido (linha {cpfs[valores['cpf']]}).")
+                    continue
+                if valores["matricula"] and valores["matricula"] in matriculas:
+                    self._erro(numero, valores["cpf"], f"Matrícula repetida (linha {matriculas[valores['matricula']]}).")
+                    continue
+                cpfs[valores["cpf"]] = numero
+                if valores["matricula"]:
+                    matriculas[valores["matricula"]] = numero
+                pendentes.append((numero, valores))
+                if len(pendentes) >= self.lote:
+                    self._gravar(pendentes)
+                    pendentes = []
+            if pendentes:
+                self._gravar(pendentes)
+
+        if self.user_ids:
+            busca.indexar(self.user_ids)
+            incrementar_versao()
+        return self
+
+    def _erro(self, numero, cpf, mensagem):
+        self.erros.append((numero, texto_celula(cpf), mensagem))
+
+    def _gravar(self, pendentes):
+        cpfs_existentes = set(
+            User.objects.filter(cpf__in=[valores["cpf"] for _, valores in pendentes]).values_list("cpf", flat=True)
+        )
+        matriculas_existentes = set(
+            Aluno.objects.filter(
+                matricula__in=[valores["matricula"] for _, valores in pendentes if valores["matricula"]]
+            ).values_list("matricula", flat=True)
+        )
+        validos = []
+        for numero, valores in pendentes:
+            if valores["cpf"] in cpfs_existentes:
+                self._erro(numero, valores["cpf"], "CPF já cadastrado.")
+            elif valores["matricula"] in matriculas_existentes:
+                self._erro(numero, valores["cpf"], "Matrícula já cadastrada.")
+            else:
+                validos.append(valores)
+        if self.validar_apenas or not validos:
+            self.importados += len(validos)
+            return
+
+        senhas = _hashes([valores["senha"] for valores in validos])
+        usuarios = User.objects.bulk_create([
+            User(
+                cpf=valores["cpf"],
+                first_name=valores["nome"],
+                last_name=valores["sobrenome"],
+                email=valores["email"],
+                role=User.Role.ALUNO,
+                password=senha,
+            )
+            for valores, senha in zip(validos, senhas)
+        ])
+        Aluno.objects.bulk_create([
+            Aluno(
+                user=usuario,
+                curso_id=valores["curso_id"],
+                matricula=valores["matricula"],
+                data_ingresso=valores["data_ingresso"],
+                situacao=valores["situacao"],
+            )
+            for usuario, valores in zip(usuarios, validos)
+        ])
+        self.user_ids.extend(usuario.pk for usuario in usuarios)
+        self.sem_senha.extend(usuario for usuario, valores in zip(usuarios, validos) if not valores["senha"])
+        self.importados += len(usuarios)
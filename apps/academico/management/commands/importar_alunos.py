@@ -0,0 +1,48 @@
+"""Importa alunos (e seus usuários) de um arquivo CSV ou XLSX (apps/academico/importacao.py)."""
+
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.academico.importacao import CABECALHO_ERROS, LOTE, Importacao, ler_linhas
+from core.utils.planilhas import ArquivoInvalido, escrever_erros
+
+
+class Command(BaseCommand):
+    help = "Importa alunos de um CSV ou XLSX, gravando em lotes com bulk_create."
+
+    def add_arguments(self, parser):
+        parser.add_argument("arquivo", help="Arquivo .csv ou .xlsx com cabeçalho na primeira linha.")
+        parser.add_argument("--erros", help="Caminho do CSV com as linhas recusadas e o motivo.")
+        parser.add_argument("--validar", action="store_true", help="Só valida; não grava nada.")
+        parser.add_argument("--lote", type=int, default=LOTE, help=f"Linhas gravadas por vez (padrão: {LOTE}).")
+
+    def handle(self, *args, **options):
+        importacao = Importacao(validar_apenas=options["validar"], lote=options["lote"])
+        inicio = time.monotonic()
+        try:
+            with open(options["arquivo"], "rb") as arquivo:
+                importacao.executar(ler_linhas(arquivo, options["arquivo"]))
+        except FileNotFoundError as erro:
+            raise CommandError(f"Arquivo não encontrado: {options['arquivo']}") from erro
+        except ArquivoInvalido as erro:
+            raise CommandError(str(erro)) from erro
+        duracao = time.monotonic() - inicio
+
+        if importacao.erros and options["erros"]:
+            with open(options["erros"], "w", encoding="utf-8-sig", newline="") as destino:
+                escrever_erros(importacao.erros, destino, CABECALHO_ERROS)
+        elif importacao.erros:
+            for linha, cpf, mensagem in importacao.erros:
+                self.stderr.write(f"Linha {linha} ({cpf or 'sem CPF'}): {mensagem}")
+
+        acao = "válido(s)" if options["validar"] else "importado(s)"
+        self.stdout.write(
+            f"{importacao.lidas} linha(s) lida(s), {importacao.importados} aluno(s) {acao}, "
+            f"{len(importacao.erros)} erro(s) em {duracao:.1f}s"
+        )
+        if importacao.sem_senha:
+            self.stdout.write(
+                f"{len(importacao.sem_senha)} aluno(s) sem senha ainda não conseguem entrar: "
+                "gere os links de primeiro acesso com manage.py links_primeiro_acesso."
+            )
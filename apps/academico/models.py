@@ -2,6 +2,37 @@ from datetime import date
 
 from django.conf import settings
 from django.db import models
+from django.db.models import Exists, OuterRef
+
+
+def calcular_semestre(data_ingresso, hoje=None):
+    """Semestre atual (1-based) a partir da data de ingresso, ou None."""
+    if not data_ingresso:
+        return None
+    ingresso_idx = data_ingresso.year * 2 + (1 if data_ingresso.month <= 6 else 2)
+    hoje = hoje or date.today()
+    hoje_idx = hoje.year * 2 + (1 if hoje.month <= 6 else 2)
+    semestre = hoje_idx - ingresso_idx + 1
+    if semestre < 1:
+        return None
+    return semestre
+
+
+def intervalo_ingresso(semestre, hoje=None):
+    """
+    Datas de ingresso (início, fim) dos alunos que estão no ``semestre`` hoje; inverso de ``calcular_semestre``.
+
+    Returns:
+        a tupla; None se o ingresso cairia fora das datas representáveis (nenhum aluno)
+    """
+    hoje = hoje or date.today()
+    indice = hoje.year * 2 + (1 if hoje.month <= 6 else 2) - semestre + 1
+    ano, metade = divmod(indice - 1, 2)
+    if not date.min.year <= ano <= date.max.year:
+        return None
+    if metade == 0:
+        return date(ano, 1, 1), date(ano, 6, 30)
+    return date(ano, 7, 1), date(ano, 12, 31)
 
 
 class Faculdade(models.Model):
@@ -172,15 +203,21 @@ class Aluno(models.Model):
         ordering = ["user"]
 
     def semestre_atual(self):
-        if not self.data_ingresso:
-            return None
-        ingresso_idx = self.data_ingresso.year * 2 + (1 if self.data_ingresso.month <= 6 else 2)
-        hoje = date.today()
-        hoje_idx = hoje.year * 2 + (1 if hoje.month <= 6 else 2)
-        semestre = hoje_idx - ingresso_idx + 1
-        if semestre < 1:
-            return None
-        return semestre
+        return calcular_semestre(self.data_ingresso)
 
     def __str__(self):
         return str(self.user)
+
+
+def sem_aluno(exceto_aluno_id=None):
+    """
+    Condição para filtrar usuários que ainda não têm cadastro de aluno.
+
+    É um ``NOT EXISTS`` correlacionado (usa o índice único de ``user_id``), e
+    não uma lista de ids no ``exclude``, então o custo não cresce com o número
+    de alunos. ``exceto_aluno_id`` ignora o próprio aluno ao editar.
+    """
+    outros = Aluno.objects.filter(user_id=OuterRef("pk"))
+    if exceto_aluno_id:
+        outros = outros.exclude(pk=exceto_aluno_id)
+    return ~Exists(outros)
@@ -1,8 +1,23 @@
-from datetime import date
+import tempfile
+from datetime import date, datetime
+from io import BytesIO, StringIO
 
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from openpyxl import Workbook
 
+from apps.usuarios import busca
+from core.utils.ambiente_teste import SEM_MANIFEST
+from core.utils.planilhas import ArquivoInvalido
+
+from .forms import AlunoForm
+from .importacao import Importacao, ler_linhas
 from .models import Aluno, Curso, Faculdade
 
 User = get_user_model()
@@ -72,3 +87,238 @@ class AcademicoFixturesTestCase(TestCase):
         """Verifica se os cursos têm alunos associados."""
         total_alunos = sum(c.alunos.count() for c in self.cursos)
         self.assertEqual(total_alunos, 10)
+
+
+class AlunoFormUsuarioTestCase(TestCase):
+    """Testes da escolha de usuário no formulário de aluno."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.admin = User.objects.create_user(cpf="99999999999", first_name="Admin", role=User.Role.ADMINISTRATIVO)
+        cls.livre = User.objects.create_user(cpf="00000000001", first_name="Livre", role=User.Role.ALUNO)
+        cls.vinculado = User.objects.create_user(cpf="00000000002", first_name="Vinculado", role=User.Role.ALUNO)
+        cls.aluno = Aluno.objects.create(user=cls.vinculado, matricula="F001")
+
+    def test_usuarios_elegiveis(self):
+        form = AlunoForm()
+        queryset = form.fields["user"].queryset
+        self.assertEqual(list(queryset), [self.livre])
+        self.assertIn("NOT EXISTS", str(queryset.query))
+        # Ao editar, o próprio usuário continua elegível
+        form = AlunoForm(instance=self.aluno)
+        self.assertEqual(set(form.fields["user"].queryset), {self.livre, self.vinculado})
+
+    def test_renderiza_so_o_usuario_selecionado(self):
+        html = str(AlunoForm(instance=self.aluno)["user"])
+        self.assertIn("Vinculado", html)
+        self.assertNotIn("Livre", html)
+        self.assertIn(f"exceto_aluno={self.aluno.pk}", html)
+
+    def test_rejeita_usuario_ja_vinculado(self):
+        form = AlunoForm(data={"user": self.vinculado.pk, "situacao": Aluno.Situacao.ATIVO})
+        self.assertFalse(form.is_valid())
+        self.assertIn("user", form.errors)
+
+    def test_autocomplete_sem_aluno(self):
+        self.client.force_login(self.admin)
+        url = reverse("user_autocomplete")
+        dados = self.client.get(url, {"role": User.Role.ALUNO, "sem_aluno": 1}).json()
+        self.assertEqual([item["id"] for item in dados["resultados"]], [self.livre.pk])
+        dados = self.client.get(url, {"role": User.Role.ALUNO, "sem_aluno": 1, "exceto_aluno": self.aluno.pk}).json()
+        self.assertEqual({item["id"] for item in dados["resultados"]}, {self.livre.pk, self.vinculado.pk})
+
+
+def _xlsx(linhas):
+    planilha = Workbook()
+    for linha in linhas:
+        planilha.active.append(linha)
+    arquivo = BytesIO()
+    planilha.save(arquivo)
+    arquivo.seek(0)
+    return arquivo
+
+
+class ImportacaoAlunosTestCase(TestCase):
+    """Testes da importação de alunos em lote (importacao.py)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        faculdade = Faculdade.objects.create(nome="Faculdade")
+        cls.direito = Curso.objects.create(nome="Direito", faculdade=faculdade, duracao=10)
+        cls.sistemas = Curso.objects.create(nome="Sistemas de Informação", faculdade=faculdade, duracao=8)
+        cls.existente = User.objects.create_user(cpf="99999999999", first_name="Já", role=User.Role.ALUNO)
+        Aluno.objects.create(user=cls.existente, matricula="M-EXISTE")
+
+    def _importar(self, conteudo, nome="alunos.csv", **kwargs):
+        arquivo = BytesIO(conteudo.encode("utf-8-sig")) if isinstance(conteudo, str) else conteudo
+        return Importacao(**kwargs).executar(ler_linhas(arquivo, nome))
+
+    def test_csv_em_lotes(self):
+        linhas = ["CPF;Nome;Sobrenome;Matrícula;Curso;Data de ingresso"]
+        linhas += [f"{i:011d};Aluno;Número {i};M{i};Direito;15/02/2024" for i in range(1, 8)]
+        with CaptureQueriesContext(connection) as consultas:
+            importacao = self._importar("\n".join(linhas), lote=3)
+        # Um INSERT por lote (7 linhas em lotes de 3), não por linha
+        inserts = [c["sql"] for c in consultas.captured_queries if c["sql"].startswith('INSERT INTO "academico_aluno"')]
+        self.assertEqual(len(inserts), 3)
+        self.assertEqual((importacao.lidas, importacao.importados, importacao.erros), (7, 7, []))
+        aluno = Aluno.objects.select_related("user").get(matricula="M3")
+        self.assertEqual(aluno.user.cpf, "00000000003")
+        self.assertEqual(aluno.user.get_full_name(), "Aluno Número 3")
+        self.assertEqual(aluno.user.role, User.Role.ALUNO)
+        self.assertEqual(aluno.curso, self.direito)
+        self.assertEqual(aluno.data_ingresso, date(2024, 2, 15))
+        self.assertFalse(aluno.user.has_usable_password())
+        # bulk_create não dispara signals: o índice de busca foi atualizado pela importação
+        self.assertEqual(busca.buscar_ids("Número 3"), [aluno.user_id])
+
+    def test_erros_por_linha(self):
+        conteudo = "\n".join([
+            "cpf,nome,matricula,curso,data_ingresso,situacao,email",
+            "123,Curto,,,,,",
+            "00000000001,Ana,M1,Medicina,,,",
+            "00000000002,Bia,M2,,31/02/2024,,",
+            "00000000003,Caio,M3,,,Trancado,",
+            "00000000004,,M4,,,,x@",
+            "99999999999,Repetido no banco,,,,,",
+            "00000000005,Duda,M-EXISTE,,,,",
+            "00000000006,Edu,M6,sistemas de informacao,2024-08-01,inativo,edu@teste.br",
+            "00000000006,Edu de novo,M7,,,,",
+            "00000000008,Fabi,M6,,,,",
+        ])
+        importacao = self._importar(conteudo)
+        self.assertEqual(importacao.importados, 1)
+        erros = {linha: mensagem for linha, _, mensagem in importacao.erros}
+        self.assertEqual(sorted(erros), [2, 3, 4, 5, 6, 7, 8, 10, 11])
+        self.assertIn("11 dígitos", erros[2])
+        self.assertIn("Medicina", erros[3])
+        self.assertIn("Data de ingresso", erros[4])
+        self.assertIn("Situação", erros[5])
+        self.assertIn("Nome obrigatório", erros[6])
+        self.assertIn("E-mail", erros[6])
+        self.assertIn("CPF já cadastrado", erros[7])
+        self.assertIn("Matrícula já cadastrada", erros[8])
+        self.assertIn("linha 9", erros[10])
+        self.assertIn("linha 9", erros[11])
+        aluno = Aluno.objects.get(matricula="M6")
+        self.assertEqual((aluno.curso, aluno.situacao), (self.sistemas, Aluno.Situacao.INATIVO))
+
+    def test_xlsx_com_cpf_numerico_e_senha(self):
+        arquivo = _xlsx([
+            ["cpf", "nome", "curso", "data_ingresso", "senha"],
+            [1234567890, "Gabi", self.direito.pk, datetime(2023, 3, 1), "senha-forte-1"],
+            [None, None, None, None, None],
+            ["000.000.000-07", "Hugo", None, None, None],
+        ])
+        importacao = self._importar(arquivo, "alunos.XLSX")
+        self.assertEqual((importacao.lidas, importacao.importados, importacao.erros), (2, 2, []))
+        gabi = User.objects.get(cpf="01234567890")
+        self.assertTrue(gabi.check_password("senha-forte-1"))
+        self.assertEqual((gabi.aluno.curso, gabi.aluno.data_ingresso), (self.direito, date(2023, 3, 1)))
+        self.assertFalse(User.objects.get(cpf="00000000007").has_usable_password())
+
+    def test_csv_malformado(self):
+        for conteudo in ["cpf;nome\n00000000001;" + "x" * 200_000, 'cpf;nome\n00000000001;"Ana\n' + "y" * 200_000]:
+            with self.subTest(tamanho=len(conteudo)), self.assertRaisesMessage(ArquivoInvalido, "Arquivo CSV inválido"):
+                self._importar(conteudo)
+
+    def test_validar_apenas_nao_grava(self):
+        importacao = self._importar("cpf;nome\n00000000001;Ana\n99999999999;Já", validar_apenas=True)
+        self.assertEqual((importacao.importados, len(importacao.erros)), (1, 1))
+        self.assertFalse(User.objects.filter(cpf="00000000001").exists())
+
+    def test_comando(self):
+        with tempfile.TemporaryDirectory() as diretorio:
+            caminho = f"{diretorio}/alunos.csv"
+            with open(caminho, "w", encoding="cp1252") as arquivo:
+                arquivo.write("cpf;nome;curso\n00000000001;José;Direito\n00000000002;Lúcia;Arquitetura\n")
+            saida = StringIO()
+            call_command("importar_alunos", caminho, "--erros", f"{diretorio}/erros.csv", stdout=saida)
+            self.assertIn("1 aluno(s) importado(s), 1 erro(s)", saida.getvalue())
+            with open(f"{diretorio}/erros.csv", encoding="utf-8-sig") as arquivo:
+                self.assertEqual(arquivo.read().splitlines()[1], "3;00000000002;Curso “Arquitetura” não encontrado.")
+            self.assertEqual(User.objects.get(cpf="00000000001").first_name, "José")
+
+            with open(f"{diretorio}/alunos.csv", "w") as arquivo:
+                arquivo.write("nome;email\nAna;ana@teste.br\n")
+            with self.assertRaisesMessage(CommandError, "Colunas obrigatórias ausentes: cpf"):
+                call_command("importar_alunos", caminho, stdout=StringIO())
+
+
+@override_settings(STORAGES=SEM_MANIFEST)
+class ImportacaoAlunosViewTestCase(TestCase):
+    """Testes da tela de importação e do download do relatório de erros."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.admin = User.objects.create_user(cpf="99999999999", role=User.Role.ADMINISTRATIVO)
+        cls.aluno = User.objects.create_user(cpf="88888888888", role=User.Role.ALUNO)
+
+    def setUp(self):
+        self.diretorio = tempfile.TemporaryDirectory()
+        self.addCleanup(self.diretorio.cleanup)
+        override = override_settings(RELATORIOS_ARQUIVOS_DIR=self.diretorio.name)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def test_so_diretor_e_administrativo(self):
+        self.client.force_login(self.aluno)
+        self.assertEqual(self.client.get(reverse("academico:aluno_importar")).status_code, 403)
+        self.client.force_login(self.admin)
+        self.assertEqual(self.client.get(reverse("academico:aluno_importar")).status_code, 200)
+
+    def test_importa_e_baixa_relatorio_de_erros(self):
+        self.client.force_login(self.admin)
+        arquivo = SimpleUploadedFile("alunos.csv", "cpf;nome\n00000000001;Ana\n123;Curto\n".encode())
+        response = self.client.post(reverse("academico:aluno_importar"), {"arquivo": arquivo})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context["importacao"].importados, 1)
+        self.assertTrue(User.objects.filter(cpf="00000000001", aluno__isnull=False).exists())
+
+        url = reverse("academico:aluno_importar_erros", args=[response.context["token_erros"]])
+        download = self.client.get(url)
+        self.assertEqual(download.status_code, 200)
+        self.assertIn("3;123;Informe um CPF válido", b"".join(download.streaming_content).decode("utf-8-sig"))
+
+        # O relatório é da sessão de quem importou
+        self.client.force_login(User.objects.create_user(cpf="77777777777", role=User.Role.DIRETOR))
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_links_de_primeiro_acesso(self):
+        self.client.force_login(self.admin)
+        arquivo = SimpleUploadedFile("alunos.csv", "cpf;nome;senha\n00000000001;Ana;\n00000000002;Bia;segredo-da-bia\n".encode())
+        response = self.client.post(reverse("academico:aluno_importar"), {"arquivo": arquivo})
+        self.assertEqual([user.cpf for user in response.context["importacao"].sem_senha], ["00000000001"])
+        self.assertContains(response, "ainda não")
+
+        url = reverse("academico:aluno_importar_acessos", args=[response.context["token_acessos"]])
+        conteudo = b"".join(self.client.get(url).streaming_content).decode("utf-8-sig")
+        linhas = [linha.split(";") for linha in conteudo.splitlines()]
+        self.assertEqual([linha[:2] for linha in linhas], [["cpf", "nome"], ["00000000001", "Ana"]])
+        link = linhas[1][2]
+        self.assertTrue(link.startswith("http://testserver/primeiro-acesso/"))
+
+        # O aluno define a senha pelo link, que depois deixa de valer
+        self.client.logout()
+        definir = self.client.get(link, follow=True)
+        self.assertTrue(definir.context["validlink"])
+        senha = "Contrapartida#2025"
+        response = self.client.post(definir.redirect_chain[-1][0], {"new_password1": senha, "new_password2": senha})
+        self.assertRedirects(response, reverse("login"), fetch_redirect_response=False)
+        self.assertTrue(self.client.login(username="00000000001", password=senha))
+        self.client.logout()
+        self.assertFalse(self.client.get(link, follow=True).context["validlink"])
+
+        saida = StringIO()
+        call_command("links_primeiro_acesso", stdout=saida)
+        self.assertIn("88888888888", saida.getvalue())
+        self.assertNotIn("00000000001", saida.getvalue())
+
+    def test_formato_invalido(self):
+        self.client.force_login(self.admin)
+        arquivo = SimpleUploadedFile("alunos.txt", b"cpf;nome\n")
+        response = self.client.post(reverse("academico:aluno_importar"), {"arquivo": arquivo})
+        self.assertIn("arquivo", response.context["form"].errors)
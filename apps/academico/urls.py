@@ -16,6 +16,10 @@ urlpatterns = [
     path("cursos/<int:pk>/", views.CursoDetailView.as_view(), name="curso_detail"),
     # Aluno
     path("alunos/", views.AlunoListView.as_view(), name="aluno_list"),
+    path("alunos/autocomplete/", views.aluno_autocomplete, name="aluno_autocomplete"),
+    path("alunos/importar/", views.AlunoImportarView.as_view(), name="aluno_importar"),
+    path("alunos/importar/erros/<str:token>/", views.aluno_importar_erros, name="aluno_importar_erros"),
+    path("alunos/importar/acessos/<str:token>/", views.aluno_importar_acessos, name="aluno_importar_acessos"),
     path("alunos/cadastrar/<int:user_id>/", views.AlunoCreateComUsuarioView.as_view(), name="aluno_create_com_usuario"),
     path("alunos/cadastrar/", views.AlunoCadastroUsuarioView.as_view(), name="aluno_create"),
     path("alunos/<int:pk>/editar/", views.AlunoUpdateView.as_view(), name="aluno_edit"),
@@ -1,27 +1,33 @@
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin
 from datetime import timedelta
 
-from django.db.models import DurationField, Q, Sum, Value
-from django.db.models.functions import Coalesce
+from django.core.exceptions import ObjectDoesNotExist, PermissionDenied
 from django.shortcuts import get_object_or_404, redirect
 from django.urls import reverse_lazy
 from django.views.generic import CreateView, DetailView, FormView, ListView, UpdateView
-from urllib.parse import urlencode
 
-from .forms import AlunoForm, CursoForm, FaculdadeForm
+from .forms import AlunoForm, AlunoImportacaoForm, CursoForm, FaculdadeForm
+from .importacao import CABECALHO_ERROS, Importacao, ler_linhas
 from .models import Aluno, Curso, Faculdade
+from apps.usuarios import busca, primeiro_acesso
 from apps.usuarios.forms import UserCreateForm
+from core.utils.autocomplete import resposta_autocomplete
+from core.utils.paginacao import PaginacaoCursorMixin
+from core.utils.planilhas import ERROS_NA_TELA, ArquivoInvalido, pode_importar, resposta_erros, salvar_erros
 
 User = get_user_model()
 
 
 # --- Faculdade ---
-class FaculdadeListView(LoginRequiredMixin, ListView):
+class FaculdadeListView(LoginRequiredMixin, PaginacaoCursorMixin, ListView):
     model = Faculdade
     context_object_name = "faculdades"
     template_name = "academico/faculdade_list.html"
     paginate_by = 15
+    ordenacao_cursor = ("nome", "pk")
 
     def get_queryset(self):
         queryset = super().get_queryset()
@@ -30,13 +36,6 @@ class FaculdadeListView(LoginRequiredMixin, ListView):
             queryset = queryset.filter(nome__icontains=q)
         return queryset
 
-    def get_context_data(self, **kwargs):
-        context = super().get_context_data(**kwargs)
-        query_params = self.request.GET.copy()
-        query_params.pop("page", None)
-        context["querystring"] = urlencode(query_params)
-        return context
-
 
 class FaculdadeCreateView(LoginRequiredMixin, CreateView):
     model = Faculdade
@@ -52,11 +51,12 @@ class FaculdadeDetailView(LoginRequiredMixin, DetailView):
 
 
 # --- Curso ---
-class CursoListView(LoginRequiredMixin, ListView):
+class CursoListView(LoginRequiredMixin, PaginacaoCursorMixin, ListView):
     model = Curso
     context_object_name = "cursos"
     template_name = "academico/curso_list.html"
     paginate_by = 15
+    ordenacao_cursor = ("nome", "pk")
 
     def get_queryset(self):
         queryset = super().get_queryset().select_related("faculdade")
@@ -70,9 +70,6 @@ class CursoListView(LoginRequiredMixin, ListView):
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        query_params = self.request.GET.copy()
-        query_params.pop("page", None)
-        context["querystring"] = urlencode(query_params)
         context["faculdades"] = Faculdade.objects.all()
         return context
 
@@ -105,11 +102,12 @@ class CursoUpdateView(LoginRequiredMixin, UpdateView):
 
 
 # --- Aluno ---
-class AlunoListView(LoginRequiredMixin, ListView):
+class AlunoListView(LoginRequiredMixin, PaginacaoCursorMixin, ListView):
     model = Aluno
     context_object_name = "alunos"
     template_name = "academico/aluno_list.html"
     paginate_by = 15
+    ordenacao_cursor = ("user__first_name", "user__last_name", "pk")
 
     def get_queryset(self):
         queryset = super().get_queryset().select_related("user", "curso")
@@ -119,12 +117,7 @@ class AlunoListView(LoginRequiredMixin, ListView):
         situacao = self.request.GET.get("situacao", "").strip()
 
         if q:
-            queryset = queryset.filter(
-                Q(user__first_name__icontains=q)
-                | Q(user__last_name__icontains=q)
-                | Q(user__cpf__icontains=q)
-                | Q(user__username__icontains=q)
-            )
+            queryset = busca.anotar_relevancia(queryset.filter(busca.q_usuarios(q, "user")), q, "user")
         if matricula:
             queryset = queryset.filter(matricula__icontains=matricula)
         if curso:
@@ -133,16 +126,87 @@ class AlunoListView(LoginRequiredMixin, ListView):
             queryset = queryset.filter(situacao=situacao)
         return queryset
 
+    def get_ordenacao_cursor(self):
+        # Com busca, os mais relevantes primeiro (anotação de busca.anotar_relevancia)
+        if self.request.GET.get("q", "").strip():
+            return ("relevancia", *self.ordenacao_cursor)
+        return self.ordenacao_cursor
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        query_params = self.request.GET.copy()
-        query_params.pop("page", None)
-        context["querystring"] = urlencode(query_params)
         context["cursos"] = Curso.objects.all()
         context["situacoes"] = Aluno.Situacao.choices
+        context["pode_importar"] = pode_importar(self.request.user)
         return context
 
 
+@login_required
+def aluno_autocomplete(request):
+    """Opções de aluno para os campos de autocomplete (nome, CPF ou matrícula em ``q``)."""
+    queryset = Aluno.objects.select_related("user").only(
+        "matricula", "user__first_name", "user__last_name", "user__username"
+    )
+    ordenacao = ("user__first_name", "user__last_name", "pk")
+    q = request.GET.get("q", "").strip()
+    if q:
+        queryset = busca.anotar_relevancia(queryset.filter(busca.q_usuarios(q, "user")), q, "user")
+        ordenacao = ("relevancia", *ordenacao)
+    return resposta_autocomplete(
+        request,
+        queryset,
+        ordenacao,
+        lambda aluno: {"texto": aluno.user.get_full_name() or aluno.user.username, "detalhe": aluno.matricula or ""},
+    )
+
+
+class AlunoImportarView(LoginRequiredMixin, FormView):
+    """Importação de alunos em lote (CSV/XLSX); as linhas recusadas viram um CSV para download."""
+    form_class = AlunoImportacaoForm
+    template_name = "academico/aluno_importar.html"
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.user.is_authenticated and not pode_importar(request.user):
+            raise PermissionDenied
+        return super().dispatch(request, *args, **kwargs)
+
+    def form_valid(self, form):
+        arquivo = form.cleaned_data["arquivo"]
+        importacao = Importacao(validar_apenas=form.cleaned_data["validar_apenas"])
+        try:
+            importacao.executar(ler_linhas(arquivo, arquivo.name))
+        except ArquivoInvalido as erro:
+            form.add_error("arquivo", str(erro))
+            return self.form_invalid(form)
+
+        token = salvar_erros(self.request, importacao.erros, CABECALHO_ERROS) if importacao.erros else None
+        # Os links de primeiro acesso usam o mesmo armazenamento (por sessão) do relatório de erros
+        token_acessos = None
+        if importacao.sem_senha:
+            linhas = primeiro_acesso.linhas(importacao.sem_senha, self.request.build_absolute_uri("/")[:-1])
+            token_acessos = salvar_erros(self.request, linhas, primeiro_acesso.CABECALHO)
+        return self.render_to_response(self.get_context_data(
+            form=self.get_form_class()(),
+            importacao=importacao,
+            validar_apenas=importacao.validar_apenas,
+            erros=importacao.erros[:ERROS_NA_TELA],
+            token_erros=token,
+            token_acessos=token_acessos,
+            dias_link=settings.PASSWORD_RESET_TIMEOUT // (24 * 60 * 60),
+        ))
+
+
+@login_required
+def aluno_importar_erros(request, token):
+    """Download do CSV de erros de uma importação feita nesta sessão."""
+    return resposta_erros(request, token, "erros_importacao_alunos.csv")
+
+
+@login_required
+def aluno_importar_acessos(request, token):
+    """Download do CSV com os links de primeiro acesso dos alunos importados sem senha."""
+    return resposta_erros(request, token, "primeiro_acesso_alunos.csv")
+
+
 class AlunoCadastroUsuarioView(LoginRequiredMixin, FormView):
     """Passo 1 do cadastro de aluno: formulário de cadastro de usuário."""
     form_class = UserCreateForm
@@ -211,14 +275,11 @@ class AlunoDetailView(LoginRequiredMixin, DetailView):
         context["encaminhamentos"] = aluno.encaminhamentos.select_related(
             "secretaria", "responsavel_emissao"
         ).order_by("-data", "-numero")
-        total = aluno.horas.aggregate(
-            total=Coalesce(
-                Sum("quantidade", output_field=DurationField()),
-                Value(timedelta(0), output_field=DurationField()),
-                output_field=DurationField(),
-            )
-        )
-        context["total_horas"] = total["total"]
+        # Total mantido pelo app contrapartida (ResumoHoras); sem registros não há resumo
+        try:
+            context["total_horas"] = aluno.resumo_horas.total
+        except ObjectDoesNotExist:
+            context["total_horas"] = timedelta(0)
         return context
 
 
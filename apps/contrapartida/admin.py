@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Secretaria, Encaminhamento, Horas
+from .models import Secretaria, Encaminhamento, Horas, ResumoHoras, Sequencia
 
 
 @admin.register(Secretaria)
@@ -29,3 +29,32 @@ class HorasAdmin(admin.ModelAdmin):
     raw_id_fields = ("aluno", "responsavel_registro")
     date_hierarchy = "data_registro"
     ordering = ("-data_registro",)
+
+
+@admin.register(ResumoHoras)
+class ResumoHorasAdmin(admin.ModelAdmin):
+    list_display = ("aluno", "total", "quantidade_registros", "ultimo_registro")
+    search_fields = ("aluno__user__first_name", "aluno__user__last_name", "aluno__matricula")
+    raw_id_fields = ("aluno",)
+
+    # Mantido pelo sistema; correções via manage.py reconstruir_resumo_horas
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(Sequencia)
+class SequenciaAdmin(admin.ModelAdmin):
+    list_display = ("nome", "ultimo")
+
+    # Alterada só pelas reservas; editar à mão pode repetir números
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
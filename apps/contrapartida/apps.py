@@ -3,3 +3,8 @@ from django.apps import AppConfig
 
 class ContrapartidaConfig(AppConfig):
     name = 'apps.contrapartida'
+
+    def ready(self):
+        from . import signals
+
+        signals.conectar()
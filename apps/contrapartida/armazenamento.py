@@ -0,0 +1,165 @@
+"""
+Armazenamento dos ofícios de ``Horas.oficio_documento`` endereçado pelo conteúdo.
+
+O mesmo ofício cobre vários alunos e costuma ser enviado uma vez por
+registro. ``OficioStorage`` calcula o SHA-256 enquanto copia o envio para
+um arquivo temporário, em blocos de ``BLOCO`` bytes, e o move para
+``oficios/<2 primeiros>/<sha256><extensão>``: arquivos iguais viram um só
+no disco e o nome já identifica o conteúdo.
+
+A contagem de referências são as próprias linhas de ``Horas`` que apontam
+para o nome (coluna indexada). Ao excluir um registro ou trocar o documento,
+``liberar`` apaga o arquivo depois do commit se nenhuma linha o usa mais.
+Arquivos gravados há menos de ``CARENCIA`` segundos ficam — podem ser de
+um envio cuja transação ainda não terminou — e são recolhidos depois por
+``manage.py deduplicar_oficios``.
+
+Fotos e digitalizações são regravadas como JPEG de tamanho limitado antes
+do hash (``imagens.py``); a prévia de cada uma é gerada no primeiro pedido
+(``miniatura``) e guardada em ``miniaturas/`` pela mesma chave.
+"""
+
+import hashlib
+import os
+import posixpath
+import re
+import time
+import uuid
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+
+from .imagens import ERROS_IMAGEM, e_imagem, gerar_miniatura, nome_miniatura, otimizar_imagem
+
+# Bytes lidos por vez do envio; é o máximo que o armazenamento guarda em memória
+BLOCO = 64 * 1024
+
+# Idade mínima (s) para apagar um arquivo sem referências
+CARENCIA = 60 * 60
+
+# Prefixo dos temporários, no mesmo diretório do destino (o rename é atômico)
+PREFIXO_TEMPORARIO = ".envio-"
+
+# Extensões maiores que isso são cortadas no nome gravado
+EXTENSAO_MAXIMA = 10
+
+# oficios/ab/ab…(64 hex).ext
+_NOME_CONTEUDO = re.compile(r"(?:.+/)?([0-9a-f]{2})/(\1[0-9a-f]{62})[^/]*")
+
+
+class OficioStorage(FileSystemStorage):
+    """``FileSystemStorage`` que grava cada conteúdo distinto uma única vez, pelo SHA-256."""
+
+    # Regrava fotos e digitalizações como JPEG de tamanho limitado (imagens.py)
+    otimizar_imagens = True
+
+    def get_available_name(self, name, max_length=None):
+        # O nome final só é conhecido depois de ler o conteúdo (_save)
+        return name
+
+    def _save(self, name, content):
+        otimizado = otimizar_imagem(content) if self.otimizar_imagens and e_imagem(name) else None
+        if otimizado is None:
+            return self._gravar(name, content)
+        with otimizado:
+            return self._gravar(os.path.splitext(name)[0] + ".jpg", File(otimizado))
+
+    def _gravar(self, name, content):
+        diretorio = posixpath.dirname(name)
+        extensao = os.path.splitext(name)[1].lower()[:EXTENSAO_MAXIMA]
+        os.makedirs(self.path(diretorio), exist_ok=True)
+        temporario = self.path(posixpath.join(diretorio, f"{PREFIXO_TEMPORARIO}{uuid.uuid4().hex}"))
+
+        resumo = hashlib.sha256()
+        fd = os.open(temporario, os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, "O_BINARY", 0), 0o666)
+        try:
+            with os.fdopen(fd, "wb") as saida:
+                for bloco in content.chunks(BLOCO):
+                    if isinstance(bloco, str):
+                        bloco = bloco.encode()
+                    resumo.update(bloco)
+                    saida.write(bloco)
+            if self.file_permissions_mode is not None:
+                os.chmod(temporario, self.file_permissions_mode)
+
+            sha256 = resumo.hexdigest()
+            nome = posixpath.join(diretorio, sha256[:2], sha256 + extensao)
+            caminho = self.path(nome)
+            os.makedirs(os.path.dirname(caminho), exist_ok=True)
+            # Se já existe, o conteúdo é o mesmo: substituir só renova a data, que conta para a CARENCIA
+            os.replace(temporario, caminho)
+        except BaseException:
+            if os.path.exists(temporario):
+                os.remove(temporario)
+            raise
+        return nome
+
+
+oficio_storage = OficioStorage()
+
+
+def digest(nome):
+    """SHA-256 do conteúdo, tirado do nome gravado por ``OficioStorage``; None para nomes antigos."""
+    encontrado = _NOME_CONTEUDO.fullmatch(nome or "")
+    return encontrado.group(2) if encontrado else None
+
+
+def chave(nome):
+    """Chave da prévia do ofício: o SHA-256 do conteúdo (ou do nome, nos arquivos antigos)."""
+    return digest(nome) or hashlib.sha256(nome.encode()).hexdigest()
+
+
+def miniatura(nome):
+    """
+    Nome no storage da prévia do ofício ``nome``, gerada no primeiro pedido.
+
+    Returns:
+        o nome; None se o ofício não é imagem, está corrompido ou não está no disco
+    """
+    if not e_imagem(nome):
+        return None
+    previa = nome_miniatura(chave(nome))
+    try:
+        gerar_miniatura(oficio_storage.path(nome), oficio_storage.path(previa))
+    except ERROS_IMAGEM:
+        return None
+    return previa
+
+
+def obter_storage():
+    """Storage de ``Horas.oficio_documento`` (callable: a migração não serializa a instância)."""
+    return oficio_storage
+
+
+def referencias(nome):
+    """Registros de horas que apontam para o arquivo ``nome``."""
+    from .models import Horas
+
+    return Horas.objects.filter(oficio_documento=nome).count()
+
+
+def _apagar_sem_referencias(nomes, carencia):
+    limite = time.time() - carencia
+    for nome in nomes:
+        if not nome or referencias(nome):
+            continue
+        try:
+            if os.path.getmtime(oficio_storage.path(nome)) > limite:
+                continue
+        except FileNotFoundError:
+            continue
+        oficio_storage.delete(nome)
+        oficio_storage.delete(nome_miniatura(chave(nome)))
+
+
+def liberar(nomes, carencia=CARENCIA):
+    """
+    Apaga, depois do commit, os arquivos de ``nomes`` que nenhum registro usa mais.
+
+    Args:
+        nomes: nomes no storage (os vazios são ignorados)
+        carencia: idade mínima (s) do arquivo para ser apagado
+    """
+    nomes = set(nomes)
+    transaction.on_commit(lambda: _apagar_sem_referencias(nomes, carencia))
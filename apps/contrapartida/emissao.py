@@ -0,0 +1,93 @@
+"""
+Emissão de encaminhamentos em lote para uma secretaria.
+
+Os alunos vêm de um curso, situação, semestre e/ou de uma lista de
+matrículas colada na tela. Os números são reservados de uma vez na
+``Sequencia`` (``Encaminhamento.reservar_numeros``) e todos os
+encaminhamentos entram num ``bulk_create``, em vez de um ``save`` por aluno.
+
+Os números reservados são seguidos, então o lote é identificado pelo
+intervalo (primeiro, último) — é o que o ZIP de PDFs oficiais
+(``relatorios:encaminhamentos_lote_zip``) recebe em ``numero_inicio`` e
+``numero_fim``.
+"""
+
+import re
+
+from django.db import transaction
+from django.utils import timezone
+
+from apps.academico.models import Aluno, intervalo_ingresso
+from apps.relatorios.cache import incrementar_versao
+
+from .models import Encaminhamento
+
+# Encaminhamentos gravados por INSERT
+LOTE = 500
+
+_SEPARADORES = re.compile(r"[\s,;]+")
+
+
+def separar_matriculas(texto):
+    """Matrículas de um texto colado (uma por linha, ou separadas por vírgula/espaço), sem repetições."""
+    return list(dict.fromkeys(parte for parte in _SEPARADORES.split(texto or "") if parte))
+
+
+def selecionar_alunos(curso=None, situacao=None, semestre=None, matriculas=None):
+    """
+    Alunos do lote e as matrículas informadas que não existem.
+
+    Args:
+        curso: id do curso
+        situacao: valor de ``Aluno.Situacao``
+        semestre: semestre em que o aluno está hoje (pela data de ingresso)
+        matriculas: lista de matrículas
+
+    Returns:
+        (queryset de Aluno ordenado por nome, lista de matrículas não encontradas)
+    """
+    alunos = Aluno.objects.all()
+    if curso:
+        alunos = alunos.filter(curso_id=curso)
+    if situacao:
+        alunos = alunos.filter(situacao=situacao)
+    if semestre:
+        intervalo = intervalo_ingresso(semestre, timezone.localdate())
+        alunos = alunos.filter(data_ingresso__range=intervalo) if intervalo else alunos.none()
+    nao_encontradas = []
+    if matriculas:
+        alunos = alunos.filter(matricula__in=matriculas)
+        existentes = set(Aluno.objects.filter(matricula__in=matriculas).values_list("matricula", flat=True))
+        nao_encontradas = [matricula for matricula in matriculas if matricula not in existentes]
+    return alunos.order_by("user__first_name", "user__last_name", "pk"), nao_encontradas
+
+
+def emitir(secretaria, alunos, responsavel, data=None):
+    """
+    Emite um encaminhamento para cada aluno de ``alunos`` na ``secretaria``.
+
+    Returns:
+        ``range`` com os números emitidos (vazio se não há alunos)
+    """
+    aluno_ids = list(alunos.values_list("pk", flat=True))
+    if not aluno_ids:
+        return range(0)
+    data = data or timezone.localdate()
+    with transaction.atomic():
+        numeros = Encaminhamento.reservar_numeros(len(aluno_ids))
+        Encaminhamento.objects.bulk_create(
+            [
+                Encaminhamento(
+                    secretaria=secretaria,
+                    aluno_id=aluno_id,
+                    data=data,
+                    numero=numero,
+                    responsavel_emissao=responsavel,
+                )
+                for aluno_id, numero in zip(aluno_ids, numeros)
+            ],
+            batch_size=LOTE,
+        )
+    # bulk_create não dispara os signals que invalidam o cache dos relatórios
+    incrementar_versao()
+    return numeros
@@ -2,7 +2,13 @@ import re
 from datetime import timedelta
 
 from django import forms
+from django.urls import reverse_lazy
 
+from apps.academico.models import Aluno, Curso
+from core.utils.autocomplete import AutocompleteSelect
+from core.utils.planilhas import EXTENSOES
+
+from .emissao import separar_matriculas
 from .models import Encaminhamento, Horas, Secretaria
 
 # Classes Tailwind para os widgets
@@ -25,10 +31,23 @@ class EncaminhamentoForm(forms.ModelForm):
         model = Encaminhamento
         fields = ["secretaria", "aluno"]
         widgets = {
-            "secretaria": forms.Select(attrs={"class": TAILWIND_SELECT}),
-            "aluno": forms.Select(attrs={"class": TAILWIND_SELECT}),
+            "secretaria": AutocompleteSelect(
+                reverse_lazy("contrapartida:secretaria_autocomplete"),
+                attrs={"class": TAILWIND_SELECT},
+                placeholder="Digite o nome ou a sigla da secretaria",
+            ),
+            "aluno": AutocompleteSelect(
+                reverse_lazy("academico:aluno_autocomplete"),
+                attrs={"class": TAILWIND_SELECT},
+                placeholder="Digite o nome, CPF ou matrícula do aluno",
+            ),
         }
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Rótulo do aluno selecionado sem consulta extra ao usuário
+        self.fields["aluno"].queryset = Aluno.objects.select_related("user")
+
 
 class HorasForm(forms.ModelForm):
     quantidade = forms.CharField(
@@ -45,11 +64,19 @@ class HorasForm(forms.ModelForm):
             "oficio_documento",
         ]
         widgets = {
-            "aluno": forms.Select(attrs={"class": TAILWIND_SELECT}),
+            "aluno": AutocompleteSelect(
+                reverse_lazy("academico:aluno_autocomplete"),
+                attrs={"class": TAILWIND_SELECT},
+                placeholder="Digite o nome, CPF ou matrícula do aluno",
+            ),
             "oficio_informacao": forms.TextInput(attrs={"class": TAILWIND_INPUT, "placeholder": "Número do ofício"}),
             "oficio_documento": forms.ClearableFileInput(attrs={"class": TAILWIND_INPUT}),
         }
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields["aluno"].queryset = Aluno.objects.select_related("user")
+
     def clean_quantidade(self):
         valor = (self.cleaned_data.get("quantidade") or "").strip()
         if not re.match(r"^\d{1,2}:\d{2}$", valor):
@@ -60,3 +87,84 @@ class HorasForm(forms.ModelForm):
         if minutos_int > 59:
             raise forms.ValidationError("Minutos devem ser entre 00 e 59.")
         return timedelta(hours=horas_int, minutes=minutos_int)
+
+
+class HorasImportacaoForm(forms.Form):
+    arquivo = forms.FileField(
+        label="Planilha do ofício",
+        help_text="CSV ou XLSX com as colunas matricula (ou cpf) e horas; data e oficio são opcionais.",
+        widget=forms.ClearableFileInput(attrs={"class": TAILWIND_INPUT, "accept": ",".join(EXTENSOES)}),
+    )
+    oficio_informacao = forms.CharField(
+        label="Ofício de informação",
+        max_length=Horas._meta.get_field("oficio_informacao").max_length,
+        required=False,
+        help_text="Usado nas linhas sem a coluna oficio.",
+        widget=forms.TextInput(attrs={"class": TAILWIND_INPUT, "placeholder": "Número do ofício"}),
+    )
+    oficio_documento = forms.FileField(
+        label="Ofício de documento",
+        required=False,
+        help_text="Anexado a todos os registros importados.",
+        widget=forms.ClearableFileInput(attrs={"class": TAILWIND_INPUT}),
+    )
+    validar_apenas = forms.BooleanField(
+        label="Só validar (não grava nada)",
+        required=False,
+        widget=forms.CheckboxInput(attrs={"class": "h-4 w-4 text-primary-600 border-gray-300 rounded"}),
+    )
+
+    def clean_arquivo(self):
+        arquivo = self.cleaned_data["arquivo"]
+        if not arquivo.name.lower().endswith(EXTENSOES):
+            raise forms.ValidationError(f"Envie um arquivo {' ou '.join(EXTENSOES)}.")
+        return arquivo
+
+
+class EncaminhamentoLoteForm(forms.Form):
+    secretaria = forms.ModelChoiceField(
+        label="Secretaria",
+        queryset=Secretaria.objects.all(),
+        widget=AutocompleteSelect(
+            reverse_lazy("contrapartida:secretaria_autocomplete"),
+            attrs={"class": TAILWIND_SELECT},
+            placeholder="Digite o nome ou a sigla da secretaria",
+        ),
+    )
+    curso = forms.ModelChoiceField(
+        label="Curso",
+        queryset=Curso.objects.all(),
+        required=False,
+        empty_label="Todos",
+        widget=forms.Select(attrs={"class": TAILWIND_SELECT}),
+    )
+    situacao = forms.ChoiceField(
+        label="Situação",
+        choices=[("", "Todas")] + Aluno.Situacao.choices,
+        required=False,
+        initial=Aluno.Situacao.ATIVO,
+        widget=forms.Select(attrs={"class": TAILWIND_SELECT}),
+    )
+    semestre = forms.IntegerField(
+        label="Semestre",
+        min_value=1,
+        required=False,
+        help_text="Semestre que o aluno está cursando hoje.",
+        widget=forms.NumberInput(attrs={"class": TAILWIND_INPUT, "min": 1}),
+    )
+    matriculas = forms.CharField(
+        label="Matrículas",
+        required=False,
+        help_text="Uma por linha, ou separadas por vírgula.",
+        widget=forms.Textarea(attrs={"class": TAILWIND_INPUT, "rows": 4}),
+    )
+
+    def clean_matriculas(self):
+        return separar_matriculas(self.cleaned_data.get("matriculas"))
+
+    def clean(self):
+        cleaned_data = super().clean()
+        # Situação sozinha selecionaria quase todos os alunos
+        if not (cleaned_data.get("curso") or cleaned_data.get("semestre") or cleaned_data.get("matriculas")):
+            raise forms.ValidationError("Escolha um curso, um semestre ou informe as matrículas.")
+        return cleaned_data
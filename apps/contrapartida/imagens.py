@@ -0,0 +1,152 @@
+"""
+Otimização das fotos e digitalizações enviadas como ofício.
+
+Muitos ofícios chegam como foto de celular ou digitalização de vários MB.
+``otimizar_imagem`` regrava a imagem como JPEG com no máximo ``LADO_MAXIMO``
+pixels no lado maior, já na orientação do EXIF (e sem os metadados, como a
+localização da foto); ``OficioStorage`` aplica isso a todo envio. JPEGs já
+dentro do limite, PDFs e imagens de várias páginas ficam como vieram.
+
+``gerar_miniatura`` faz a prévia mostrada nas telas de horas. As funções
+daqui só usam o Pillow e caminhos do disco: rodam nos processos filhos do
+``manage.py otimizar_oficios``, que não configuram o Django.
+"""
+
+import hashlib
+import os
+import tempfile
+import uuid
+
+from PIL import Image, ImageOps
+
+EXTENSOES_IMAGEM = (".jpg", ".jpeg", ".png", ".webp", ".gif", ".bmp", ".tif", ".tiff")
+
+# Lado maior (px) e qualidade do ofício regravado
+LADO_MAXIMO = 2000
+QUALIDADE = 82
+
+# Lado maior (px) e qualidade das prévias
+LADO_MINIATURA = 320
+QUALIDADE_MINIATURA = 75
+
+# Prévias ficam no storage dos ofícios, em miniaturas/<ab>/<chave>.jpg
+PASTA_MINIATURAS = "miniaturas"
+
+# Bytes da imagem regravada mantidos em memória antes de ir para o disco
+EM_MEMORIA = 1024 * 1024
+
+_ORIENTACAO = 0x0112
+
+# Imagem corrompida ou truncada (o erro só aparece ao decodificar) ou grande demais
+ERROS_IMAGEM = (OSError, ValueError, Image.DecompressionBombError)
+
+
+def e_imagem(nome):
+    """Se o nome tem extensão de imagem (tem prévia)."""
+    return os.path.splitext(nome or "")[1].lower() in EXTENSOES_IMAGEM
+
+
+def nome_miniatura(chave):
+    """Nome da prévia no storage; ``chave`` é o SHA-256 do ofício."""
+    return f"{PASTA_MINIATURAS}/{chave[:2]}/{chave}.jpg"
+
+
+def _preparar(imagem, lado):
+    """Imagem reduzida a ``lado``, na orientação do EXIF, em RGB (ou tons de cinza)."""
+    # JPEG: decodifica já numa escala menor, sem abrir a foto inteira na memória
+    imagem.draft("RGB", (lado, lado))
+    imagem = ImageOps.exif_transpose(imagem)
+    if imagem.mode in ("RGBA", "LA", "PA") or "transparency" in imagem.info:
+        imagem = imagem.convert("RGBA")
+        fundo = Image.new("RGB", imagem.size, "white")
+        fundo.paste(imagem, mask=imagem.getchannel("A"))
+        imagem = fundo
+    elif imagem.mode not in ("RGB", "L"):
+        imagem = imagem.convert("L" if imagem.mode in ("1", "I", "I;16", "F") else "RGB")
+    imagem.thumbnail((lado, lado), Image.Resampling.LANCZOS)
+    return imagem
+
+
+def otimizar_imagem(arquivo):
+    """
+    JPEG limitado a ``LADO_MAXIMO`` de uma imagem enviada.
+
+    Args:
+        arquivo: arquivo binário com ``seek``/``read`` (upload ou ``open``)
+
+    Returns:
+        arquivo temporário com o JPEG, na posição 0; None se não é imagem (ou
+        está corrompida), tem várias páginas, já é um JPEG dentro do limite ou
+        regravar não diminui — nesses casos o original é gravado como veio
+    """
+    arquivo.seek(0, os.SEEK_END)
+    tamanho = arquivo.tell()
+    arquivo.seek(0)
+    saida = None
+    try:
+        imagem = Image.open(arquivo)
+        dentro = max(imagem.size) <= LADO_MAXIMO
+        girada = imagem.getexif().get(_ORIENTACAO, 1) != 1
+        if getattr(imagem, "n_frames", 1) > 1 or (imagem.format == "JPEG" and dentro and not girada):
+            return None
+        saida = tempfile.SpooledTemporaryFile(max_size=EM_MEMORIA)
+        _preparar(imagem, LADO_MAXIMO).save(saida, "JPEG", quality=QUALIDADE, optimize=True, progressive=True)
+    except ERROS_IMAGEM:
+        if saida is not None:
+            saida.close()
+        return None
+    finally:
+        # Sem imagem.close(): fecharia o arquivo de quem chamou
+        arquivo.seek(0)
+    if dentro and not girada and saida.tell() >= tamanho:
+        saida.close()
+        return None
+    saida.seek(0)
+    return saida
+
+
+def gerar_miniatura(origem, destino):
+    """Grava em ``destino`` a prévia JPEG da imagem em ``origem``, se ainda não existe."""
+    if os.path.exists(destino):
+        return
+    os.makedirs(os.path.dirname(destino), exist_ok=True)
+    temporario = f"{destino}.{uuid.uuid4().hex}.tmp"
+    try:
+        with Image.open(origem) as imagem:
+            _preparar(imagem, LADO_MINIATURA).save(temporario, "JPEG", quality=QUALIDADE_MINIATURA, optimize=True)
+        # Pedidos simultâneos da mesma prévia gravam o mesmo conteúdo
+        os.replace(temporario, destino)
+    finally:
+        if os.path.exists(temporario):
+            os.remove(temporario)
+
+
+def processar(caminho, chave, raiz, diretorio_temporario):
+    """
+    Otimiza um ofício do acervo e gera sua prévia (processo filho do otimizar_oficios).
+
+    Args:
+        caminho: arquivo original
+        chave: chave da prévia se o arquivo não for regravado
+        raiz: diretório do storage dos ofícios (as prévias ficam nele)
+        diretorio_temporario: onde gravar o JPEG regravado
+
+    Returns:
+        (caminho do JPEG regravado ou None, bytes antes, bytes depois)
+    """
+    antes = os.path.getsize(caminho)
+    with open(caminho, "rb") as arquivo:
+        otimizado = otimizar_imagem(arquivo)
+    if otimizado is None:
+        gerar_miniatura(caminho, os.path.join(raiz, nome_miniatura(chave)))
+        return None, antes, antes
+
+    resumo = hashlib.sha256()
+    fd, temporario = tempfile.mkstemp(dir=diretorio_temporario, suffix=".jpg")
+    with otimizado, os.fdopen(fd, "wb") as saida:
+        for bloco in iter(lambda: otimizado.read(64 * 1024), b""):
+            resumo.update(bloco)
+            saida.write(bloco)
+    # O storage vai gravar esse conteúdo com o nome do próprio SHA-256
+    gerar_miniatura(temporario, os.path.join(raiz, nome_miniatura(resumo.hexdigest())))
+    return temporario, antes, os.path.getsize(temporario)
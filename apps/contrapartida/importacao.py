@@ -0,0 +1,256 @@
+"""
+Importação de horas em lote a partir do ofício mensal de cada secretaria.
+
+A planilha (CSV ou XLSX, lida em streaming por ``core.utils.planilhas``)
+traz uma linha por aluno. O aluno é encontrado pela matrícula ou pelo CPF
+num dicionário carregado uma única vez; as horas aceitam ``HH:MM``, horas
+decimais ("4,5") ou a célula de duração do Excel.
+
+As linhas válidas são gravadas em lotes de ``LOTE``: uma consulta por lote
+confere registros já existentes com o mesmo (aluno, ofício, data) — pelo
+índice de ``Horas`` — e um ``bulk_create`` grava o lote, recalculando o
+``ResumoHoras`` dos alunos envolvidos (``HorasQuerySet.bulk_create``). Tudo
+numa transação: um erro inesperado não deixa metade do ofício gravado.
+
+O documento do ofício é gravado uma única vez no storage e todas as linhas
+apontam para o mesmo arquivo (que ainda é compartilhado com outras
+importações do mesmo conteúdo; ``armazenamento.py``).
+
+Colunas: ``matricula`` ou ``cpf`` e ``horas`` obrigatórias; ``data``
+(padrão: hoje) e ``oficio`` (padrão: o ofício informado na importação)
+opcionais.
+"""
+
+import re
+from datetime import time, timedelta
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.utils import timezone
+
+from apps.academico.models import Aluno
+from apps.relatorios.cache import incrementar_versao
+from core.utils import planilhas
+from core.utils.planilhas import data_celula, texto_celula
+
+from .armazenamento import liberar
+from .models import Horas
+
+# Linhas conferidas e gravadas por vez
+LOTE = 500
+
+# Cabeçalho normalizado -> campo
+COLUNAS = {
+    "matricula": "matricula",
+    "cpf": "cpf",
+    "horas": "horas",
+    "quantidade": "horas",
+    "quantidade_de_horas": "horas",
+    "carga_horaria": "horas",
+    "data": "data",
+    "data_registro": "data",
+    "data_de_registro": "data",
+    "oficio": "oficio",
+    "oficio_informacao": "oficio",
+}
+OBRIGATORIAS = (("matricula", "cpf"), "horas")
+
+CABECALHO_ERROS = ("linha", "aluno", "erro")
+
+_HORAS_MINUTOS = re.compile(r"(\d{1,3}):([0-5]\d)")
+_HORAS_DECIMAIS = re.compile(r"\d{1,3}(?:[.,]\d+)?")
+
+
+def ler_linhas(arquivo, nome):
+    """Linhas da planilha de horas (``core.utils.planilhas.ler_linhas``)."""
+    return planilhas.ler_linhas(arquivo, nome, COLUNAS, OBRIGATORIAS)
+
+
+def converter_horas(valor):
+    """
+    Duração da célula: ``HH:MM``, horas decimais ou duração/hora do XLSX.
+
+    Raises:
+        ValidationError: formato não reconhecido ou duração zero
+    """
+    if isinstance(valor, timedelta):
+        duracao = valor
+    elif isinstance(valor, time):
+        duracao = timedelta(hours=valor.hour, minutes=valor.minute)
+    elif isinstance(valor, (int, float)) and not isinstance(valor, bool):
+        duracao = timedelta(minutes=round(valor * 60))
+    else:
+        texto = texto_celula(valor)
+        if encontrado := _HORAS_MINUTOS.fullmatch(texto):
+            duracao = timedelta(hours=int(encontrado[1]), minutes=int(encontrado[2]))
+        elif _HORAS_DECIMAIS.fullmatch(texto):
+            duracao = timedelta(minutes=round(float(texto.replace(",", ".")) * 60))
+        else:
+            raise ValidationError(f"Horas inválidas: “{texto}” (use HH:MM).")
+    if duracao <= timedelta(0):
+        raise ValidationError("Quantidade de horas deve ser maior que zero.")
+    return duracao
+
+
+class TabelaAlunos:
+    """Alunos por matrícula e por CPF, carregados numa consulta."""
+
+    def __init__(self):
+        self.por_matricula = {}
+        self.por_cpf = {}
+        for pk, matricula, cpf in Aluno.objects.values_list("pk", "matricula", "user__cpf"):
+            if matricula:
+                self.por_matricula[matricula] = pk
+            self.por_cpf[cpf] = pk
+
+    def resolver(self, dados):
+        """Id do aluno da linha; ValidationError se não encontrado ou se matrícula e CPF divergem."""
+        matricula = texto_celula(dados.get("matricula"))
+        bruto = dados.get("cpf")
+        # CPF numérico no XLSX perde os zeros à esquerda
+        cpf = str(int(bruto)).zfill(11) if isinstance(bruto, (int, float)) else re.sub(r"\D", "", texto_celula(bruto))
+        if not matricula and not cpf:
+            raise ValidationError("Informe a matrícula ou o CPF do aluno.")
+        pelo_cpf = self.por_cpf.get(cpf) if cpf else None
+        if matricula:
+            pela_matricula = self.por_matricula.get(matricula)
+            if pela_matricula is None:
+                raise ValidationError(f"Matrícula “{matricula}” não encontrada.")
+            if cpf and pelo_cpf != pela_matricula:
+                raise ValidationError("Matrícula e CPF são de alunos diferentes.")
+            return pela_matricula
+        if pelo_cpf is None:
+            raise ValidationError(f"CPF “{cpf}” não encontrado.")
+        return pelo_cpf
+
+
+class ImportacaoHoras:
+    """
+    Uma importação de ofício em andamento.
+
+    Args:
+        responsavel: usuário registrado como responsável por todas as linhas
+        oficio_informacao: ofício das linhas sem a coluna ``oficio``
+        oficio_documento: arquivo do ofício (``File``), anexado uma vez
+    """
+
+    def __init__(self, responsavel, oficio_informacao="", oficio_documento=None, validar_apenas=False, lote=LOTE):
+        self.responsavel = responsavel
+        self.oficio_informacao = (oficio_informacao or "").strip()
+        self.oficio_documento = oficio_documento
+        self.validar_apenas = validar_apenas
+        self.lote = lote
+        self.lidas = 0
+        self.importados = 0
+        # (linha, aluno, mensagem)
+        self.erros = []
+        self.documento = None
+
+    def executar(self, linhas):
+        """Valida e grava todas as ``linhas``; tudo numa transação."""
+        alunos = TabelaAlunos()
+        hoje = timezone.localdate()
+        vistos = {}
+        pendentes = []
+        try:
+            with transaction.atomic():
+                for numero, dados in linhas:
+                    self.lidas += 1
+                    try:
+                        valores = self._validar(dados, alunos, hoje)
+                    except ValidationError as erro:
+                        self._erro(numero, dados, " ".join(erro.messages))
+                        continue
+                    chave = (valores["aluno_id"], valores["oficio"], valores["data"])
+                    if chave in vistos:
+                        self._erro(numero, dados, f"Registro repetido (linha {vistos[chave]}).")
+                        continue
+                    vistos[chave] = numero
+                    pendentes.append((numero, dados, valores))
+                    if len(pendentes) >= self.lote:
+                        self._gravar(pendentes)
+                        pendentes = []
+                if pendentes:
+                    self._gravar(pendentes)
+        except BaseException:
+            # O arquivo do ofício não fica órfão no storage (a menos que outros registros já o usem).
+            # Com a carência padrão: um envio simultâneo do mesmo conteúdo pode gravar o mesmo nome;
+            # se for recente, o deduplicar_oficios o recolhe depois
+            if self.documento:
+                liberar([self.documento])
+            raise
+
+        if self.importados and not self.validar_apenas:
+            incrementar_versao()
+        return self
+
+    def _erro(self, numero, dados, mensagem):
+        aluno = texto_celula(dados.get("matricula")) or texto_celula(dados.get("cpf"))
+        self.erros.append((numero, aluno, mensagem))
+
+    def _validar(self, dados, alunos, hoje):
+        valores = {}
+        erros = []
+        try:
+            valores["aluno_id"] = alunos.resolver(dados)
+        except ValidationError as erro:
+            erros.extend(erro.messages)
+        try:
+            valores["quantidade"] = converter_horas(dados.get("horas"))
+        except ValidationError as erro:
+            erros.extend(erro.messages)
+        try:
+            valores["data"] = data_celula(dados["data"]) if texto_celula(dados.get("data")) else hoje
+        except ValueError:
+            erros.append(f"Data inválida: “{texto_celula(dados.get('data'))}”.")
+        oficio = texto_celula(dados.get("oficio")) or self.oficio_informacao
+        maximo = Horas._meta.get_field("oficio_informacao").max_length
+        if not oficio:
+            erros.append("Informe o ofício.")
+        elif len(oficio) > maximo:
+            erros.append(f"Ofício com mais de {maximo} caracteres.")
+        valores["oficio"] = oficio
+        if erros:
+            raise ValidationError(erros)
+        return valores
+
+    def _gravar(self, pendentes):
+        # Uma consulta pelo índice (aluno, oficio_informacao, data_registro)
+        existentes = set(
+            Horas.objects.filter(
+                aluno_id__in={valores["aluno_id"] for _, _, valores in pendentes},
+                oficio_informacao__in={valores["oficio"] for _, _, valores in pendentes},
+                data_registro__in={valores["data"] for _, _, valores in pendentes},
+            ).values_list("aluno_id", "oficio_informacao", "data_registro")
+        )
+        validos = []
+        for numero, dados, valores in pendentes:
+            if (valores["aluno_id"], valores["oficio"], valores["data"]) in existentes:
+                self._erro(numero, dados, "Horas já registradas para este aluno, ofício e data.")
+            else:
+                validos.append(valores)
+        if self.validar_apenas or not validos:
+            self.importados += len(validos)
+            return
+
+        documento = self._documento()
+        criados = Horas.objects.bulk_create([
+            Horas(
+                aluno_id=valores["aluno_id"],
+                quantidade=valores["quantidade"],
+                data_registro=valores["data"],
+                oficio_informacao=valores["oficio"],
+                oficio_documento=documento,
+                responsavel_registro=self.responsavel,
+            )
+            for valores in validos
+        ])
+        self.importados += len(criados)
+
+    def _documento(self):
+        """Nome do ofício no storage, gravado no primeiro lote."""
+        if self.oficio_documento and not self.documento:
+            campo = Horas._meta.get_field("oficio_documento")
+            nome = campo.generate_filename(None, self.oficio_documento.name)
+            self.documento = campo.storage.save(nome, self.oficio_documento, max_length=campo.max_length)
+        return self.documento
@@ -0,0 +1,70 @@
+"""Converte os ofícios antigos para o armazenamento por conteúdo e recolhe arquivos órfãos (armazenamento.py)."""
+
+import os
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.contrapartida.armazenamento import CARENCIA, PREFIXO_TEMPORARIO, digest, oficio_storage
+from apps.contrapartida.models import Horas
+
+
+class Command(BaseCommand):
+    help = "Regrava os ofícios de nomes antigos pelo SHA-256 (um arquivo por conteúdo) e apaga os arquivos sem registro."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--simular", action="store_true", help="Só mostra o que seria feito.")
+        parser.add_argument(
+            "--carencia", type=int, default=CARENCIA, help=f"Idade mínima (s) de um órfão para ser apagado (padrão: {CARENCIA})."
+        )
+
+    def handle(self, *args, **options):
+        simular = options["simular"]
+        nomes = set(
+            Horas.objects.exclude(oficio_documento="").exclude(oficio_documento__isnull=True)
+            .values_list("oficio_documento", flat=True).distinct()
+        )
+
+        convertidos = 0
+        for antigo in sorted(nome for nome in nomes if not digest(nome)):
+            if not oficio_storage.exists(antigo):
+                self.stderr.write(f"Arquivo não encontrado: {antigo}")
+                continue
+            convertidos += 1
+            if simular:
+                continue
+            with oficio_storage.open(antigo) as arquivo:
+                novo = oficio_storage.save(antigo, arquivo)
+            Horas.objects.filter(oficio_documento=antigo).update(oficio_documento=novo)
+            nomes.add(novo)
+            oficio_storage.delete(antigo)
+
+        removidos, liberados = self._remover_orfaos(nomes, time.time() - options["carencia"], simular)
+        acao = "seriam" if simular else "foram"
+        self.stdout.write(
+            f"{convertidos} ofício(s) antigo(s) regravado(s) por conteúdo; {removidos} arquivo(s) sem registro "
+            f"{acao} apagado(s) ({liberados / (1024 * 1024):.1f} MB)."
+        )
+
+    def _remover_orfaos(self, nomes, limite, simular):
+        diretorio = Horas._meta.get_field("oficio_documento").upload_to.strip("/")
+        raiz = oficio_storage.path(diretorio)
+        removidos = liberados = 0
+        for pasta, _, arquivos in os.walk(raiz):
+            for arquivo in arquivos:
+                caminho = os.path.join(pasta, arquivo)
+                nome = os.path.relpath(caminho, oficio_storage.location).replace(os.sep, "/")
+                if nome in nomes and not arquivo.startswith(PREFIXO_TEMPORARIO):
+                    continue
+                try:
+                    estado = os.stat(caminho)
+                except FileNotFoundError:
+                    continue
+                # Recentes podem ser de um envio cuja transação ainda não terminou
+                if estado.st_mtime > limite:
+                    continue
+                removidos += 1
+                liberados += estado.st_size
+                if not simular:
+                    os.remove(caminho)
+        return removidos, liberados
@@ -0,0 +1,74 @@
+"""Emite encaminhamentos em lote para uma secretaria (apps/contrapartida/emissao.py)."""
+
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.academico.models import Aluno
+from apps.contrapartida.emissao import emitir, selecionar_alunos, separar_matriculas
+from apps.contrapartida.models import Secretaria
+from apps.usuarios.models import User
+
+
+class Command(BaseCommand):
+    help = "Emite um encaminhamento por aluno selecionado, com números reservados de uma vez e bulk_create."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--secretaria", type=int, required=True, help="ID da secretaria.")
+        parser.add_argument("--responsavel", required=True, help="CPF do usuário responsável pela emissão.")
+        parser.add_argument("--curso", type=int, help="ID do curso dos alunos.")
+        parser.add_argument(
+            "--situacao", choices=Aluno.Situacao.values, default=Aluno.Situacao.ATIVO, help="Situação dos alunos (padrão: ATIVO)."
+        )
+        parser.add_argument("--semestre", type=int, help="Semestre que os alunos estão cursando hoje.")
+        parser.add_argument("--matriculas", help="Arquivo texto com as matrículas (uma por linha).")
+        parser.add_argument("--data", type=date.fromisoformat, help="Data dos encaminhamentos (AAAA-MM-DD; padrão: hoje).")
+        parser.add_argument("--zip", help="Gera também o ZIP com os PDFs oficiais do lote neste caminho.")
+        parser.add_argument("--simular", action="store_true", help="Só mostra quantos alunos seriam atendidos.")
+
+    def handle(self, *args, **options):
+        secretaria = Secretaria.objects.filter(pk=options["secretaria"]).first()
+        if secretaria is None:
+            raise CommandError(f"Secretaria não encontrada: {options['secretaria']}")
+        responsavel = User.objects.filter(cpf=options["responsavel"]).first()
+        if responsavel is None:
+            raise CommandError(f"Usuário não encontrado: {options['responsavel']}")
+
+        matriculas = None
+        if options["matriculas"]:
+            try:
+                with open(options["matriculas"], encoding="utf-8-sig") as arquivo:
+                    matriculas = separar_matriculas(arquivo.read())
+            except FileNotFoundError as erro:
+                raise CommandError(f"Arquivo não encontrado: {options['matriculas']}") from erro
+        if not (options["curso"] or options["semestre"] or matriculas):
+            raise CommandError("Informe --curso, --semestre ou --matriculas.")
+
+        alunos, nao_encontradas = selecionar_alunos(
+            curso=options["curso"],
+            situacao=options["situacao"],
+            semestre=options["semestre"],
+            matriculas=matriculas,
+        )
+        for matricula in nao_encontradas:
+            self.stderr.write(f"Matrícula não encontrada: {matricula}")
+        if options["simular"]:
+            self.stdout.write(f"{alunos.count()} aluno(s) selecionado(s).")
+            return
+
+        inicio = time.monotonic()
+        numeros = emitir(secretaria, alunos, responsavel, data=options["data"])
+        if not numeros:
+            raise CommandError("Nenhum aluno selecionado.")
+        self.stdout.write(
+            f"{len(numeros)} encaminhamento(s) emitido(s), nº {numeros[0]} a {numeros[-1]}, "
+            f"em {time.monotonic() - inicio:.1f}s"
+        )
+
+        if options["zip"]:
+            from apps.relatorios.services.encaminhamento_lote import escrever_zip
+
+            with open(options["zip"], "wb") as destino:
+                escrever_zip(destino, {"numero_inicio": numeros[0], "numero_fim": numeros[-1]})
+            self.stdout.write(f"PDFs em {options['zip']}")
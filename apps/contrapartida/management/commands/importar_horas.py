@@ -0,0 +1,65 @@
+"""Importa as horas de um ofício de secretaria (apps/contrapartida/importacao.py)."""
+
+import time
+from pathlib import Path
+
+from django.core.files import File
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.contrapartida.importacao import CABECALHO_ERROS, LOTE, ImportacaoHoras, ler_linhas
+from apps.usuarios.models import User
+from core.utils.planilhas import ArquivoInvalido, escrever_erros
+
+
+class Command(BaseCommand):
+    help = "Importa as horas de um ofício (CSV ou XLSX), gravando em lotes com bulk_create."
+
+    def add_arguments(self, parser):
+        parser.add_argument("arquivo", help="Arquivo .csv ou .xlsx com cabeçalho na primeira linha.")
+        parser.add_argument("--responsavel", required=True, help="CPF do usuário responsável pelo registro.")
+        parser.add_argument("--oficio", default="", help="Ofício das linhas sem a coluna oficio.")
+        parser.add_argument("--documento", help="Arquivo do ofício, anexado a todos os registros.")
+        parser.add_argument("--erros", help="Caminho do CSV com as linhas recusadas e o motivo.")
+        parser.add_argument("--validar", action="store_true", help="Só valida; não grava nada.")
+        parser.add_argument("--lote", type=int, default=LOTE, help=f"Linhas gravadas por vez (padrão: {LOTE}).")
+
+    def handle(self, *args, **options):
+        responsavel = User.objects.filter(cpf=options["responsavel"]).first()
+        if responsavel is None:
+            raise CommandError(f"Usuário não encontrado: {options['responsavel']}")
+
+        inicio = time.monotonic()
+        try:
+            with open(options["arquivo"], "rb") as arquivo:
+                documento = None
+                if options["documento"]:
+                    documento = File(open(options["documento"], "rb"), name=Path(options["documento"]).name)
+                try:
+                    importacao = ImportacaoHoras(
+                        responsavel,
+                        oficio_informacao=options["oficio"],
+                        oficio_documento=documento,
+                        validar_apenas=options["validar"],
+                        lote=options["lote"],
+                    ).executar(ler_linhas(arquivo, options["arquivo"]))
+                finally:
+                    if documento:
+                        documento.close()
+        except FileNotFoundError as erro:
+            raise CommandError(f"Arquivo não encontrado: {erro.filename}") from erro
+        except ArquivoInvalido as erro:
+            raise CommandError(str(erro)) from erro
+        duracao = time.monotonic() - inicio
+
+        if importacao.erros and options["erros"]:
+            with open(options["erros"], "w", encoding="utf-8-sig", newline="") as destino:
+                escrever_erros(importacao.erros, destino, CABECALHO_ERROS)
+        elif importacao.erros:
+            for linha, aluno, mensagem in importacao.erros:
+                self.stderr.write(f"Linha {linha} ({aluno or 'sem aluno'}): {mensagem}")
+
+        acao = "válido(s)" if options["validar"] else "importado(s)"
+        self.stdout.write(
+            f"{importacao.lidas} linha(s) lida(s), {importacao.importados} registro(s) de horas {acao}, "
+            f"{len(importacao.erros)} erro(s) em {duracao:.1f}s"
+        )
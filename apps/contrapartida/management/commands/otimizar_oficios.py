@@ -0,0 +1,100 @@
+"""Regrava as fotos e digitalizações do acervo de ofícios e gera as prévias (imagens.py), num pool de processos."""
+
+import multiprocessing
+import os
+import posixpath
+import tempfile
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from django.conf import settings
+from django.core.files import File
+from django.core.management.base import BaseCommand
+
+from apps.contrapartida.armazenamento import chave, liberar, oficio_storage
+from apps.contrapartida.imagens import e_imagem, processar
+from apps.contrapartida.models import Horas
+
+# Arquivos aguardando cada processo
+ARQUIVOS_POR_WORKER = 4
+
+
+class Command(BaseCommand):
+    help = "Regrava os ofícios que são imagem como JPEG de tamanho limitado e gera as prévias, em paralelo."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers", type=int, default=None, help="Processos (padrão: OFICIOS_OTIMIZAR_WORKERS; 1 = sem pool)."
+        )
+
+    def handle(self, *args, **options):
+        workers = settings.OFICIOS_OTIMIZAR_WORKERS if options["workers"] is None else options["workers"]
+        nomes = sorted(
+            nome
+            for nome in Horas.objects.exclude(oficio_documento="").exclude(oficio_documento__isnull=True)
+            .values_list("oficio_documento", flat=True).distinct()
+            if e_imagem(nome)
+        )
+        raiz = oficio_storage.path("")
+        os.makedirs(raiz, exist_ok=True)
+
+        inicio = time.monotonic()
+        regravados = erros = antes = depois = 0
+        with tempfile.TemporaryDirectory(dir=raiz, prefix=".otimizar-") as temporarios:
+            for nome, resultado, erro in self._processar(nomes, raiz, temporarios, workers):
+                if erro:
+                    erros += 1
+                    self.stderr.write(f"{nome}: {erro}")
+                    continue
+                otimizado, tamanho_antes, tamanho_depois = resultado
+                antes += tamanho_antes
+                depois += tamanho_depois
+                if otimizado is None:
+                    continue
+                with open(otimizado, "rb") as arquivo:
+                    novo = oficio_storage.save(posixpath.splitext(nome)[0] + ".jpg", File(arquivo))
+                os.remove(otimizado)
+                Horas.objects.filter(oficio_documento=nome).update(oficio_documento=novo)
+                # O original recente fica para o deduplicar_oficios (pode ser de um envio em andamento)
+                liberar([nome])
+                regravados += 1
+
+        self.stdout.write(
+            f"{len(nomes)} ofício(s) de imagem, {regravados} regravado(s), {erros} erro(s): "
+            f"{antes / (1024 * 1024):.1f} MB -> {depois / (1024 * 1024):.1f} MB em {time.monotonic() - inicio:.1f}s"
+        )
+
+    def _processar(self, nomes, raiz, temporarios, workers):
+        """(nome, resultado de ``processar``, erro) de cada ofício, na ordem em que ficam prontos."""
+        argumentos = ((nome, (oficio_storage.path(nome), chave(nome), raiz, temporarios)) for nome in nomes)
+        if workers <= 1:
+            for nome, args in argumentos:
+                try:
+                    yield nome, processar(*args), None
+                except Exception as exc:
+                    yield nome, None, str(exc) or exc.__class__.__name__
+            return
+
+        # "spawn" evita herdar conexões de banco; os filhos só usam o Pillow e o disco
+        contexto = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=contexto) as pool:
+            pendentes = {}
+            limite = workers * ARQUIVOS_POR_WORKER
+            esgotado = False
+            while pendentes or not esgotado:
+                while not esgotado and len(pendentes) < limite:
+                    proximo = next(argumentos, None)
+                    if proximo is None:
+                        esgotado = True
+                        break
+                    nome, args = proximo
+                    pendentes[pool.submit(processar, *args)] = nome
+                if not pendentes:
+                    break
+                prontos, _ = wait(pendentes, return_when=FIRST_COMPLETED)
+                for future in prontos:
+                    nome = pendentes.pop(future)
+                    try:
+                        yield nome, future.result(), None
+                    except Exception as exc:
+                        yield nome, None, str(exc) or exc.__class__.__name__
@@ -0,0 +1,50 @@
+"""Reconstrói ou confere a tabela ResumoHoras a partir de contrapartida_horas."""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.contrapartida.models import ANOS_RESUMO, ResumoHoras
+
+CAMPOS = ["total", "quantidade_registros", "ultimo_registro", *[f"ano_{ano}" for ano in range(1, ANOS_RESUMO + 1)]]
+
+
+class Command(BaseCommand):
+    help = "Recalcula os resumos de horas por aluno (ou só confere, com --verificar)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--verificar",
+            action="store_true",
+            help="Só compara os resumos gravados com o cálculo a partir de Horas; não altera nada.",
+        )
+
+    def handle(self, *args, **options):
+        if not options["verificar"]:
+            resumos = ResumoHoras.objects.recalcular()
+            self.stdout.write(f"{len(resumos)} resumo(s) de horas reconstruído(s).")
+            return
+
+        esperados = {resumo.aluno_id: resumo for resumo in ResumoHoras.objects.calcular()}
+        gravados = {resumo.aluno_id: resumo for resumo in ResumoHoras.objects.all()}
+        divergencias = []
+        for aluno_id in sorted(esperados.keys() | gravados.keys()):
+            esperado = esperados.get(aluno_id)
+            gravado = gravados.get(aluno_id)
+            if gravado is None:
+                divergencias.append(f"Aluno {aluno_id}: resumo ausente")
+                continue
+            if esperado is None:
+                # Aluno sem horas: o resumo só pode estar zerado
+                esperado = ResumoHoras(aluno_id=aluno_id)
+            for campo in CAMPOS:
+                if getattr(gravado, campo) != getattr(esperado, campo):
+                    divergencias.append(
+                        f"Aluno {aluno_id}: {campo} gravado={getattr(gravado, campo)} esperado={getattr(esperado, campo)}"
+                    )
+
+        for linha in divergencias:
+            self.stdout.write(linha)
+        if divergencias:
+            raise CommandError(
+                f"{len(divergencias)} divergência(s). Rode 'manage.py reconstruir_resumo_horas' para corrigir."
+            )
+        self.stdout.write(f"{len(gravados)} resumo(s) conferido(s), nenhuma divergência.")
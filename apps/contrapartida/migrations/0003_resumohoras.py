@@ -0,0 +1,68 @@
+# Generated by Django 6.0.1 on 2026-10-18 12:15
+
+import datetime
+import django.db.models.deletion
+from django.db import migrations, models
+
+# Cópia da regra de apps.contrapartida.models.calcular_ano_curso (migrações não importam o código atual)
+ANOS_RESUMO = 6
+
+
+def _ano_curso(data_ingresso, data_registro):
+    if not data_ingresso:
+        return None
+    diferenca = data_registro.year - data_ingresso.year
+    if (data_registro.month, data_registro.day) >= (data_ingresso.month, data_ingresso.day):
+        diferenca += 1
+    return min(max(diferenca, 1), ANOS_RESUMO)
+
+
+def preencher_resumos(apps, schema_editor):
+    Horas = apps.get_model('contrapartida', 'Horas')
+    ResumoHoras = apps.get_model('contrapartida', 'ResumoHoras')
+
+    resumos = {}
+    registros = Horas.objects.values_list('aluno_id', 'aluno__data_ingresso', 'data_registro', 'quantidade')
+    for aluno_id, data_ingresso, data_registro, quantidade in registros.iterator():
+        resumo = resumos.get(aluno_id)
+        if resumo is None:
+            resumo = resumos[aluno_id] = ResumoHoras(aluno_id=aluno_id, ultimo_registro=data_registro)
+        resumo.total += quantidade
+        resumo.quantidade_registros += 1
+        resumo.ultimo_registro = max(resumo.ultimo_registro, data_registro)
+        ano = _ano_curso(data_ingresso, data_registro)
+        if ano:
+            campo = f'ano_{ano}'
+            setattr(resumo, campo, getattr(resumo, campo) + quantidade)
+    ResumoHoras.objects.bulk_create(resumos.values(), batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('academico', '0003_aluno_celular_aluno_sexo_aluno_telefone'),
+        ('contrapartida', '0002_alter_horas_oficio_documento'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumoHoras',
+            fields=[
+                ('aluno', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='resumo_horas', serialize=False, to='academico.aluno', verbose_name='Aluno')),
+                ('total', models.DurationField(default=datetime.timedelta(0), verbose_name='Total de horas')),
+                ('quantidade_registros', models.PositiveIntegerField(default=0, verbose_name='Quantidade de registros')),
+                ('ultimo_registro', models.DateField(blank=True, null=True, verbose_name='Último registro')),
+                ('ano_1', models.DurationField(default=datetime.timedelta(0), verbose_name='1º ano')),
+                ('ano_2', models.DurationField(default=datetime.timedelta(0), verbose_name='2º ano')),
+                ('ano_3', models.DurationField(default=datetime.timedelta(0), verbose_name='3º ano')),
+                ('ano_4', models.DurationField(default=datetime.timedelta(0), verbose_name='4º ano')),
+                ('ano_5', models.DurationField(default=datetime.timedelta(0), verbose_name='5º ano')),
+                ('ano_6', models.DurationField(default=datetime.timedelta(0), verbose_name='6º ano')),
+            ],
+            options={
+                'verbose_name': 'Resumo de horas',
+                'verbose_name_plural': 'Resumos de horas',
+            },
+        ),
+        migrations.RunPython(preencher_resumos, migrations.RunPython.noop),
+    ]
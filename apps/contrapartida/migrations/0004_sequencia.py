@@ -0,0 +1,33 @@
+# Generated by Django 6.0.1 on 2026-10-18 12:38
+
+from django.db import migrations, models
+from django.db.models import Max
+
+
+def criar_sequencia_encaminhamento(apps, schema_editor):
+    Encaminhamento = apps.get_model('contrapartida', 'Encaminhamento')
+    Sequencia = apps.get_model('contrapartida', 'Sequencia')
+    ultimo = Encaminhamento.objects.aggregate(ultimo=Max('numero'))['ultimo'] or 0
+    Sequencia.objects.create(nome='encaminhamento', ultimo=ultimo)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contrapartida', '0003_resumohoras'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Sequencia',
+            fields=[
+                ('nome', models.CharField(max_length=50, primary_key=True, serialize=False, verbose_name='Nome')),
+                ('ultimo', models.BigIntegerField(default=0, verbose_name='Último número')),
+            ],
+            options={
+                'verbose_name': 'Sequência',
+                'verbose_name_plural': 'Sequências',
+            },
+        ),
+        migrations.RunPython(criar_sequencia_encaminhamento, migrations.RunPython.noop),
+    ]
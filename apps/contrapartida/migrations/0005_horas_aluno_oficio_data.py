@@ -0,0 +1,20 @@
+# Generated by Django 6.0.1 on 2026-10-18 12:46
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('academico', '0003_aluno_celular_aluno_sexo_aluno_telefone'),
+        ('contrapartida', '0004_sequencia'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='horas',
+            index=models.Index(fields=['aluno', 'oficio_informacao', 'data_registro'], name='contraparti_aluno_i_f567e5_idx'),
+        ),
+    ]
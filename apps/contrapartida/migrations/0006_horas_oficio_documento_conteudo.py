@@ -0,0 +1,19 @@
+# Generated by Django 6.0.1 on 2026-10-18 12:53
+
+import apps.contrapartida.armazenamento
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contrapartida', '0005_horas_aluno_oficio_data'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='horas',
+            name='oficio_documento',
+            field=models.FileField(blank=True, db_index=True, null=True, storage=apps.contrapartida.armazenamento.obter_storage, upload_to='oficios/', verbose_name='Ofício de documento'),
+        ),
+    ]
@@ -1,7 +1,22 @@
-from django.db import models
+from datetime import timedelta
+
+from django.db import IntegrityError, models, transaction
+from django.db.models import Case, Count, F, IntegerField, Max, OuterRef, Q, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce, ExtractDay, ExtractMonth, ExtractYear, Greatest, Least
+from django.db.models.lookups import GreaterThanOrEqual
+
 from apps.academico.models import Aluno
 from apps.usuarios.models import User
 
+from .armazenamento import liberar, obter_storage
+from .imagens import e_imagem
+
+# Anos do curso mostrados no encaminhamento e nos relatórios de horas
+ANOS_CURSO = 4
+
+# Anos guardados no ResumoHoras (cobre cursos de até 12 semestres)
+ANOS_RESUMO = 6
+
 #Modelo Secretaria
 class Secretaria(models.Model):
     nome = models.CharField(max_length=200, verbose_name="Nome")
@@ -15,6 +30,59 @@ class Secretaria(models.Model):
     def __str__(self):
         return self.sigla
 
+class SequenciaManager(models.Manager):
+    def reservar(self, nome, quantidade=1, inicial=0):
+        """
+        Reserva ``quantidade`` números seguidos da sequência ``nome``.
+
+        O incremento é um único UPDATE com ``F()`` numa transação curta; a
+        linha fica bloqueada até o fim da transação, então duas reservas
+        simultâneas nunca recebem o mesmo número. Reservar um bloco custa o
+        mesmo que reservar um número.
+
+        Args:
+            inicial: último número já usado (ou função que o calcula), usado
+                só se a sequência ainda não existir
+
+        Returns:
+            range: os números reservados
+        """
+        if quantidade < 1:
+            raise ValueError("A quantidade deve ser positiva.")
+        with transaction.atomic(using=self.db):
+            if not self.filter(nome=nome).update(ultimo=F("ultimo") + quantidade):
+                ultimo = inicial() if callable(inicial) else inicial
+                try:
+                    with transaction.atomic(using=self.db):
+                        self.create(nome=nome, ultimo=ultimo + quantidade)
+                except IntegrityError:
+                    # Outra transação criou a sequência ao mesmo tempo
+                    self.filter(nome=nome).update(ultimo=F("ultimo") + quantidade)
+            ultimo = self.filter(nome=nome).values_list("ultimo", flat=True).get()
+        return range(ultimo - quantidade + 1, ultimo + 1)
+
+
+#Modelo Sequencia
+class Sequencia(models.Model):
+    """Contador nomeado para numeração (ex.: número do encaminhamento)."""
+
+    nome = models.CharField(max_length=50, primary_key=True, verbose_name="Nome")
+    ultimo = models.BigIntegerField(default=0, verbose_name="Último número")
+
+    objects = SequenciaManager()
+
+    class Meta:
+        verbose_name = "Sequência"
+        verbose_name_plural = "Sequências"
+
+    def __str__(self):
+        return f"{self.nome}: {self.ultimo}"
+
+
+# Sequência dos números de encaminhamento
+SEQUENCIA_ENCAMINHAMENTO = "encaminhamento"
+
+
 #Modelo Encaminhamento
 class Encaminhamento(models.Model):
     secretaria = models.ForeignKey(Secretaria, on_delete=models.CASCADE, verbose_name="Secretaria")
@@ -33,23 +101,252 @@ class Encaminhamento(models.Model):
 
     def save(self, *args, **kwargs):
         if not self.numero:
-            ultimo = Encaminhamento.objects.order_by("-numero").values_list("numero", flat=True).first()
-            self.numero = (ultimo or 0) + 1
+            self.numero = self.reservar_numeros()[0]
         super().save(*args, **kwargs)
 
+    @classmethod
+    def reservar_numeros(cls, quantidade=1):
+        """Reserva ``quantidade`` números seguidos para novos encaminhamentos (para ``bulk_create``)."""
+        return Sequencia.objects.reservar(
+            SEQUENCIA_ENCAMINHAMENTO,
+            quantidade,
+            inicial=lambda: cls.objects.aggregate(ultimo=Max("numero"))["ultimo"] or 0,
+        )
+
+def ano_curso(anos=ANOS_CURSO, registro="data_registro", ingresso="aluno__data_ingresso"):
+    """
+    Expressão com o ano do curso (1 a ``anos``) em que caiu o registro.
+
+    Um ano se completa a cada aniversário da data de ingresso; registros
+    anteriores ao ingresso contam no 1º ano e os posteriores ao último ano, no
+    último. Fica NULL quando o aluno não tem data de ingresso.
+    """
+
+    def mes_dia(campo):
+        return ExtractMonth(campo) * 100 + ExtractDay(campo)
+
+    diferenca = (
+        ExtractYear(registro)
+        - ExtractYear(ingresso)
+        + Case(When(GreaterThanOrEqual(mes_dia(registro), mes_dia(ingresso)), then=Value(1)), default=Value(0))
+    )
+    return Case(
+        When(**{f"{ingresso}__isnull": True}, then=Value(None)),
+        default=Greatest(Least(diferenca, Value(anos)), Value(1)),
+        output_field=IntegerField(),
+    )
+
+
+def calcular_ano_curso(data_ingresso, data_registro, anos=ANOS_CURSO):
+    """Mesma regra de ``ano_curso`` para um único registro, em Python (None sem data de ingresso)."""
+    if not data_ingresso:
+        return None
+    diferenca = data_registro.year - data_ingresso.year
+    if (data_registro.month, data_registro.day) >= (data_ingresso.month, data_ingresso.day):
+        diferenca += 1
+    return min(max(diferenca, 1), anos)
+
+
+class HorasQuerySet(models.QuerySet):
+    def por_ano_curso(self, *campos, anos=ANOS_CURSO):
+        """
+        Soma as horas de cada ano do curso, por aluno, em uma única consulta agrupada.
+
+        Cada linha traz ``aluno_id``, os ``campos`` pedidos, ``ano_1`` a
+        ``ano_<anos>`` e ``total`` (None quando não há horas no ano). Horas de
+        alunos sem data de ingresso entram só no total.
+        """
+        somas = {f"ano_{ano}": Sum("quantidade", filter=Q(ano_curso=ano)) for ano in range(1, anos + 1)}
+        return (
+            self.alias(ano_curso=ano_curso(anos))
+            .values("aluno_id", *campos)
+            .order_by()
+            .annotate(**somas, total=Sum("quantidade"))
+        )
+
+    def horas_por_ano_curso(self, anos=ANOS_CURSO):
+        """Retorna {aluno_id: {1: timedelta, ..., anos: timedelta}} a partir de ``por_ano_curso``."""
+        return {
+            linha["aluno_id"]: {ano: linha[f"ano_{ano}"] or timedelta(0) for ano in range(1, anos + 1)}
+            for linha in self.por_ano_curso(anos=anos)
+        }
+
+    # Operações em massa não passam por Horas.save/delete: o resumo dos alunos
+    # afetados é recalculado na mesma transação.
+
+    def update(self, **kwargs):
+        with transaction.atomic(using=self.db):
+            alunos = set(self.values_list("aluno_id", flat=True))
+            linhas = super().update(**kwargs)
+            alunos.update(self.values_list("aluno_id", flat=True))
+            ResumoHoras.objects.recalcular(alunos)
+        return linhas
+
+    def bulk_create(self, objs, *args, **kwargs):
+        with transaction.atomic(using=self.db):
+            criados = super().bulk_create(objs, *args, **kwargs)
+            ResumoHoras.objects.recalcular({obj.aluno_id for obj in criados})
+        return criados
+
+
 #Modelo Horas
 class Horas(models.Model):
     aluno = models.ForeignKey(Aluno, on_delete=models.CASCADE, related_name="horas", verbose_name="Aluno")
     quantidade = models.DurationField(verbose_name="Quantidade de horas")
     data_registro = models.DateField(verbose_name="Data de registro")
     oficio_informacao = models.CharField(max_length=200, verbose_name="Ofício de informação")
-    oficio_documento = models.FileField(upload_to="oficios/", verbose_name="Ofício de documento", blank=True, null=True)
+    # Um arquivo por conteúdo, compartilhado pelos registros do mesmo ofício (armazenamento.py)
+    oficio_documento = models.FileField(
+        upload_to="oficios/", storage=obter_storage, db_index=True, verbose_name="Ofício de documento", blank=True, null=True
+    )
     responsavel_registro = models.ForeignKey(User, on_delete=models.CASCADE, related_name="horas_registro", verbose_name="Responsável pelo registro")
 
+    objects = HorasQuerySet.as_manager()
+
     class Meta:
         verbose_name = "Horas"
         verbose_name_plural = "Horas"
         ordering = ["data_registro"]
+        # Conferência de duplicados na importação de ofícios (importacao.py)
+        indexes = [models.Index(fields=["aluno", "oficio_informacao", "data_registro"])]
 
     def __str__(self):
         return f"{self.quantidade} - {self.encaminhamento.numero} - {self.encaminhamento.aluno.user.first_name} {self.encaminhamento.aluno.user.last_name} - {self.encaminhamento.secretaria.sigla}"
+
+    @property
+    def oficio_e_imagem(self):
+        """O ofício é uma foto ou digitalização (tem prévia)."""
+        return bool(self.oficio_documento) and e_imagem(self.oficio_documento.name)
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and not {"aluno", "aluno_id", "data_registro", "quantidade", "oficio_documento"} & set(update_fields):
+            return super().save(*args, **kwargs)
+        # O resumo do aluno é atualizado na mesma transação do registro
+        with transaction.atomic(using=kwargs.get("using")):
+            anterior = None
+            if self.pk:
+                anterior = (
+                    Horas.objects.filter(pk=self.pk)
+                    .values("aluno_id", "data_registro", "quantidade", "oficio_documento")
+                    .first()
+                )
+            super().save(*args, **kwargs)
+            if anterior:
+                documento = anterior.pop("oficio_documento")
+                if documento and documento != self.oficio_documento.name:
+                    liberar([documento])
+                ResumoHoras.objects.registrar(sinal=-1, **anterior)
+            ResumoHoras.objects.registrar(self.aluno_id, self.data_registro, self.quantidade)
+        # A exclusão (inclusive em cascata) é tratada pelo post_delete em signals.py
+
+
+class ResumoHorasManager(models.Manager):
+    def registrar(self, aluno_id, data_registro, quantidade, sinal=1):
+        """
+        Soma (``sinal=1``) ou subtrai (``sinal=-1``) um registro de horas no resumo do aluno.
+
+        A atualização usa expressões F, então registros simultâneos do mesmo
+        aluno não se sobrescrevem.
+        """
+        data_ingresso = Aluno.objects.filter(pk=aluno_id).values_list("data_ingresso", flat=True).first()
+        ano = calcular_ano_curso(data_ingresso, data_registro, anos=ANOS_RESUMO)
+        delta = quantidade * sinal
+        campos = {
+            "total": F("total") + delta,
+            "quantidade_registros": F("quantidade_registros") + sinal,
+        }
+        if ano:
+            campos[f"ano_{ano}"] = F(f"ano_{ano}") + delta
+
+        if sinal > 0:
+            self.get_or_create(aluno_id=aluno_id)
+            campos["ultimo_registro"] = Greatest(Coalesce("ultimo_registro", Value(data_registro)), Value(data_registro))
+        else:
+            # Na exclusão o resumo pode já ter sido apagado junto com o aluno; não recria
+            campos["ultimo_registro"] = Subquery(
+                Horas.objects.filter(aluno_id=OuterRef("aluno_id"))
+                .order_by("-data_registro")
+                .values("data_registro")[:1]
+            )
+        self.filter(aluno_id=aluno_id).update(**campos)
+
+    def calcular(self, aluno_ids=None):
+        """Resumos calculados do zero a partir de Horas (uma consulta agrupada), sem gravar."""
+        horas = Horas.objects.all()
+        if aluno_ids is not None:
+            horas = horas.filter(aluno_id__in=aluno_ids)
+        linhas = horas.por_ano_curso(anos=ANOS_RESUMO).annotate(
+            quantidade_registros=Count("pk"),
+            ultimo_registro=Max("data_registro"),
+        )
+        return [
+            ResumoHoras(
+                aluno_id=linha["aluno_id"],
+                total=linha["total"],
+                quantidade_registros=linha["quantidade_registros"],
+                ultimo_registro=linha["ultimo_registro"],
+                **{f"ano_{ano}": linha[f"ano_{ano}"] or timedelta(0) for ano in range(1, ANOS_RESUMO + 1)},
+            )
+            for linha in linhas
+        ]
+
+    def recalcular(self, aluno_ids=None):
+        """Regrava os resumos dos alunos indicados (ou de todos) a partir de Horas."""
+        aluno_ids = None if aluno_ids is None else list(aluno_ids)
+        resumos = self.calcular(aluno_ids)
+        with transaction.atomic(using=self.db):
+            antigos = self.all() if aluno_ids is None else self.filter(aluno_id__in=aluno_ids)
+            antigos.delete()
+            self.bulk_create(resumos)
+        return resumos
+
+
+#Modelo ResumoHoras
+class ResumoHoras(models.Model):
+    """
+    Totais de horas por aluno, mantidos a cada gravação de Horas.
+
+    Evita somar ``contrapartida_horas`` nas listagens: o total vira a leitura de
+    uma linha. ``ano_1``...``ano_6`` seguem a regra de ``ano_curso`` com
+    ``ANOS_RESUMO`` anos. Alterações feitas fora do ORM exigem
+    ``manage.py reconstruir_resumo_horas``.
+    """
+
+    aluno = models.OneToOneField(
+        Aluno,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="resumo_horas",
+        verbose_name="Aluno",
+    )
+    total = models.DurationField(default=timedelta(0), verbose_name="Total de horas")
+    quantidade_registros = models.PositiveIntegerField(default=0, verbose_name="Quantidade de registros")
+    ultimo_registro = models.DateField(null=True, blank=True, verbose_name="Último registro")
+    ano_1 = models.DurationField(default=timedelta(0), verbose_name="1º ano")
+    ano_2 = models.DurationField(default=timedelta(0), verbose_name="2º ano")
+    ano_3 = models.DurationField(default=timedelta(0), verbose_name="3º ano")
+    ano_4 = models.DurationField(default=timedelta(0), verbose_name="4º ano")
+    ano_5 = models.DurationField(default=timedelta(0), verbose_name="5º ano")
+    ano_6 = models.DurationField(default=timedelta(0), verbose_name="6º ano")
+
+    objects = ResumoHorasManager()
+
+    class Meta:
+        verbose_name = "Resumo de horas"
+        verbose_name_plural = "Resumos de horas"
+
+    def __str__(self):
+        return f"{self.aluno_id} - {self.total}"
+
+    def por_ano(self, anos=ANOS_CURSO):
+        """
+        {1: timedelta, ..., anos: timedelta}, com os anos seguintes somados ao último
+        (como ``ano_curso(anos)``). Retorna None se ``anos`` passar de ``ANOS_RESUMO``.
+        """
+        if anos > ANOS_RESUMO:
+            return None
+        valores = [getattr(self, f"ano_{ano}") for ano in range(1, ANOS_RESUMO + 1)]
+        por_ano = {ano: valores[ano - 1] for ano in range(1, anos)}
+        por_ano[anos] = sum(valores[anos - 1:], timedelta(0))
+        return por_ano
@@ -0,0 +1,41 @@
+"""Signals que mantêm o ResumoHoras (e os arquivos de ofício) em dia fora de Horas.save."""
+
+from django.db.models.signals import post_delete, post_save, pre_save
+
+from apps.academico.models import Aluno
+
+from .armazenamento import liberar
+from .models import Horas, ResumoHoras
+
+
+def _horas_excluidas(sender, instance, **kwargs):
+    # Roda dentro da transação do delete, inclusive em exclusões em massa e em cascata
+    ResumoHoras.objects.registrar(instance.aluno_id, instance.data_registro, instance.quantidade, sinal=-1)
+    if instance.oficio_documento:
+        liberar([instance.oficio_documento.name])
+
+
+def _aluno_salvando(sender, instance, update_fields=None, **kwargs):
+    # Data de ingresso gravada, para o post_save saber se ela mudou
+    if instance.pk is None or (update_fields is not None and "data_ingresso" not in update_fields):
+        return
+    instance._data_ingresso_anterior = (
+        Aluno.objects.filter(pk=instance.pk).values_list("data_ingresso", flat=True).first()
+    )
+
+
+def _aluno_salvo(sender, instance, created, update_fields=None, **kwargs):
+    # A divisão por ano depende da data de ingresso; outros campos não mexem no resumo
+    anterior = instance.__dict__.pop("_data_ingresso_anterior", None)
+    if created or (update_fields is not None and "data_ingresso" not in update_fields):
+        return
+    if anterior == instance.data_ingresso:
+        return
+    if ResumoHoras.objects.filter(aluno_id=instance.pk).exists():
+        ResumoHoras.objects.recalcular([instance.pk])
+
+
+def conectar():
+    post_delete.connect(_horas_excluidas, sender=Horas, dispatch_uid="contrapartida_resumo_horas_delete")
+    pre_save.connect(_aluno_salvando, sender=Aluno, dispatch_uid="contrapartida_resumo_horas_aluno_pre")
+    post_save.connect(_aluno_salvo, sender=Aluno, dispatch_uid="contrapartida_resumo_horas_aluno")
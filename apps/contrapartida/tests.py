@@ -1,4 +1,859 @@
-from django.test import TestCase
+import hashlib
+import os
+import tempfile
+import threading
+from datetime import date, time, timedelta
+from io import BytesIO, StringIO
 
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from openpyxl import Workbook
+from PIL import Image
 
-# Create your tests here.
+from apps.academico.models import Aluno, Curso, Faculdade
+from core.utils.ambiente_teste import SEM_MANIFEST
+
+from .armazenamento import BLOCO, oficio_storage
+from .imagens import LADO_MAXIMO, LADO_MINIATURA
+from .emissao import emitir, selecionar_alunos, separar_matriculas
+from .importacao import ImportacaoHoras, converter_horas, ler_linhas
+from .models import Encaminhamento, Horas, ResumoHoras, Secretaria, Sequencia
+
+User = get_user_model()
+
+
+class HorasPorAnoCursoTestCase(TestCase):
+    """Testes da soma de horas por ano do curso feita no banco."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.responsavel = User.objects.create_user(cpf="99999999999", role=User.Role.DIRETOR)
+        curso = Curso.objects.create(nome="Curso", faculdade=Faculdade.objects.create(nome="FAC"), duracao=6)
+        cls.aluno = Aluno.objects.create(
+            user=User.objects.create_user(cpf="00000000001"),
+            curso=curso,
+            matricula="M1",
+            data_ingresso=date(2022, 3, 10),
+        )
+        cls.sem_ingresso = Aluno.objects.create(user=User.objects.create_user(cpf="00000000002"), matricula="M2")
+        registros = [
+            (cls.aluno, date(2022, 1, 5), 1),  # antes do ingresso: 1º ano
+            (cls.aluno, date(2023, 3, 9), 2),  # véspera do aniversário: ainda 1º ano
+            (cls.aluno, date(2023, 3, 10), 4),  # aniversário: 2º ano
+            (cls.aluno, date(2030, 1, 1), 8),  # depois do curso: último ano
+            (cls.sem_ingresso, date(2024, 1, 1), 5),
+        ]
+        for aluno, dia, horas in registros:
+            Horas.objects.create(
+                aluno=aluno,
+                quantidade=timedelta(hours=horas),
+                data_registro=dia,
+                oficio_informacao="OF",
+                responsavel_registro=cls.responsavel,
+            )
+
+    def test_varios_alunos_em_uma_consulta(self):
+        with self.assertNumQueries(1):
+            por_aluno = Horas.objects.horas_por_ano_curso(anos=3)
+        self.assertEqual(
+            por_aluno[self.aluno.pk],
+            {1: timedelta(hours=3), 2: timedelta(hours=4), 3: timedelta(hours=8)},
+        )
+        self.assertEqual(por_aluno[self.sem_ingresso.pk], {1: timedelta(0), 2: timedelta(0), 3: timedelta(0)})
+
+    def test_total_inclui_aluno_sem_ingresso(self):
+        linhas = {linha["aluno_id"]: linha for linha in Horas.objects.por_ano_curso("aluno__matricula")}
+        self.assertEqual(linhas[self.aluno.pk]["total"], timedelta(hours=15))
+        self.assertEqual(linhas[self.sem_ingresso.pk]["total"], timedelta(hours=5))
+        self.assertIsNone(linhas[self.sem_ingresso.pk]["ano_1"])
+        self.assertEqual(linhas[self.aluno.pk]["aluno__matricula"], "M1")
+
+    @override_settings(STORAGES=SEM_MANIFEST)
+    def test_progresso_da_tela_de_horas(self):
+        self.client.force_login(self.responsavel)
+        response = self.client.get(reverse("contrapartida:horas_aluno_list", args=[self.aluno.pk]))
+        self.assertEqual([item["feito"] for item in response.context["progresso_horas"]], [3, 4, 8])
+        self.assertEqual(response.context["total_horas"], 15)
+        self.assertEqual(response.context["total_restante"], 97 + 96 + 92)
+
+
+class ResumoHorasTestCase(TestCase):
+    """Testes do resumo de horas mantido a cada gravação."""
+
+    CAMPOS = ["total", "quantidade_registros", "ultimo_registro", "ano_1", "ano_2", "ano_3", "ano_4", "ano_5", "ano_6"]
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.responsavel = User.objects.create_user(cpf="99999999999", role=User.Role.DIRETOR)
+        cls.aluno = Aluno.objects.create(
+            user=User.objects.create_user(cpf="00000000001"),
+            matricula="M1",
+            data_ingresso=date(2022, 3, 10),
+        )
+        cls.outro = Aluno.objects.create(user=User.objects.create_user(cpf="00000000002"), matricula="M2")
+
+    def _horas(self, aluno, dia, horas):
+        return Horas(
+            aluno=aluno,
+            quantidade=timedelta(hours=horas),
+            data_registro=dia,
+            oficio_informacao="OF",
+            responsavel_registro=self.responsavel,
+        )
+
+    def assertResumoConfere(self):
+        esperados = {resumo.aluno_id: resumo for resumo in ResumoHoras.objects.calcular()}
+        for resumo in ResumoHoras.objects.all():
+            esperado = esperados.get(resumo.aluno_id, ResumoHoras(aluno_id=resumo.aluno_id))
+            for campo in self.CAMPOS:
+                self.assertEqual(getattr(resumo, campo), getattr(esperado, campo), campo)
+        self.assertLessEqual(esperados.keys(), set(ResumoHoras.objects.values_list("aluno_id", flat=True)))
+
+    def test_criar_alterar_e_excluir(self):
+        primeiro = self._horas(self.aluno, date(2022, 5, 1), 2)
+        primeiro.save()
+        segundo = self._horas(self.aluno, date(2023, 5, 1), 3)
+        segundo.save()
+        resumo = ResumoHoras.objects.get(aluno=self.aluno)
+        self.assertEqual(resumo.total, timedelta(hours=5))
+        self.assertEqual((resumo.ano_1, resumo.ano_2), (timedelta(hours=2), timedelta(hours=3)))
+        self.assertEqual(resumo.ultimo_registro, date(2023, 5, 1))
+
+        # Troca de aluno e de data: sai de um resumo e entra no outro
+        segundo.aluno = self.outro
+        segundo.save()
+        self.assertEqual(ResumoHoras.objects.get(aluno=self.aluno).ultimo_registro, date(2022, 5, 1))
+        self.assertEqual(ResumoHoras.objects.get(aluno=self.outro).total, timedelta(hours=3))
+        self.assertResumoConfere()
+
+        primeiro.delete()
+        resumo = ResumoHoras.objects.get(aluno=self.aluno)
+        self.assertEqual((resumo.total, resumo.quantidade_registros, resumo.ultimo_registro), (timedelta(0), 0, None))
+        self.assertResumoConfere()
+
+    def test_operacoes_em_massa(self):
+        Horas.objects.bulk_create(
+            [self._horas(self.aluno, date(2022, 5, 1), 1), self._horas(self.outro, date(2024, 1, 1), 4)]
+        )
+        self.assertResumoConfere()
+        Horas.objects.filter(aluno=self.aluno).update(quantidade=timedelta(hours=6), data_registro=date(2025, 1, 1))
+        self.assertEqual(ResumoHoras.objects.get(aluno=self.aluno).ano_3, timedelta(hours=6))
+        self.assertResumoConfere()
+        Horas.objects.filter(aluno=self.outro).delete()
+        self.assertEqual(ResumoHoras.objects.get(aluno=self.outro).total, timedelta(0))
+        self.assertResumoConfere()
+
+    def test_mudanca_de_ingresso_redistribui_anos(self):
+        self._horas(self.aluno, date(2023, 5, 1), 2).save()
+        self.assertEqual(ResumoHoras.objects.get(aluno=self.aluno).ano_2, timedelta(hours=2))
+        # Salvar sem mudar o ingresso não recalcula (o resumo alterado fora do ORM continua igual)
+        ResumoHoras.objects.filter(aluno=self.aluno).update(total=timedelta(hours=9))
+        self.aluno.telefone = "1133334444"
+        self.aluno.save()
+        self.assertEqual(ResumoHoras.objects.get(aluno=self.aluno).total, timedelta(hours=9))
+        self.aluno.data_ingresso = date(2023, 1, 1)
+        self.aluno.save()
+        self.assertEqual(ResumoHoras.objects.get(aluno=self.aluno).ano_1, timedelta(hours=2))
+        self.assertResumoConfere()
+
+    def test_reconstruir_e_verificar(self):
+        self._horas(self.aluno, date(2022, 5, 1), 2).save()
+        call_command("reconstruir_resumo_horas", "--verificar", stdout=StringIO())
+        # Alteração fora do ORM deixa o resumo divergente até a reconstrução
+        ResumoHoras.objects.filter(aluno=self.aluno).update(total=timedelta(hours=9))
+        with self.assertRaises(CommandError):
+            call_command("reconstruir_resumo_horas", "--verificar", stdout=StringIO())
+        call_command("reconstruir_resumo_horas", stdout=StringIO())
+        call_command("reconstruir_resumo_horas", "--verificar", stdout=StringIO())
+        self.assertEqual(ResumoHoras.objects.get(aluno=self.aluno).total, timedelta(hours=2))
+
+
+@override_settings(STORAGES=SEM_MANIFEST)
+class AutocompleteTestCase(TestCase):
+    """Testes dos endpoints de autocomplete e dos formulários que os usam."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.admin = User.objects.create_user(cpf="99999999999", first_name="Admin", role=User.Role.ADMINISTRATIVO)
+        cls.alunos = [
+            Aluno.objects.create(
+                user=User.objects.create_user(cpf=f"{numero:011d}", first_name="Aluno", last_name=f"Número {numero:02d}"),
+                matricula=f"AC{numero:03d}",
+            )
+            for numero in range(1, 6)
+        ]
+        cls.secretarias = [
+            Secretaria.objects.create(nome="Secretaria de Saúde", sigla="SMS"),
+            Secretaria.objects.create(nome="Secretaria de Educação", sigla="SEDUC"),
+        ]
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def test_alunos_paginados(self):
+        url = reverse("academico:aluno_autocomplete")
+        dados = self.client.get(url, {"q": "aluno", "limite": 2}).json()
+        ids = [item["id"] for item in dados["resultados"]]
+        while dados["proximo"]:
+            dados = self.client.get(url, {"q": "aluno", "limite": 2, "apos": dados["proximo"]}).json()
+            ids.extend(item["id"] for item in dados["resultados"])
+        self.assertEqual(ids, [aluno.pk for aluno in self.alunos])
+
+        dados = self.client.get(url, {"q": "numero 03"}).json()
+        self.assertEqual(dados["resultados"], [{"id": self.alunos[2].pk, "texto": "Aluno Número 03", "detalhe": "AC003"}])
+
+    def test_secretarias_por_prefixo(self):
+        dados = self.client.get(reverse("contrapartida:secretaria_autocomplete"), {"q": "sed"}).json()
+        self.assertEqual([item["id"] for item in dados["resultados"]], [self.secretarias[1].pk])
+
+    def test_usuarios(self):
+        dados = self.client.get(reverse("user_autocomplete"), {"q": "admin"}).json()
+        self.assertEqual(dados["resultados"], [{"id": self.admin.pk, "texto": "Admin", "detalhe": "999.999.999-99"}])
+        self.client.force_login(self.alunos[0].user)
+        self.assertEqual(self.client.get(reverse("user_autocomplete")).status_code, 403)
+
+    def test_formulario_renderiza_so_o_selecionado(self):
+        encaminhamento = Encaminhamento.objects.create(
+            secretaria=self.secretarias[0], aluno=self.alunos[3], data=date(2024, 1, 1), responsavel_emissao=self.admin
+        )
+        response = self.client.get(reverse("contrapartida:encaminhamento_edit", args=[encaminhamento.pk]))
+        conteudo = response.content.decode()
+        self.assertIn(f'<option value="{self.alunos[3].pk}" selected>Aluno Número 04</option>', conteudo)
+        self.assertNotIn("Aluno Número 01", conteudo)
+        self.assertIn(reverse("academico:aluno_autocomplete"), conteudo)
+
+        # O número de consultas não depende de quantos alunos existem
+        url = reverse("contrapartida:horas_create")
+        with CaptureQueriesContext(connection) as antes:
+            self.client.get(url)
+        for numero in range(6, 30):
+            Aluno.objects.create(user=User.objects.create_user(cpf=f"{numero:011d}"), matricula=f"AC{numero:03d}")
+        with CaptureQueriesContext(connection) as depois:
+            self.client.get(url)
+        self.assertEqual(len(antes), len(depois))
+
+    def test_formulario_valida_no_servidor(self):
+        response = self.client.post(
+            reverse("contrapartida:encaminhamento_create"),
+            {"secretaria": self.secretarias[0].pk, "aluno": "999999"},
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("aluno", response.context["form"].errors)
+        self.assertFalse(Encaminhamento.objects.exists())
+
+
+class SequenciaTestCase(TestCase):
+    """Testes da sequência de números de encaminhamento."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.responsavel = User.objects.create_user(cpf="99999999999")
+        cls.aluno = Aluno.objects.create(user=User.objects.create_user(cpf="00000000001"), matricula="S001")
+        cls.secretaria = Secretaria.objects.create(nome="Secretaria de Saúde", sigla="SMS")
+
+    def _encaminhamento(self, **kwargs):
+        return Encaminhamento(
+            aluno=self.aluno, secretaria=self.secretaria, data=date(2024, 1, 1), responsavel_emissao=self.responsavel, **kwargs
+        )
+
+    def test_numeros_seguidos_e_blocos(self):
+        primeiro = self._encaminhamento()
+        primeiro.save()
+        segundo = self._encaminhamento()
+        segundo.save()
+        self.assertEqual(segundo.numero, primeiro.numero + 1)
+
+        bloco = Encaminhamento.reservar_numeros(100)
+        self.assertEqual(len(bloco), 100)
+        self.assertEqual(bloco[0], segundo.numero + 1)
+        Encaminhamento.objects.bulk_create([self._encaminhamento(numero=numero) for numero in bloco])
+        terceiro = self._encaminhamento()
+        terceiro.save()
+        self.assertEqual(terceiro.numero, bloco[-1] + 1)
+
+    def test_reserva_em_uma_transacao_curta(self):
+        self._encaminhamento().save()
+        with CaptureQueriesContext(connection) as consultas:
+            Encaminhamento.reservar_numeros(50)
+        # Um UPDATE na sequência e a leitura do valor; nada na tabela de encaminhamentos
+        sqls = [consulta["sql"] for consulta in consultas if "SAVEPOINT" not in consulta["sql"]]
+        self.assertEqual(len(sqls), 2)
+        self.assertTrue(sqls[0].startswith('UPDATE "contrapartida_sequencia"'))
+        self.assertFalse(any("contrapartida_encaminhamento" in sql for sql in sqls))
+
+    def test_sequencia_criada_a_partir_do_maior_numero(self):
+        Sequencia.objects.all().delete()
+        self._encaminhamento(numero=41).save()
+        self.assertEqual(list(Encaminhamento.reservar_numeros(2)), [42, 43])
+        with self.assertRaises(ValueError):
+            Encaminhamento.reservar_numeros(0)
+
+
+class SequenciaConcorrenteTestCase(TransactionTestCase):
+    """Emissões simultâneas de encaminhamentos, cada uma em sua conexão."""
+
+    THREADS = 8
+    POR_THREAD = 10
+
+    def test_emissoes_em_paralelo_nao_repetem_numero(self):
+        responsavel = User.objects.create_user(cpf="99999999999")
+        aluno = Aluno.objects.create(user=User.objects.create_user(cpf="00000000001"), matricula="S001")
+        secretaria = Secretaria.objects.create(nome="Secretaria de Saúde", sigla="SMS")
+        barreira = threading.Barrier(self.THREADS)
+        erros = []
+
+        def emitir():
+            try:
+                barreira.wait()
+                for _ in range(self.POR_THREAD):
+                    Encaminhamento.objects.create(
+                        aluno=aluno, secretaria=secretaria, data=date(2024, 1, 1), responsavel_emissao=responsavel
+                    )
+            except Exception as erro:  # noqa: BLE001 - reportado no assert abaixo
+                erros.append(erro)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=emitir) for _ in range(self.THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(erros, [])
+        total = self.THREADS * self.POR_THREAD
+        self.assertEqual(sorted(Encaminhamento.objects.values_list("numero", flat=True)), list(range(1, total + 1)))
+
+
+class ImportacaoHorasTestCase(TestCase):
+    """Testes da importação das horas de um ofício (importacao.py)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.responsavel = User.objects.create_user(cpf="99999999999", role=User.Role.ADMINISTRATIVO)
+        cls.ana = Aluno.objects.create(user=User.objects.create_user(cpf="00000000001"), matricula="M1")
+        cls.bia = Aluno.objects.create(user=User.objects.create_user(cpf="00000000002"), matricula="M2")
+        Horas.objects.create(
+            aluno=cls.bia,
+            quantidade=timedelta(hours=1),
+            data_registro=date(2024, 5, 31),
+            oficio_informacao="OF-10/2024",
+            responsavel_registro=cls.responsavel,
+        )
+
+    def setUp(self):
+        self.media = tempfile.TemporaryDirectory()
+        self.addCleanup(self.media.cleanup)
+        override = override_settings(MEDIA_ROOT=self.media.name)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def _importar(self, conteudo, nome="oficio.csv", **kwargs):
+        arquivo = BytesIO(conteudo.encode()) if isinstance(conteudo, str) else conteudo
+        kwargs.setdefault("oficio_informacao", "OF-10/2024")
+        return ImportacaoHoras(self.responsavel, **kwargs).executar(ler_linhas(arquivo, nome))
+
+    def test_converter_horas(self):
+        self.assertEqual(converter_horas("04:30"), timedelta(hours=4, minutes=30))
+        self.assertEqual(converter_horas("120:00"), timedelta(hours=120))
+        self.assertEqual(converter_horas("4,5"), timedelta(hours=4, minutes=30))
+        self.assertEqual(converter_horas(2), timedelta(hours=2))
+        self.assertEqual(converter_horas(time(3, 15)), timedelta(hours=3, minutes=15))
+        self.assertEqual(converter_horas(timedelta(hours=30)), timedelta(hours=30))
+        for invalido in ("4:75", "quatro", "", "00:00"):
+            with self.assertRaises(ValidationError):
+                converter_horas(invalido)
+
+    def test_importa_em_lotes_com_um_documento(self):
+        linhas = ["Matrícula;Horas;Data"] + [f"M1;01:00;{dia:02d}/05/2024" for dia in range(1, 6)]
+        documento = ContentFile(b"%PDF-1.4 oficio", name="oficio.pdf")
+        with CaptureQueriesContext(connection) as consultas:
+            importacao = self._importar("\n".join(linhas), oficio_documento=documento, lote=2)
+        self.assertEqual((importacao.lidas, importacao.importados, importacao.erros), (5, 5, []))
+        # Um INSERT por lote (5 linhas em lotes de 2) e uma conferência de duplicados por lote
+        sqls = [consulta["sql"] for consulta in consultas.captured_queries]
+        self.assertEqual(len([sql for sql in sqls if sql.startswith('INSERT INTO "contrapartida_horas"')]), 3)
+        self.assertEqual(len([sql for sql in sqls if 'FROM "contrapartida_horas" WHERE' in sql and '"oficio_informacao" IN' in sql]), 3)
+
+        registros = Horas.objects.filter(aluno=self.ana)
+        self.assertEqual({registro.oficio_documento.name for registro in registros}, {importacao.documento})
+        self.assertEqual({registro.responsavel_registro for registro in registros}, {self.responsavel})
+        self.assertEqual(ResumoHoras.objects.get(aluno=self.ana).total, timedelta(hours=5))
+
+    def test_erros_por_linha(self):
+        conteudo = "\n".join([
+            "matricula,cpf,horas,data,oficio",
+            "M9,,02:00,,",
+            ",000.000.000-02,02:00,31/05/2024,",
+            "M1,00000000002,02:00,,",
+            "M1,,xx,32/01/2024,",
+            "M1,,03:00,01/06/2024,",
+            ",00000000001,03:00,2024-06-01,",
+            "M1,,03:00,01/06/2024,OF-11/2024",
+        ])
+        importacao = self._importar(conteudo)
+        erros = {linha: mensagem for linha, _, mensagem in importacao.erros}
+        self.assertEqual(sorted(erros), [2, 3, 4, 5, 7])
+        self.assertIn("“M9” não encontrada", erros[2])
+        self.assertIn("já registradas", erros[3])
+        self.assertIn("alunos diferentes", erros[4])
+        self.assertIn("Horas inválidas", erros[5])
+        self.assertIn("Data inválida", erros[5])
+        self.assertIn("linha 6", erros[7])
+        self.assertEqual(importacao.importados, 2)
+        self.assertEqual(
+            set(Horas.objects.filter(aluno=self.ana).values_list("oficio_informacao", "data_registro")),
+            {("OF-10/2024", date(2024, 6, 1)), ("OF-11/2024", date(2024, 6, 1))},
+        )
+
+    def test_xlsx_por_cpf_com_data_padrao(self):
+        planilha = Workbook()
+        planilha.active.append(["CPF", "Carga horária"])
+        planilha.active.append([1, 1.5])
+        arquivo = BytesIO()
+        planilha.save(arquivo)
+        arquivo.seek(0)
+        importacao = self._importar(arquivo, "oficio.xlsx")
+        self.assertEqual(importacao.erros, [])
+        registro = Horas.objects.get(aluno=self.ana)
+        self.assertEqual((registro.quantidade, registro.data_registro), (timedelta(hours=1, minutes=30), timezone.localdate()))
+
+    def test_validar_apenas_nao_grava_nem_anexa(self):
+        documento = ContentFile(b"oficio", name="oficio.pdf")
+        importacao = self._importar("matricula;horas\nM1;01:00", oficio_documento=documento, validar_apenas=True)
+        self.assertEqual((importacao.importados, importacao.documento), (1, None))
+        self.assertFalse(Horas.objects.filter(aluno=self.ana).exists())
+
+    def test_comando(self):
+        with tempfile.TemporaryDirectory() as diretorio:
+            caminho = f"{diretorio}/oficio.csv"
+            with open(caminho, "w") as arquivo:
+                arquivo.write("matricula;horas\nM1;02:00\nM3;01:00\n")
+            saida = StringIO()
+            call_command(
+                "importar_horas", caminho, "--responsavel", self.responsavel.cpf, "--oficio", "OF-12/2024",
+                "--erros", f"{diretorio}/erros.csv", stdout=saida,
+            )
+            self.assertIn("1 registro(s) de horas importado(s), 1 erro(s)", saida.getvalue())
+            with open(f"{diretorio}/erros.csv", encoding="utf-8-sig") as arquivo:
+                self.assertEqual(arquivo.read().splitlines()[1], "3;M3;Matrícula “M3” não encontrada.")
+            with self.assertRaisesMessage(CommandError, "Colunas obrigatórias ausentes: matricula ou cpf"):
+                with open(caminho, "w") as arquivo:
+                    arquivo.write("nome;horas\nAna;01:00\n")
+                call_command("importar_horas", caminho, "--responsavel", self.responsavel.cpf, stdout=StringIO())
+
+
+@override_settings(STORAGES=SEM_MANIFEST)
+class ImportacaoHorasViewTestCase(TestCase):
+    """Tela de importação de ofício e download do relatório de erros."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.admin = User.objects.create_user(cpf="99999999999", role=User.Role.ADMINISTRATIVO)
+        cls.aluno = Aluno.objects.create(user=User.objects.create_user(cpf="00000000001"), matricula="M1")
+
+    def setUp(self):
+        self.diretorio = tempfile.TemporaryDirectory()
+        self.addCleanup(self.diretorio.cleanup)
+        override = override_settings(RELATORIOS_ARQUIVOS_DIR=self.diretorio.name, MEDIA_ROOT=self.diretorio.name)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def test_importa_e_baixa_relatorio_de_erros(self):
+        self.client.force_login(self.aluno.user)
+        self.assertEqual(self.client.get(reverse("contrapartida:horas_importar")).status_code, 403)
+
+        self.client.force_login(self.admin)
+        response = self.client.post(reverse("contrapartida:horas_importar"), {
+            "arquivo": SimpleUploadedFile("oficio.csv", b"matricula;horas\nM1;02:00\nM2;01:00\n"),
+            "oficio_informacao": "OF-1/2024",
+            "oficio_documento": SimpleUploadedFile("oficio.pdf", b"%PDF-1.4"),
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context["importacao"].importados, 1)
+        registro = Horas.objects.get()
+        self.assertEqual((registro.oficio_informacao, registro.responsavel_registro), ("OF-1/2024", self.admin))
+        self.assertTrue(registro.oficio_documento.name.startswith("oficios/"))
+
+        download = self.client.get(reverse("contrapartida:horas_importar_erros", args=[response.context["token_erros"]]))
+        self.assertIn("3;M2;Matrícula “M2” não encontrada.", b"".join(download.streaming_content).decode("utf-8-sig"))
+
+
+class EmissaoLoteTestCase(TestCase):
+    """Testes da emissão de encaminhamentos em lote (emissao.py)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.admin = User.objects.create_user(cpf="99999999999", role=User.Role.ADMINISTRATIVO)
+        cls.secretaria = Secretaria.objects.create(nome="Secretaria de Saúde", sigla="SMS")
+        cls.curso = Curso.objects.create(nome="Curso", faculdade=Faculdade.objects.create(nome="FAC"), duracao=6)
+        hoje = timezone.localdate()
+        cls.calouro = Aluno.objects.create(
+            user=User.objects.create_user(cpf="00000000001", first_name="Ana"),
+            matricula="M1", curso=cls.curso, data_ingresso=hoje,
+        )
+        cls.veterano = Aluno.objects.create(
+            user=User.objects.create_user(cpf="00000000002", first_name="Bia"),
+            matricula="M2", curso=cls.curso, data_ingresso=hoje.replace(year=hoje.year - 1),
+        )
+        cls.inativo = Aluno.objects.create(
+            user=User.objects.create_user(cpf="00000000003", first_name="Caio"),
+            matricula="M3", curso=cls.curso, data_ingresso=hoje, situacao=Aluno.Situacao.INATIVO,
+        )
+        cls.outro = Aluno.objects.create(user=User.objects.create_user(cpf="00000000004", first_name="Davi"), matricula="M4")
+
+    def test_separar_matriculas(self):
+        self.assertEqual(separar_matriculas("M1\nM2, M3;M1 \n\n"), ["M1", "M2", "M3"])
+        self.assertEqual(separar_matriculas(""), [])
+
+    def test_selecionar_alunos(self):
+        ativos = Aluno.Situacao.ATIVO
+        alunos, _ = selecionar_alunos(curso=self.curso.pk, situacao=ativos)
+        self.assertEqual(list(alunos), [self.calouro, self.veterano])
+        alunos, _ = selecionar_alunos(curso=self.curso.pk, semestre=1)
+        self.assertEqual(list(alunos), [self.calouro, self.inativo])
+        alunos, _ = selecionar_alunos(semestre=3)
+        self.assertEqual(list(alunos), [self.veterano])
+        # Ingresso antes do ano 1: nenhum aluno, em vez de erro
+        alunos, _ = selecionar_alunos(semestre=5000)
+        self.assertEqual(list(alunos), [])
+        alunos, nao_encontradas = selecionar_alunos(matriculas=["M4", "M1", "X9"])
+        self.assertEqual(list(alunos), [self.calouro, self.outro])
+        self.assertEqual(nao_encontradas, ["X9"])
+
+    def test_emitir_numeros_seguidos_em_um_insert(self):
+        Encaminhamento.objects.create(
+            aluno=self.outro, secretaria=self.secretaria, data=date(2024, 1, 1), responsavel_emissao=self.admin
+        )
+        alunos, _ = selecionar_alunos(curso=self.curso.pk)
+        with CaptureQueriesContext(connection) as consultas:
+            numeros = emitir(self.secretaria, alunos, self.admin, data=date(2024, 3, 1))
+        inserts = [consulta for consulta in consultas if consulta["sql"].startswith('INSERT INTO "contrapartida_encaminhamento"')]
+        self.assertEqual(len(inserts), 1)
+        self.assertEqual(len(numeros), 3)
+        emitidos = Encaminhamento.objects.filter(numero__range=(numeros[0], numeros[-1])).order_by("numero")
+        self.assertEqual([enc.aluno for enc in emitidos], [self.calouro, self.veterano, self.inativo])
+        self.assertTrue(all(enc.data == date(2024, 3, 1) and enc.secretaria == self.secretaria for enc in emitidos))
+        self.assertEqual(emitir(self.secretaria, Aluno.objects.none(), self.admin), range(0))
+
+    def test_comando(self):
+        saida = StringIO()
+        call_command(
+            "emitir_encaminhamentos",
+            "--secretaria", str(self.secretaria.pk),
+            "--responsavel", self.admin.cpf,
+            "--curso", str(self.curso.pk),
+            stdout=saida,
+        )
+        self.assertIn("2 encaminhamento(s) emitido(s)", saida.getvalue())
+        with self.assertRaises(CommandError):
+            call_command("emitir_encaminhamentos", "--secretaria", str(self.secretaria.pk), "--responsavel", self.admin.cpf)
+
+    @override_settings(STORAGES=SEM_MANIFEST)
+    def test_view_confere_e_emite(self):
+        url = reverse("contrapartida:encaminhamento_lote")
+        self.client.force_login(self.outro.user)
+        self.assertEqual(self.client.get(url).status_code, 403)
+
+        self.client.force_login(self.admin)
+        dados = {
+            "secretaria": self.secretaria.pk,
+            "curso": self.curso.pk,
+            "situacao": Aluno.Situacao.ATIVO,
+            "matriculas": "M1\nM2\nX9",
+        }
+        response = self.client.post(url, dados)
+        self.assertEqual(response.context["total"], 2)
+        self.assertEqual(response.context["nao_encontradas"], ["X9"])
+        self.assertFalse(Encaminhamento.objects.exists())
+
+        response = self.client.post(url, {**dados, "emitir": "1"})
+        numeros = sorted(Encaminhamento.objects.values_list("numero", flat=True))
+        self.assertEqual(len(numeros), 2)
+        self.assertRedirects(response, f"{url}?numero_inicio={numeros[0]}&numero_fim={numeros[-1]}")
+        resultado = self.client.get(response.url)
+        self.assertEqual(resultado.context["emitidos"], 2)
+        self.assertIn(f"numero_inicio={numeros[0]}&numero_fim={numeros[-1]}", resultado.context["url_zip"])
+
+        response = self.client.post(url, {"secretaria": self.secretaria.pk, "situacao": Aluno.Situacao.ATIVO})
+        self.assertTrue(response.context["form"].non_field_errors())
+
+
+class ArmazenamentoOficioTestCase(TestCase):
+    """Ofícios gravados uma vez por conteúdo e apagados quando nenhum registro os usa (armazenamento.py)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.responsavel = User.objects.create_user(cpf="99999999999")
+        cls.aluno = Aluno.objects.create(user=User.objects.create_user(cpf="00000000001"), matricula="M1")
+
+    def setUp(self):
+        self.media = tempfile.TemporaryDirectory()
+        self.addCleanup(self.media.cleanup)
+        override = override_settings(MEDIA_ROOT=self.media.name)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def _horas(self, documento):
+        return Horas.objects.create(
+            aluno=self.aluno,
+            quantidade=timedelta(hours=1),
+            data_registro=date(2024, 5, 1),
+            oficio_informacao="OF",
+            oficio_documento=documento,
+            responsavel_registro=self.responsavel,
+        )
+
+    def _envelhecer(self, nome):
+        os.utime(oficio_storage.path(nome), (0, 0))
+
+    def _arquivos(self):
+        return sorted(
+            os.path.relpath(os.path.join(pasta, arquivo), self.media.name)
+            for pasta, _, arquivos in os.walk(self.media.name)
+            for arquivo in arquivos
+        )
+
+    def test_mesmo_conteudo_um_arquivo(self):
+        conteudo = b"%PDF-1.4 " + b"x" * (3 * BLOCO + 7)
+        digest = hashlib.sha256(conteudo).hexdigest()
+        primeiro = self._horas(ContentFile(conteudo, name="Ofício 10.PDF"))
+        segundo = self._horas(ContentFile(conteudo, name="copia.pdf"))
+        outro = self._horas(ContentFile(b"outro", name="outro.pdf"))
+        self.assertEqual(primeiro.oficio_documento.name, f"oficios/{digest[:2]}/{digest}.pdf")
+        self.assertEqual(segundo.oficio_documento.name, primeiro.oficio_documento.name)
+        self.assertNotEqual(outro.oficio_documento.name, primeiro.oficio_documento.name)
+        self.assertEqual(len(self._arquivos()), 2)
+        with primeiro.oficio_documento.open("rb") as arquivo:
+            self.assertEqual(arquivo.read(), conteudo)
+
+    def test_apaga_quando_nao_ha_referencias(self):
+        primeiro = self._horas(ContentFile(b"oficio", name="oficio.pdf"))
+        segundo = self._horas(ContentFile(b"oficio", name="oficio.pdf"))
+        nome = primeiro.oficio_documento.name
+        self._envelhecer(nome)
+        with self.captureOnCommitCallbacks(execute=True):
+            primeiro.delete()
+        self.assertTrue(oficio_storage.exists(nome))
+        with self.captureOnCommitCallbacks(execute=True):
+            segundo.delete()
+        self.assertFalse(oficio_storage.exists(nome))
+
+        # Trocar o documento libera o anterior; arquivos recentes ficam para o deduplicar_oficios
+        registro = self._horas(ContentFile(b"antigo", name="oficio.pdf"))
+        antigo = registro.oficio_documento.name
+        self._envelhecer(antigo)
+        registro.oficio_documento = ContentFile(b"novo", name="oficio.pdf")
+        with self.captureOnCommitCallbacks(execute=True):
+            registro.save()
+        self.assertFalse(oficio_storage.exists(antigo))
+        with self.captureOnCommitCallbacks(execute=True):
+            registro.delete()
+        self.assertEqual(len(self._arquivos()), 1)
+
+    def test_comando_deduplicar_oficios(self):
+        legado = FileSystemStorage(location=self.media.name)
+        nomes = [legado.save(f"oficios/{nome}", ContentFile(b"mesmo oficio")) for nome in ("a.pdf", "b.pdf")]
+        for nome in nomes:
+            Horas.objects.filter(pk=self._horas(None).pk).update(oficio_documento=nome)
+        orfao = legado.save("oficios/orfao.pdf", ContentFile(b"sem registro"))
+        self._envelhecer(orfao)
+
+        saida = StringIO()
+        call_command("deduplicar_oficios", stdout=saida)
+        self.assertIn("2 ofício(s) antigo(s) regravado(s) por conteúdo; 1 arquivo(s) sem registro", saida.getvalue())
+        documentos = set(Horas.objects.values_list("oficio_documento", flat=True))
+        self.assertEqual(len(documentos), 1)
+        self.assertEqual(self._arquivos(), [documentos.pop()])
+
+
+class HorasDocumentoViewTestCase(TestCase):
+    """Download do ofício com acesso conferido, Range e ETag."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.admin = User.objects.create_user(cpf="99999999999", role=User.Role.ADMINISTRATIVO)
+        cls.secretaria = User.objects.create_user(cpf="88888888888", role=User.Role.SECRETARIA)
+        cls.ana = Aluno.objects.create(user=User.objects.create_user(cpf="00000000001", role=User.Role.ALUNO), matricula="M1")
+        cls.bia = Aluno.objects.create(user=User.objects.create_user(cpf="00000000002", role=User.Role.ALUNO), matricula="M2")
+
+    def setUp(self):
+        self.media = tempfile.TemporaryDirectory()
+        self.addCleanup(self.media.cleanup)
+        override = override_settings(MEDIA_ROOT=self.media.name)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.conteudo = b"%PDF-1.4 " + bytes(range(256)) * 4
+        self.registro = Horas.objects.create(
+            aluno=self.ana,
+            quantidade=timedelta(hours=1),
+            data_registro=date(2024, 5, 1),
+            oficio_informacao="OF-10/2024",
+            oficio_documento=ContentFile(self.conteudo, name="oficio.pdf"),
+            responsavel_registro=self.admin,
+        )
+        self.url = reverse("contrapartida:horas_documento", args=[self.registro.pk])
+        self.etag = f'"{hashlib.sha256(self.conteudo).hexdigest()}"'
+
+    def test_acesso(self):
+        self.assertEqual(self.client.get(self.url).status_code, 302)
+        self.client.force_login(self.secretaria)
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+        self.client.force_login(self.bia.user)
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+        self.client.force_login(self.ana.user)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b"".join(response.streaming_content), self.conteudo)
+        self.assertEqual(response["ETag"], self.etag)
+        self.assertEqual(response["Content-Type"], "application/pdf")
+        self.assertIn("oficio_OF-10-2024.pdf", response["Content-Disposition"])
+
+    def test_range_e_condicionais(self):
+        self.client.force_login(self.admin)
+        response = self.client.get(self.url, headers={"Range": "bytes=9-18"})
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response["Content-Range"], f"bytes 9-18/{len(self.conteudo)}")
+        self.assertEqual(response["Content-Length"], "10")
+        self.assertEqual(b"".join(response.streaming_content), self.conteudo[9:19])
+
+        response = self.client.get(self.url, headers={"Range": "bytes=-4"})
+        self.assertEqual(b"".join(response.streaming_content), self.conteudo[-4:])
+        response = self.client.get(self.url, headers={"Range": f"bytes={len(self.conteudo)}-"})
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response["Content-Range"], f"bytes */{len(self.conteudo)}")
+
+        # If-Range com ETag antigo: o arquivo mudou, vai inteiro
+        response = self.client.get(self.url, headers={"Range": "bytes=0-3", "If-Range": '"antigo"'})
+        self.assertEqual(response.status_code, 200)
+        response = self.client.get(self.url, headers={"Range": "bytes=0-3", "If-Range": self.etag})
+        self.assertEqual(response.status_code, 206)
+
+        self.assertEqual(self.client.get(self.url, headers={"If-None-Match": self.etag}).status_code, 304)
+        response = self.client.get(self.url, headers={"If-Modified-Since": response["Last-Modified"]})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(self.client.get(self.url, headers={"If-Match": '"outro"'}).status_code, 412)
+
+    def test_envio_pelo_servidor_web(self):
+        self.client.force_login(self.admin)
+        nome = self.registro.oficio_documento.name
+        with override_settings(DOWNLOAD_OFFLOAD="x-accel-redirect"):
+            response = self.client.get(self.url)
+        self.assertEqual(response["X-Accel-Redirect"], f"/protegido/{nome}")
+        self.assertEqual((response.content, response["ETag"]), (b"", self.etag))
+        with override_settings(DOWNLOAD_OFFLOAD="x-sendfile"):
+            response = self.client.get(self.url)
+        self.assertEqual(response["X-Sendfile"], self.registro.oficio_documento.path)
+
+
+def _imagem(tamanho, formato="PNG", **kwargs):
+    saida = BytesIO()
+    Image.new("RGB", tamanho, (180, 40, 40)).save(saida, formato, **kwargs)
+    return saida.getvalue()
+
+
+class ImagensOficioTestCase(TestCase):
+    """Fotos e digitalizações regravadas no envio e prévias nas telas de horas (imagens.py)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.admin = User.objects.create_user(cpf="99999999999", role=User.Role.ADMINISTRATIVO)
+        cls.aluno = Aluno.objects.create(user=User.objects.create_user(cpf="00000000001"), matricula="M1")
+
+    def setUp(self):
+        self.media = tempfile.TemporaryDirectory()
+        self.addCleanup(self.media.cleanup)
+        override = override_settings(MEDIA_ROOT=self.media.name)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def _horas(self, documento):
+        return Horas.objects.create(
+            aluno=self.aluno,
+            quantidade=timedelta(hours=1),
+            data_registro=date(2024, 5, 1),
+            oficio_informacao="OF",
+            oficio_documento=documento,
+            responsavel_registro=self.admin,
+        )
+
+    def test_regrava_imagens_grandes(self):
+        foto = self._horas(ContentFile(_imagem((4000, 1000)), name="foto.png"))
+        self.assertTrue(foto.oficio_documento.name.endswith(".jpg"))
+        with Image.open(foto.oficio_documento.path) as imagem:
+            self.assertEqual((imagem.format, imagem.size), ("JPEG", (LADO_MAXIMO, LADO_MAXIMO // 4)))
+
+        # JPEG dentro do limite e PDF ficam como vieram
+        pequena = _imagem((800, 600), "JPEG")
+        self.assertEqual(self._horas(ContentFile(pequena, name="foto.jpg")).oficio_documento.read(), pequena)
+        self.assertTrue(self._horas(ContentFile(b"%PDF-1.4", name="oficio.pdf")).oficio_documento.name.endswith(".pdf"))
+
+    @override_settings(STORAGES=SEM_MANIFEST)
+    def test_imagem_corrompida_fica_como_veio(self):
+        truncada = _imagem((3000, 2000), "JPEG")[:5000]
+        registro = self._horas(ContentFile(truncada, name="foto.jpg"))
+        self.assertEqual(registro.oficio_documento.read(), truncada)
+        self.client.force_login(self.admin)
+        self.assertEqual(self.client.get(reverse("contrapartida:horas_previa", args=[registro.pk])).status_code, 404)
+
+    @override_settings(STORAGES=SEM_MANIFEST)
+    def test_previa(self):
+        foto = self._horas(ContentFile(_imagem((1200, 600)), name="foto.png"))
+        pdf = self._horas(ContentFile(b"%PDF-1.4", name="oficio.pdf"))
+        self.client.force_login(self.admin)
+        url = reverse("contrapartida:horas_previa", args=[foto.pk])
+        response = self.client.get(url)
+        self.assertEqual((response.status_code, response["Content-Type"]), (200, "image/jpeg"))
+        with Image.open(BytesIO(b"".join(response.streaming_content))) as imagem:
+            self.assertEqual(imagem.size, (LADO_MINIATURA, LADO_MINIATURA // 2))
+        self.assertEqual(self.client.get(url, headers={"If-None-Match": response["ETag"]}).status_code, 304)
+        self.assertEqual(self.client.get(reverse("contrapartida:horas_previa", args=[pdf.pk])).status_code, 404)
+
+        detalhe = self.client.get(reverse("contrapartida:horas_detail", args=[foto.pk]))
+        self.assertContains(detalhe, url)
+        lista = self.client.get(reverse("contrapartida:horas_aluno_list", args=[self.aluno.pk]))
+        self.assertContains(lista, url)
+        self.assertNotContains(lista, reverse("contrapartida:horas_previa", args=[pdf.pk]))
+
+    def test_comando_otimizar_oficios(self):
+        legado = FileSystemStorage(location=self.media.name)
+        nomes = [
+            legado.save("oficios/scan.png", ContentFile(_imagem((3000, 2000)))),
+            legado.save("oficios/foto.jpg", ContentFile(_imagem((600, 400), "JPEG"))),
+        ]
+        for nome in nomes:
+            Horas.objects.filter(pk=self._horas(None).pk).update(oficio_documento=nome)
+
+        saida = StringIO()
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command("otimizar_oficios", "--workers", "2", stdout=saida)
+        self.assertIn("2 ofício(s) de imagem, 1 regravado(s), 0 erro(s)", saida.getvalue())
+        documentos = set(Horas.objects.values_list("oficio_documento", flat=True))
+        documentos.remove("oficios/foto.jpg")
+        self.assertRegex(documentos.pop(), r"^oficios/[0-9a-f]{2}/[0-9a-f]{64}\.jpg$")
+        # O original é recente: fica até o deduplicar_oficios recolhê-lo
+        self.assertTrue(oficio_storage.exists("oficios/scan.png"))
+        call_command("deduplicar_oficios", "--carencia", "0", stdout=StringIO())
+        self.assertFalse(oficio_storage.exists("oficios/scan.png"))
+        # As prévias já ficam prontas para as telas
+        self.assertEqual(len(os.listdir(os.path.join(self.media.name, "miniaturas"))), 2)
@@ -1,25 +1,40 @@
+from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin
 from datetime import timedelta
 import math
+import os
 
-from django.db.models import DurationField, Q, Sum, Value
+from django.core.exceptions import PermissionDenied
+from django.db.models import DurationField, Q, Value
 from django.db.models.functions import Coalesce
-from django.shortcuts import render
+from django.http import Http404
+from django.shortcuts import get_object_or_404, redirect, render
 from django.utils import timezone
-from django.urls import reverse_lazy
-from django.views.generic import CreateView, DeleteView, DetailView, ListView, UpdateView
-from urllib.parse import urlencode
+from django.urls import reverse, reverse_lazy
+from django.utils.text import get_valid_filename
+from django.views import View
+from django.views.generic import CreateView, DeleteView, DetailView, FormView, ListView, UpdateView
 
 from apps.academico.models import Aluno
-from .forms import EncaminhamentoForm, HorasForm, SecretariaForm
-from .models import Encaminhamento, Horas, Secretaria
+from apps.usuarios import busca
+from apps.usuarios.models import User
+from core.utils.autocomplete import resposta_autocomplete
+from core.utils.downloads import resposta_arquivo
+from core.utils.paginacao import PaginacaoCursorMixin
+from core.utils.planilhas import ERROS_NA_TELA, ArquivoInvalido, pode_importar, resposta_erros, salvar_erros
+from .armazenamento import chave, digest, miniatura, oficio_storage
+from .emissao import emitir, selecionar_alunos
+from .forms import EncaminhamentoForm, EncaminhamentoLoteForm, HorasForm, HorasImportacaoForm, SecretariaForm
+from .importacao import CABECALHO_ERROS, ImportacaoHoras, ler_linhas
+from .models import Encaminhamento, Horas, ResumoHoras, Secretaria
 
 # --- Secretaria ---
-class SecretariaListView(LoginRequiredMixin, ListView):
+class SecretariaListView(LoginRequiredMixin, PaginacaoCursorMixin, ListView):
     model = Secretaria
     context_object_name = "secretarias"
     template_name = "contrapartida/secretaria_list.html"
     paginate_by = 15
+    ordenacao_cursor = ("nome", "pk")
 
     def get_queryset(self):
         queryset = super().get_queryset()
@@ -28,12 +43,20 @@ class SecretariaListView(LoginRequiredMixin, ListView):
             queryset = queryset.filter(Q(nome__icontains=q) | Q(sigla__icontains=q))
         return queryset
 
-    def get_context_data(self, **kwargs):
-        context = super().get_context_data(**kwargs)
-        query_params = self.request.GET.copy()
-        query_params.pop("page", None)
-        context["querystring"] = urlencode(query_params)
-        return context
+
+@login_required
+def secretaria_autocomplete(request):
+    """Opções de secretaria para os campos de autocomplete (início do nome ou da sigla em ``q``)."""
+    queryset = Secretaria.objects.all()
+    q = request.GET.get("q", "").strip()
+    if q:
+        queryset = queryset.filter(Q(nome__istartswith=q) | Q(sigla__istartswith=q))
+    return resposta_autocomplete(
+        request,
+        queryset,
+        ("nome", "pk"),
+        lambda secretaria: {"texto": secretaria.nome, "detalhe": secretaria.sigla},
+    )
 
 
 class SecretariaCreateView(LoginRequiredMixin, CreateView):
@@ -64,11 +87,12 @@ class SecretariaDeleteView(LoginRequiredMixin, DeleteView):
 
 
 # --- Encaminhamento ---
-class EncaminhamentoListView(LoginRequiredMixin, ListView):
+class EncaminhamentoListView(LoginRequiredMixin, PaginacaoCursorMixin, ListView):
     model = Encaminhamento
     context_object_name = "encaminhamentos"
     template_name = "contrapartida/encaminhamento_list.html"
     paginate_by = 15
+    ordenacao_cursor = ("numero",)
 
     def get_queryset(self):
         queryset = super().get_queryset().select_related("secretaria", "aluno", "responsavel_emissao", "aluno__user")
@@ -88,11 +112,13 @@ class EncaminhamentoListView(LoginRequiredMixin, ListView):
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        query_params = self.request.GET.copy()
-        query_params.pop("page", None)
-        context["querystring"] = urlencode(query_params)
-        context["alunos"] = Aluno.objects.select_related("user").order_by("user__first_name", "user__username")
+        # O filtro de aluno é um autocomplete: só o aluno já escolhido vai para a página
+        aluno = self.request.GET.get("aluno", "").strip()
+        context["aluno_selecionado"] = (
+            Aluno.objects.select_related("user").filter(pk=aluno).first() if aluno.isdigit() else None
+        )
         context["secretarias"] = Secretaria.objects.all()
+        context["pode_emitir_lote"] = pode_importar(self.request.user)
         return context
 
 
@@ -108,6 +134,60 @@ class EncaminhamentoCreateView(LoginRequiredMixin, CreateView):
         return super().form_valid(form)
 
 
+class EncaminhamentoLoteView(LoginRequiredMixin, FormView):
+    """
+    Emissão em lote (emissao.py): o primeiro envio mostra os alunos
+    selecionados; o botão "emitir" grava e redireciona para o resultado, com
+    o intervalo de números e o link do ZIP com os PDFs oficiais.
+    """
+    form_class = EncaminhamentoLoteForm
+    template_name = "contrapartida/encaminhamento_lote.html"
+    alunos_na_previa = 20
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.user.is_authenticated and not pode_importar(request.user):
+            raise PermissionDenied
+        return super().dispatch(request, *args, **kwargs)
+
+    def form_valid(self, form):
+        dados = form.cleaned_data
+        alunos, nao_encontradas = selecionar_alunos(
+            curso=dados["curso"].pk if dados["curso"] else None,
+            situacao=dados["situacao"],
+            semestre=dados["semestre"],
+            matriculas=dados["matriculas"],
+        )
+        if "emitir" not in self.request.POST:
+            total = alunos.count()
+            previa = list(alunos.select_related("user", "curso")[:self.alunos_na_previa])
+            return self.render_to_response(self.get_context_data(
+                form=form,
+                previa=previa,
+                total=total,
+                restantes=total - len(previa),
+                nao_encontradas=nao_encontradas,
+            ))
+
+        numeros = emitir(dados["secretaria"], alunos, self.request.user)
+        if not numeros:
+            form.add_error(None, "Nenhum aluno selecionado.")
+            return self.form_invalid(form)
+        # Redireciona: recarregar a página de resultado não emite outro lote
+        return redirect(f"{reverse('contrapartida:encaminhamento_lote')}?numero_inicio={numeros[0]}&numero_fim={numeros[-1]}")
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        inicio = self.request.GET.get("numero_inicio", "")
+        fim = self.request.GET.get("numero_fim", "")
+        if inicio.isdigit() and fim.isdigit():
+            context["emitidos"] = Encaminhamento.objects.filter(numero__range=(inicio, fim)).count()
+            context["numero_inicio"], context["numero_fim"] = int(inicio), int(fim)
+            context["url_zip"] = (
+                f"{reverse('relatorios:encaminhamentos_lote_zip')}?numero_inicio={inicio}&numero_fim={fim}"
+            )
+        return context
+
+
 class EncaminhamentoDetailView(LoginRequiredMixin, DetailView):
     model = Encaminhamento
     context_object_name = "encaminhamento"
@@ -129,11 +209,12 @@ class EncaminhamentoDeleteView(LoginRequiredMixin, DeleteView):
 
 
 # --- Horas ---
-class HorasListView(LoginRequiredMixin, ListView):
+class HorasListView(LoginRequiredMixin, PaginacaoCursorMixin, ListView):
     model = Aluno
     context_object_name = "alunos_totais"
     template_name = "contrapartida/horas_list.html"
     paginate_by = 15
+    ordenacao_cursor = ("user__first_name", "user__last_name", "pk")
 
     def get_queryset(self):
         queryset = (
@@ -141,8 +222,9 @@ class HorasListView(LoginRequiredMixin, ListView):
             .get_queryset()
             .select_related("user", "curso")
             .annotate(
+                # Total mantido em ResumoHoras: uma linha por aluno, sem somar os registros
                 total_horas=Coalesce(
-                    Sum("horas__quantidade", output_field=DurationField()),
+                    "resumo_horas__total",
                     Value(timedelta(0), output_field=DurationField()),
                     output_field=DurationField(),
                 )
@@ -152,25 +234,23 @@ class HorasListView(LoginRequiredMixin, ListView):
         matricula = self.request.GET.get("matricula", "").strip()
         curso = self.request.GET.get("curso", "").strip()
         if aluno:
-            for termo in aluno.split():
-                queryset = queryset.filter(
-                    Q(user__first_name__icontains=termo)
-                    | Q(user__last_name__icontains=termo)
-                    | Q(user__username__icontains=termo)
-                )
+            queryset = busca.anotar_relevancia(queryset.filter(busca.q_usuarios(aluno, "user")), aluno, "user")
         if matricula:
             queryset = queryset.filter(matricula__icontains=matricula)
         if curso:
             queryset = queryset.filter(curso_id=curso)
         return queryset
 
+    def get_ordenacao_cursor(self):
+        # Com busca, os mais relevantes primeiro (anotação de busca.anotar_relevancia)
+        if self.request.GET.get("aluno", "").strip():
+            return ("relevancia", *self.ordenacao_cursor)
+        return self.ordenacao_cursor
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        query_params = self.request.GET.copy()
-        query_params.pop("page", None)
-        context["querystring"] = urlencode(query_params)
-        context["alunos"] = Aluno.objects.select_related("user").order_by("user__first_name", "user__username")
         context["cursos"] = Aluno.objects.select_related("curso").values("curso_id", "curso__nome").distinct().order_by("curso__nome")
+        context["pode_importar"] = pode_importar(self.request.user)
         return context
 
 
@@ -186,17 +266,105 @@ class HorasCreateView(LoginRequiredMixin, CreateView):
         return super().form_valid(form)
 
 
+class HorasImportarView(LoginRequiredMixin, FormView):
+    """Importação das horas de um ofício (CSV/XLSX); as linhas recusadas viram um CSV para download."""
+    form_class = HorasImportacaoForm
+    template_name = "contrapartida/horas_importar.html"
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.user.is_authenticated and not pode_importar(request.user):
+            raise PermissionDenied
+        return super().dispatch(request, *args, **kwargs)
+
+    def form_valid(self, form):
+        arquivo = form.cleaned_data["arquivo"]
+        importacao = ImportacaoHoras(
+            self.request.user,
+            oficio_informacao=form.cleaned_data["oficio_informacao"],
+            oficio_documento=form.cleaned_data["oficio_documento"],
+            validar_apenas=form.cleaned_data["validar_apenas"],
+        )
+        try:
+            importacao.executar(ler_linhas(arquivo, arquivo.name))
+        except ArquivoInvalido as erro:
+            form.add_error("arquivo", str(erro))
+            return self.form_invalid(form)
+
+        token = salvar_erros(self.request, importacao.erros, CABECALHO_ERROS) if importacao.erros else None
+        return self.render_to_response(self.get_context_data(
+            form=self.get_form_class()(),
+            importacao=importacao,
+            validar_apenas=importacao.validar_apenas,
+            erros=importacao.erros[:ERROS_NA_TELA],
+            token_erros=token,
+        ))
+
+
+@login_required
+def horas_importar_erros(request, token):
+    """Download do CSV de erros de uma importação feita nesta sessão."""
+    return resposta_erros(request, token, "erros_importacao_horas.csv")
+
+
 class HorasDetailView(LoginRequiredMixin, DetailView):
     model = Horas
     context_object_name = "registro_horas"
     template_name = "contrapartida/horas_detail.html"
 
 
-class HorasAlunoListView(LoginRequiredMixin, ListView):
+class HorasDocumentoView(LoginRequiredMixin, View):
+    """
+    Ofício de um registro de horas (core/utils/downloads.py): Range, ETag
+    forte pelo SHA-256 do nome e, com DOWNLOAD_OFFLOAD, envio pelo servidor web.
+    Diretores e administrativos veem todos; alunos, só os próprios.
+    """
+
+    def get_queryset(self):
+        user = self.request.user
+        registros = Horas.objects.exclude(oficio_documento="").exclude(oficio_documento__isnull=True)
+        if user.is_superuser or user.role in [User.Role.DIRETOR, User.Role.ADMINISTRATIVO]:
+            return registros
+        if user.role == User.Role.ALUNO:
+            return registros.filter(aluno__user=user)
+        raise PermissionDenied
+
+    def get(self, request, pk):
+        documento = get_object_or_404(self.get_queryset(), pk=pk).oficio_documento
+        sha256 = digest(documento.name)
+        extensao = os.path.splitext(documento.name)[1] or ".pdf"
+        oficio = documento.instance.oficio_informacao.replace("/", "-")
+        return resposta_arquivo(
+            request,
+            documento.path,
+            get_valid_filename(f"oficio_{oficio}{extensao}"),
+            etag=f'"{sha256}"' if sha256 else None,
+            interno=documento.name,
+        )
+
+
+class HorasPreviaView(HorasDocumentoView):
+    """Prévia JPEG de um ofício que é foto ou digitalização, gerada no primeiro pedido (imagens.py)."""
+
+    def get(self, request, pk):
+        documento = get_object_or_404(self.get_queryset(), pk=pk).oficio_documento
+        previa = miniatura(documento.name)
+        if previa is None:
+            raise Http404("Ofício sem prévia.")
+        return resposta_arquivo(
+            request,
+            oficio_storage.path(previa),
+            f"previa_{pk}.jpg",
+            etag=f'"{chave(documento.name)}-previa"',
+            interno=previa,
+        )
+
+
+class HorasAlunoListView(LoginRequiredMixin, PaginacaoCursorMixin, ListView):
     model = Horas
     context_object_name = "registros"
     template_name = "contrapartida/horas_aluno_list.html"
     paginate_by = 15
+    ordenacao_cursor = ("-data_registro", "-pk")
 
     def get_queryset(self):
         return (
@@ -212,36 +380,39 @@ class HorasAlunoListView(LoginRequiredMixin, ListView):
         aluno_id = self.kwargs.get("aluno_id")
         aluno = Aluno.objects.select_related("user", "curso").filter(pk=aluno_id).first()
         context["aluno"] = aluno
-        total = self.get_queryset().aggregate(
-            total=Coalesce(
-                Sum("quantidade", output_field=DurationField()),
-                Value(timedelta(0), output_field=DurationField()),
-                output_field=DurationField(),
-            )
-        )
-        total_td = total["total"] or timedelta(0)
-        total_horas = total_td.total_seconds() / 3600
         anos = 0
         if aluno and aluno.curso and aluno.curso.duracao:
             anos = math.ceil(aluno.curso.duracao / 2)
+        resumo = ResumoHoras.objects.filter(aluno_id=aluno_id).first()
+        por_ano = resumo.por_ano(anos) if resumo and anos else None
+        if resumo and anos and por_ano is None:
+            # Curso mais longo que os anos guardados no resumo: soma direto em Horas
+            linha = next(iter(Horas.objects.filter(aluno_id=aluno_id).por_ano_curso(anos=anos)), {})
+            por_ano = {ano: linha.get(f"ano_{ano}") or timedelta(0) for ano in range(1, anos + 1)}
+        total_td = resumo.total if resumo else timedelta(0)
+        total_horas = total_td.total_seconds() / 3600
         progresso = []
         restante = total_horas
         for ano in range(1, anos + 1):
-            feito = min(100, restante)
-            restante = max(0, restante - feito)
+            if aluno.data_ingresso:
+                feito = (por_ano[ano] if por_ano else timedelta(0)).total_seconds() / 3600
+            else:
+                # Sem data de ingresso não há como separar por ano: distribui o total
+                feito = min(100, restante)
+                restante = max(0, restante - feito)
             falta = max(0, 100 - feito)
             progresso.append(
                 {
                     "ano": ano,
                     "feito": feito,
                     "falta": falta,
-                    "percentual": min(100, (feito / 100) * 100 if 100 else 0),
+                    "percentual": min(100, feito),
                 }
             )
         context["progresso_horas"] = progresso
         context["total_horas"] = total_horas
         context["total_necessario"] = anos * 100
-        context["total_restante"] = max(0, (anos * 100) - total_horas)
+        context["total_restante"] = sum(item["falta"] for item in progresso)
         return context
 
 
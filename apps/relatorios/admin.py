@@ -1,3 +1,12 @@
 from django.contrib import admin
 
-# Relatórios são gerados via views, não há models para registrar
+from .models import RelatorioJob
+
+
+@admin.register(RelatorioJob)
+class RelatorioJobAdmin(admin.ModelAdmin):
+    list_display = ("id", "relatorio", "formato", "status", "solicitado_por", "criado_em", "concluido_em")
+    list_filter = ("status", "relatorio", "formato")
+    raw_id_fields = ("solicitado_por",)
+    readonly_fields = ("arquivo", "erro", "criado_em", "iniciado_em", "concluido_em")
+    ordering = ("-criado_em",)
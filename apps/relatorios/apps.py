@@ -5,3 +5,8 @@ class RelatoriosConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "apps.relatorios"
     verbose_name = "Relatórios"
+
+    def ready(self):
+        from . import signals
+
+        signals.conectar()
@@ -0,0 +1,242 @@
+"""
+Benchmark dos relatórios: massa de dados sintética e medição de tempo, consultas e memória.
+
+Usado pelo comando ``manage.py benchmark_relatorios``. A massa é criada
+dentro de uma transação que o comando desfaz no final, então o banco volta
+ao estado anterior (mas fica bloqueado para escrita enquanto o benchmark roda:
+use um banco de desenvolvimento).
+"""
+
+import gc
+import random
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from apps.academico.models import Aluno, Curso, Faculdade
+from apps.contrapartida.models import Encaminhamento, Horas, Secretaria
+from apps.usuarios.models import User
+
+from . import cache
+from .catalogo import RELATORIOS, escrever_relatorio
+
+# Volumes por unidade de escala
+FACULDADES = 3
+CURSOS_POR_FACULDADE = 4
+SECRETARIAS = 5
+ALUNOS = 500
+ENCAMINHAMENTOS_POR_ALUNO = 1
+HORAS_POR_ALUNO = 12
+
+LOTE = 1000
+
+NOMES = ["Ana", "Bruno", "Carla", "Diego", "Elisa", "Fábio", "Gabriela", "Heitor", "Isabela", "João"]
+SOBRENOMES = ["Silva", "Souza", "Oliveira", "Santos", "Pereira", "Lima", "Costa", "Ferreira", "Almeida", "Ribeiro"]
+
+
+def gerar_dados_sinteticos(escala=1, semente=0):
+    """
+    Cria faculdades, cursos, secretarias, alunos (com usuário), encaminhamentos
+    e horas distribuídas ao longo dos anos de curso de cada aluno.
+
+    Tudo é gravado com ``bulk_create``; os signals de cache não rodam, então
+    quem chama deve trocar a versão dos dados (``cache.incrementar_versao``).
+
+    Returns:
+        dict: quantidade criada de cada modelo
+    """
+    aleatorio = random.Random(semente)
+    senha = make_password(None)
+
+    faculdades = Faculdade.objects.bulk_create(
+        [Faculdade(nome=f"Faculdade Sintética {numero}") for numero in range(1, FACULDADES * escala + 1)]
+    )
+    cursos = Curso.objects.bulk_create(
+        [
+            Curso(nome=f"Curso Sintético {indice}.{numero}", faculdade=faculdade, duracao=aleatorio.choice([6, 8, 10]))
+            for indice, faculdade in enumerate(faculdades, start=1)
+            for numero in range(1, CURSOS_POR_FACULDADE + 1)
+        ]
+    )
+    secretarias = Secretaria.objects.bulk_create(
+        [Secretaria(nome=f"Secretaria Sintética {numero}", sigla=f"SS{numero}") for numero in range(1, SECRETARIAS * escala + 1)]
+    )
+    # CPF e matrícula com letra: nunca colidem com dados reais
+    responsavel = User.objects.create(cpf=f"S{0:010d}", password=senha, role=User.Role.ADMINISTRATIVO)
+
+    total_alunos = ALUNOS * escala
+    usuarios = User.objects.bulk_create(
+        [
+            User(
+                cpf=f"S{numero:010d}",
+                password=senha,
+                first_name=aleatorio.choice(NOMES),
+                last_name=f"{aleatorio.choice(SOBRENOMES)} {aleatorio.choice(SOBRENOMES)}",
+                email=f"aluno{numero}@exemplo.com",
+            )
+            for numero in range(1, total_alunos + 1)
+        ],
+        batch_size=LOTE,
+    )
+    alunos = Aluno.objects.bulk_create(
+        [
+            Aluno(
+                user=usuario,
+                curso=aleatorio.choice(cursos),
+                matricula=f"SINT{numero:08d}",
+                data_ingresso=date(aleatorio.randint(2019, 2024), aleatorio.randint(1, 12), aleatorio.randint(1, 28)),
+                situacao=Aluno.Situacao.ATIVO if aleatorio.random() < 0.85 else Aluno.Situacao.INATIVO,
+                cidade="Registro",
+            )
+            for numero, usuario in enumerate(usuarios, start=1)
+        ],
+        batch_size=LOTE,
+    )
+
+    # Um bloco da sequência para todos os encaminhamentos (bulk_create não chama save)
+    numeros = iter(Encaminhamento.reservar_numeros(len(alunos) * ENCAMINHAMENTOS_POR_ALUNO))
+    encaminhamentos = []
+    horas = []
+    for aluno in alunos:
+        for _ in range(ENCAMINHAMENTOS_POR_ALUNO):
+            encaminhamentos.append(
+                Encaminhamento(
+                    numero=next(numeros),
+                    aluno=aluno,
+                    secretaria=aleatorio.choice(secretarias),
+                    data=aluno.data_ingresso + timedelta(days=aleatorio.randint(0, 365)),
+                    responsavel_emissao=responsavel,
+                )
+            )
+        for _ in range(HORAS_POR_ALUNO):
+            horas.append(
+                Horas(
+                    aluno=aluno,
+                    quantidade=timedelta(hours=aleatorio.randint(1, 8), minutes=aleatorio.choice([0, 15, 30, 45])),
+                    data_registro=aluno.data_ingresso + timedelta(days=aleatorio.randint(0, 4 * 365)),
+                    oficio_informacao=f"Ofício {aleatorio.randint(1, 999)}/{aluno.data_ingresso.year}",
+                    responsavel_registro=responsavel,
+                )
+            )
+    Encaminhamento.objects.bulk_create(encaminhamentos, batch_size=LOTE)
+    # Horas.objects.bulk_create também preenche o ResumoHoras dos alunos
+    Horas.objects.bulk_create(horas, batch_size=LOTE)
+
+    return {
+        "faculdades": len(faculdades),
+        "cursos": len(cursos),
+        "secretarias": len(secretarias),
+        "alunos": len(alunos),
+        "encaminhamentos": len(encaminhamentos),
+        "horas": len(horas),
+    }
+
+
+class _Descarte:
+    """Destino de escrita que só conta os bytes."""
+
+    def __init__(self):
+        self.tamanho = 0
+
+    def write(self, dados):
+        self.tamanho += len(dados)
+        return len(dados)
+
+    def flush(self):
+        pass
+
+
+def medir(funcao):
+    """
+    Roda ``funcao`` duas vezes: uma para o tempo e as consultas, outra com
+    tracemalloc para o pico de memória (o rastreamento deixa o código mais lento).
+
+    Antes de cada execução a versão dos dados é trocada, para que nenhum
+    snapshot em cache (ex.: indicadores do consolidado) seja reaproveitado.
+    """
+    cache.incrementar_versao()
+    gc.collect()
+    with CaptureQueriesContext(connection) as consultas:
+        inicio = time.perf_counter()
+        resultado = funcao()
+        segundos = time.perf_counter() - inicio
+
+    cache.incrementar_versao()
+    gc.collect()
+    tracemalloc.start()
+    try:
+        funcao()
+        _atual, pico = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    medida = {"segundos": round(segundos, 4), "consultas": len(consultas), "memoria_pico_kb": pico // 1024}
+    if isinstance(resultado, int):
+        medida["bytes"] = resultado
+    return medida
+
+
+def _dados(chave):
+    def executar():
+        _colunas, linhas = RELATORIOS[chave]["dados"](None)
+        for _linha in linhas:
+            pass
+
+    return executar
+
+
+def _arquivo(chave, formato):
+    def executar():
+        destino = _Descarte()
+        escrever_relatorio(chave, formato, None, destino)
+        return destino.tamanho
+
+    return executar
+
+
+def medir_relatorios():
+    """Mede a montagem dos dados e cada formato de todos os relatórios do catálogo."""
+    medidas = {}
+    for chave, relatorio in RELATORIOS.items():
+        medidas[f"dados:{chave}"] = medir(_dados(chave))
+        for formato in relatorio["formatos"]:
+            medidas[f"{formato}:{chave}"] = medir(_arquivo(chave, formato))
+    return medidas
+
+
+def comparar(atual, baseline, tolerancia=0.25, folga_segundos=0.05):
+    """
+    Compara duas execuções (dicts no formato gravado pelo comando).
+
+    Tempo e memória regridem quando passam de ``baseline * (1 + tolerancia)``
+    (tempo só acima de ``folga_segundos`` de diferença, para ignorar ruído);
+    consultas regridem com qualquer aumento.
+
+    Returns:
+        list[str]: descrição de cada regressão encontrada
+    """
+    regressoes = []
+    for escala, resultado in atual["escalas"].items():
+        base_escala = baseline.get("escalas", {}).get(escala)
+        if not base_escala:
+            continue
+        for nome, medida in resultado["medidas"].items():
+            base = base_escala["medidas"].get(nome)
+            if not base:
+                continue
+            if (
+                medida["segundos"] > base["segundos"] * (1 + tolerancia)
+                and medida["segundos"] - base["segundos"] > folga_segundos
+            ):
+                regressoes.append(f"escala {escala} {nome}: tempo {base['segundos']:.3f}s -> {medida['segundos']:.3f}s")
+            if medida["consultas"] > base["consultas"]:
+                regressoes.append(f"escala {escala} {nome}: consultas {base['consultas']} -> {medida['consultas']}")
+            if medida["memoria_pico_kb"] > base["memoria_pico_kb"] * (1 + tolerancia):
+                regressoes.append(
+                    f"escala {escala} {nome}: memória {base['memoria_pico_kb']} KB -> {medida['memoria_pico_kb']} KB"
+                )
+    return regressoes
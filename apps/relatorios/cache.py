@@ -0,0 +1,168 @@
+"""
+Cache em disco dos arquivos de relatório, versionado pelos dados.
+
+A chave de cada arquivo combina relatório, formato, filtros normalizados e a
+versão atual dos dados. A versão é trocada pelos signals de ``signals.py``
+sempre que um registro que aparece nos relatórios é salvo ou excluído, então
+entradas antigas simplesmente deixam de ser encontradas e saem pela poda LRU.
+
+``obter`` e ``gravar`` devolvem o arquivo já aberto: outro worker pode podar
+a entrada logo depois, e no POSIX um arquivo removido continua legível por
+quem já o abriu.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import uuid
+from pathlib import Path
+
+from django.conf import settings
+
+ARQUIVO_VERSAO = "versao_dados"
+
+# Snapshot dos indicadores gerais (services/metricas.py); fica fora da poda LRU
+ARQUIVO_METRICAS = "metricas.json"
+
+
+def _diretorio():
+    diretorio = Path(settings.RELATORIOS_CACHE_DIR)
+    diretorio.mkdir(parents=True, exist_ok=True)
+    return diretorio
+
+
+def versao_dados():
+    """Versão atual dos dados; criada na primeira leitura."""
+    caminho = _diretorio() / ARQUIVO_VERSAO
+    try:
+        return caminho.read_text().strip()
+    except FileNotFoundError:
+        return incrementar_versao()
+
+
+def incrementar_versao():
+    """Gera uma nova versão dos dados (invalida todas as entradas atuais)."""
+    versao = uuid.uuid4().hex
+    diretorio = _diretorio()
+    fd, tmp_path = tempfile.mkstemp(dir=diretorio, suffix=".tmp")
+    with os.fdopen(fd, "w") as tmp:
+        tmp.write(versao)
+    os.replace(tmp_path, diretorio / ARQUIVO_VERSAO)
+    return versao
+
+
+def chave(relatorio, formato, filtros):
+    """Chave do arquivo: relatório, formato, filtros (ordenados) e versão dos dados."""
+    conteudo = json.dumps(
+        {
+            "relatorio": relatorio,
+            "formato": formato,
+            "filtros": sorted((filtros or {}).items()),
+            "versao": versao_dados(),
+        }
+    )
+    return hashlib.sha256(conteudo.encode()).hexdigest()
+
+
+def obter(chave_arquivo, formato):
+    """Arquivo em cache aberto para leitura (binário), ou None. Um acerto atualiza o mtime (ordem LRU)."""
+    caminho = _diretorio() / f"{chave_arquivo}.{formato}"
+    try:
+        arquivo = open(caminho, "rb")
+    except FileNotFoundError:
+        return None
+    try:
+        os.utime(caminho)
+    except FileNotFoundError:
+        # Podado entre o open e o utime; o arquivo aberto continua legível
+        pass
+    return arquivo
+
+
+def gravar(chave_arquivo, formato, escrever):
+    """
+    Grava um novo arquivo no cache e o devolve aberto para leitura, na posição 0.
+
+    ``escrever`` recebe um arquivo binário aberto e escreve o conteúdo; a
+    gravação é feita em arquivo temporário e publicada com ``os.replace``.
+    A poda que segue nunca remove o arquivo recém-gravado, mesmo que ele
+    sozinho passe de RELATORIOS_CACHE_MAX_BYTES.
+    """
+    diretorio = _diretorio()
+    caminho = diretorio / f"{chave_arquivo}.{formato}"
+    fd, tmp_path = tempfile.mkstemp(dir=diretorio, suffix=".tmp")
+    arquivo = os.fdopen(fd, "w+b")
+    try:
+        escrever(arquivo)
+        arquivo.flush()
+        os.replace(tmp_path, caminho)
+    except BaseException:
+        arquivo.close()
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    arquivo.seek(0)
+    podar(manter=caminho)
+    return arquivo
+
+
+def gravar_stream(chave_arquivo, formato, blocos):
+    """
+    Repassa os ``blocos`` (bytes) de um arquivo enquanto os grava no cache.
+
+    Para respostas transmitidas: cada bloco vai ao cliente assim que fica
+    pronto e o arquivo só é publicado (``os.replace``) depois do último. Se a
+    transmissão for interrompida (ex.: o cliente desconectou), o temporário é
+    apagado e nada entra no cache.
+    """
+    diretorio = _diretorio()
+    caminho = diretorio / f"{chave_arquivo}.{formato}"
+    fd, tmp_path = tempfile.mkstemp(dir=diretorio, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as destino:
+            for bloco in blocos:
+                destino.write(bloco)
+                yield bloco
+        os.replace(tmp_path, caminho)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    podar(manter=caminho)
+
+
+def podar(limite=None, manter=None):
+    """
+    Remove os arquivos menos usados até o cache caber em RELATORIOS_CACHE_MAX_BYTES.
+
+    Args:
+        limite: bytes (padrão: RELATORIOS_CACHE_MAX_BYTES)
+        manter: caminho que não é removido (o arquivo que acabou de ser gravado)
+    """
+    limite = settings.RELATORIOS_CACHE_MAX_BYTES if limite is None else limite
+    manter = os.fspath(manter) if manter is not None else None
+    arquivos = []
+    total = 0
+    for entrada in os.scandir(_diretorio()):
+        if not entrada.is_file() or entrada.name in (ARQUIVO_VERSAO, ARQUIVO_METRICAS) or entrada.name.endswith(".tmp"):
+            continue
+        try:
+            info = entrada.stat()
+        except FileNotFoundError:
+            # Removido por outro processo durante a varredura
+            continue
+        total += info.st_size
+        if entrada.path == manter:
+            continue
+        arquivos.append((info.st_mtime, info.st_size, entrada.path))
+
+    arquivos.sort()
+    for _mtime, tamanho, caminho in arquivos:
+        if total <= limite:
+            break
+        try:
+            os.remove(caminho)
+        except FileNotFoundError:
+            pass
+        total -= tamanho
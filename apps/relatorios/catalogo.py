@@ -0,0 +1,119 @@
+"""Catálogo dos relatórios tabulares: dados, títulos, filtros aceitos e formatos."""
+
+from .reports import (
+    relatorio_alunos_dados,
+    relatorio_encaminhamentos_dados,
+    relatorio_horas_dados,
+    relatorio_horas_por_aluno_dados,
+    relatorio_consolidado_dados,
+)
+from .services import gerar_pdf_tabela, gerar_xlsx_stream
+
+PDF = "pdf"
+XLSX = "xlsx"
+
+CONTENT_TYPES = {
+    PDF: "application/pdf",
+    XLSX: "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+
+# Cada entrada descreve um relatório usado pelas views e pelo worker de jobs.
+# "titulo_xlsx" é o nome da planilha quando difere do título do PDF.
+# "larguras_pdf" (opcional) são os pesos das colunas no modo de tabela grande do PDF.
+RELATORIOS = {
+    "alunos": {
+        "titulo": "Lista de Alunos",
+        "dados": relatorio_alunos_dados,
+        "filtros": ["q", "matricula", "curso", "situacao"],
+        "orientacao": "portrait",
+        "arquivo": "relatorio_alunos",
+        "formatos": (PDF, XLSX),
+    },
+    "encaminhamentos": {
+        "titulo": "Encaminhamentos por Período",
+        "titulo_xlsx": "Encaminhamentos",
+        "dados": relatorio_encaminhamentos_dados,
+        "filtros": ["data_inicio", "data_fim"],
+        "orientacao": "landscape",
+        "arquivo": "relatorio_encaminhamentos",
+        "formatos": (PDF, XLSX),
+    },
+    "horas": {
+        "titulo": "Registro de Horas (Detalhado)",
+        "titulo_xlsx": "Registro de Horas",
+        "dados": relatorio_horas_dados,
+        "filtros": ["data_inicio", "data_fim", "aluno_id"],
+        "orientacao": "landscape",
+        "larguras_pdf": [3, 1.2, 1.3, 3, 3],
+        "arquivo": "relatorio_horas",
+        "formatos": (PDF, XLSX),
+    },
+    "horas_por_aluno": {
+        "titulo": "Horas por Aluno",
+        "dados": relatorio_horas_por_aluno_dados,
+        "filtros": ["data_inicio", "data_fim"],
+        "orientacao": "landscape",
+        "arquivo": "relatorio_horas_por_aluno",
+        "formatos": (PDF, XLSX),
+    },
+    "consolidado": {
+        "titulo": "Relatório Consolidado",
+        "dados": relatorio_consolidado_dados,
+        "filtros": [],
+        "orientacao": "portrait",
+        "arquivo": "relatorio_consolidado",
+        "formatos": (PDF,),
+    },
+}
+
+
+def nome_arquivo(chave, formato):
+    """Nome do arquivo de download, ex.: ``relatorio_alunos.xlsx``."""
+    return f"{RELATORIOS[chave]['arquivo']}.{formato}"
+
+
+def gerar_relatorio_stream(chave, formato, filtros):
+    """
+    Conteúdo do relatório ``chave`` no ``formato`` pedido, em blocos de bytes.
+
+    O XLSX sai à medida que as linhas são lidas do banco; o PDF é montado
+    inteiro pelo reportlab e sai num bloco só.
+
+    Args:
+        chave: chave em ``RELATORIOS``
+        formato: ``"pdf"`` ou ``"xlsx"``
+        filtros: dict de filtros (saída de ``_extrair_filtros``) ou None
+
+    Returns:
+        iterador de ``bytes``
+    """
+    relatorio = RELATORIOS[chave]
+    if formato not in relatorio["formatos"]:
+        raise ValueError(f"Formato {formato!r} não disponível para o relatório {chave!r}.")
+
+    colunas, linhas = relatorio["dados"](filtros)
+    if formato == PDF:
+        return iter([
+            gerar_pdf_tabela(
+                relatorio["titulo"],
+                colunas,
+                linhas,
+                orientacao=relatorio["orientacao"],
+                larguras=relatorio.get("larguras_pdf"),
+            )
+        ])
+    return gerar_xlsx_stream(relatorio.get("titulo_xlsx", relatorio["titulo"]), colunas, linhas)
+
+
+def escrever_relatorio(chave, formato, filtros, destino):
+    """
+    Gera o relatório ``chave`` no ``formato`` pedido e grava em ``destino``.
+
+    Args:
+        chave: chave em ``RELATORIOS``
+        formato: ``"pdf"`` ou ``"xlsx"``
+        filtros: dict de filtros (saída de ``_extrair_filtros``) ou None
+        destino: objeto arquivo binário aberto para escrita
+    """
+    for bloco in gerar_relatorio_stream(chave, formato, filtros):
+        destino.write(bloco)
@@ -0,0 +1,70 @@
+"""Compara o tempo de renderização do PDF de encaminhamento com e sem a camada estática."""
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.relatorios.services import encaminhamento_pdf
+
+# Valores fictícios no formato de dados_encaminhamento (o benchmark não usa o banco)
+DADOS_EXEMPLO = {
+    "numero": 1,
+    "data": "03/02/2025",
+    "secretaria": "Secretaria Municipal de Educação",
+    "responsavel": "Servidor Responsável",
+    "nome_completo": "Maria Aparecida da Silva",
+    "cpf": "123.456.789-01",
+    "matricula": "2024000001",
+    "rg": "12.345.678-9",
+    "data_nascimento": "15/04/2003",
+    "sexo": "Feminino",
+    "logradouro": "Rua das Palmeiras",
+    "numero_endereco": "120",
+    "cidade": "Registro",
+    "bairro": "Centro",
+    "complemento": "Casa 2",
+    "telefone": "(13) 3822-0000",
+    "celular": "(13) 99999-0000",
+    "cep": "11.900-000",
+    "curso": "Administração",
+    "ano_cursando": "2º ANO",
+    "horas": ["98:30", "12:00", "00:00", "00:00"],
+    "horas_total": "110:30",
+    "horas_media": "55:15",
+}
+
+
+class Command(BaseCommand):
+    help = "Mede o tempo por documento do PDF de encaminhamento: layout completo x camada estática."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--documentos",
+            type=int,
+            default=200,
+            help="Quantidade de PDFs gerados em cada modo (padrão: 200).",
+        )
+
+    def _medir(self, camada_estatica, documentos):
+        inicio = time.perf_counter()
+        for numero in range(1, documentos + 1):
+            encaminhamento_pdf.renderizar_pdf_encaminhamento(
+                {**DADOS_EXEMPLO, "numero": numero}, camada_estatica=camada_estatica
+            )
+        return (time.perf_counter() - inicio) / documentos * 1000
+
+    def handle(self, *args, **options):
+        documentos = options["documentos"]
+
+        encaminhamento_pdf._camada_estatica.cache_clear()
+        inicio = time.perf_counter()
+        encaminhamento_pdf._camada_estatica()
+        montagem = (time.perf_counter() - inicio) * 1000
+
+        completo = self._medir(False, documentos)
+        camada = self._medir(True, documentos)
+
+        self.stdout.write(f"Documentos por modo: {documentos}")
+        self.stdout.write(f"Montagem da camada estática (uma vez por processo): {montagem:.1f} ms")
+        self.stdout.write(f"Layout completo: {completo:.2f} ms/documento")
+        self.stdout.write(f"Camada estática: {camada:.2f} ms/documento ({completo / camada:.1f}x mais rápido)")
@@ -0,0 +1,46 @@
+"""Mede o tempo do PDF tabular por quantidade de linhas: tabela simples x modo de tabela grande."""
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.relatorios.services.pdf import gerar_pdf_tabela
+
+# Mesmas colunas do relatório detalhado de horas (o benchmark não usa o banco)
+COLUNAS = ["Aluno", "Quantidade", "Data registro", "Ofício informação", "Responsável"]
+
+
+def linhas_exemplo(quantidade):
+    for numero in range(1, quantidade + 1):
+        yield [
+            f"Aluno de Exemplo {numero}",
+            f"{numero % 40}:30:00",
+            "03/02/2025",
+            f"Ofício nº {numero}/2025 - Secretaria Municipal",
+            "Servidor Responsável",
+        ]
+
+
+class Command(BaseCommand):
+    help = "Mede o tempo de geração do PDF tabular para várias quantidades de linhas, nos dois modos."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--linhas",
+            type=int,
+            nargs="+",
+            default=[500, 2000, 5000],
+            help="Quantidades de linhas a medir (padrão: 500 2000 5000).",
+        )
+
+    def _medir(self, quantidade, modo_grande):
+        inicio = time.perf_counter()
+        gerar_pdf_tabela("Benchmark", COLUNAS, linhas_exemplo(quantidade), "landscape", modo_grande=modo_grande)
+        return time.perf_counter() - inicio
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"{'Linhas':>8}  {'Simples (s)':>12}  {'Grande (s)':>11}  {'Ganho':>6}")
+        for quantidade in options["linhas"]:
+            simples = self._medir(quantidade, False)
+            grande = self._medir(quantidade, True)
+            self.stdout.write(f"{quantidade:>8}  {simples:>12.2f}  {grande:>11.2f}  {simples / grande:>5.1f}x")
@@ -0,0 +1,80 @@
+"""Mede os relatórios sobre uma massa de dados sintética e compara com uma baseline."""
+
+import json
+import platform
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from apps.relatorios import benchmark, cache
+
+
+class Command(BaseCommand):
+    help = (
+        "Gera dados sintéticos (desfeitos no final), mede tempo, consultas e pico de memória "
+        "de cada relatório e formato e grava o resultado em JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--escalas",
+            type=int,
+            nargs="+",
+            default=[1],
+            help=f"Fatores de escala; cada unidade = {benchmark.ALUNOS} alunos (padrão: 1).",
+        )
+        parser.add_argument("--saida", help="Arquivo JSON onde gravar o resultado.")
+        parser.add_argument("--baseline", help="JSON de uma execução anterior para comparar.")
+        parser.add_argument(
+            "--tolerancia",
+            type=float,
+            default=0.25,
+            help="Aumento relativo de tempo/memória aceito em relação à baseline (padrão: 0.25).",
+        )
+        parser.add_argument("--semente", type=int, default=0, help="Semente dos dados sintéticos.")
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options["baseline"]:
+            with open(options["baseline"]) as arquivo:
+                baseline = json.load(arquivo)
+
+        resultado = {
+            "gerado_em": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "escalas": {},
+        }
+        try:
+            for escala in options["escalas"]:
+                resultado["escalas"][str(escala)] = self._executar(escala, options["semente"])
+        finally:
+            # O snapshot de indicadores pode ter sido gravado com os dados desfeitos
+            cache.incrementar_versao()
+
+        if options["saida"]:
+            with open(options["saida"], "w") as arquivo:
+                json.dump(resultado, arquivo, indent=2, ensure_ascii=False)
+            self.stdout.write(f"Resultado gravado em {options['saida']}")
+
+        if baseline is not None:
+            regressoes = benchmark.comparar(resultado, baseline, tolerancia=options["tolerancia"])
+            for linha in regressoes:
+                self.stdout.write(self.style.ERROR(linha))
+            if regressoes:
+                raise CommandError(f"{len(regressoes)} regressão(ões) em relação a {options['baseline']}.")
+            self.stdout.write(self.style.SUCCESS("Nenhuma regressão em relação à baseline."))
+
+    def _executar(self, escala, semente):
+        with transaction.atomic():
+            volumes = benchmark.gerar_dados_sinteticos(escala, semente=semente)
+            self.stdout.write(f"Escala {escala}: " + ", ".join(f"{nome}={total}" for nome, total in volumes.items()))
+            medidas = benchmark.medir_relatorios()
+            transaction.set_rollback(True)
+
+        self.stdout.write(f"{'Medida':<28} {'Tempo (s)':>10} {'Consultas':>10} {'Pico (KB)':>10}")
+        for nome, medida in medidas.items():
+            self.stdout.write(
+                f"{nome:<28} {medida['segundos']:>10.3f} {medida['consultas']:>10} {medida['memoria_pico_kb']:>10}"
+            )
+        return {"volumes": volumes, "medidas": medidas}
@@ -0,0 +1,51 @@
+"""Gera os PDFs oficiais de vários encaminhamentos de uma vez, em um arquivo ZIP."""
+
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.relatorios.services.encaminhamento_lote import encaminhamentos_lote, escrever_zip
+
+
+class Command(BaseCommand):
+    help = "Gera um ZIP com os PDFs de encaminhamento filtrados, renderizados em paralelo."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--saida", required=True, help="Caminho do arquivo ZIP a ser criado.")
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=None,
+            help="Processos de renderização (padrão: ENCAMINHAMENTOS_LOTE_WORKERS).",
+        )
+        parser.add_argument("--data-inicio", help="Data inicial (AAAA-MM-DD).")
+        parser.add_argument("--data-fim", help="Data final (AAAA-MM-DD).")
+        parser.add_argument("--secretaria", type=int, help="ID da secretaria.")
+        parser.add_argument("--curso", type=int, help="ID do curso do aluno.")
+        parser.add_argument("--numero-inicio", type=int, help="Primeiro número (ex.: de uma emissão em lote).")
+        parser.add_argument("--numero-fim", type=int, help="Último número.")
+        parser.add_argument("--ids", type=int, nargs="+", help="IDs dos encaminhamentos.")
+
+    def handle(self, *args, **options):
+        filtros = {
+            "data_inicio": options["data_inicio"],
+            "data_fim": options["data_fim"],
+            "secretaria": options["secretaria"],
+            "curso": options["curso"],
+            "numero_inicio": options["numero_inicio"],
+            "numero_fim": options["numero_fim"],
+            "ids": options["ids"],
+        }
+        filtros = {campo: valor for campo, valor in filtros.items() if valor}
+
+        total = encaminhamentos_lote(filtros).count()
+        if not total:
+            raise CommandError("Nenhum encaminhamento encontrado para os filtros informados.")
+
+        inicio = time.monotonic()
+        with open(options["saida"], "wb") as destino:
+            tamanho = escrever_zip(destino, filtros, workers=options["workers"])
+        duracao = time.monotonic() - inicio
+        self.stdout.write(
+            f"{total} encaminhamento(s) em {options['saida']} ({tamanho / 1024:.0f} KB) em {duracao:.1f}s"
+        )
@@ -0,0 +1,56 @@
+"""Worker que processa a fila de jobs de relatório (RelatorioJob)."""
+
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connection
+
+from apps.relatorios.services.jobs import executar, liberar_travados, limpar_expirados, reservar_proximo
+
+
+class Command(BaseCommand):
+    help = "Processa os relatórios enfileirados, gravando os arquivos em RELATORIOS_ARQUIVOS_DIR."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--uma-vez",
+            action="store_true",
+            help="Processa os jobs pendentes e encerra (útil em cron ou testes).",
+        )
+        parser.add_argument(
+            "--intervalo",
+            type=float,
+            default=2.0,
+            help="Segundos de espera quando a fila está vazia (padrão: 2).",
+        )
+        parser.add_argument(
+            "--timeout",
+            type=int,
+            default=30,
+            help="Minutos após os quais um job em processamento volta para a fila (padrão: 30).",
+        )
+
+    def handle(self, *args, **options):
+        timeout = timedelta(minutes=options["timeout"])
+        liberados = liberar_travados(timeout)
+        if liberados:
+            self.stdout.write(f"{liberados} job(s) travado(s) devolvido(s) à fila.")
+
+        while True:
+            # Dentro de uma transação (call_command em testes) a conexão não pode ser fechada
+            if not connection.in_atomic_block:
+                close_old_connections()
+            job = reservar_proximo()
+            if job is None:
+                limpar_expirados()
+                if options["uma_vez"]:
+                    break
+                time.sleep(options["intervalo"])
+                liberar_travados(timeout)
+                continue
+
+            inicio = time.monotonic()
+            executar(job)
+            duracao = time.monotonic() - inicio
+            self.stdout.write(f"Job #{job.pk} {job.relatorio}.{job.formato}: {job.get_status_display()} em {duracao:.1f}s")
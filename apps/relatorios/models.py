@@ -0,0 +1,60 @@
+from pathlib import Path
+
+from django.conf import settings
+from django.db import models
+
+
+class RelatorioJob(models.Model):
+    """Pedido de geração de relatório processado fora da requisição (ver comando processar_relatorios)."""
+
+    class Status(models.TextChoices):
+        PENDENTE = "PENDENTE", "Pendente"
+        PROCESSANDO = "PROCESSANDO", "Processando"
+        CONCLUIDO = "CONCLUIDO", "Concluído"
+        ERRO = "ERRO", "Erro"
+
+    class Formato(models.TextChoices):
+        PDF = "pdf", "PDF"
+        XLSX = "xlsx", "XLSX"
+
+    relatorio = models.CharField(max_length=50, verbose_name="Relatório")
+    formato = models.CharField(max_length=4, choices=Formato.choices, verbose_name="Formato")
+    filtros = models.JSONField(default=dict, blank=True, verbose_name="Filtros")
+    status = models.CharField(
+        max_length=12,
+        choices=Status.choices,
+        default=Status.PENDENTE,
+        verbose_name="Status",
+    )
+    arquivo = models.CharField(
+        max_length=255,
+        blank=True,
+        verbose_name="Arquivo",
+        help_text="Caminho relativo a RELATORIOS_ARQUIVOS_DIR",
+    )
+    erro = models.TextField(blank=True, verbose_name="Erro")
+    solicitado_por = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="relatorio_jobs",
+        verbose_name="Solicitado por",
+    )
+    criado_em = models.DateTimeField(auto_now_add=True, verbose_name="Criado em")
+    iniciado_em = models.DateTimeField(null=True, blank=True, verbose_name="Iniciado em")
+    concluido_em = models.DateTimeField(null=True, blank=True, verbose_name="Concluído em")
+
+    class Meta:
+        verbose_name = "Job de relatório"
+        verbose_name_plural = "Jobs de relatório"
+        ordering = ["-criado_em"]
+        indexes = [models.Index(fields=["status", "criado_em"])]
+
+    def __str__(self):
+        return f"{self.relatorio}.{self.formato} #{self.pk} ({self.get_status_display()})"
+
+    @property
+    def caminho_arquivo(self):
+        """Caminho absoluto do arquivo gerado, ou None."""
+        if not self.arquivo:
+            return None
+        return Path(settings.RELATORIOS_ARQUIVOS_DIR) / self.arquivo
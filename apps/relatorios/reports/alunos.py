@@ -1,8 +1,12 @@
 """Relatório de lista de alunos."""
 
-from django.db.models import Q
+from datetime import date
 
-from apps.academico.models import Aluno
+from apps.academico.models import Aluno, calcular_semestre
+from apps.usuarios import busca
+from core.utils.formatters import format_cpf, format_nome
+
+from .base import iterar_linhas
 
 
 def relatorio_alunos_dados(filtros=None):
@@ -13,13 +17,11 @@ def relatorio_alunos_dados(filtros=None):
         filtros: dict com q, matricula, curso, situacao (opcional)
 
     Returns:
-        tuple: (colunas, linhas)
+        tuple: (colunas, linhas) — ``linhas`` é um gerador
     """
     colunas = ["Nome", "CPF", "Matrícula", "Curso", "Faculdade", "Semestre", "Situação"]
 
-    queryset = Aluno.objects.select_related("user", "curso", "curso__faculdade").order_by(
-        "user__first_name", "user__last_name"
-    )
+    queryset = Aluno.objects.order_by("user__first_name", "user__last_name")
 
     if filtros:
         q = filtros.get("q", "").strip()
@@ -28,12 +30,7 @@ def relatorio_alunos_dados(filtros=None):
         situacao = filtros.get("situacao", "").strip()
 
         if q:
-            queryset = queryset.filter(
-                Q(user__first_name__icontains=q)
-                | Q(user__last_name__icontains=q)
-                | Q(user__cpf__icontains=q)
-                | Q(matricula__icontains=q)
-            )
+            queryset = queryset.filter(busca.q_usuarios(q, "user"))
         if matricula:
             queryset = queryset.filter(matricula__icontains=matricula)
         if curso_id:
@@ -41,17 +38,29 @@ def relatorio_alunos_dados(filtros=None):
         if situacao:
             queryset = queryset.filter(situacao=situacao)
 
-    linhas = []
-    for aluno in queryset:
-        nome = f"{aluno.user.first_name or ''} {aluno.user.last_name or ''}".strip() or str(aluno.user)
-        cpf = aluno.user.cpf or ""
-        if len(cpf) == 11:
-            cpf = f"{cpf[:3]}.{cpf[3:6]}.{cpf[6:9]}-{cpf[9:]}"
-        matricula = aluno.matricula or "—"
-        curso_nome = aluno.curso.nome if aluno.curso else "—"
-        faculdade = aluno.curso.faculdade.nome if aluno.curso and aluno.curso.faculdade else "—"
-        semestre = aluno.semestre_atual() if aluno.semestre_atual() else "—"
-        situacao = aluno.get_situacao_display()
-        linhas.append([nome, cpf, matricula, curso_nome, faculdade, semestre, situacao])
-
-    return colunas, linhas
+    queryset = queryset.values_list(
+        "user__first_name",
+        "user__last_name",
+        "user__cpf",
+        "matricula",
+        "curso__nome",
+        "curso__faculdade__nome",
+        "data_ingresso",
+        "situacao",
+    )
+    situacoes = dict(Aluno.Situacao.choices)
+    hoje = date.today()
+
+    def formatar(registro):
+        first_name, last_name, cpf, matricula, curso, faculdade, data_ingresso, situacao = registro
+        return [
+            format_nome(first_name, last_name),
+            format_cpf(cpf),
+            matricula or "—",
+            curso or "—",
+            faculdade or "—",
+            calcular_semestre(data_ingresso, hoje) or "—",
+            situacoes.get(situacao, situacao),
+        ]
+
+    return colunas, iterar_linhas(queryset, formatar)
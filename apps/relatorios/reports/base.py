@@ -0,0 +1,16 @@
+"""Utilitários compartilhados pelas funções de dados dos relatórios."""
+
+# Quantidade de linhas buscadas por vez no banco ao iterar os relatórios
+CHUNK_SIZE = 2000
+
+
+def iterar_linhas(queryset, formatar, chunk_size=CHUNK_SIZE):
+    """
+    Gera as linhas do relatório sob demanda.
+
+    O ``queryset`` (normalmente um ``values_list``) é percorrido com
+    ``.iterator(chunk_size=...)`` e cada registro é formatado na hora, então
+    nem os objetos nem a lista completa de linhas ficam em memória.
+    """
+    for registro in queryset.iterator(chunk_size=chunk_size):
+        yield formatar(registro)
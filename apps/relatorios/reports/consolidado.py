@@ -1,8 +1,7 @@
 """Relatório consolidado (resumo geral)."""
 
-from apps.academico.models import Aluno, Curso, Faculdade
-from apps.contrapartida.models import Encaminhamento, Horas
-from django.db.models import Sum
+from apps.relatorios.services.metricas import obter_metricas
+from core.utils.formatters import format_duracao_horas
 
 
 def relatorio_consolidado_dados(filtros=None):
@@ -17,25 +16,18 @@ def relatorio_consolidado_dados(filtros=None):
     """
     colunas = ["Indicador", "Quantidade"]
 
-    total_alunos = Aluno.objects.count()
-    total_alunos_ativos = Aluno.objects.filter(situacao="ATIVO").count()
-    total_faculdades = Faculdade.objects.count()
-    total_cursos = Curso.objects.count()
-    total_encaminhamentos = Encaminhamento.objects.count()
-    total_horas_registros = Horas.objects.count()
-    soma_horas = Horas.objects.aggregate(total=Sum("quantidade"))["total"]
+    metricas = obter_metricas()
     total_horas_str = "0:00:00"
-    if soma_horas:
-        from core.utils.formatters import format_duracao_horas
-        total_horas_str = format_duracao_horas(soma_horas)
+    if metricas["horas_total"]:
+        total_horas_str = format_duracao_horas(metricas["horas_total"])
 
     linhas = [
-        ["Total de alunos", total_alunos],
-        ["Alunos ativos", total_alunos_ativos],
-        ["Faculdades", total_faculdades],
-        ["Cursos", total_cursos],
-        ["Encaminhamentos", total_encaminhamentos],
-        ["Registros de horas", total_horas_registros],
+        ["Total de alunos", metricas["alunos"]],
+        ["Alunos ativos", metricas["alunos_ativos"]],
+        ["Faculdades", metricas["faculdades"]],
+        ["Cursos", metricas["cursos"]],
+        ["Encaminhamentos", metricas["encaminhamentos"]],
+        ["Registros de horas", metricas["horas_registros"]],
         ["Soma total de horas", total_horas_str],
     ]
 
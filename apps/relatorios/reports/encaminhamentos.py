@@ -1,8 +1,9 @@
 """Relatório de encaminhamentos por período."""
 
-from django.db.models import Q
-
 from apps.contrapartida.models import Encaminhamento
+from core.utils.formatters import format_nome
+
+from .base import iterar_linhas
 
 
 def relatorio_encaminhamentos_dados(filtros=None):
@@ -13,13 +14,11 @@ def relatorio_encaminhamentos_dados(filtros=None):
         filtros: dict com data_inicio, data_fim (opcional)
 
     Returns:
-        tuple: (colunas, linhas)
+        tuple: (colunas, linhas) — ``linhas`` é um gerador
     """
     colunas = ["Número", "Aluno", "Secretaria", "Data", "Responsável emissão"]
 
-    queryset = Encaminhamento.objects.select_related(
-        "aluno__user", "secretaria", "responsavel_emissao"
-    ).order_by("-data", "-numero")
+    queryset = Encaminhamento.objects.order_by("-data", "-numero")
 
     if filtros:
         data_inicio = filtros.get("data_inicio")
@@ -30,22 +29,24 @@ def relatorio_encaminhamentos_dados(filtros=None):
         if data_fim:
             queryset = queryset.filter(data__lte=data_fim)
 
-    linhas = []
-    for enc in queryset:
-        nome_aluno = f"{enc.aluno.user.first_name or ''} {enc.aluno.user.last_name or ''}".strip()
-        if not nome_aluno:
-            nome_aluno = str(enc.aluno.user)
-        responsavel = f"{enc.responsavel_emissao.first_name or ''} {enc.responsavel_emissao.last_name or ''}".strip()
-        if not responsavel:
-            responsavel = str(enc.responsavel_emissao)
-        linhas.append(
-            [
-                enc.numero,
-                nome_aluno,
-                enc.secretaria.sigla,
-                enc.data.strftime("%d/%m/%Y"),
-                responsavel,
-            ]
-        )
-
-    return colunas, linhas
+    queryset = queryset.values_list(
+        "numero",
+        "aluno__user__first_name",
+        "aluno__user__last_name",
+        "secretaria__sigla",
+        "data",
+        "responsavel_emissao__first_name",
+        "responsavel_emissao__last_name",
+    )
+
+    def formatar(registro):
+        numero, aluno_first, aluno_last, sigla, data, resp_first, resp_last = registro
+        return [
+            numero,
+            format_nome(aluno_first, aluno_last),
+            sigla,
+            data.strftime("%d/%m/%Y"),
+            format_nome(resp_first, resp_last),
+        ]
+
+    return colunas, iterar_linhas(queryset, formatar)
@@ -1,10 +1,11 @@
 """Relatórios de horas."""
 
-from django.db.models import Q, Sum
+from datetime import timedelta
 
-from apps.academico.models import Aluno
-from apps.contrapartida.models import Horas
-from core.utils.formatters import format_duracao_horas
+from apps.contrapartida.models import ANOS_CURSO, ANOS_RESUMO, Horas, ResumoHoras
+from core.utils.formatters import format_duracao_horas, format_nome
+
+from .base import iterar_linhas
 
 
 def relatorio_horas_dados(filtros=None):
@@ -15,13 +16,11 @@ def relatorio_horas_dados(filtros=None):
         filtros: dict com data_inicio, data_fim, aluno_id (opcional)
 
     Returns:
-        tuple: (colunas, linhas)
+        tuple: (colunas, linhas) — ``linhas`` é um gerador
     """
     colunas = ["Aluno", "Quantidade", "Data registro", "Ofício informação", "Responsável"]
 
-    queryset = Horas.objects.select_related(
-        "aluno__user", "responsavel_registro"
-    ).order_by("-data_registro")
+    queryset = Horas.objects.order_by("-data_registro")
 
     if filtros:
         data_inicio = filtros.get("data_inicio")
@@ -35,64 +34,72 @@ def relatorio_horas_dados(filtros=None):
         if aluno_id:
             queryset = queryset.filter(aluno_id=aluno_id)
 
-    linhas = []
-    for h in queryset:
-        nome_aluno = f"{h.aluno.user.first_name or ''} {h.aluno.user.last_name or ''}".strip()
-        if not nome_aluno:
-            nome_aluno = str(h.aluno.user)
-        responsavel = f"{h.responsavel_registro.first_name or ''} {h.responsavel_registro.last_name or ''}".strip()
-        if not responsavel:
-            responsavel = str(h.responsavel_registro)
-        linhas.append(
-            [
-                nome_aluno,
-                format_duracao_horas(h.quantidade),
-                h.data_registro.strftime("%d/%m/%Y"),
-                h.oficio_informacao or "—",
-                responsavel,
-            ]
-        )
+    queryset = queryset.values_list(
+        "aluno__user__first_name",
+        "aluno__user__last_name",
+        "quantidade",
+        "data_registro",
+        "oficio_informacao",
+        "responsavel_registro__first_name",
+        "responsavel_registro__last_name",
+    )
+
+    def formatar(registro):
+        aluno_first, aluno_last, quantidade, data_registro, oficio, resp_first, resp_last = registro
+        return [
+            format_nome(aluno_first, aluno_last),
+            format_duracao_horas(quantidade),
+            data_registro.strftime("%d/%m/%Y"),
+            oficio or "—",
+            format_nome(resp_first, resp_last),
+        ]
 
-    return colunas, linhas
+    return colunas, iterar_linhas(queryset, formatar)
 
 
 def relatorio_horas_por_aluno_dados(filtros=None):
     """
-    Retorna colunas e linhas para o relatório de total de horas por aluno.
+    Retorna colunas e linhas para o relatório de horas por aluno, com a divisão por ano do curso.
 
     Args:
         filtros: dict com data_inicio, data_fim (opcional)
 
     Returns:
-        tuple: (colunas, linhas)
+        tuple: (colunas, linhas) — ``linhas`` é um gerador
     """
-    colunas = ["Aluno", "Matrícula", "Curso", "Total de horas"]
+    anos = [f"{ano}º ano" for ano in range(1, ANOS_CURSO + 1)]
+    colunas = ["Aluno", "Matrícula", "Curso", *anos, "Total de horas"]
 
-    base = Aluno.objects.filter(horas__isnull=False)
-    if filtros:
-        data_inicio = filtros.get("data_inicio")
-        data_fim = filtros.get("data_fim")
+    data_inicio = filtros.get("data_inicio") if filtros else None
+    data_fim = filtros.get("data_fim") if filtros else None
+    campos = ["aluno__user__first_name", "aluno__user__last_name", "aluno__matricula", "aluno__curso__nome"]
+
+    if data_inicio or data_fim:
+        # Período: soma os registros do intervalo em uma consulta agrupada por aluno
+        queryset = Horas.objects.all()
         if data_inicio:
-            base = base.filter(horas__data_registro__gte=data_inicio)
+            queryset = queryset.filter(data_registro__gte=data_inicio)
         if data_fim:
-            base = base.filter(horas__data_registro__lte=data_fim)
-
-    alunos_com_horas = (
-        base.annotate(total=Sum("horas__quantidade"))
-        .select_related("user", "curso")
-        .order_by("user__first_name", "user__last_name")
-        .distinct()
-    )
-
-    linhas = []
-    for aluno in alunos_com_horas:
-        nome = f"{aluno.user.first_name or ''} {aluno.user.last_name or ''}".strip()
-        if not nome:
-            nome = str(aluno.user)
-        matricula = aluno.matricula or "—"
-        curso = aluno.curso.nome if aluno.curso else "—"
-        total = getattr(aluno, "total", None)
-        total_str = format_duracao_horas(total) if total else "0:00:00"
-        linhas.append([nome, matricula, curso, total_str])
-
-    return colunas, linhas
+            queryset = queryset.filter(data_registro__lte=data_fim)
+        queryset = queryset.por_ano_curso(*campos)
+    else:
+        # Sem período: lê os totais já mantidos em ResumoHoras
+        queryset = ResumoHoras.objects.filter(quantidade_registros__gt=0).values(
+            "aluno_id", *campos, *[f"ano_{ano}" for ano in range(1, ANOS_RESUMO + 1)], "total"
+        )
+    queryset = queryset.order_by("aluno__user__first_name", "aluno__user__last_name")
+
+    def formatar(registro):
+        anos = [registro.get(f"ano_{ano}") for ano in range(1, ANOS_RESUMO + 1)]
+        # Anos além do último entram nele, como em ano_curso(ANOS_CURSO)
+        ultimo = sum((valor for valor in anos[ANOS_CURSO - 1:] if valor), timedelta(0))
+        return [
+            format_nome(registro["aluno__user__first_name"], registro["aluno__user__last_name"]),
+            registro["aluno__matricula"] or "—",
+            registro["aluno__curso__nome"] or "—",
+            *[format_duracao_horas(valor) for valor in anos[:ANOS_CURSO - 1]],
+            format_duracao_horas(ultimo),
+            format_duracao_horas(registro["total"]) if registro["total"] else "0:00:00",
+        ]
+
+    return colunas, iterar_linhas(queryset, formatar)
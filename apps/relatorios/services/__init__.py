@@ -1,4 +1,10 @@
 from .pdf import gerar_pdf_tabela, gerar_pdf_documento
-from .xlsx import gerar_xlsx_tabela
+from .xlsx import gerar_xlsx_tabela, gerar_xlsx_stream, escrever_xlsx_tabela
 
-__all__ = ["gerar_pdf_tabela", "gerar_pdf_documento", "gerar_xlsx_tabela"]
+__all__ = [
+    "gerar_pdf_tabela",
+    "gerar_pdf_documento",
+    "gerar_xlsx_tabela",
+    "gerar_xlsx_stream",
+    "escrever_xlsx_tabela",
+]
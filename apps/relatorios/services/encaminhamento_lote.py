@@ -0,0 +1,183 @@
+"""Geração em lote dos PDFs oficiais de encaminhamento, entregues em um ZIP."""
+
+import logging
+import multiprocessing
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from django.conf import settings
+
+from apps.contrapartida.models import Encaminhamento
+
+from .encaminhamento_pdf import _horas_por_ano_lote, dados_encaminhamento, renderizar_pdf_encaminhamento
+
+logger = logging.getLogger(__name__)
+
+# Encaminhamentos carregados por vez (cada bloco = 1 consulta de encaminhamentos + 1 de horas)
+CHUNK_SIZE = 200
+
+# Documentos aguardando cada processo; limita a memória ocupada pelos dados pendentes
+DOCUMENTOS_POR_WORKER = 4
+
+
+def encaminhamentos_lote(filtros=None):
+    """
+    Retorna os encaminhamentos do lote, já com as relações usadas no PDF.
+
+    Args:
+        filtros: dict com data_inicio, data_fim, secretaria (id), curso (id),
+            numero_inicio, numero_fim (intervalo de uma emissão em lote) e
+            ids (lista de pks) — todos opcionais
+    """
+    queryset = Encaminhamento.objects.select_related(
+        "aluno__user", "aluno__curso", "secretaria", "responsavel_emissao"
+    ).order_by("numero")
+
+    if filtros:
+        if filtros.get("data_inicio"):
+            queryset = queryset.filter(data__gte=filtros["data_inicio"])
+        if filtros.get("data_fim"):
+            queryset = queryset.filter(data__lte=filtros["data_fim"])
+        if filtros.get("secretaria"):
+            queryset = queryset.filter(secretaria_id=filtros["secretaria"])
+        if filtros.get("curso"):
+            queryset = queryset.filter(aluno__curso_id=filtros["curso"])
+        if filtros.get("numero_inicio"):
+            queryset = queryset.filter(numero__gte=filtros["numero_inicio"])
+        if filtros.get("numero_fim"):
+            queryset = queryset.filter(numero__lte=filtros["numero_fim"])
+        if filtros.get("ids"):
+            queryset = queryset.filter(pk__in=filtros["ids"])
+
+    return queryset
+
+
+def _nome_arquivo(dados):
+    return f"encaminhamento_{dados['numero']}.pdf"
+
+
+def iterar_dados(queryset, chunk_size=CHUNK_SIZE):
+    """
+    Gera o dict de ``dados_encaminhamento`` de cada encaminhamento do queryset.
+
+    Os encaminhamentos são lidos em blocos e as horas de todos os alunos do
+    bloco vêm de uma única consulta (em vez de uma por documento).
+    """
+    bloco = []
+    for enc in queryset.iterator(chunk_size=chunk_size):
+        bloco.append(enc)
+        if len(bloco) >= chunk_size:
+            yield from _dados_bloco(bloco)
+            bloco = []
+    if bloco:
+        yield from _dados_bloco(bloco)
+
+
+def _dados_bloco(encaminhamentos):
+    horas = _horas_por_ano_lote({enc.aluno for enc in encaminhamentos})
+    for enc in encaminhamentos:
+        yield dados_encaminhamento(enc, horas_por_ano=horas[enc.aluno_id])
+
+
+def renderizar_lote(itens, workers=None):
+    """
+    Renderiza os PDFs em um pool de processos, na ordem em que ficam prontos.
+
+    Os processos filhos só recebem dicts já formatados e não tocam no banco.
+    Com ``workers <= 1`` tudo roda no processo atual.
+
+    Yields:
+        tuple: (dados, pdf_bytes ou None, erro ou None)
+    """
+    workers = settings.ENCAMINHAMENTOS_LOTE_WORKERS if workers is None else workers
+    if workers <= 1:
+        for dados in itens:
+            yield _renderizar_seguro(dados)
+        return
+
+    # "spawn" evita herdar conexões de banco e threads do processo Django
+    contexto = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=contexto) as pool:
+        pendentes = {}
+        itens = iter(itens)
+        limite = workers * DOCUMENTOS_POR_WORKER
+        esgotado = False
+        while pendentes or not esgotado:
+            while not esgotado and len(pendentes) < limite:
+                dados = next(itens, None)
+                if dados is None:
+                    esgotado = True
+                    break
+                pendentes[pool.submit(renderizar_pdf_encaminhamento, dados)] = dados
+            if not pendentes:
+                break
+            prontos, _ = wait(pendentes, return_when=FIRST_COMPLETED)
+            for future in prontos:
+                dados = pendentes.pop(future)
+                try:
+                    yield dados, future.result(), None
+                except Exception as exc:
+                    logger.exception("Falha ao gerar PDF do encaminhamento %s", dados["numero"])
+                    yield dados, None, str(exc) or exc.__class__.__name__
+
+
+def _renderizar_seguro(dados):
+    try:
+        return dados, renderizar_pdf_encaminhamento(dados), None
+    except Exception as exc:
+        logger.exception("Falha ao gerar PDF do encaminhamento %s", dados["numero"])
+        return dados, None, str(exc) or exc.__class__.__name__
+
+
+class _SaidaZip:
+    """Destino só-escrita do ZipFile: acumula os bytes até o próximo ``esvaziar``."""
+
+    def __init__(self):
+        self._blocos = []
+
+    def write(self, dados):
+        self._blocos.append(bytes(dados))
+        return len(dados)
+
+    def flush(self):
+        pass
+
+    def esvaziar(self):
+        conteudo = b"".join(self._blocos)
+        self._blocos = []
+        return conteudo
+
+
+def gerar_zip_stream(filtros=None, workers=None):
+    """
+    Gera o ZIP do lote em blocos, um por documento concluído.
+
+    Pensado para ``StreamingHttpResponse``: cada PDF é enviado assim que o
+    pool termina de renderizá-lo. Falhas individuais não interrompem o lote;
+    elas são listadas em ``ERROS.txt`` no final do arquivo.
+
+    Yields:
+        bytes: blocos do conteúdo do ZIP
+    """
+    saida = _SaidaZip()
+    erros = []
+    with zipfile.ZipFile(saida, mode="w", compression=zipfile.ZIP_DEFLATED) as zf:
+        itens = iterar_dados(encaminhamentos_lote(filtros))
+        for dados, pdf, erro in renderizar_lote(itens, workers=workers):
+            if erro:
+                erros.append(f"{_nome_arquivo(dados)}: {erro}")
+                continue
+            zf.writestr(_nome_arquivo(dados), pdf)
+            yield saida.esvaziar()
+        if erros:
+            zf.writestr("ERROS.txt", "\n".join(erros) + "\n")
+    yield saida.esvaziar()
+
+
+def escrever_zip(destino, filtros=None, workers=None):
+    """Grava o ZIP do lote em ``destino`` (arquivo binário aberto). Retorna o total de bytes."""
+    total = 0
+    for bloco in gerar_zip_stream(filtros, workers=workers):
+        destino.write(bloco)
+        total += len(bloco)
+    return total
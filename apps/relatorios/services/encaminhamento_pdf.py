@@ -1,13 +1,16 @@
 """Geração do PDF de encaminhamento conforme template oficial FALS."""
 
 from datetime import timedelta
+from functools import lru_cache
 from io import BytesIO
 
 from reportlab.lib import colors
 from reportlab.lib.pagesizes import A4
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import cm
+from reportlab.pdfgen.canvas import Canvas
 from reportlab.platypus import (
+    Flowable,
     SimpleDocTemplate,
     Paragraph,
     Spacer,
@@ -45,65 +48,121 @@ def _format_horas_minutos(td: timedelta):
     return f"{h}:{m:02d}"
 
 
-def _horas_por_ano(aluno):
-    """Retorna dict {1: timedelta, 2: timedelta, ...} e total, média."""
-    from apps.contrapartida.models import Horas
-
-    if not aluno.data_ingresso:
-        return {1: timedelta(0), 2: timedelta(0), 3: timedelta(0), 4: timedelta(0)}, timedelta(0), timedelta(0)
-
-    horas_qs = Horas.objects.filter(aluno=aluno).only("data_registro", "quantidade")
-    ano_map = {1: timedelta(0), 2: timedelta(0), 3: timedelta(0), 4: timedelta(0)}
-    ingresso = aluno.data_ingresso
-
-    for h in horas_qs:
-        data_reg = h.data_registro
-        qtd = h.quantidade
-        if not qtd:
-            continue
-        # Ano do curso = anos desde ingresso (1-based)
-        anos_diff = (data_reg.year - ingresso.year) + (
-            1 if (data_reg.month, data_reg.day) >= (ingresso.month, ingresso.day) else 0
-        )
-        ano_curso = min(max(anos_diff, 1), 4)
-        ano_map[ano_curso] = ano_map[ano_curso] + qtd
-
+def _resumo_anos(ano_map):
+    """Retorna (ano_map, total, média) — média entre os anos com horas."""
     total = ano_map[1] + ano_map[2] + ano_map[3] + ano_map[4]
     count = sum(1 for v in ano_map.values() if v and v.total_seconds() > 0)
     media_sec = total.total_seconds() / count if count > 0 else 0
     media = timedelta(seconds=int(media_sec))
-
     return ano_map, total, media
 
 
-def gerar_pdf_encaminhamento(encaminhamento):
-    """Gera PDF do encaminhamento no formato do template oficial."""
+def _anos_vazios():
+    return {1: timedelta(0), 2: timedelta(0), 3: timedelta(0), 4: timedelta(0)}
+
+
+def _horas_por_ano(aluno):
+    """Retorna dict {1: timedelta, 2: timedelta, ...} e total, média."""
+    return _horas_por_ano_lote([aluno])[aluno.pk]
+
+
+def _horas_por_ano_lote(alunos):
+    """
+    Mesmo cálculo de ``_horas_por_ano`` para vários alunos com uma única consulta.
+
+    As horas por ano do curso vêm do ``ResumoHoras`` de cada aluno, mantido a
+    cada gravação de ``Horas``.
+
+    Returns:
+        dict: {aluno_id: (ano_map, total, media)}
+    """
+    from apps.contrapartida.models import ANOS_CURSO, ResumoHoras
+
+    ids = [aluno.pk for aluno in alunos]
+    resumos = {resumo.aluno_id: resumo for resumo in ResumoHoras.objects.filter(aluno_id__in=ids)}
+    return {
+        aluno_id: _resumo_anos(resumos[aluno_id].por_ano(ANOS_CURSO) if aluno_id in resumos else _anos_vazios())
+        for aluno_id in ids
+    }
+
+
+def dados_encaminhamento(encaminhamento, horas_por_ano=None):
+    """
+    Extrai do encaminhamento os textos já formatados usados no PDF.
+
+    O resultado é um dict simples (serializável), o que permite renderizar o
+    PDF em outro processo sem acesso ao banco.
+
+    Args:
+        encaminhamento: Encaminhamento com aluno, user, curso, secretaria e
+            responsavel_emissao carregados
+        horas_por_ano: tupla (ano_map, total, media) já calculada; se omitida,
+            é consultada com ``_horas_por_ano``
+    """
     enc = encaminhamento
     aluno = enc.aluno
     user = aluno.user
     curso = aluno.curso
 
     nome_completo = f"{user.first_name or ''} {user.last_name or ''}".strip() or str(user)
-    cpf_fmt = format_cpf(user.cpf) if user.cpf else ""
     responsavel = f"{enc.responsavel_emissao.first_name or ''} {enc.responsavel_emissao.last_name or ''}".strip()
     responsavel = responsavel or str(enc.responsavel_emissao)
 
-    ano_map, total_horas, media_horas = _horas_por_ano(aluno)
-    h1 = _format_horas_minutos(ano_map.get(1))
-    h2 = _format_horas_minutos(ano_map.get(2))
-    h3 = _format_horas_minutos(ano_map.get(3))
-    h4 = _format_horas_minutos(ano_map.get(4))
-    h_total = _format_horas_minutos(total_horas)
-    h_media = _format_horas_minutos(media_horas)
-
+    ano_map, total_horas, media_horas = horas_por_ano or _horas_por_ano(aluno)
     semestre = aluno.semestre_atual()
-    ano_cursando = f"{(semestre + 1) // 2}º ANO" if semestre else "—"
-    curso_nome = curso.nome if curso else "—"
-    bolsista_desde = _format_data(aluno.data_ingresso) if aluno.data_ingresso else "—"
-    sexo_display = aluno.get_sexo_display() if aluno.sexo else "—"
 
-    buffer = BytesIO()
-    doc = SimpleDocTemplate(
+    return {
+        "numero": enc.numero,
+        "data": _format_data(enc.data),
+        "secretaria": enc.secretaria.nome,
+        "responsavel": responsavel,
+        "nome_completo": nome_completo,
+        "cpf": format_cpf(user.cpf) if user.cpf else "",
+        "matricula": aluno.matricula or "—",
+        "rg": aluno.rg or "—",
+        "data_nascimento": _format_data(aluno.data_nascimento),
+        "sexo": aluno.get_sexo_display() if aluno.sexo else "—",
+        "logradouro": aluno.logradouro or "—",
+        "numero_endereco": aluno.numero or "—",
+        "cidade": aluno.cidade or "—",
+        "bairro": aluno.bairro or "—",
+        "complemento": aluno.complemento or "—",
+        "telefone": aluno.telefone or "—",
+        "celular": aluno.celular or "—",
+        "cep": _format_cep(aluno.cep),
+        "curso": curso.nome if curso else "—",
+        "ano_cursando": f"{(semestre + 1) // 2}º ANO" if semestre else "—",
+        "horas": [_format_horas_minutos(ano_map.get(ano)) for ano in (1, 2, 3, 4)],
+        "horas_total": _format_horas_minutos(total_horas),
+        "horas_media": _format_horas_minutos(media_horas),
+    }
+
+
+def gerar_pdf_encaminhamento(encaminhamento):
+    """Gera PDF do encaminhamento no formato do template oficial."""
+    return renderizar_pdf_encaminhamento(dados_encaminhamento(encaminhamento))
+
+
+def renderizar_pdf_encaminhamento(dados, camada_estatica=True):
+    """
+    Renderiza o PDF oficial a partir do dict de ``dados_encaminhamento`` (não acessa o banco).
+
+    Com ``camada_estatica`` (padrão), a parte fixa do documento é diagramada uma
+    única vez por processo (compartilhada entre as threads) e cada chamada só
+    posiciona os valores do aluno por cima dela. Se algum valor não couber no
+    espaço reservado no modelo (ex.: nome que quebraria a linha), o documento
+    é diagramado por completo, como antes.
+    """
+    if camada_estatica:
+        try:
+            return _renderizar_sobre_camada(dados, _camada_estatica())
+        except _ValorNaoCabe:
+            pass
+    return _renderizar_completo(dados)
+
+
+def _documento(buffer):
+    return SimpleDocTemplate(
         buffer,
         pagesize=A4,
         rightMargin=1.2 * cm,
@@ -112,6 +171,22 @@ def gerar_pdf_encaminhamento(encaminhamento):
         bottomMargin=0.7 * cm,
     )
 
+
+def _renderizar_completo(dados):
+    """Diagrama o documento inteiro com os valores do aluno."""
+    buffer = BytesIO()
+    _documento(buffer).build(_elementos(_CamposPreenchidos(dados)))
+    return buffer.getvalue()
+
+
+def _elementos(campos):
+    """
+    Monta os flowables do documento.
+
+    Os valores do aluno vêm de ``campos.paragrafo``/``campos.texto``: preenchidos
+    (``_CamposPreenchidos``) ou apenas marcados para a camada estática
+    (``_CamposMarcados``). O restante do layout é o mesmo nos dois casos.
+    """
     styles = getSampleStyleSheet()
     title_style = ParagraphStyle(
         name="EncTitle",
@@ -144,7 +219,6 @@ def gerar_pdf_encaminhamento(encaminhamento):
     )
 
     elements = []
-    enc_data = _format_data(enc.data)
 
     # 1. Título (idêntico ao referência)
     elements.append(Paragraph("ENCAMINHAMENTO DE ESTAGIÁRIOS DE CONTRAPARTIDA - FALS", title_style))
@@ -177,40 +251,40 @@ def gerar_pdf_encaminhamento(encaminhamento):
         ("TOPPADDING", (0, 0), (-1, -1), 0),
         ("BOTTOMPADDING", (0, 0), (-1, -1), 4),
     ])
-    matricula_val = aluno.matricula or "—"
-    matricula_para = Paragraph(
-        f'<b>MATRÍCULA:</b> <font color="#2563EB"><u>{matricula_val}</u></font>',
+    matricula_para = campos.paragrafo(
+        "matricula",
+        '<b>MATRÍCULA:</b> <font color="#2563EB"><u>{}</u></font>',
         _cell_style,
     )
     # Linha 1: MATRÍCULA | RG | CPF
     t1 = Table([
-        [matricula_para, Paragraph(f'<b>RG:</b> {aluno.rg or "—"}', _cell_style), Paragraph(f'<b>CPF:</b> {cpf_fmt}', _cell_style)]
+        [matricula_para, campos.paragrafo("rg", "<b>RG:</b> {}", _cell_style), campos.paragrafo("cpf", "<b>CPF:</b> {}", _cell_style)]
     ], colWidths=[_col3, _col3, _col3])
     t1.setStyle(_tbl_style)
     elements.append(t1)
 
     # Linha 2: NOME | NASCIMENTO | SEXO
     t2 = Table([[
-        Paragraph(f'<b>NOME:</b> {nome_completo[:50]}', _cell_style),
-        Paragraph(f'<b>NASCIMENTO:</b> {_format_data(aluno.data_nascimento)}', _cell_style),
-        Paragraph(f'<b>SEXO:</b> {sexo_display}', _cell_style),
+        campos.paragrafo("nome_completo", "<b>NOME:</b> {}", _cell_style, limite=50),
+        campos.paragrafo("data_nascimento", "<b>NASCIMENTO:</b> {}", _cell_style),
+        campos.paragrafo("sexo", "<b>SEXO:</b> {}", _cell_style),
     ]], colWidths=[_col3, _col3, _col3])
     t2.setStyle(_tbl_style)
     elements.append(t2)
 
     # Linha 3: ENDEREÇO | Nº | CIDADE
     t3 = Table([[
-        Paragraph(f'<b>ENDEREÇO:</b> {(aluno.logradouro or "—")[:45]}', _cell_style),
-        Paragraph(f'<b>Nº:</b> {aluno.numero or "—"}', _cell_style),
-        Paragraph(f'<b>CIDADE:</b> {aluno.cidade or "—"}', _cell_style),
+        campos.paragrafo("logradouro", "<b>ENDEREÇO:</b> {}", _cell_style, limite=45),
+        campos.paragrafo("numero_endereco", "<b>Nº:</b> {}", _cell_style),
+        campos.paragrafo("cidade", "<b>CIDADE:</b> {}", _cell_style),
     ]], colWidths=[_col3, _col3, _col3])
     t3.setStyle(_tbl_style)
     elements.append(t3)
 
     # Linha 4: BAIRRO | COMPLEMENTO | Nº
     t4 = Table([[
-        Paragraph(f'<b>BAIRRO:</b> {aluno.bairro or "—"}', _cell_style),
-        Paragraph(f'<b>COMPLEMENTO:</b> {(aluno.complemento or "—")[:30]}', _cell_style),
+        campos.paragrafo("bairro", "<b>BAIRRO:</b> {}", _cell_style),
+        campos.paragrafo("complemento", "<b>COMPLEMENTO:</b> {}", _cell_style, limite=30),
         Paragraph('<b>Nº:</b> ', _cell_style),
     ]], colWidths=[_col3, _col3, _col3])
     t4.setStyle(_tbl_style)
@@ -218,17 +292,17 @@ def gerar_pdf_encaminhamento(encaminhamento):
 
     # Linha 5: TELEFONE | CELULAR | CEP
     t5 = Table([[
-        Paragraph(f'<b>TELEFONE:</b> {aluno.telefone or "—"}', _cell_style),
-        Paragraph(f'<b>CELULAR:</b> {aluno.celular or "—"}', _cell_style),
-        Paragraph(f'<b>CEP:</b> {_format_cep(aluno.cep)}', _cell_style),
+        campos.paragrafo("telefone", "<b>TELEFONE:</b> {}", _cell_style),
+        campos.paragrafo("celular", "<b>CELULAR:</b> {}", _cell_style),
+        campos.paragrafo("cep", "<b>CEP:</b> {}", _cell_style),
     ]], colWidths=[_col3, _col3, _col3])
     t5.setStyle(_tbl_style)
     elements.append(t5)
 
     # Linha 6: CURSO | CURSANDO (duas colunas para ocupar toda a linha)
     t6 = Table([[
-        Paragraph(f'<b>CURSO:</b> {curso_nome}', _cell_style),
-        Paragraph(f'<b>CURSANDO:</b> {ano_cursando}', _cell_style),
+        campos.paragrafo("curso", "<b>CURSO:</b> {}", _cell_style),
+        campos.paragrafo("ano_cursando", "<b>CURSANDO:</b> {}", _cell_style),
     ]], colWidths=[_col2, _col2])
     t6.setStyle(_tbl_style)
     elements.append(t6)
@@ -255,9 +329,9 @@ def gerar_pdf_encaminhamento(encaminhamento):
 
     dados_horas = [
         ["Ano", "1º ANO", "2º ANO", "3º ANO", "4º ANO", "TOTAL", "MÉDIA"],
-        ["Qtd. Horas", h1, h2, h3, h4, h_total, h_media],
+        ["Qtd. Horas", *[campos.texto(("horas", i)) for i in range(4)], campos.texto("horas_total"), campos.texto("horas_media")],
     ]
-    t_horas = Table(
+    t_horas = _Tabela(
         dados_horas,
         colWidths=[2.2 * cm, 2 * cm, 2 * cm, 2 * cm, 2 * cm, 2 * cm, 2 * cm],
     )
@@ -372,13 +446,13 @@ def gerar_pdf_encaminhamento(encaminhamento):
 
     # 7. Encaminhamento à : / Em : (duas linhas, assinatura à direita – como no referência)
     dados_enc = [
-        [f"Encaminhamento à :", enc.secretaria.nome],
-        [f"Em :", enc_data],
+        [f"Encaminhamento à :", campos.texto("secretaria")],
+        [f"Em :", campos.texto("data")],
         ["", "_________________________"],
-        ["", responsavel],
+        ["", campos.texto("responsavel")],
         ["", "RF:"],
     ]
-    t_enc = Table(dados_enc, colWidths=[3.2 * cm, 12 * cm])
+    t_enc = _Tabela(dados_enc, colWidths=[3.2 * cm, 12 * cm])
     t_enc.setStyle(
         TableStyle(
             [
@@ -432,10 +506,10 @@ def gerar_pdf_encaminhamento(encaminhamento):
     _value_date = 4 * cm
 
     dados_prot_1 = [
-        ["Estagiário(a):", nome_completo],
-        ["Encaminhamento à:", enc.secretaria.nome],
+        ["Estagiário(a):", campos.texto("nome_completo")],
+        ["Encaminhamento à:", campos.texto("secretaria")],
     ]
-    t_prot_1 = Table(dados_prot_1, colWidths=[_label_w, _value_wide])
+    t_prot_1 = _Tabela(dados_prot_1, colWidths=[_label_w, _value_wide])
     t_prot_1.setStyle(
         TableStyle([
             ("FONTNAME", (0, 0), (0, -1), "Helvetica-Bold"),
@@ -453,8 +527,8 @@ def gerar_pdf_encaminhamento(encaminhamento):
     elements.append(t_prot_1)
 
     # Linha Cadastrado em com caixa de data mais estreita
-    dados_prot_2 = [["Cadastrado em :", enc_data]]
-    t_prot_2 = Table(dados_prot_2, colWidths=[_label_w, _value_date])
+    dados_prot_2 = [["Cadastrado em :", campos.texto("data")]]
+    t_prot_2 = _Tabela(dados_prot_2, colWidths=[_label_w, _value_date])
     t_prot_2.setStyle(
         TableStyle([
             ("FONTNAME", (0, 0), (0, -1), "Helvetica-Bold"),
@@ -474,11 +548,246 @@ def gerar_pdf_encaminhamento(encaminhamento):
 
     # Assinatura protocolo
     elements.append(
-        Paragraph(
-            f"_________________________<br/>{responsavel}<br/>RF:",
+        campos.paragrafo(
+            "responsavel",
+            "_________________________<br/>{}<br/>RF:",
             ParagraphStyle(name="SigProt", fontSize=8, alignment=2),
         )
     )
 
-    doc.build(elements)
+    return elements
+
+
+# --- Camada estática ---
+#
+# O modelo é diagramado uma vez com os campos do aluno vazios: cada campo guarda
+# o ponto onde seu valor entra e a parte fixa é desenhada uma vez e guardada
+# como o trecho de operadores PDF da página. Os documentos seguintes recebem
+# esse trecho pronto (``addLiteral``) e só escrevem os valores por cima.
+
+
+class _ValorNaoCabe(Exception):
+    """Um valor ocupa mais linhas do que o espaço reservado no modelo."""
+
+
+def _valor(dados, chave, limite=None):
+    if isinstance(chave, tuple):
+        nome, indice = chave
+        valor = dados[nome][indice]
+    else:
+        valor = dados[chave]
+    valor = str(valor)
+    return valor[:limite] if limite else valor
+
+
+class _CamposPreenchidos:
+    """Valores do aluno inseridos direto no layout."""
+
+    def __init__(self, dados):
+        self.dados = dados
+
+    def paragrafo(self, chave, modelo, estilo, limite=None):
+        return Paragraph(modelo.format(_valor(self.dados, chave, limite)), estilo)
+
+    def texto(self, chave):
+        return _valor(self.dados, chave)
+
+
+class _CamposMarcados:
+    """Campos vazios que só registram onde cada valor será escrito."""
+
+    def __init__(self):
+        self.paragrafos = []
+        self.textos = []
+
+    def paragrafo(self, chave, modelo, estilo, limite=None):
+        campo = _CampoParagrafo(chave, modelo, estilo, limite)
+        self.paragrafos.append(campo)
+        return campo
+
+    def texto(self, chave):
+        campo = _CampoTexto(chave)
+        self.textos.append(campo)
+        return campo
+
+
+class _CampoParagrafo(Flowable):
+    """Ocupa o espaço do parágrafo com o valor vazio e guarda sua posição na página."""
+
+    def __init__(self, chave, modelo, estilo, limite=None):
+        super().__init__()
+        self.chave = chave
+        self.modelo = modelo
+        self.estilo = estilo
+        self.limite = limite
+        self._vazio = Paragraph(modelo.format(""), estilo)
+        self.posicao = None
+
+    def wrap(self, availWidth, availHeight):
+        self.largura = availWidth
+        self.width, self.height = self._vazio.wrap(availWidth, availHeight)
+        return self.width, self.height
+
+    def draw(self):
+        self.posicao = (self.canv.getPageNumber(), *self.canv.absolutePosition(0, 0))
+
+    def preencher(self, dados):
+        """Parágrafo com o valor, ou ``_ValorNaoCabe`` se ele ficar mais alto que o modelo."""
+        paragrafo = Paragraph(self.modelo.format(_valor(dados, self.chave, self.limite)), self.estilo)
+        _, altura = paragrafo.wrap(self.largura, A4[1])
+        if altura > self.height + 0.01:
+            raise _ValorNaoCabe(self.chave)
+        return paragrafo, altura
+
+
+class _CampoTexto(str):
+    """Célula de texto simples de ``_Tabela``; recebe a posição ao ser desenhada."""
+
+    def __new__(cls, chave):
+        campo = super().__new__(cls, chave[0] if isinstance(chave, tuple) else chave)
+        campo.chave = chave
+        campo.posicao = None
+        return campo
+
+
+class _Tabela(Table):
+    """Table que, no lugar de desenhar um ``_CampoTexto``, registra onde ele seria escrito."""
+
+    def _drawCell(self, cellval, cellstyle, pos, size):
+        if not isinstance(cellval, _CampoTexto):
+            return super()._drawCell(cellval, cellstyle, pos, size)
+
+        # Mesmas contas de Table._drawCell para uma célula de texto de uma linha
+        colpos, rowpos = pos
+        colwidth, rowheight = size
+        just = cellstyle.alignment
+        if just == "LEFT":
+            x = colpos + cellstyle.leftPadding
+        elif just in ("CENTRE", "CENTER"):
+            x = colpos + (colwidth + cellstyle.leftPadding - cellstyle.rightPadding) * 0.5
+        else:
+            x = colpos + colwidth - cellstyle.rightPadding
+        if cellstyle.valign == "BOTTOM":
+            y = rowpos + cellstyle.bottomPadding + cellstyle.leading - cellstyle.fontsize
+        elif cellstyle.valign == "TOP":
+            y = rowpos + rowheight - cellstyle.topPadding - cellstyle.fontsize
+        else:
+            y = rowpos + (cellstyle.bottomPadding + rowheight - cellstyle.topPadding + cellstyle.leading) / 2.0 - cellstyle.fontsize
+
+        cellval.posicao = (self.canv.getPageNumber(), *self.canv.absolutePosition(x, y))
+        cellval.alinhamento = just
+        cellval.fonte = (cellstyle.fontname, cellstyle.fontsize)
+        cellval.cor = cellstyle.color
+
+
+class _Gravador(Flowable):
+    """Envolve um flowable de primeiro nível e guarda onde o frame o desenhou."""
+
+    def __init__(self, flowable):
+        super().__init__()
+        self.flowable = flowable
+        self.posicao = None
+
+    def wrap(self, availWidth, availHeight):
+        self.width, self.height = self.flowable.wrap(availWidth, availHeight)
+        return self.width, self.height
+
+    def split(self, availWidth, availHeight):
+        return []
+
+    def getSpaceBefore(self):
+        return self.flowable.getSpaceBefore()
+
+    def getSpaceAfter(self):
+        return self.flowable.getSpaceAfter()
+
+    def drawOn(self, canvas, x, y, _sW=0):
+        self.posicao = (canvas.getPageNumber(), x, y, _sW)
+        self.flowable.drawOn(canvas, x, y, _sW=_sW)
+
+
+def _fontes_registradas(canvas):
+    """Fontes do documento na ordem em que receberam os nomes internos (/F1, /F2...)."""
+    mapa = canvas._doc.fontMapping
+    return sorted(mapa, key=lambda fonte: int(mapa[fonte].lstrip("/F")))
+
+
+class _CamadaEstatica:
+    """
+    Parte fixa do documento: operadores PDF de cada página e posição dos campos.
+
+    Os canvas e documentos do reportlab usados para montá-la (inclusive os
+    internos ``_code`` e ``fontMapping``) são locais ao ``__init__``, e só nele
+    ``_Tabela._drawCell`` e ``draw`` gravam a posição dos campos. Depois dele
+    nada é alterado — as listas viram tuplas e ``_renderizar_sobre_camada``
+    só lê os campos e monta seus próprios ``Paragraph`` e canvas —, então a
+    mesma instância serve a várias threads ao mesmo tempo.
+    """
+
+    def __init__(self):
+        campos = _CamposMarcados()
+        gravadores = [_Gravador(flowable) for flowable in _elementos(campos)]
+        _documento(BytesIO()).build(list(gravadores))  # build consome a lista
+
+        # Redesenha a parte fixa em um canvas à parte e guarda os operadores de cada página
+        canvas = Canvas(BytesIO(), pagesize=A4)
+        self.paginas = []
+        for pagina in range(1, max(g.posicao[0] for g in gravadores if g.posicao) + 1):
+            inicio = len(canvas._code)
+            for g in gravadores:
+                if g.posicao and g.posicao[0] == pagina:
+                    _, x, y, sW = g.posicao
+                    g.flowable.drawOn(canvas, x, y, _sW=sW)
+            self.paginas.append("q\n" + "\n".join(canvas._code[inicio:]) + "\nQ")
+            canvas.showPage()
+        # Os operadores referem-se às fontes pelo nome interno; cada documento
+        # novo precisa registrá-las na mesma ordem.
+        self.paginas = tuple(self.paginas)
+        self.fontes = tuple(_fontes_registradas(canvas))
+        self.paragrafos = tuple(campos.paragrafos)
+        self.textos = tuple(campos.textos)
+
+
+@lru_cache(maxsize=None)
+def _camada_estatica():
+    """
+    Camada estática do processo, montada na primeira chamada (só leitura depois disso).
+
+    Threads que chegam juntas na primeira chamada podem montar cada uma a sua;
+    o ``lru_cache`` guarda uma delas e as demais são descartadas.
+    """
+    return _CamadaEstatica()
+
+
+def _renderizar_sobre_camada(dados, camada):
+    paragrafos = [(campo, *campo.preencher(dados)) for campo in camada.paragrafos]
+
+    buffer = BytesIO()
+    canvas = Canvas(buffer, pagesize=A4)
+    for fonte in camada.fontes:
+        canvas._doc.getInternalFontName(fonte)
+
+    for pagina, codigo in enumerate(camada.paginas, start=1):
+        canvas.addLiteral(codigo)
+
+        for campo, paragrafo, altura in paragrafos:
+            pagina_campo, x, y = campo.posicao
+            if pagina_campo == pagina:
+                paragrafo.drawOn(canvas, x, y + campo.height - altura)
+
+        for campo in camada.textos:
+            pagina_campo, x, y = campo.posicao
+            if pagina_campo != pagina:
+                continue
+            canvas.setFillColor(campo.cor)
+            canvas.setFont(*campo.fonte)
+            valor = _valor(dados, campo.chave)
+            if campo.alinhamento == "LEFT":
+                canvas.drawString(x, y, valor)
+            elif campo.alinhamento in ("CENTRE", "CENTER"):
+                canvas.drawCentredString(x, y, valor)
+            else:
+                canvas.drawRightString(x, y, valor)
+        canvas.showPage()
+    canvas.save()
     return buffer.getvalue()
@@ -0,0 +1,106 @@
+"""Fila de jobs de relatório persistida no banco (sem broker externo)."""
+
+import logging
+import os
+import tempfile
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.utils import timezone
+
+from ..catalogo import RELATORIOS, escrever_relatorio, nome_arquivo
+from ..models import RelatorioJob
+
+logger = logging.getLogger(__name__)
+
+
+def enfileirar(relatorio, formato, filtros, usuario):
+    """Cria um job pendente; o worker (``manage.py processar_relatorios``) o executa."""
+    if relatorio not in RELATORIOS:
+        raise ValueError(f"Relatório desconhecido: {relatorio!r}.")
+    if formato not in RELATORIOS[relatorio]["formatos"]:
+        raise ValueError(f"Formato {formato!r} não disponível para o relatório {relatorio!r}.")
+    return RelatorioJob.objects.create(
+        relatorio=relatorio,
+        formato=formato,
+        filtros=filtros or {},
+        solicitado_por=usuario,
+    )
+
+
+def reservar_proximo():
+    """
+    Reserva o job pendente mais antigo para este processo.
+
+    A troca PENDENTE -> PROCESSANDO é um UPDATE condicional: se outro worker
+    pegou o mesmo job antes, nenhuma linha é alterada e tentamos o próximo.
+    """
+    while True:
+        job = (
+            RelatorioJob.objects.filter(status=RelatorioJob.Status.PENDENTE)
+            .order_by("criado_em", "pk")
+            .first()
+        )
+        if job is None:
+            return None
+        reservado = RelatorioJob.objects.filter(pk=job.pk, status=RelatorioJob.Status.PENDENTE).update(
+            status=RelatorioJob.Status.PROCESSANDO,
+            iniciado_em=timezone.now(),
+        )
+        if reservado:
+            job.refresh_from_db()
+            return job
+
+
+def executar(job):
+    """Gera o arquivo do job em disco e registra o resultado."""
+    diretorio = Path(settings.RELATORIOS_ARQUIVOS_DIR)
+    diretorio.mkdir(parents=True, exist_ok=True)
+    arquivo = f"{job.pk}_{nome_arquivo(job.relatorio, job.formato)}"
+
+    fd, tmp_path = tempfile.mkstemp(dir=diretorio, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as destino:
+            escrever_relatorio(job.relatorio, job.formato, job.filtros or None, destino)
+        os.replace(tmp_path, diretorio / arquivo)
+    except Exception as exc:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        logger.exception("Falha ao gerar relatório do job %s", job.pk)
+        job.status = RelatorioJob.Status.ERRO
+        job.erro = str(exc) or exc.__class__.__name__
+    else:
+        job.status = RelatorioJob.Status.CONCLUIDO
+        job.arquivo = arquivo
+        job.erro = ""
+    job.concluido_em = timezone.now()
+    job.save(update_fields=["status", "arquivo", "erro", "concluido_em"])
+    return job
+
+
+def liberar_travados(timeout):
+    """Devolve à fila jobs PROCESSANDO há mais de ``timeout`` (worker que morreu no meio)."""
+    limite = timezone.now() - timeout
+    return RelatorioJob.objects.filter(
+        status=RelatorioJob.Status.PROCESSANDO,
+        iniciado_em__lt=limite,
+    ).update(status=RelatorioJob.Status.PENDENTE, iniciado_em=None)
+
+
+def limpar_expirados(dias=None):
+    """Remove jobs finalizados há mais de ``dias`` dias, junto com seus arquivos."""
+    dias = settings.RELATORIOS_JOBS_RETENCAO_DIAS if dias is None else dias
+    limite = timezone.now() - timedelta(days=dias)
+    expirados = RelatorioJob.objects.filter(
+        status__in=[RelatorioJob.Status.CONCLUIDO, RelatorioJob.Status.ERRO],
+        concluido_em__lt=limite,
+    )
+    total = 0
+    for job in expirados.iterator():
+        caminho = job.caminho_arquivo
+        if caminho and caminho.exists():
+            caminho.unlink()
+        job.delete()
+        total += 1
+    return total
@@ -0,0 +1,126 @@
+"""
+Indicadores gerais do sistema (relatório consolidado e painel do diretor).
+
+Os indicadores são calculados em um único SELECT com uma subconsulta por
+tabela (mais a lista de alunos por curso) e guardados em um snapshot JSON no
+diretório do cache de relatórios. O snapshot vale enquanto a versão dos dados
+(``cache.versao_dados``) não mudar e por no máximo ``RELATORIOS_METRICAS_TTL``
+segundos; dentro disso, ler os indicadores não consulta o banco.
+"""
+
+import json
+import os
+import tempfile
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import Count, DurationField, F, Func, IntegerField
+
+from apps.academico.models import Aluno, Curso, Faculdade
+from apps.contrapartida.models import Encaminhamento, ResumoHoras
+
+from .. import cache
+from ..cache import ARQUIVO_METRICAS
+
+
+def _agregado(queryset, funcao="COUNT", campo="pk", output_field=None):
+    """Queryset de uma linha e uma coluna (``valor``) com ``funcao`` sobre ``campo``."""
+    expressao = Func(F(campo), function=funcao, output_field=output_field or IntegerField())
+    # Func (e não Count/Sum) para o ORM não agrupar pelas colunas do modelo
+    return queryset.order_by().values(valor=expressao)
+
+
+def _indicadores():
+    """Querysets escalares, um por indicador."""
+    return {
+        "alunos": _agregado(Aluno.objects.all()),
+        "alunos_ativos": _agregado(Aluno.objects.filter(situacao=Aluno.Situacao.ATIVO)),
+        "faculdades": _agregado(Faculdade.objects.all()),
+        "cursos": _agregado(Curso.objects.all()),
+        "encaminhamentos": _agregado(Encaminhamento.objects.all()),
+        # Registros e soma de horas saem do resumo por aluno, sem varrer contrapartida_horas
+        "horas_registros": _agregado(ResumoHoras.objects.all(), "SUM", "quantidade_registros"),
+        "horas_total": _agregado(ResumoHoras.objects.all(), "SUM", "total", DurationField()),
+    }
+
+
+def _selecionar(consultas, using="default"):
+    """
+    Executa vários querysets escalares como subconsultas de um único SELECT.
+
+    Cada valor passa pelos mesmos conversores que o ORM aplicaria (ex.:
+    DurationField no SQLite vem em microssegundos).
+    """
+    conexao = connections[using]
+    partes, parametros = [], []
+    for queryset in consultas.values():
+        sql, params = queryset.query.sql_with_params()
+        partes.append(f"({sql})")
+        parametros.extend(params)
+    with conexao.cursor() as cursor:
+        cursor.execute("SELECT " + ", ".join(partes), parametros)
+        linha = cursor.fetchone()
+
+    resultado = {}
+    for (nome, queryset), valor in zip(consultas.items(), linha):
+        expressao = queryset.query.annotations["valor"]
+        for conversor in expressao.output_field.get_db_converters(conexao):
+            valor = conversor(valor, expressao, conexao)
+        resultado[nome] = valor
+    return resultado
+
+
+def calcular_metricas():
+    """
+    Calcula os indicadores direto no banco (duas consultas).
+
+    Returns:
+        dict: contagens, ``horas_total`` (timedelta) e ``alunos_por_curso``
+        (lista de [nome do curso, quantidade de alunos], por nome)
+    """
+    metricas = _selecionar(_indicadores())
+    metricas["horas_registros"] = metricas["horas_registros"] or 0
+    metricas["horas_total"] = metricas["horas_total"] or timedelta(0)
+    metricas["alunos_por_curso"] = [
+        [curso["nome"], curso["alunos_total"]]
+        for curso in Curso.objects.order_by("nome").values("nome").annotate(alunos_total=Count("alunos"))
+    ]
+    return metricas
+
+
+def _ler_snapshot(versao):
+    caminho = cache._diretorio() / ARQUIVO_METRICAS
+    try:
+        snapshot = json.loads(caminho.read_text())
+    except (FileNotFoundError, ValueError):
+        return None
+    if snapshot.get("versao") != versao or time.time() - snapshot.get("gerado_em", 0) > settings.RELATORIOS_METRICAS_TTL:
+        return None
+    metricas = snapshot["metricas"]
+    metricas["horas_total"] = timedelta(seconds=metricas["horas_total"])
+    return metricas
+
+
+def _gravar_snapshot(versao, metricas):
+    conteudo = {
+        "versao": versao,
+        "gerado_em": time.time(),
+        "metricas": {**metricas, "horas_total": metricas["horas_total"].total_seconds()},
+    }
+    diretorio = cache._diretorio()
+    fd, tmp_path = tempfile.mkstemp(dir=diretorio, suffix=".tmp")
+    with os.fdopen(fd, "w") as tmp:
+        json.dump(conteudo, tmp)
+    os.replace(tmp_path, diretorio / ARQUIVO_METRICAS)
+
+
+def obter_metricas():
+    """Indicadores do snapshot atual; recalcula e regrava se a versão mudou ou o TTL venceu."""
+    versao = cache.versao_dados()
+    metricas = _ler_snapshot(versao)
+    if metricas is None:
+        metricas = calcular_metricas()
+        _gravar_snapshot(versao, metricas)
+    return metricas
@@ -1,23 +1,77 @@
 """Helpers para geração de relatórios em PDF usando reportlab."""
 
 from io import BytesIO
+from itertools import chain, islice
+from xml.sax.saxutils import escape
 
 from reportlab.lib import colors
 from reportlab.lib.pagesizes import A4
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import cm
+from reportlab.pdfbase.pdfmetrics import stringWidth
 from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
 
 
-def gerar_pdf_tabela(titulo, colunas, linhas, orientacao="portrait"):
+# Tabelas com mais linhas que isso usam o modo de tabela grande (ver _blocos_tabela_grande)
+LIMITE_TABELA_SIMPLES = 300
+
+# Linhas usadas para estimar a largura das colunas no modo de tabela grande
+AMOSTRA_LARGURAS = 200
+
+# Alturas fixas do modo de tabela grande (fonte 10/9 + paddings do ESTILO_TABELA)
+ALTURA_CABECALHO = 28
+ALTURA_LINHA = 17
+
+FONTE_CABECALHO = ("Helvetica-Bold", 10)
+FONTE_CORPO = ("Helvetica", 9)
+PADDING_HORIZONTAL = 12  # LEFTPADDING + RIGHTPADDING padrão do reportlab
+PADDING_VERTICAL = 6  # TOPPADDING + BOTTOMPADDING padrão do reportlab
+
+# Texto que não cabe na coluna quebra em até tantas linhas; só o que passar disso é abreviado
+MAX_LINHAS_CELULA = 10
+
+# Células quebradas do modo de tabela grande (mesma fonte do corpo)
+ESTILO_CELULA = ParagraphStyle(name="CelulaTabela", fontName=FONTE_CORPO[0], fontSize=FONTE_CORPO[1], leading=11)
+
+ESTILO_TABELA = [
+    ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#4F46E5")),
+    ("TEXTCOLOR", (0, 0), (-1, 0), colors.whitesmoke),
+    ("ALIGN", (0, 0), (-1, -1), "LEFT"),
+    ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
+    ("FONTSIZE", (0, 0), (-1, 0), 10),
+    ("BOTTOMPADDING", (0, 0), (-1, 0), 8),
+    ("TOPPADDING", (0, 0), (-1, 0), 8),
+    ("BACKGROUND", (0, 1), (-1, -1), colors.white),
+    ("TEXTCOLOR", (0, 1), (-1, -1), colors.black),
+    ("FONTNAME", (0, 1), (-1, -1), "Helvetica"),
+    ("FONTSIZE", (0, 1), (-1, -1), 9),
+    ("GRID", (0, 0), (-1, -1), 0.5, colors.grey),
+    ("ROWBACKGROUNDS", (0, 1), (-1, -1), [colors.white, colors.HexColor("#F3F4F6")]),
+]
+
+
+def gerar_pdf_tabela(titulo, colunas, linhas, orientacao="portrait", larguras=None, modo_grande=None):
     """
     Gera um PDF com uma tabela.
 
+    Tabelas pequenas vão inteiras para o ``Table`` do reportlab, que mede
+    cada célula. Acima de ``LIMITE_TABELA_SIMPLES`` linhas (ou com
+    ``modo_grande=True``) a tabela é emitida em blocos do tamanho de uma
+    página, com larguras calculadas do cabeçalho e de uma amostra das linhas
+    (ou de ``larguras``) e alturas fixas. Um texto que não cabe na coluna
+    quebra em linhas (``Paragraph``), e só a linha da tabela onde isso
+    acontece fica mais alta; textos com mais de ``MAX_LINHAS_CELULA`` linhas
+    são abreviados com "…".
+
     Args:
         titulo: Título do relatório
         colunas: Lista de nomes das colunas
-        linhas: Lista de listas (cada lista é uma linha)
+        linhas: Iterável de listas (cada lista é uma linha); pode ser um gerador
         orientacao: "portrait" ou "landscape"
+        larguras: pesos relativos das colunas no modo de tabela grande
+            (ex.: ``[3, 1, 1]``); sem isso, usa a amostra
+        modo_grande: força (True) ou desliga (False) o modo de tabela grande;
+            None decide pelo número de linhas
 
     Returns:
         bytes: Conteúdo do PDF
@@ -48,33 +102,124 @@ def gerar_pdf_tabela(titulo, colunas, linhas, orientacao="portrait"):
     elements.append(Paragraph(titulo, title_style))
     elements.append(Spacer(1, 0.5 * cm))
 
-    dados = [colunas] + linhas
-    tabela = Table(dados, repeatRows=1)
-    tabela.setStyle(
-        TableStyle(
-            [
-                ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#4F46E5")),
-                ("TEXTCOLOR", (0, 0), (-1, 0), colors.whitesmoke),
-                ("ALIGN", (0, 0), (-1, -1), "LEFT"),
-                ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
-                ("FONTSIZE", (0, 0), (-1, 0), 10),
-                ("BOTTOMPADDING", (0, 0), (-1, 0), 8),
-                ("TOPPADDING", (0, 0), (-1, 0), 8),
-                ("BACKGROUND", (0, 1), (-1, -1), colors.white),
-                ("TEXTCOLOR", (0, 1), (-1, -1), colors.black),
-                ("FONTNAME", (0, 1), (-1, -1), "Helvetica"),
-                ("FONTSIZE", (0, 1), (-1, -1), 9),
-                ("GRID", (0, 0), (-1, -1), 0.5, colors.grey),
-                ("ROWBACKGROUNDS", (0, 1), (-1, -1), [colors.white, colors.HexColor("#F3F4F6")]),
-            ]
-        )
-    )
-    elements.append(tabela)
+    linhas = iter(linhas)
+    inicio = [] if modo_grande else list(islice(linhas, LIMITE_TABELA_SIMPLES + 1))
+    if modo_grande is None:
+        modo_grande = len(inicio) > LIMITE_TABELA_SIMPLES
+
+    if modo_grande:
+        elements.extend(_blocos_tabela_grande(doc, list(elements), colunas, chain(inicio, linhas), larguras))
+    else:
+        dados = [colunas, *inicio, *linhas]
+        tabela = Table(dados, repeatRows=1)
+        tabela.setStyle(TableStyle(ESTILO_TABELA))
+        elements.append(tabela)
 
     doc.build(elements)
     return buffer.getvalue()
 
 
+def _texto(valor):
+    return "" if valor is None else str(valor)
+
+
+def _larguras_amostra(colunas, amostra, largura_util):
+    """Largura de cada coluna pelo maior texto do cabeçalho e da amostra, reduzida se passar da página."""
+    larguras = [stringWidth(_texto(coluna), *FONTE_CABECALHO) for coluna in colunas]
+    for linha in amostra:
+        for indice, valor in enumerate(linha):
+            larguras[indice] = max(larguras[indice], stringWidth(_texto(valor), *FONTE_CORPO))
+    larguras = [largura + PADDING_HORIZONTAL for largura in larguras]
+    total = sum(larguras)
+    if total > largura_util:
+        larguras = [largura * largura_util / total for largura in larguras]
+    return larguras
+
+
+def _abreviar(texto, largura):
+    """Corta ``texto`` com "…" para caber em ``largura`` (pontos) na fonte do corpo."""
+    fonte, tamanho = FONTE_CORPO
+    # Nenhum glifo da Helvetica passa de ~1em: textos curtos nem são medidos
+    if len(texto) * tamanho <= largura or stringWidth(texto, fonte, tamanho) <= largura:
+        return texto
+    baixo, alto = 0, len(texto)
+    while baixo < alto:
+        meio = (baixo + alto + 1) // 2
+        if stringWidth(texto[:meio] + "…", fonte, tamanho) <= largura:
+            baixo = meio
+        else:
+            alto = meio - 1
+    return texto[:baixo] + "…"
+
+
+def _celula(texto, largura):
+    """
+    Conteúdo da célula e a altura da linha que ele pede.
+
+    O texto que cabe em ``largura`` vai como está (altura ``ALTURA_LINHA``);
+    o que não cabe vira um ``Paragraph`` medido aqui, uma única vez.
+    """
+    fonte, tamanho = FONTE_CORPO
+    # Nenhum glifo da Helvetica passa de ~1em: textos curtos nem são medidos
+    if len(texto) * tamanho <= largura or stringWidth(texto, fonte, tamanho) <= largura:
+        return texto, ALTURA_LINHA
+    paragrafo = Paragraph(escape(_abreviar(texto, largura * MAX_LINHAS_CELULA)), ESTILO_CELULA)
+    altura = paragrafo.wrap(largura, float("inf"))[1] + PADDING_VERTICAL
+    return paragrafo, max(altura, ALTURA_LINHA)
+
+
+def _blocos_tabela_grande(doc, elementos_antes, colunas, linhas, larguras=None):
+    """
+    Quebra a tabela em ``Table`` de uma página cada, com o cabeçalho repetido.
+
+    Larguras e alturas são passadas prontas ao reportlab, que assim não mede
+    as células; cada bloco cabe na página e não precisa ser dividido.
+    """
+    largura_util = doc.width - 12  # padding padrão do Frame (6 pt de cada lado)
+    altura_util = doc.height - 12
+
+    if larguras:
+        total = sum(larguras)
+        larguras = [largura_util * peso / total for peso in larguras]
+    else:
+        amostra = list(islice(linhas, AMOSTRA_LARGURAS))
+        larguras = _larguras_amostra(colunas, amostra, largura_util)
+        linhas = chain(amostra, linhas)
+    limites = [largura - PADDING_HORIZONTAL for largura in larguras]
+
+    # Espaço ocupado pelo título na primeira página
+    ocupado = 0
+    for elemento in elementos_antes:
+        ocupado += elemento.wrap(largura_util, altura_util)[1] + elemento.getSpaceBefore() + elemento.getSpaceAfter()
+    por_pagina = altura_util - ALTURA_CABECALHO
+    espaco = altura_util - ocupado - ALTURA_CABECALHO
+
+    bloco, alturas, emitidos = [], [], 0
+    for linha in linhas:
+        celulas = [_celula(_texto(valor), limite) for valor, limite in zip(linha, limites)]
+        altura = max((altura for _conteudo, altura in celulas), default=ALTURA_LINHA)
+        # A linha que não cabe no que sobrou da página abre o próximo bloco
+        if bloco and sum(alturas) + altura > espaco:
+            yield _tabela_bloco(colunas, bloco, larguras, alturas)
+            bloco, alturas, espaco, emitidos = [], [], por_pagina, emitidos + 1
+        bloco.append([conteudo for conteudo, _altura in celulas])
+        alturas.append(altura)
+    if bloco or not emitidos:
+        yield _tabela_bloco(colunas, bloco, larguras, alturas)
+
+
+def _tabela_bloco(colunas, bloco, larguras, alturas):
+    tabela = Table(
+        [colunas, *bloco],
+        colWidths=larguras,
+        rowHeights=[ALTURA_CABECALHO, *alturas],
+        repeatRows=1,
+    )
+    # Nas linhas com texto quebrado, as demais células ficam centralizadas na altura
+    tabela.setStyle(TableStyle([*ESTILO_TABELA, ("VALIGN", (0, 1), (-1, -1), "MIDDLE")]))
+    return tabela
+
+
 def gerar_pdf_documento(titulo, campos):
     """
     Gera um PDF no formato de documento (lista de campo: valor).
@@ -1,56 +1,203 @@
-"""Helpers para geração de relatórios em XLSX usando openpyxl."""
+"""
+Helpers para geração de relatórios em XLSX usando openpyxl.
 
+O openpyxl só monta o ZIP do XLSX no ``save``, depois da última linha. Para
+transmitir a planilha enquanto as linhas são lidas, ``gerar_xlsx_stream`` usa
+o openpyxl (modo write-only) só para montar um modelo com o cabeçalho e os
+estilos; as linhas de dados são serializadas aqui, no mesmo formato, direto
+na entrada da planilha de um ZIP escrito sem ``seek`` — cada bloco comprimido
+sai assim que fica pronto.
+"""
+
+import io
+import re
+import zipfile
+from decimal import Decimal
 from io import BytesIO
+from xml.sax.saxutils import escape
 
 from openpyxl import Workbook
-from openpyxl.styles import Font, Alignment, PatternFill, Border, Side
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
+from openpyxl.styles import Font, Alignment, NamedStyle, PatternFill, Border, Side
 from openpyxl.utils import get_column_letter
 
+# Planilha dentro do ZIP montado pelo openpyxl
+ARQUIVO_PLANILHA = "xl/worksheets/sheet1.xml"
 
-def gerar_xlsx_tabela(titulo, colunas, linhas):
-    """
-    Gera um arquivo XLSX com uma tabela.
+# Linhas serializadas entre uma entrega de bloco e outra
+LINHAS_POR_BLOCO = 500
 
-    Args:
-        titulo: Título do relatório (usado como nome da planilha)
-        colunas: Lista de nomes das colunas
-        linhas: Lista de listas (cada lista é uma linha)
+_ESTILO = re.compile(r' s="(\d+)"')
 
-    Returns:
-        bytes: Conteúdo do XLSX
-    """
-    wb = Workbook()
-    ws = wb.active
-    ws.title = titulo[:31] if len(titulo) > 31 else titulo  # Excel limita a 31 chars
 
-    header_fill = PatternFill(start_color="4F46E5", end_color="4F46E5", fill_type="solid")
-    header_font = Font(bold=True, color="FFFFFF")
+def _estilos_nomeados():
+    """Cria os estilos nomeados compartilhados por todas as células da planilha."""
     thin_border = Border(
         left=Side(style="thin"),
         right=Side(style="thin"),
         top=Side(style="thin"),
         bottom=Side(style="thin"),
     )
+    alinhamento = Alignment(horizontal="left", vertical="center", wrap_text=True)
+
+    cabecalho = NamedStyle(name="relatorio_cabecalho")
+    cabecalho.fill = PatternFill(start_color="4F46E5", end_color="4F46E5", fill_type="solid")
+    cabecalho.font = Font(bold=True, color="FFFFFF")
+    cabecalho.alignment = alinhamento
+    cabecalho.border = thin_border
+
+    dado = NamedStyle(name="relatorio_dado")
+    dado.alignment = alinhamento
+    dado.border = thin_border
+
+    return cabecalho, dado
+
+
+def _modelo(titulo, colunas):
+    """
+    XLSX (bytes) com o cabeçalho e uma linha de marcação no estilo dos dados.
 
-    # Cabeçalho
-    for col_idx, coluna in enumerate(colunas, start=1):
-        cell = ws.cell(row=1, column=col_idx, value=coluna)
-        cell.fill = header_fill
-        cell.font = header_font
-        cell.alignment = Alignment(horizontal="left", vertical="center", wrap_text=True)
-        cell.border = thin_border
-
-    # Dados
-    for row_idx, linha in enumerate(linhas, start=2):
-        for col_idx, valor in enumerate(linha, start=1):
-            cell = ws.cell(row=row_idx, column=col_idx, value=valor)
-            cell.border = thin_border
-            cell.alignment = Alignment(horizontal="left", vertical="center", wrap_text=True)
-
-    # Ajustar largura das colunas
+    A linha de marcação só serve para saber onde as linhas entram no XML da
+    planilha e qual o índice do estilo ``relatorio_dado``.
+    """
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(title=titulo[:31])  # Excel limita a 31 chars
+
+    cabecalho, dado = _estilos_nomeados()
+    wb.add_named_style(cabecalho)
+    wb.add_named_style(dado)
+
+    # Em modo write-only a largura das colunas precisa ser definida antes das linhas
     for col_idx in range(1, len(colunas) + 1):
         ws.column_dimensions[get_column_letter(col_idx)].width = 15
 
+    def _linha(valores, estilo):
+        celulas = []
+        for valor in valores:
+            cell = WriteOnlyCell(ws, value=valor)
+            cell.style = estilo
+            celulas.append(cell)
+        return celulas
+
+    ws.append(_linha(colunas, cabecalho.name))
+    ws.append(_linha([0], dado.name))
+
     buffer = BytesIO()
     wb.save(buffer)
     return buffer.getvalue()
+
+
+def _celula(referencia, valor, estilo):
+    """XML de uma célula de dados, como o openpyxl escreve no modo write-only."""
+    if valor is None:
+        return f'<c r="{referencia}" s="{estilo}" t="n" />'
+    if isinstance(valor, bool):
+        return f'<c r="{referencia}" s="{estilo}" t="b"><v>{int(valor)}</v></c>'
+    if isinstance(valor, (int, float, Decimal)):
+        return f'<c r="{referencia}" s="{estilo}" t="n"><v>{valor}</v></c>'
+    texto = ILLEGAL_CHARACTERS_RE.sub("", str(valor))
+    espaco = ' xml:space="preserve"' if texto != texto.strip() else ""
+    return f'<c r="{referencia}" s="{estilo}" t="inlineStr"><is><t{espaco}>{escape(texto)}</t></is></c>'
+
+
+class _Saida(io.RawIOBase):
+    """Destino sem ``seek`` do ZIP: guarda os bytes escritos até serem retirados."""
+
+    def __init__(self):
+        super().__init__()
+        self._blocos = []
+
+    def writable(self):
+        return True
+
+    def write(self, dados):
+        self._blocos.append(bytes(dados))
+        return len(dados)
+
+    def retirar(self):
+        dados = b"".join(self._blocos)
+        self._blocos.clear()
+        return dados
+
+
+def gerar_xlsx_stream(titulo, colunas, linhas):
+    """
+    Gera o XLSX em blocos de bytes, à medida que as linhas são consumidas.
+
+    Pensado para ``StreamingHttpResponse``: o primeiro bloco sai antes de a
+    consulta terminar e nem as linhas nem o arquivo ficam inteiros em memória.
+
+    Args:
+        titulo: Título do relatório (usado como nome da planilha)
+        colunas: Lista de nomes das colunas
+        linhas: Iterável de listas (cada lista é uma linha)
+
+    Yields:
+        bytes: blocos do conteúdo do XLSX
+    """
+    modelo = zipfile.ZipFile(BytesIO(_modelo(titulo, colunas)))
+    saida = _Saida()
+    with zipfile.ZipFile(saida, "w", zipfile.ZIP_DEFLATED) as destino:
+        for info in modelo.infolist():
+            if info.filename != ARQUIVO_PLANILHA:
+                destino.writestr(info, modelo.read(info))
+                continue
+
+            xml = modelo.read(info).decode()
+            inicio = xml.index('<row r="2"')
+            fim = xml.index("</sheetData>")
+            estilo = _ESTILO.search(xml, inicio, fim).group(1)
+            # As partes fixas já escritas saem antes da primeira linha ser lida
+            yield saida.retirar()
+            entrada = zipfile.ZipInfo(info.filename, date_time=info.date_time)
+            entrada.compress_type = zipfile.ZIP_DEFLATED
+            with destino.open(entrada, "w") as planilha:
+                planilha.write(xml[:inicio].encode())
+                for numero, linha in enumerate(linhas, start=2):
+                    celulas = "".join(
+                        _celula(f"{get_column_letter(coluna)}{numero}", valor, estilo)
+                        for coluna, valor in enumerate(linha, start=1)
+                    )
+                    planilha.write(f'<row r="{numero}">{celulas}</row>'.encode())
+                    if numero % LINHAS_POR_BLOCO == 0:
+                        # O compressor só devolve bytes de tempos em tempos; pode não haver bloco
+                        bloco = saida.retirar()
+                        if bloco:
+                            yield bloco
+                planilha.write(xml[fim:].encode())
+    yield saida.retirar()
+
+
+def escrever_xlsx_tabela(destino, titulo, colunas, linhas):
+    """
+    Escreve a tabela em XLSX (``gerar_xlsx_stream``) no arquivo ``destino``.
+
+    As linhas são consumidas uma a uma (podem vir de um gerador), então o
+    consumo de memória não cresce com o tamanho do relatório.
+
+    Args:
+        destino: objeto arquivo (binário) onde o XLSX será salvo
+        titulo: Título do relatório (usado como nome da planilha)
+        colunas: Lista de nomes das colunas
+        linhas: Iterável de listas (cada lista é uma linha)
+    """
+    for bloco in gerar_xlsx_stream(titulo, colunas, linhas):
+        destino.write(bloco)
+
+
+def gerar_xlsx_tabela(titulo, colunas, linhas):
+    """
+    Gera um arquivo XLSX com uma tabela.
+
+    Args:
+        titulo: Título do relatório (usado como nome da planilha)
+        colunas: Lista de nomes das colunas
+        linhas: Iterável de listas (cada lista é uma linha)
+
+    Returns:
+        bytes: Conteúdo do XLSX
+    """
+    buffer = BytesIO()
+    escrever_xlsx_tabela(buffer, titulo, colunas, linhas)
+    return buffer.getvalue()
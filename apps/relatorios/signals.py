@@ -0,0 +1,28 @@
+"""Signals que trocam a versão dos dados usada pelo cache de relatórios."""
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+
+from apps.academico.models import Aluno, Curso, Faculdade
+from apps.contrapartida.models import Encaminhamento, Horas, Secretaria
+from apps.usuarios.models import User
+
+from .cache import incrementar_versao
+
+# Modelos cujos dados aparecem nos relatórios
+MODELOS_RELATORIOS = (Aluno, Horas, Encaminhamento, Curso, Faculdade, Secretaria, User)
+
+
+def _invalidar_relatorios(sender, update_fields=None, **kwargs):
+    # Login só atualiza last_login, que não aparece em nenhum relatório
+    if update_fields is not None and set(update_fields) <= {"last_login"}:
+        return
+    # Só depois do commit: um relatório gerado antes dele leria os dados antigos
+    # e os guardaria no cache já com a versão nova
+    transaction.on_commit(incrementar_versao)
+
+
+def conectar():
+    for modelo in MODELOS_RELATORIOS:
+        post_save.connect(_invalidar_relatorios, sender=modelo, dispatch_uid=f"relatorios_cache_save_{modelo.__name__}")
+        post_delete.connect(_invalidar_relatorios, sender=modelo, dispatch_uid=f"relatorios_cache_delete_{modelo.__name__}")
@@ -1,3 +1,598 @@
-from django.test import TestCase
+import json
+import os
+import re
+import tempfile
+import types
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from io import BytesIO, StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from openpyxl import load_workbook
+from reportlab.pdfbase.pdfmetrics import stringWidth
+
+from apps.academico.models import Aluno, Curso, Faculdade
+from apps.contrapartida.models import Encaminhamento, Horas, Secretaria
+from core.utils.ambiente_teste import SEM_MANIFEST
+
+from . import benchmark
+from . import cache as cache_relatorios
+from .models import RelatorioJob
+from .reports import relatorio_alunos_dados, relatorio_consolidado_dados, relatorio_horas_por_aluno_dados
+from .services import escrever_xlsx_tabela, gerar_xlsx_stream, gerar_xlsx_tabela
+from .services.encaminhamento_lote import encaminhamentos_lote, iterar_dados
+from .services.metricas import calcular_metricas, obter_metricas
+from .services.pdf import ALTURA_LINHA, FONTE_CORPO, LIMITE_TABELA_SIMPLES, _abreviar, _celula, gerar_pdf_tabela
+from .services.encaminhamento_pdf import (
+    _camada_estatica,
+    _horas_por_ano,
+    _renderizar_sobre_camada,
+    _ValorNaoCabe,
+    dados_encaminhamento,
+    renderizar_pdf_encaminhamento,
+)
+from .management.commands.benchmark_encaminhamento_pdf import DADOS_EXEMPLO
+
+User = get_user_model()
+
+
+class XlsxServiceTestCase(TestCase):
+    """Testes do writer XLSX write-only."""
+
+    def test_escreve_planilha_valida(self):
+        """As linhas de um gerador vão para o arquivo com cabeçalho em negrito."""
+        linhas = ([f"Aluno {i}", i] for i in range(500))
+        with tempfile.TemporaryFile() as destino:
+            escrever_xlsx_tabela(destino, "Planilha de teste", ["Nome", "Número"], linhas)
+            destino.seek(0)
+            ws = load_workbook(destino).active
+        self.assertEqual(ws.title, "Planilha de teste")
+        self.assertEqual([c.value for c in ws[1]], ["Nome", "Número"])
+        self.assertEqual(ws.max_row, 501)
+        self.assertEqual(ws["A501"].value, "Aluno 499")
+        self.assertTrue(ws["A1"].font.bold)
+
+    def test_stream_sai_antes_das_linhas(self):
+        """O primeiro bloco sai antes de a primeira linha ser lida; a planilha mantém os estilos."""
+        lidas = []
+
+        def linhas():
+            for i in range(2000):
+                lidas.append(i)
+                yield [f"<Aluno> {i} ", i, None]
+
+        blocos = gerar_xlsx_stream("Planilha", ["Nome", "Número", "Vazio"], linhas())
+        primeiro = next(blocos)
+        self.assertTrue(primeiro.startswith(b"PK"))
+        self.assertEqual(lidas, [])
+        ws = load_workbook(BytesIO(primeiro + b"".join(blocos))).active
+        self.assertEqual(ws.max_row, 2001)
+        self.assertEqual([c.value for c in ws[2001]], ["<Aluno> 1999 ", 1999, None])
+        self.assertTrue(ws["A1"].font.bold)
+        self.assertEqual(ws["B2"].border.left.style, "thin")
+        self.assertFalse(ws["B2"].font.bold)
+
+    def test_titulo_limitado_a_31_caracteres(self):
+        conteudo = gerar_xlsx_tabela("x" * 40, ["A"], [[1]])
+        ws = load_workbook(BytesIO(conteudo)).active
+        self.assertEqual(ws.title, "x" * 31)
+
+
+class PdfTabelaTestCase(TestCase):
+    """Testes do PDF tabular, inclusive do modo de tabela grande."""
+
+    COLUNAS = ["Aluno", "Quantidade", "Ofício"]
+
+    def _linhas(self, quantidade):
+        return ([f"Aluno {i}", f"{i}:00:00", "OF"] for i in range(quantidade))
+
+    def _paginas(self, pdf):
+        return len(re.findall(rb"/Type /Page\b", pdf))
+
+    def test_abreviar(self):
+        self.assertEqual(_abreviar("curto", 100), "curto")
+        texto = _abreviar("x" * 200, 50)
+        self.assertTrue(texto.endswith("…"))
+        self.assertLessEqual(stringWidth(texto, *FONTE_CORPO), 50)
+
+    def test_texto_longo_quebra_em_vez_de_abreviar(self):
+        self.assertEqual(_celula("Ana", 100), ("Ana", ALTURA_LINHA))
+        nome = "Maria das Graças Albuquerque de Vasconcellos & Filhos"
+        paragrafo, altura = _celula(nome, 100)
+        self.assertEqual(paragrafo.getPlainText(), nome)
+        self.assertGreater(altura, ALTURA_LINHA)
+
+        longos = ([f"Aluno {i} " + "de Souza " * 12, "1:00:00", "OF"] for i in range(LIMITE_TABELA_SIMPLES + 1))
+        pdf = gerar_pdf_tabela("Teste", self.COLUNAS, longos, larguras=[2, 1, 1])
+        curtos = gerar_pdf_tabela("Teste", self.COLUNAS, self._linhas(LIMITE_TABELA_SIMPLES + 1), larguras=[2, 1, 1])
+        # As linhas com nome quebrado ficam mais altas: mais páginas, mesmos dados
+        self.assertGreater(self._paginas(pdf), self._paginas(curtos))
+
+    def test_modo_grande_emite_uma_tabela_por_pagina(self):
+        simples = gerar_pdf_tabela("Teste", self.COLUNAS, self._linhas(LIMITE_TABELA_SIMPLES))
+        grande = gerar_pdf_tabela("Teste", self.COLUNAS, self._linhas(LIMITE_TABELA_SIMPLES + 1))
+        self.assertTrue(grande.startswith(b"%PDF"))
+        # Mesma quantidade de páginas (± a diferença de altura das linhas) com uma linha a mais
+        self.assertLessEqual(abs(self._paginas(grande) - self._paginas(simples)), 1)
+        forcado = gerar_pdf_tabela("Teste", self.COLUNAS, self._linhas(10), larguras=[2, 1, 1], modo_grande=True)
+        self.assertEqual(self._paginas(forcado), 1)
+        vazio = gerar_pdf_tabela("Teste", self.COLUNAS, [], modo_grande=True)
+        self.assertEqual(self._paginas(vazio), 1)
+
+    def test_benchmark(self):
+        saida = StringIO()
+        call_command("benchmark_pdf_tabela", "--linhas", "20", stdout=saida)
+        self.assertIn("20", saida.getvalue())
+
+
+class RelatoriosDadosTestCase(TestCase):
+    """Testes das funções de dados (geradores de linhas)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.responsavel = User.objects.create_user(cpf="99999999999", role=User.Role.ADMINISTRATIVO)
+        curso = Curso.objects.create(nome="Curso de Teste", faculdade=Faculdade.objects.create(nome="FAC"), duracao=8)
+        user = User.objects.create_user(cpf="12345678901", first_name="Maria", last_name="Silva")
+        cls.aluno = Aluno.objects.create(user=user, curso=curso, matricula="M1", data_ingresso=date(2024, 1, 15))
+        sem_curso = User.objects.create_user(cpf="12345678902", first_name="João")
+        Aluno.objects.create(user=sem_curso, matricula="M2")
+        for dia, horas in [(date(2024, 3, 1), 2), (date(2024, 5, 1), 3), (date(2025, 2, 1), 4)]:
+            Horas.objects.create(
+                aluno=cls.aluno,
+                quantidade=timedelta(hours=horas),
+                data_registro=dia,
+                oficio_informacao="OF-1",
+                responsavel_registro=cls.responsavel,
+            )
+
+    def test_alunos_retorna_gerador_formatado(self):
+        colunas, linhas = relatorio_alunos_dados({"q": "Maria"})
+        self.assertIsInstance(linhas, types.GeneratorType)
+        linhas = list(linhas)
+        self.assertEqual(len(linhas), 1)
+        self.assertEqual(linhas[0][:5], ["Maria Silva", "123.456.789-01", "M1", "Curso de Teste", "FAC"])
+        self.assertEqual(linhas[0][6], "Ativo")
+
+    def test_alunos_sem_curso(self):
+        _, linhas = relatorio_alunos_dados({"matricula": "M2"})
+        self.assertEqual(list(linhas), [["João", "123.456.789-02", "M2", "—", "—", "—", "Ativo"]])
+
+    def test_horas_por_aluno_filtra_periodo(self):
+        _, linhas = relatorio_horas_por_aluno_dados()
+        self.assertEqual(list(linhas), [["Maria Silva", "M1", "Curso de Teste", "5:00:00", "4:00:00", "—", "—", "9:00:00"]])
+        _, linhas = relatorio_horas_por_aluno_dados({"data_inicio": "2024-04-01", "data_fim": "2024-12-31"})
+        self.assertEqual(list(linhas), [["Maria Silva", "M1", "Curso de Teste", "3:00:00", "—", "—", "—", "3:00:00"]])
+        _, linhas = relatorio_horas_por_aluno_dados({"data_inicio": "2026-01-01"})
+        self.assertEqual(list(linhas), [])
+
+
+class RelatoriosViewsTestCase(TestCase):
+    """Testes das views de relatórios."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.diretor = User.objects.create_user(
+            cpf="99999999999",
+            password="senha123",
+            first_name="Diretor",
+            last_name="Teste",
+            role=User.Role.DIRETOR,
+        )
+        faculdade = Faculdade.objects.create(nome="Faculdade de Teste")
+        curso = Curso.objects.create(nome="Curso de Teste", faculdade=faculdade, duracao=8)
+        for i in range(1, 4):
+            user = User.objects.create_user(
+                cpf=f"{i:011d}",
+                password="senha123",
+                first_name="Aluno",
+                last_name=f"Teste {i}",
+                role=User.Role.ALUNO,
+            )
+            Aluno.objects.create(user=user, curso=curso, matricula=f"202400{i:04d}")
+
+    def setUp(self):
+        diretorio = tempfile.TemporaryDirectory()
+        self.addCleanup(diretorio.cleanup)
+        override = override_settings(RELATORIOS_CACHE_DIR=diretorio.name)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.client.force_login(self.diretor)
+
+    def test_alunos_xlsx_transmitido(self):
+        response = self.client.get(reverse("relatorios:alunos_xlsx"))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        ws = load_workbook(BytesIO(b"".join(response.streaming_content))).active
+        self.assertEqual(ws.max_row, 4)
+        self.assertEqual(ws["C2"].value, "2024000001")
+
+    def test_pdf_tabular(self):
+        response = self.client.get(reverse("relatorios:encaminhamentos_pdf"))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(b"".join(response.streaming_content).startswith(b"%PDF"))
+        self.assertIn("relatorio_encaminhamentos.pdf", response["Content-Disposition"])
+
+    def test_falta_no_cache_transmite_enquanto_grava(self):
+        conteudo = self.client.get(reverse("relatorios:horas_por_aluno_xlsx")).streaming_content
+        next(conteudo)
+        # Só o temporário (e a versão) enquanto a transmissão não termina
+        self.assertEqual(len(os.listdir(settings.RELATORIOS_CACHE_DIR)), 2)
+        self.assertFalse(any(nome.endswith(".xlsx") for nome in os.listdir(settings.RELATORIOS_CACHE_DIR)))
+        b"".join(conteudo)
+        self.assertTrue(any(nome.endswith(".xlsx") for nome in os.listdir(settings.RELATORIOS_CACHE_DIR)))
+
+    def test_download_repetido_vem_do_cache(self):
+        url = reverse("relatorios:horas_por_aluno_xlsx")
+        primeiro = b"".join(self.client.get(url).streaming_content)
+        with self.assertNumQueries(2):  # sessão + usuário autenticado
+            segundo = b"".join(self.client.get(url).streaming_content)
+        self.assertEqual(primeiro, segundo)
+
+    def test_alteracao_de_dados_invalida_cache(self):
+        url = reverse("relatorios:alunos_xlsx")
+        b"".join(self.client.get(url + "?matricula=2024000001").streaming_content)
+        aluno = Aluno.objects.get(matricula="2024000001")
+        aluno.matricula = "2024009999"
+        with self.captureOnCommitCallbacks(execute=True):
+            aluno.save()
+        conteudo = b"".join(self.client.get(url + "?matricula=2024000001").streaming_content)
+        ws = load_workbook(BytesIO(conteudo)).active
+        self.assertEqual(ws.max_row, 1)
+
+    def test_xlsx_exige_perfil(self):
+        aluno = User.objects.get(cpf="00000000001")
+        self.client.force_login(aluno)
+        response = self.client.get(reverse("relatorios:horas_xlsx"))
+        self.assertEqual(response.status_code, 403)
+
+
+class CacheRelatoriosTestCase(TestCase):
+    """Testes do cache em disco dos arquivos de relatório."""
+
+    def setUp(self):
+        diretorio = tempfile.TemporaryDirectory()
+        self.addCleanup(diretorio.cleanup)
+        override = override_settings(RELATORIOS_CACHE_DIR=diretorio.name)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def test_chave_normaliza_filtros_e_usa_versao(self):
+        chave = cache_relatorios.chave("horas", "pdf", {"data_inicio": "2025-01-01", "data_fim": "2025-12-31"})
+        self.assertEqual(chave, cache_relatorios.chave("horas", "pdf", {"data_fim": "2025-12-31", "data_inicio": "2025-01-01"}))
+        self.assertNotEqual(chave, cache_relatorios.chave("horas", "xlsx", {"data_inicio": "2025-01-01", "data_fim": "2025-12-31"}))
+        cache_relatorios.incrementar_versao()
+        self.assertNotEqual(chave, cache_relatorios.chave("horas", "pdf", {"data_inicio": "2025-01-01", "data_fim": "2025-12-31"}))
+
+    def _existe(self, nome):
+        arquivo = cache_relatorios.obter(nome, "pdf")
+        if arquivo is None:
+            return False
+        arquivo.close()
+        return True
+
+    def test_poda_remove_menos_usado(self):
+        for nome in ["a", "b", "c"]:
+            with cache_relatorios.gravar(nome, "pdf", lambda destino: destino.write(b"x" * 10)) as arquivo:
+                os.utime(arquivo.name, (0, {"a": 100, "b": 300, "c": 200}[nome]))
+        cache_relatorios.podar(limite=25)
+        self.assertFalse(self._existe("a"))
+        self.assertTrue(self._existe("b"))
+        self.assertTrue(self._existe("c"))
+
+    @override_settings(RELATORIOS_CACHE_MAX_BYTES=5)
+    def test_arquivo_maior_que_o_limite_nao_e_podado_ao_gravar(self):
+        with cache_relatorios.gravar("grande", "pdf", lambda destino: destino.write(b"x" * 10)) as arquivo:
+            self.assertEqual(arquivo.read(), b"x" * 10)
+        self.assertTrue(self._existe("grande"))
+        # A gravação seguinte poda o anterior, mas não a si mesma
+        cache_relatorios.gravar("outro", "pdf", lambda destino: destino.write(b"y" * 10)).close()
+        self.assertFalse(self._existe("grande"))
+        self.assertTrue(self._existe("outro"))
+
+    def test_transmissao_interrompida_nao_entra_no_cache(self):
+        blocos = cache_relatorios.gravar_stream("a", "xlsx", iter([b"um", b"dois"]))
+        self.assertEqual(next(blocos), b"um")
+        blocos.close()
+        self.assertIsNone(cache_relatorios.obter("a", "xlsx"))
+        self.assertEqual(os.listdir(settings.RELATORIOS_CACHE_DIR), [])
+        self.assertEqual(b"".join(cache_relatorios.gravar_stream("a", "xlsx", iter([b"um", b"dois"]))), b"umdois")
+        with cache_relatorios.obter("a", "xlsx") as arquivo:
+            self.assertEqual(arquivo.read(), b"umdois")
+
+    def test_arquivo_aberto_sobrevive_a_poda(self):
+        cache_relatorios.gravar("a", "pdf", lambda destino: destino.write(b"conteudo")).close()
+        with cache_relatorios.obter("a", "pdf") as arquivo:
+            # Outro worker poda a entrada entre o obter e o envio da resposta
+            cache_relatorios.podar(limite=0)
+            self.assertFalse(self._existe("a"))
+            self.assertEqual(arquivo.read(), b"conteudo")
+
+    def test_versao_so_muda_depois_do_commit(self):
+        versao = cache_relatorios.versao_dados()
+        with self.captureOnCommitCallbacks() as callbacks:
+            Faculdade.objects.create(nome="NOVA")
+            # Transação ainda aberta: um relatório gerado agora leria os dados antigos
+            self.assertEqual(cache_relatorios.versao_dados(), versao)
+        self.assertEqual(cache_relatorios.versao_dados(), versao)
+        for callback in callbacks:
+            callback()
+        self.assertNotEqual(cache_relatorios.versao_dados(), versao)
+
+
+class MetricasTestCase(TestCase):
+    """Testes dos indicadores do consolidado e do painel do diretor."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.diretor = User.objects.create_user(cpf="99999999999", role=User.Role.DIRETOR)
+        faculdade = Faculdade.objects.create(nome="FAC")
+        cls.curso = Curso.objects.create(nome="Direito", faculdade=faculdade, duracao=10)
+        Curso.objects.create(nome="Administração", faculdade=faculdade, duracao=8)
+        aluno = Aluno.objects.create(user=User.objects.create_user(cpf="00000000001"), curso=cls.curso, matricula="M1")
+        Aluno.objects.create(user=User.objects.create_user(cpf="00000000002"), matricula="M2", situacao=Aluno.Situacao.INATIVO)
+        for horas in (2, 3):
+            Horas.objects.create(
+                aluno=aluno,
+                quantidade=timedelta(hours=horas),
+                data_registro=date(2025, 1, 1),
+                oficio_informacao="OF",
+                responsavel_registro=cls.diretor,
+            )
+
+    def setUp(self):
+        diretorio = tempfile.TemporaryDirectory()
+        self.addCleanup(diretorio.cleanup)
+        override = override_settings(RELATORIOS_CACHE_DIR=diretorio.name, STORAGES=SEM_MANIFEST)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def test_indicadores_em_duas_consultas(self):
+        with self.assertNumQueries(2):
+            metricas = calcular_metricas()
+        self.assertEqual(
+            {campo: metricas[campo] for campo in ["alunos", "alunos_ativos", "faculdades", "cursos", "encaminhamentos", "horas_registros"]},
+            {"alunos": 2, "alunos_ativos": 1, "faculdades": 1, "cursos": 2, "encaminhamentos": 0, "horas_registros": 2},
+        )
+        self.assertEqual(metricas["horas_total"], timedelta(hours=5))
+        self.assertEqual(metricas["alunos_por_curso"], [["Administração", 0], ["Direito", 1]])
+
+    def test_snapshot_reaproveitado_ate_mudar_os_dados(self):
+        obter_metricas()
+        with self.assertNumQueries(0):
+            self.assertEqual(obter_metricas()["horas_total"], timedelta(hours=5))
+            linhas = dict(relatorio_consolidado_dados()[1])
+        self.assertEqual(linhas["Soma total de horas"], "5:00:00")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Faculdade.objects.create(nome="NOVA")
+        self.assertEqual(obter_metricas()["faculdades"], 2)
+
+        with override_settings(RELATORIOS_METRICAS_TTL=-1), self.assertNumQueries(2):
+            obter_metricas()
+
+    def test_painel_do_diretor(self):
+        self.client.force_login(self.diretor)
+        self.client.get(reverse("home"))
+        with self.assertNumQueries(2):  # sessão e usuário; os indicadores vêm do snapshot
+            response = self.client.get(reverse("home"))
+        self.assertEqual(response.context["alunos_count"], 2)
+        self.assertEqual(response.context["cursos_labels"], ["Administração", "Direito"])
+        self.assertEqual(response.context["cursos_values"], [0, 1])
+
+
+@mock.patch.multiple(benchmark, ALUNOS=4, HORAS_POR_ALUNO=3)
+class BenchmarkRelatoriosTestCase(TestCase):
+    """Testes do benchmark de relatórios com dados sintéticos."""
+
+    def setUp(self):
+        diretorio = tempfile.TemporaryDirectory()
+        self.addCleanup(diretorio.cleanup)
+        self.diretorio = diretorio.name
+        override = override_settings(RELATORIOS_CACHE_DIR=diretorio.name)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def test_mede_todos_os_relatorios_e_desfaz_os_dados(self):
+        saida = os.path.join(self.diretorio, "resultado.json")
+        call_command("benchmark_relatorios", "--escalas", "1", "2", "--saida", saida, stdout=StringIO())
+        self.assertFalse(Aluno.objects.exists())
+
+        with open(saida) as arquivo:
+            resultado = json.load(arquivo)
+        self.assertEqual(resultado["escalas"]["2"]["volumes"]["alunos"], 8)
+        medidas = resultado["escalas"]["1"]["medidas"]
+        self.assertLessEqual({"dados:horas", "pdf:horas", "xlsx:horas", "pdf:consolidado"}, set(medidas))
+        self.assertEqual(set(medidas["pdf:horas"]), {"segundos", "consultas", "memoria_pico_kb", "bytes"})
+
+        # Baseline com menos consultas: a execução atual é apontada como regressão
+        for medida in medidas.values():
+            medida["consultas"] = 0
+        with open(saida, "w") as arquivo:
+            json.dump(resultado, arquivo)
+        with self.assertRaises(CommandError):
+            call_command("benchmark_relatorios", "--baseline", saida, stdout=StringIO())
+
+    def test_comparar_ignora_ruido_de_tempo(self):
+        base = {"escalas": {"1": {"medidas": {"x": {"segundos": 0.01, "consultas": 1, "memoria_pico_kb": 100}}}}}
+        atual = {"escalas": {"1": {"medidas": {"x": {"segundos": 0.03, "consultas": 1, "memoria_pico_kb": 110}}}}}
+        self.assertEqual(benchmark.comparar(atual, base), [])
+        atual["escalas"]["1"]["medidas"]["x"]["segundos"] = 0.5
+        self.assertEqual(len(benchmark.comparar(atual, base)), 1)
+
+
+class RelatorioJobTestCase(TestCase):
+    """Testes da fila de jobs de relatório."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.diretor = User.objects.create_user(cpf="99999999999", role=User.Role.DIRETOR)
+        cls.outro = User.objects.create_user(cpf="88888888888", role=User.Role.ADMINISTRATIVO)
+        user = User.objects.create_user(cpf="00000000001", first_name="Aluno", last_name="Um")
+        Aluno.objects.create(user=user, matricula="M1")
+
+    def setUp(self):
+        self.diretorio = tempfile.TemporaryDirectory()
+        self.addCleanup(self.diretorio.cleanup)
+        override = override_settings(RELATORIOS_ARQUIVOS_DIR=self.diretorio.name)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.client.force_login(self.diretor)
+
+    def test_fluxo_enfileirar_processar_baixar(self):
+        response = self.client.post(reverse("relatorios:job_enfileirar", args=["alunos", "xlsx"]) + "?q=Aluno")
+        self.assertEqual(response.status_code, 202)
+        job_id = response.json()["id"]
+        self.assertEqual(RelatorioJob.objects.get(pk=job_id).filtros, {"q": "Aluno"})
+
+        status = self.client.get(reverse("relatorios:job_status", args=[job_id])).json()
+        self.assertEqual(status["status"], RelatorioJob.Status.PENDENTE)
+        self.assertIsNone(status["download_url"])
+
+        call_command("processar_relatorios", "--uma-vez", stdout=StringIO())
+
+        status = self.client.get(reverse("relatorios:job_status", args=[job_id])).json()
+        self.assertEqual(status["status"], RelatorioJob.Status.CONCLUIDO)
+        response = self.client.get(status["download_url"])
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("relatorio_alunos.xlsx", response["Content-Disposition"])
+        ws = load_workbook(BytesIO(b"".join(response.streaming_content))).active
+        self.assertEqual(ws["C2"].value, "M1")
+
+    def test_formato_invalido(self):
+        response = self.client.post(reverse("relatorios:job_enfileirar", args=["consolidado", "xlsx"]))
+        self.assertEqual(response.status_code, 404)
+
+    def test_job_de_outro_usuario(self):
+        job = RelatorioJob.objects.create(relatorio="alunos", formato="pdf", solicitado_por=self.outro)
+        response = self.client.get(reverse("relatorios:job_status", args=[job.pk]))
+        self.assertEqual(response.status_code, 404)
+
+
+class EncaminhamentoPdfTestCase(TestCase):
+    """Testes da renderização do PDF oficial sobre a camada estática."""
+
+    def test_camada_registra_todos_os_campos(self):
+        camada = _camada_estatica()
+        self.assertIs(camada, _camada_estatica())
+        self.assertEqual(len(camada.paginas), 1)
+        campos = camada.paragrafos + camada.textos
+        self.assertTrue(all(campo.posicao for campo in campos))
+        self.assertIn(("horas", 3), [campo.chave for campo in camada.textos])
+
+    def test_renderiza_sobre_camada(self):
+        pdf = renderizar_pdf_encaminhamento(DADOS_EXEMPLO)
+        self.assertTrue(pdf.startswith(b"%PDF"))
+        self.assertIn(b"/Helvetica-Bold", pdf)
+
+    def test_camada_compartilhada_entre_threads(self):
+        camada = _camada_estatica()
+        paginas = camada.paginas
+        posicoes = [campo.posicao for campo in camada.paragrafos + camada.textos]
+        nomes = [f"Aluno {i}" for i in range(16)]
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            pdfs = list(executor.map(lambda nome: renderizar_pdf_encaminhamento({**DADOS_EXEMPLO, "nome_completo": nome}), nomes))
+        self.assertTrue(all(pdf.startswith(b"%PDF") for pdf in pdfs))
+        self.assertEqual(camada.paginas, paginas)
+        self.assertEqual([campo.posicao for campo in camada.paragrafos + camada.textos], posicoes)
+
+    def test_valor_longo_usa_layout_completo(self):
+        """Um nome que quebraria a linha não cabe no modelo; o layout completo é usado."""
+        dados = {**DADOS_EXEMPLO, "nome_completo": "Maria Aparecida " * 4}
+        with self.assertRaises(_ValorNaoCabe):
+            _renderizar_sobre_camada(dados, _camada_estatica())
+        self.assertTrue(renderizar_pdf_encaminhamento(dados).startswith(b"%PDF"))
+
+    def test_benchmark(self):
+        saida = StringIO()
+        call_command("benchmark_encaminhamento_pdf", "--documentos", "2", stdout=saida)
+        self.assertIn("ms/documento", saida.getvalue())
+
+
+class EncaminhamentoLoteTestCase(TestCase):
+    """Testes da geração em lote dos PDFs de encaminhamento."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.diretor = User.objects.create_user(cpf="99999999999", role=User.Role.DIRETOR)
+        faculdade = Faculdade.objects.create(nome="FAC")
+        cls.curso = Curso.objects.create(nome="Curso A", faculdade=faculdade, duracao=8)
+        outro_curso = Curso.objects.create(nome="Curso B", faculdade=faculdade, duracao=8)
+        cls.secretaria = Secretaria.objects.create(nome="Secretaria de Educação", sigla="SEDUC")
+        outra = Secretaria.objects.create(nome="Secretaria de Saúde", sigla="SESAU")
+        for i in range(1, 5):
+            user = User.objects.create_user(cpf=f"{i:011d}", first_name="Aluno", last_name=str(i))
+            aluno = Aluno.objects.create(
+                user=user,
+                curso=cls.curso if i <= 3 else outro_curso,
+                matricula=f"M{i}",
+                data_ingresso=date(2023, 2, 1),
+            )
+            Horas.objects.create(
+                aluno=aluno,
+                quantidade=timedelta(hours=i),
+                data_registro=date(2024, 3, 1),
+                oficio_informacao="OF-1",
+                responsavel_registro=cls.diretor,
+            )
+            Encaminhamento.objects.create(
+                aluno=aluno,
+                secretaria=cls.secretaria if i <= 2 else outra,
+                data=date(2025, 2, i),
+                responsavel_emissao=cls.diretor,
+            )
+
+    def test_dados_em_lote_iguais_aos_individuais(self):
+        """O cálculo em lote produz os mesmos dados do PDF individual, com consultas fixas."""
+        queryset = encaminhamentos_lote()
+        with self.assertNumQueries(2):  # encaminhamentos + horas do bloco
+            dados = list(iterar_dados(queryset))
+        esperados = [dados_encaminhamento(enc, _horas_por_ano(enc.aluno)) for enc in queryset]
+        self.assertEqual(dados, esperados)
+        self.assertEqual(dados[0]["horas"], ["00:00", "1:00", "00:00", "00:00"])
+
+    def test_filtros(self):
+        self.assertEqual(encaminhamentos_lote({"secretaria": self.secretaria.pk}).count(), 2)
+        self.assertEqual(encaminhamentos_lote({"curso": self.curso.pk}).count(), 3)
+        self.assertEqual(encaminhamentos_lote({"data_inicio": "2025-02-03"}).count(), 2)
+        ids = list(Encaminhamento.objects.values_list("pk", flat=True)[:2])
+        self.assertEqual(encaminhamentos_lote({"ids": ids}).count(), 2)
+        primeiro = Encaminhamento.objects.order_by("numero").values_list("numero", flat=True).first()
+        filtro = {"numero_inicio": primeiro + 1, "numero_fim": primeiro + 2}
+        self.assertEqual(encaminhamentos_lote(filtro).count(), 2)
+
+    @override_settings(ENCAMINHAMENTOS_LOTE_WORKERS=1)
+    def test_view_zip(self):
+        self.client.force_login(self.diretor)
+        response = self.client.get(
+            reverse("relatorios:encaminhamentos_lote_zip") + f"?secretaria={self.secretaria.pk}"
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "application/zip")
+        with zipfile.ZipFile(BytesIO(b"".join(response.streaming_content))) as zf:
+            self.assertEqual(sorted(zf.namelist()), ["encaminhamento_1.pdf", "encaminhamento_2.pdf"])
+            self.assertTrue(zf.read("encaminhamento_1.pdf").startswith(b"%PDF"))
+
+    def test_view_sem_resultados(self):
+        self.client.force_login(self.diretor)
+        response = self.client.get(reverse("relatorios:encaminhamentos_lote_zip") + "?data_inicio=2030-01-01")
+        self.assertEqual(response.status_code, 404)
+
+    def test_comando_com_pool_de_processos(self):
+        with tempfile.TemporaryDirectory() as diretorio:
+            saida = os.path.join(diretorio, "lote.zip")
+            call_command("gerar_encaminhamentos_lote", "--saida", saida, "--workers", "2", stdout=StringIO())
+            with zipfile.ZipFile(saida) as zf:
+                self.assertEqual(len(zf.namelist()), 4)
+                self.assertNotIn("ERROS.txt", zf.namelist())
@@ -12,6 +12,7 @@ urlpatterns = [
     path("encaminhamentos/pdf/", views.relatorio_encaminhamentos_pdf, name="encaminhamentos_pdf"),
     path("encaminhamentos/xlsx/", views.relatorio_encaminhamentos_xlsx, name="encaminhamentos_xlsx"),
     path("encaminhamento/<int:pk>/pdf/", views.encaminhamento_pdf, name="encaminhamento_pdf"),
+    path("encaminhamentos/lote/zip/", views.encaminhamentos_lote_zip, name="encaminhamentos_lote_zip"),
     # Horas (detalhado)
     path("horas/pdf/", views.relatorio_horas_pdf, name="horas_pdf"),
     path("horas/xlsx/", views.relatorio_horas_xlsx, name="horas_xlsx"),
@@ -20,4 +21,8 @@ urlpatterns = [
     path("horas-por-aluno/xlsx/", views.relatorio_horas_por_aluno_xlsx, name="horas_por_aluno_xlsx"),
     # Consolidado
     path("consolidado/pdf/", views.relatorio_consolidado_pdf, name="consolidado_pdf"),
+    # Jobs em segundo plano
+    path("jobs/<int:pk>/", views.relatorio_job_status, name="job_status"),
+    path("jobs/<int:pk>/download/", views.relatorio_job_download, name="job_download"),
+    path("jobs/<slug:relatorio>/<str:formato>/", views.relatorio_job_enfileirar, name="job_enfileirar"),
 ]
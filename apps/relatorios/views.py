@@ -4,20 +4,19 @@ from functools import wraps
 
 from django.contrib.auth.decorators import login_required
 from django.core.exceptions import PermissionDenied
-from django.http import HttpResponse
+from django.http import FileResponse, Http404, HttpResponse, JsonResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils.http import content_disposition_header
+from django.views.decorators.http import require_POST
 
 from apps.contrapartida.models import Encaminhamento
 from apps.usuarios.models import User
 
-from .reports import (
-    relatorio_alunos_dados,
-    relatorio_encaminhamentos_dados,
-    relatorio_horas_dados,
-    relatorio_horas_por_aluno_dados,
-    relatorio_consolidado_dados,
-)
-from .services import gerar_pdf_tabela, gerar_pdf_documento, gerar_xlsx_tabela
+from . import cache as cache_relatorios
+from .catalogo import CONTENT_TYPES, PDF, RELATORIOS, XLSX, escrever_relatorio, gerar_relatorio_stream, nome_arquivo
+from .models import RelatorioJob
+from .services.jobs import enfileirar
 
 
 def relatorios_required(view_func):
@@ -47,32 +46,63 @@ def _extrair_filtros(request, campos):
     return filtros or None
 
 
+def _relatorio_response(request, chave, formato):
+    """
+    Devolve o arquivo do relatório ``chave`` no ``formato`` pedido.
+
+    O arquivo é procurado no cache em disco (chave = relatório, formato, filtros
+    normalizados e versão dos dados) e, se existe, é transmitido do disco em
+    blocos. Quando não existe, a resposta é transmitida à medida que o arquivo
+    é gerado (o XLSX sai enquanto as linhas são lidas) e gravada no cache ao
+    mesmo tempo. Requisições perfiladas (``core/perfil.py``) sempre geram o
+    arquivo, e antes de responder, para que o perfil inclua a geração.
+    """
+    filtros = _extrair_filtros(request, RELATORIOS[chave]["filtros"])
+    chave_cache = cache_relatorios.chave(chave, formato, filtros)
+    if getattr(request, "perfilando", False):
+        arquivo = cache_relatorios.gravar(
+            chave_cache,
+            formato,
+            lambda destino: escrever_relatorio(chave, formato, filtros, destino),
+        )
+    else:
+        arquivo = cache_relatorios.obter(chave_cache, formato)
+    if arquivo is None:
+        response = StreamingHttpResponse(
+            cache_relatorios.gravar_stream(chave_cache, formato, gerar_relatorio_stream(chave, formato, filtros)),
+            content_type=CONTENT_TYPES[formato],
+        )
+        response["Content-Disposition"] = content_disposition_header(True, nome_arquivo(chave, formato))
+        return response
+    return FileResponse(
+        arquivo,
+        as_attachment=True,
+        filename=nome_arquivo(chave, formato),
+        content_type=CONTENT_TYPES[formato],
+    )
+
+
+def _pdf_response(request, chave):
+    return _relatorio_response(request, chave, PDF)
+
+
+def _xlsx_response(request, chave):
+    return _relatorio_response(request, chave, XLSX)
+
+
 # --- Alunos ---
 
 
 @login_required
 @relatorios_required
 def relatorio_alunos_pdf(request):
-    filtros = _extrair_filtros(request, ["q", "matricula", "curso", "situacao"])
-    colunas, linhas = relatorio_alunos_dados(filtros)
-    pdf_bytes = gerar_pdf_tabela("Lista de Alunos", colunas, linhas)
-    response = HttpResponse(pdf_bytes, content_type="application/pdf")
-    response["Content-Disposition"] = 'attachment; filename="relatorio_alunos.pdf"'
-    return response
+    return _pdf_response(request, "alunos")
 
 
 @login_required
 @relatorios_required
 def relatorio_alunos_xlsx(request):
-    filtros = _extrair_filtros(request, ["q", "matricula", "curso", "situacao"])
-    colunas, linhas = relatorio_alunos_dados(filtros)
-    xlsx_bytes = gerar_xlsx_tabela("Lista de Alunos", colunas, linhas)
-    response = HttpResponse(
-        xlsx_bytes,
-        content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-    )
-    response["Content-Disposition"] = 'attachment; filename="relatorio_alunos.xlsx"'
-    return response
+    return _xlsx_response(request, "alunos")
 
 
 # --- Encaminhamentos ---
@@ -81,28 +111,13 @@ def relatorio_alunos_xlsx(request):
 @login_required
 @relatorios_required
 def relatorio_encaminhamentos_pdf(request):
-    filtros = _extrair_filtros(request, ["data_inicio", "data_fim"])
-    colunas, linhas = relatorio_encaminhamentos_dados(filtros)
-    pdf_bytes = gerar_pdf_tabela(
-        "Encaminhamentos por Período", colunas, linhas, orientacao="landscape"
-    )
-    response = HttpResponse(pdf_bytes, content_type="application/pdf")
-    response["Content-Disposition"] = 'attachment; filename="relatorio_encaminhamentos.pdf"'
-    return response
+    return _pdf_response(request, "encaminhamentos")
 
 
 @login_required
 @relatorios_required
 def relatorio_encaminhamentos_xlsx(request):
-    filtros = _extrair_filtros(request, ["data_inicio", "data_fim"])
-    colunas, linhas = relatorio_encaminhamentos_dados(filtros)
-    xlsx_bytes = gerar_xlsx_tabela("Encaminhamentos", colunas, linhas)
-    response = HttpResponse(
-        xlsx_bytes,
-        content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-    )
-    response["Content-Disposition"] = 'attachment; filename="relatorio_encaminhamentos.xlsx"'
-    return response
+    return _xlsx_response(request, "encaminhamentos")
 
 
 @login_required
@@ -122,34 +137,48 @@ def encaminhamento_pdf(request, pk):
     return response
 
 
+def _filtros_lote(request):
+    """Filtros do lote de encaminhamentos; ``ids`` aceita ``?ids=1&ids=2`` ou ``?ids=1,2``."""
+    filtros = _extrair_filtros(request, ["data_inicio", "data_fim", "secretaria", "curso", "numero_inicio", "numero_fim"]) or {}
+    ids = [parte for valor in request.GET.getlist("ids") for parte in valor.split(",") if parte.strip()]
+    try:
+        for campo in ["secretaria", "curso", "numero_inicio", "numero_fim"]:
+            if campo in filtros:
+                filtros[campo] = int(filtros[campo])
+        if ids:
+            filtros["ids"] = [int(pk) for pk in ids]
+    except ValueError:
+        raise Http404("Filtro inválido.")
+    return filtros or None
+
+
+@login_required
+@relatorios_required
+def encaminhamentos_lote_zip(request):
+    """ZIP com os PDFs oficiais dos encaminhamentos filtrados, transmitido à medida que ficam prontos."""
+    from .services.encaminhamento_lote import encaminhamentos_lote, gerar_zip_stream
+
+    filtros = _filtros_lote(request)
+    if not encaminhamentos_lote(filtros).exists():
+        raise Http404("Nenhum encaminhamento encontrado.")
+    response = StreamingHttpResponse(gerar_zip_stream(filtros), content_type="application/zip")
+    response["Content-Disposition"] = 'attachment; filename="encaminhamentos.zip"'
+    return response
+
+
 # --- Horas (detalhado) ---
 
 
 @login_required
 @relatorios_required
 def relatorio_horas_pdf(request):
-    filtros = _extrair_filtros(request, ["data_inicio", "data_fim", "aluno_id"])
-    colunas, linhas = relatorio_horas_dados(filtros)
-    pdf_bytes = gerar_pdf_tabela(
-        "Registro de Horas (Detalhado)", colunas, linhas, orientacao="landscape"
-    )
-    response = HttpResponse(pdf_bytes, content_type="application/pdf")
-    response["Content-Disposition"] = 'attachment; filename="relatorio_horas.pdf"'
-    return response
+    return _pdf_response(request, "horas")
 
 
 @login_required
 @relatorios_required
 def relatorio_horas_xlsx(request):
-    filtros = _extrair_filtros(request, ["data_inicio", "data_fim", "aluno_id"])
-    colunas, linhas = relatorio_horas_dados(filtros)
-    xlsx_bytes = gerar_xlsx_tabela("Registro de Horas", colunas, linhas)
-    response = HttpResponse(
-        xlsx_bytes,
-        content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-    )
-    response["Content-Disposition"] = 'attachment; filename="relatorio_horas.xlsx"'
-    return response
+    return _xlsx_response(request, "horas")
 
 
 # --- Horas por aluno ---
@@ -158,26 +187,13 @@ def relatorio_horas_xlsx(request):
 @login_required
 @relatorios_required
 def relatorio_horas_por_aluno_pdf(request):
-    filtros = _extrair_filtros(request, ["data_inicio", "data_fim"])
-    colunas, linhas = relatorio_horas_por_aluno_dados(filtros)
-    pdf_bytes = gerar_pdf_tabela("Horas por Aluno", colunas, linhas)
-    response = HttpResponse(pdf_bytes, content_type="application/pdf")
-    response["Content-Disposition"] = 'attachment; filename="relatorio_horas_por_aluno.pdf"'
-    return response
+    return _pdf_response(request, "horas_por_aluno")
 
 
 @login_required
 @relatorios_required
 def relatorio_horas_por_aluno_xlsx(request):
-    filtros = _extrair_filtros(request, ["data_inicio", "data_fim"])
-    colunas, linhas = relatorio_horas_por_aluno_dados(filtros)
-    xlsx_bytes = gerar_xlsx_tabela("Horas por Aluno", colunas, linhas)
-    response = HttpResponse(
-        xlsx_bytes,
-        content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-    )
-    response["Content-Disposition"] = 'attachment; filename="relatorio_horas_por_aluno.xlsx"'
-    return response
+    return _xlsx_response(request, "horas_por_aluno")
 
 
 # --- Consolidado (apenas PDF) ---
@@ -186,8 +202,66 @@ def relatorio_horas_por_aluno_xlsx(request):
 @login_required
 @relatorios_required
 def relatorio_consolidado_pdf(request):
-    colunas, linhas = relatorio_consolidado_dados()
-    pdf_bytes = gerar_pdf_tabela("Relatório Consolidado", colunas, linhas)
-    response = HttpResponse(pdf_bytes, content_type="application/pdf")
-    response["Content-Disposition"] = 'attachment; filename="relatorio_consolidado.pdf"'
-    return response
+    return _pdf_response(request, "consolidado")
+
+
+# --- Jobs em segundo plano ---
+
+
+def _job_json(job):
+    dados = {
+        "id": job.pk,
+        "relatorio": job.relatorio,
+        "formato": job.formato,
+        "status": job.status,
+        "status_display": job.get_status_display(),
+        "criado_em": job.criado_em.isoformat(),
+        "concluido_em": job.concluido_em.isoformat() if job.concluido_em else None,
+        "status_url": reverse("relatorios:job_status", args=[job.pk]),
+        "download_url": None,
+        "erro": job.erro or None,
+    }
+    if job.status == RelatorioJob.Status.CONCLUIDO:
+        dados["download_url"] = reverse("relatorios:job_download", args=[job.pk])
+    return dados
+
+
+def _get_job(request, pk):
+    """Busca o job garantindo que pertence ao usuário (superuser vê todos)."""
+    jobs = RelatorioJob.objects.all()
+    if not request.user.is_superuser:
+        jobs = jobs.filter(solicitado_por=request.user)
+    return get_object_or_404(jobs, pk=pk)
+
+
+@login_required
+@relatorios_required
+@require_POST
+def relatorio_job_enfileirar(request, relatorio, formato):
+    """Enfileira a geração do relatório; filtros vêm da query string, como nas views síncronas."""
+    if relatorio not in RELATORIOS or formato not in RELATORIOS[relatorio]["formatos"]:
+        raise Http404("Relatório não encontrado.")
+    filtros = _extrair_filtros(request, RELATORIOS[relatorio]["filtros"])
+    job = enfileirar(relatorio, formato, filtros, request.user)
+    return JsonResponse(_job_json(job), status=202)
+
+
+@login_required
+@relatorios_required
+def relatorio_job_status(request, pk):
+    return JsonResponse(_job_json(_get_job(request, pk)))
+
+
+@login_required
+@relatorios_required
+def relatorio_job_download(request, pk):
+    job = _get_job(request, pk)
+    caminho = job.caminho_arquivo
+    if job.status != RelatorioJob.Status.CONCLUIDO or not caminho or not caminho.exists():
+        raise Http404("Arquivo do relatório indisponível.")
+    return FileResponse(
+        open(caminho, "rb"),
+        as_attachment=True,
+        filename=nome_arquivo(job.relatorio, job.formato),
+        content_type=CONTENT_TYPES[job.formato],
+    )
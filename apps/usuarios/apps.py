@@ -3,3 +3,8 @@ from django.apps import AppConfig
 
 class UsuariosConfig(AppConfig):
     name = 'apps.usuarios'
+
+    def ready(self):
+        from . import signals
+
+        signals.conectar()
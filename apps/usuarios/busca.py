@@ -0,0 +1,196 @@
+"""
+Busca de usuários e alunos por nome, CPF, username, e-mail e matrícula.
+
+No SQLite os textos ficam na tabela FTS5 ``usuarios_busca`` (uma linha por
+usuário, ``rowid`` = pk do usuário), criada na migração 0003. O tokenizer
+``unicode61 remove_diacritics 2`` ignora acentos e maiúsculas, e cada termo
+da busca casa como prefixo ("jo conc" encontra "José da Conceição"). Os
+signals de ``signals.py`` mantêm o índice em dia; alterações feitas fora do
+ORM exigem ``manage.py reconstruir_busca``.
+
+Antes do índice, ``chave_exata`` verifica se o texto é um CPF completo
+(com ou sem pontuação) ou uma matrícula; nesse caso a busca vai direto aos
+índices únicos de ``User.cpf`` e ``Aluno.matricula`` e só cai na busca
+aproximada quando não há usuário com aquela chave.
+
+``q_usuarios`` só filtra; as listas e os autocompletes usam também
+``anotar_relevancia`` para mostrar primeiro os usuários que o bm25 do FTS5
+considera mais relevantes.
+
+Em outros bancos (sem FTS5) a busca cai no ``icontains`` de sempre.
+"""
+
+import re
+
+from django.db import connection, transaction
+from django.db.models import Case, IntegerField, Q, Value, When
+from django.db.models.expressions import RawSQL
+
+from apps.academico.models import Aluno
+
+from .models import User
+
+TABELA = "usuarios_busca"
+
+# Usuários ordenados pela relevância; os demais encontrados vêm depois deles
+LIMITE_RELEVANCIA = 100
+
+# Usuários regravados por vez (limita o número de parâmetros do DELETE)
+LOTE = 500
+
+# "123.456.789-01" -> "12345678901": CPF formatado vira um único termo
+_PONTUACAO_ENTRE_DIGITOS = re.compile(r"(?<=\d)[.\-/](?=\d)")
+_TERMO = re.compile(r"\w+")
+_CPF = re.compile(r"\d{3}\.?\d{3}\.?\d{3}-?\d{2}")
+# Matrícula: uma palavra só, com pelo menos um dígito (nomes nunca têm)
+_MATRICULA = re.compile(r"(?=\S*\d)\S+")
+
+
+def disponivel():
+    return connection.vendor == "sqlite"
+
+
+def termos(texto):
+    """Termos da busca, na ordem em que foram digitados."""
+    return _TERMO.findall(_PONTUACAO_ENTRE_DIGITOS.sub("", texto or ""))
+
+
+def expressao_fts(texto):
+    """Expressão MATCH do FTS5: todos os termos, cada um como prefixo. None se não houver termos."""
+    partes = [f'"{termo}"*' for termo in termos(texto)]
+    return " ".join(partes) or None
+
+
+def chave_exata(texto):
+    """
+    Pk do usuário cujo CPF ou matrícula é exatamente ``texto``.
+
+    Só consulta o banco quando o texto tem formato de chave, e cada consulta
+    usa um índice único. None se o texto não é chave ou não há usuário com ela.
+    """
+    texto = (texto or "").strip()
+    if _CPF.fullmatch(texto):
+        cpf = re.sub(r"\D", "", texto)
+        pk = User.objects.filter(cpf=cpf).values_list("pk", flat=True).first()
+        if pk is not None:
+            return pk
+    if _MATRICULA.fullmatch(texto) and len(texto) <= Aluno._meta.get_field("matricula").max_length:
+        return Aluno.objects.filter(matricula=texto).values_list("user_id", flat=True).first()
+    return None
+
+
+def q_usuarios(texto, caminho=""):
+    """
+    ``Q`` que filtra pelos usuários encontrados.
+
+    Args:
+        texto: o que o usuário digitou
+        caminho: caminho até o usuário a partir do modelo filtrado
+            (``""`` para User, ``"user"`` para Aluno)
+    """
+    prefixo = f"{caminho}__" if caminho else ""
+    expressao = expressao_fts(texto)
+    if expressao is None:
+        return Q(**{f"{prefixo}pk__in": []})
+    pk = chave_exata(texto)
+    if pk is not None:
+        return Q(**{f"{prefixo}pk": pk})
+    if not disponivel():
+        return _q_icontains(texto, prefixo)
+    subconsulta = RawSQL(f"SELECT rowid FROM {TABELA} WHERE {TABELA} MATCH %s", [expressao])
+    return Q(**{f"{prefixo}pk__in": subconsulta})
+
+
+def _q_icontains(texto, prefixo):
+    filtro = Q()
+    for termo in termos(texto):
+        filtro &= (
+            Q(**{f"{prefixo}first_name__icontains": termo})
+            | Q(**{f"{prefixo}last_name__icontains": termo})
+            | Q(**{f"{prefixo}cpf__icontains": termo})
+            | Q(**{f"{prefixo}username__icontains": termo})
+            | Q(**{f"{prefixo}email__icontains": termo})
+            | Q(**{f"{prefixo}aluno__matricula__icontains": termo})
+        )
+    return filtro
+
+
+def buscar_ids(texto, limite=20):
+    """Pks dos usuários encontrados, do mais ao menos relevante (bm25 do FTS5)."""
+    expressao = expressao_fts(texto)
+    if expressao is None:
+        return []
+    pk = chave_exata(texto)
+    if pk is not None:
+        return [pk]
+    if not disponivel():
+        usuarios = User.objects.filter(_q_icontains(texto, "")).order_by("first_name", "last_name")
+        return list(usuarios.values_list("pk", flat=True)[:limite])
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT rowid FROM {TABELA} WHERE {TABELA} MATCH %s ORDER BY rank LIMIT %s",
+            [expressao, limite],
+        )
+        return [linha[0] for linha in cursor.fetchall()]
+
+
+def anotar_relevancia(queryset, texto, caminho=""):
+    """
+    Anota ``relevancia``: posição do usuário entre os mais relevantes para ``texto``.
+
+    Os LIMITE_RELEVANCIA primeiros de ``buscar_ids`` recebem 0, 1, 2...; os
+    demais recebem a posição seguinte ao último. Serve de primeiro campo da
+    ordenação (inclusive do cursor), seguido da ordem de sempre.
+
+    Args:
+        caminho: caminho até o usuário a partir do modelo do queryset
+            (``""`` para User, ``"user"`` para Aluno)
+    """
+    campo = f"{caminho}_id" if caminho else "pk"
+    pks = buscar_ids(texto, LIMITE_RELEVANCIA)
+    relevancia = Case(
+        *(When(**{campo: pk}, then=Value(posicao)) for posicao, pk in enumerate(pks)),
+        default=Value(len(pks)),
+        output_field=IntegerField(),
+    )
+    return queryset.annotate(relevancia=relevancia)
+
+
+def _linhas(user_ids=None):
+    usuarios = User.objects.values_list("pk", "first_name", "last_name", "cpf", "username", "email", "aluno__matricula")
+    if user_ids is not None:
+        usuarios = usuarios.filter(pk__in=user_ids)
+    for pk, first_name, last_name, cpf, username, email, matricula in usuarios.iterator():
+        nome = " ".join(parte for parte in (first_name, last_name) if parte)
+        identificacao = " ".join(parte for parte in (cpf, username, email) if parte)
+        yield pk, nome, identificacao, matricula or ""
+
+
+def indexar(user_ids):
+    """Regrava a linha de cada usuário no índice (remove as de usuários que não existem mais)."""
+    if not disponivel():
+        return
+    user_ids = list(user_ids)
+    with transaction.atomic(), connection.cursor() as cursor:
+        for inicio in range(0, len(user_ids), LOTE):
+            lote = user_ids[inicio:inicio + LOTE]
+            cursor.execute(f"DELETE FROM {TABELA} WHERE rowid IN ({', '.join(['%s'] * len(lote))})", lote)
+            cursor.executemany(
+                f"INSERT INTO {TABELA} (rowid, nome, identificacao, matricula) VALUES (%s, %s, %s, %s)",
+                list(_linhas(lote)),
+            )
+
+
+def reconstruir():
+    """Recria o índice inteiro a partir de User e Aluno. Retorna o número de linhas."""
+    if not disponivel():
+        return 0
+    linhas = list(_linhas())
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {TABELA}")
+        cursor.executemany(
+            f"INSERT INTO {TABELA} (rowid, nome, identificacao, matricula) VALUES (%s, %s, %s, %s)",
+            linhas,
+        )
+    return len(linhas)
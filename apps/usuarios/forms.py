@@ -1,6 +1,6 @@
 from django import forms
 from django.contrib.auth import get_user_model
-from django.contrib.auth.forms import AuthenticationForm
+from django.contrib.auth.forms import AuthenticationForm, SetPasswordForm
 
 User = get_user_model()
 
@@ -173,3 +173,12 @@ class LoginForm(AuthenticationForm):
         self.fields['username'].widget.attrs['class'] = TAILWIND_INPUT
         self.fields['password'].widget.attrs['placeholder'] = 'Senha'
         self.fields['password'].widget.attrs['class'] = TAILWIND_INPUT
+
+
+class PrimeiroAcessoForm(SetPasswordForm):
+    """Definição da senha pelo link de primeiro acesso (alunos importados sem senha)."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields["new_password1"].widget.attrs.update({"class": TAILWIND_INPUT, "placeholder": "Nova senha"})
+        self.fields["new_password2"].widget.attrs.update({"class": TAILWIND_INPUT, "placeholder": "Repita a senha"})
@@ -0,0 +1,26 @@
+"""Gera os links de primeiro acesso dos alunos sem senha (apps/usuarios/primeiro_acesso.py)."""
+
+from django.core.management.base import BaseCommand
+
+from apps.usuarios import primeiro_acesso
+from core.utils.planilhas import escrever_erros
+
+
+class Command(BaseCommand):
+    help = "Gera um CSV (cpf;nome;link) com os links de primeiro acesso dos alunos que ainda não têm senha."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--saida", help="Caminho do CSV (padrão: saída padrão).")
+        parser.add_argument("--url-base", default="", help="Prefixo dos links, ex.: https://contrapartida.exemplo.br")
+        parser.add_argument("--cpf", nargs="+", help="Só estes CPFs.")
+
+    def handle(self, *args, **options):
+        usuarios = primeiro_acesso.pendentes()
+        if options["cpf"]:
+            usuarios = usuarios.filter(cpf__in=options["cpf"])
+        linhas = primeiro_acesso.linhas(usuarios.iterator(), options["url_base"].rstrip("/"))
+        if options["saida"]:
+            with open(options["saida"], "w", encoding="utf-8-sig", newline="") as destino:
+                escrever_erros(linhas, destino, primeiro_acesso.CABECALHO)
+        else:
+            escrever_erros(linhas, self.stdout, primeiro_acesso.CABECALHO)
@@ -0,0 +1,16 @@
+"""Recria o índice de busca de usuários e alunos (apps/usuarios/busca.py)."""
+
+from django.core.management.base import BaseCommand
+
+from apps.usuarios import busca
+
+
+class Command(BaseCommand):
+    help = "Recria o índice FTS5 de busca por nome, CPF, e-mail e matrícula."
+
+    def handle(self, *args, **options):
+        if not busca.disponivel():
+            self.stdout.write("Banco sem FTS5: a busca usa icontains e não tem índice.")
+            return
+        total = busca.reconstruir()
+        self.stdout.write(f"{total} usuário(s) indexado(s).")
@@ -0,0 +1,39 @@
+# Generated by Django 6.0.1 on 2026-10-18 09:40
+
+from django.db import migrations
+
+
+def criar_indice(apps, schema_editor):
+    # FTS5 só existe no SQLite; nos outros bancos a busca usa icontains (ver busca.py)
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    schema_editor.execute(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS usuarios_busca USING fts5("
+        "nome, identificacao, matricula, "
+        "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+    )
+    schema_editor.execute(
+        "INSERT INTO usuarios_busca (rowid, nome, identificacao, matricula) "
+        "SELECT u.id, TRIM(COALESCE(u.first_name, '') || ' ' || COALESCE(u.last_name, '')), "
+        "TRIM(u.cpf || ' ' || COALESCE(u.username, '') || ' ' || COALESCE(u.email, '')), "
+        "COALESCE(a.matricula, '') "
+        "FROM usuarios_user u LEFT JOIN academico_aluno a ON a.user_id = u.id"
+    )
+
+
+def remover_indice(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    schema_editor.execute("DROP TABLE IF EXISTS usuarios_busca")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('usuarios', '0002_alter_user_managers'),
+        ('academico', '0003_aluno_celular_aluno_sexo_aluno_telefone'),
+    ]
+
+    operations = [
+        migrations.RunPython(criar_indice, remover_indice),
+    ]
@@ -0,0 +1,42 @@
+"""
+Primeiro acesso de usuários criados sem senha (importação de alunos).
+
+A importação não calcula hash para quem vem sem a coluna ``senha``: o
+usuário nasce com senha inutilizável e recebe um link de primeiro acesso,
+onde define a própria senha — o hash é calculado só nesse momento, um por
+aluno. O link leva o token de redefinição de senha do Django
+(``default_token_generator``), um HMAC do pk, do hash da senha e do último
+login: nada é gravado no banco, e o link deixa de valer assim que a senha é
+definida ou depois de ``PASSWORD_RESET_TIMEOUT``.
+
+Links novos (expirados ou perdidos) saem de ``manage.py links_primeiro_acesso``.
+"""
+
+from django.contrib.auth.hashers import UNUSABLE_PASSWORD_PREFIX
+from django.contrib.auth.tokens import default_token_generator
+from django.urls import reverse
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+
+from .models import User
+
+CABECALHO = ("cpf", "nome", "link")
+
+
+def caminho(user):
+    """Caminho do link de primeiro acesso do ``user``."""
+    return reverse(
+        "primeiro_acesso",
+        kwargs={"uidb64": urlsafe_base64_encode(force_bytes(user.pk)), "token": default_token_generator.make_token(user)},
+    )
+
+
+def linhas(usuarios, url_base=""):
+    """Linhas (cpf, nome, link) para distribuir os links; ``url_base`` é prefixada a cada caminho."""
+    for user in usuarios:
+        yield user.cpf, user.get_full_name(), f"{url_base}{caminho(user)}"
+
+
+def pendentes():
+    """Alunos que ainda não definiram a senha (senha inutilizável)."""
+    return User.objects.filter(role=User.Role.ALUNO, password__startswith=UNUSABLE_PASSWORD_PREFIX).order_by("first_name", "last_name")
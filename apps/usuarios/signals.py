@@ -0,0 +1,34 @@
+"""Signals que mantêm o índice de busca (busca.py) em dia."""
+
+from django.db.models.signals import post_delete, post_save
+
+from apps.academico.models import Aluno
+
+from . import busca
+from .models import User
+
+CAMPOS_USUARIO = {"first_name", "last_name", "cpf", "username", "email"}
+
+
+def _usuario_salvo(sender, instance, update_fields=None, **kwargs):
+    # Login e troca de senha não mudam nada que é buscado
+    if update_fields is not None and not CAMPOS_USUARIO & set(update_fields):
+        return
+    busca.indexar([instance.pk])
+
+
+def _usuario_excluido(sender, instance, **kwargs):
+    busca.indexar([instance.pk])
+
+
+def _aluno_alterado(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and "matricula" not in update_fields:
+        return
+    busca.indexar([instance.user_id])
+
+
+def conectar():
+    post_save.connect(_usuario_salvo, sender=User, dispatch_uid="usuarios_busca_user_save")
+    post_delete.connect(_usuario_excluido, sender=User, dispatch_uid="usuarios_busca_user_delete")
+    post_save.connect(_aluno_alterado, sender=Aluno, dispatch_uid="usuarios_busca_aluno_save")
+    post_delete.connect(_aluno_alterado, sender=Aluno, dispatch_uid="usuarios_busca_aluno_delete")
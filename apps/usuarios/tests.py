@@ -1,3 +1,112 @@
-from django.test import TestCase
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from io import StringIO
 
-# Create your tests here.
+from apps.academico.models import Aluno
+from core.utils.ambiente_teste import SEM_MANIFEST
+
+from . import busca
+from .models import User
+
+
+class BuscaUsuariosTestCase(TestCase):
+    """Testes do índice FTS5 de busca de usuários e alunos."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.jose = User.objects.create_user(
+            cpf="12345678901", first_name="José", last_name="da Conceição", email="jose@exemplo.com"
+        )
+        cls.joana = User.objects.create_user(cpf="98765432100", first_name="Joana", last_name="Conceito")
+        cls.aluno = Aluno.objects.create(user=cls.joana, matricula="2024ABC01")
+        cls.diretor = User.objects.create_user(cpf="55555555555", first_name="Diretor", role=User.Role.DIRETOR)
+
+    def _encontrados(self, texto, caminho=""):
+        return set(User.objects.filter(busca.q_usuarios(texto, caminho)).values_list("pk", flat=True))
+
+    def test_ignora_acentos_e_busca_por_prefixo(self):
+        self.assertEqual(self._encontrados("jose conceicao"), {self.jose.pk})
+        self.assertEqual(self._encontrados("CONC"), {self.jose.pk, self.joana.pk})
+        self.assertEqual(self._encontrados("jo conc"), {self.jose.pk, self.joana.pk})
+        self.assertEqual(self._encontrados("jos conc"), {self.jose.pk})
+        self.assertEqual(self._encontrados("!!!"), set())
+
+    def test_cpf_email_e_matricula(self):
+        self.assertEqual(self._encontrados("123.456.789-01"), {self.jose.pk})
+        self.assertEqual(self._encontrados("jose@exemplo"), {self.jose.pk})
+        self.assertEqual(
+            set(Aluno.objects.filter(busca.q_usuarios("2024abc", "user")).values_list("pk", flat=True)),
+            {self.aluno.pk},
+        )
+
+    def test_chave_exata_usa_cpf_e_matricula(self):
+        self.assertEqual(busca.chave_exata("123.456.789-01"), self.jose.pk)
+        self.assertEqual(busca.chave_exata(" 12345678901 "), self.jose.pk)
+        self.assertEqual(busca.chave_exata("2024ABC01"), self.joana.pk)
+        # Formato de chave sem usuário com ela, ou texto que não é chave
+        self.assertIsNone(busca.chave_exata("000.000.000-00"))
+        self.assertIsNone(busca.chave_exata("2024abc01"))
+        with self.assertNumQueries(0):
+            self.assertIsNone(busca.chave_exata("José"))
+            self.assertIsNone(busca.chave_exata("José 123"))
+
+    def test_chave_exata_dispensa_o_indice(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {busca.TABELA}")
+        self.assertEqual(self._encontrados("123.456.789-01"), {self.jose.pk})
+        self.assertEqual(busca.buscar_ids("2024ABC01"), [self.joana.pk])
+        # Prefixo de CPF não é chave completa: continua na busca aproximada
+        self.assertEqual(self._encontrados("123.456"), set())
+
+    def test_indice_acompanha_alteracoes(self):
+        self.jose.first_name = "Josué"
+        self.jose.save()
+        self.assertEqual(self._encontrados("josue"), {self.jose.pk})
+        self.aluno.matricula = "NOVA01"
+        self.aluno.save(update_fields=["matricula"])
+        self.assertEqual(self._encontrados("nova01"), {self.joana.pk})
+        self.aluno.delete()
+        self.assertEqual(self._encontrados("nova01"), set())
+        self.jose.delete()
+        self.assertEqual(self._encontrados("josue"), set())
+
+    def test_ranking_e_reconstrucao(self):
+        self.assertEqual(busca.buscar_ids("conceicao"), [self.jose.pk])
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {busca.TABELA}")
+        self.assertEqual(busca.buscar_ids("conceicao"), [])
+        call_command("reconstruir_busca", stdout=StringIO())
+        self.assertEqual(busca.buscar_ids("conceicao"), [self.jose.pk])
+
+    @override_settings(STORAGES=SEM_MANIFEST)
+    def test_lista_de_usuarios(self):
+        self.client.force_login(self.diretor)
+        response = self.client.get(reverse("user_admin_list"), {"q": "conceicao"})
+        self.assertEqual([user.pk for user in response.context["users"]], [self.jose.pk])
+
+    def test_resultados_ordenados_pela_relevancia(self):
+        # Em ordem alfabética Ana viria antes; o nome curto de Zé pesa mais no bm25
+        ana = User.objects.create_user(cpf="11111111111", first_name="Ana", last_name="Silvana Maria Pereira Costa")
+        ze = User.objects.create_user(cpf="22222222222", first_name="Zé", last_name="Silva")
+        self.assertEqual(busca.buscar_ids("silva"), [ze.pk, ana.pk])
+        self.client.force_login(self.diretor)
+
+        with override_settings(STORAGES=SEM_MANIFEST):
+            response = self.client.get(reverse("user_admin_list"), {"q": "silva"})
+        self.assertEqual([user.pk for user in response.context["users"]], [ze.pk, ana.pk])
+        Aluno.objects.create(user=ana, matricula="M-ANA")
+        Aluno.objects.create(user=ze, matricula="M-ZE")
+        with override_settings(STORAGES=SEM_MANIFEST):
+            response = self.client.get(reverse("academico:aluno_list"), {"q": "silva"})
+        self.assertEqual([aluno.user_id for aluno in response.context["alunos"]], [ze.pk, ana.pk])
+
+        # O cursor do autocomplete carrega a relevância para a página seguinte
+        url = reverse("user_autocomplete")
+        pagina = self.client.get(url, {"q": "silva", "limite": 1}).json()
+        self.assertEqual([item["id"] for item in pagina["resultados"]], [ze.pk])
+        pagina = self.client.get(url, {"q": "silva", "limite": 1, "apos": pagina["proximo"]}).json()
+        self.assertEqual([item["id"] for item in pagina["resultados"]], [ana.pk])
+        self.assertIsNone(pagina["proximo"])
@@ -6,8 +6,10 @@ urlpatterns = [
     path('', views.login, name='login'),
     path('home/', views.home, name='home'),
     path('logout/', views.logout, name='logout'),
+    path('primeiro-acesso/<uidb64>/<token>/', views.PrimeiroAcessoView.as_view(), name='primeiro_acesso'),
     path('usuarios/', views.user_admin_list, name='user_admin_list'),
     path('usuarios/cadastrar/', views.user_admin_create, name='user_admin_create'),
+    path('usuarios/autocomplete/', views.user_autocomplete, name='user_autocomplete'),
     path('usuarios/<int:pk>/', views.user_admin_detail, name='user_admin_detail'),
     path('usuarios/<int:pk>/editar/', views.user_admin_edit, name='user_admin_edit'),
     path('usuarios/<int:pk>/toggle-ativo/', views.user_admin_toggle_active, name='user_admin_toggle_active'),
@@ -1,14 +1,19 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
 from django.contrib.auth import login as auth_login, logout as auth_logout
+from django.contrib.auth.views import PasswordResetConfirmView
 from django.contrib.auth.decorators import login_required
 from django.core.exceptions import PermissionDenied
-from django.db.models import Count, Q
-from .forms import LoginForm, AdminUserCreateForm, AdminUserUpdateForm
+from . import busca
+from .forms import LoginForm, AdminUserCreateForm, AdminUserUpdateForm, PrimeiroAcessoForm
 from .models import User
+from django.urls import reverse_lazy
 from django.utils.http import url_has_allowed_host_and_scheme
 
-from apps.academico.models import Aluno, Curso, Faculdade
+from apps.academico.models import sem_aluno
+from apps.relatorios.services.metricas import obter_metricas
+from core.utils.autocomplete import resposta_autocomplete
+from core.utils.formatters import format_cpf
 
 def login(request):
     if request.user.is_authenticated:
@@ -26,6 +31,16 @@ def login(request):
     next_url = request.POST.get('next', '') if request.method == 'POST' else request.GET.get('next', '')
     return render(request, 'registration/login.html', {'form': form, 'next': next_url})
 
+class PrimeiroAcessoView(PasswordResetConfirmView):
+    """Aluno importado sem senha define a própria senha pelo link de primeiro acesso."""
+    form_class = PrimeiroAcessoForm
+    template_name = "registration/primeiro_acesso.html"
+    success_url = reverse_lazy("login")
+
+    def form_valid(self, form):
+        messages.success(self.request, "Senha definida. Entre com seu CPF e a nova senha.")
+        return super().form_valid(form)
+
 @login_required
 def home(request):
     role_template = {
@@ -37,16 +52,14 @@ def home(request):
     template = role_template.get(request.user.role, 'dashboard/aluno_home.html')
     context = {}
     if request.user.role == User.Role.DIRETOR:
-        cursos = (
-            Curso.objects.annotate(alunos_total=Count("alunos"))
-            .order_by("nome")
-        )
+        # Snapshot compartilhado com o relatório consolidado (sem consultas enquanto válido)
+        metricas = obter_metricas()
         context = {
-            "alunos_count": Aluno.objects.count(),
-            "cursos_count": Curso.objects.count(),
-            "faculdades_count": Faculdade.objects.count(),
-            "cursos_labels": [curso.nome for curso in cursos],
-            "cursos_values": [curso.alunos_total for curso in cursos],
+            "alunos_count": metricas["alunos"],
+            "cursos_count": metricas["cursos"],
+            "faculdades_count": metricas["faculdades"],
+            "cursos_labels": [nome for nome, _total in metricas["alunos_por_curso"]],
+            "cursos_values": [total for _nome, total in metricas["alunos_por_curso"]],
         }
     return render(request, template, context)
 
@@ -76,12 +89,9 @@ def user_admin_list(request):
 
     users = User.objects.all().order_by("first_name", "last_name", "cpf")
     if query:
-        users = users.filter(
-            Q(cpf__icontains=query)
-            | Q(first_name__icontains=query)
-            | Q(last_name__icontains=query)
-            | Q(email__icontains=query)
-        )
+        # Os mais relevantes primeiro, depois a ordem alfabética
+        users = busca.anotar_relevancia(users.filter(busca.q_usuarios(query)), query)
+        users = users.order_by("relevancia", "first_name", "last_name", "cpf")
     if role:
         users = users.filter(role=role)
 
@@ -145,3 +155,34 @@ def user_admin_toggle_active(request, pk):
     status = "ativado" if user_item.is_active else "desativado"
     messages.success(request, f"Usuário {status} com sucesso.")
     return redirect("user_admin_list")
+
+
+@login_required
+def user_autocomplete(request):
+    """
+    Opções de usuário para os campos de autocomplete.
+
+    Parâmetros: ``q`` (nome, CPF ou e-mail), ``role`` e ``sem_aluno=1`` (só
+    usuários sem cadastro de aluno; ``exceto_aluno`` ignora o aluno em edição).
+    """
+    # Alunos não escolhem usuários em nenhum formulário; a lista traz CPFs
+    if request.user.role == User.Role.ALUNO and not request.user.is_superuser:
+        raise PermissionDenied
+    users = User.objects.only("first_name", "last_name", "username", "cpf")
+    ordenacao = ("first_name", "last_name", "pk")
+    query = request.GET.get("q", "").strip()
+    role = request.GET.get("role", "").strip()
+    if query:
+        users = busca.anotar_relevancia(users.filter(busca.q_usuarios(query)), query)
+        ordenacao = ("relevancia", *ordenacao)
+    if role:
+        users = users.filter(role=role)
+    if request.GET.get("sem_aluno") == "1":
+        exceto_aluno = request.GET.get("exceto_aluno", "")
+        users = users.filter(sem_aluno(int(exceto_aluno) if exceto_aluno.isdigit() else None))
+    return resposta_autocomplete(
+        request,
+        users,
+        ordenacao,
+        lambda user: {"texto": user.get_full_name() or user.username or user.cpf, "detalhe": format_cpf(user.cpf)},
+    )
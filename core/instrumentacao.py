@@ -0,0 +1,182 @@
+"""
+Instrumentação por requisição: consultas SQL, tempo de view e de templates.
+
+``InstrumentacaoMiddleware`` mede cada requisição e publica o resultado em
+uma linha JSON no logger ``core.instrumentacao`` e no cabeçalho
+``Server-Timing`` (visível na aba Network do navegador). O cabeçalho só vai
+para todos com ``INSTRUMENTACAO_SERVER_TIMING`` (padrão: ``DEBUG``); sem
+ele, só diretores e superusers o recebem. Requisições acima de
+``INSTRUMENTACAO_LIMITE_MS`` são registradas como WARNING com a lista
+completa de consultas. O tempo de template depende do backend
+``DjangoTemplatesMedidos`` configurado em ``TEMPLATES``.
+"""
+
+import json
+import logging
+import time
+from collections import Counter
+from contextlib import ExitStack
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+from django.template import TemplateDoesNotExist
+from django.template.backends.django import DjangoTemplates, Template, reraise
+
+from .perfil import pode_perfilar
+
+logger = logging.getLogger(__name__)
+
+# Consultas guardadas por requisição (as demais só entram na contagem e no tempo)
+MAX_CONSULTAS_GUARDADAS = 1000
+
+# Consultas mais lentas listadas em toda linha de log
+CONSULTAS_MAIS_LENTAS = 3
+
+# Tamanho do SQL nas listas resumidas (a lista completa do WARNING não corta)
+TAMANHO_SQL_RESUMO = 200
+
+_medicao_atual = ContextVar("medicao_atual", default=None)
+
+
+class Medicao:
+    """Acumula o que foi medido em uma requisição."""
+
+    def __init__(self):
+        self.inicio = time.perf_counter()
+        self.inicio_view = None
+        self.fim_view = None
+        self.total_consultas = 0
+        self.tempo_sql = 0.0
+        self.tempo_template = 0.0
+        self.consultas = []
+
+    def __call__(self, execute, sql, params, many, context):
+        # Usado como execute_wrapper das conexões
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duracao = time.perf_counter() - inicio
+            self.total_consultas += 1
+            self.tempo_sql += duracao
+            if len(self.consultas) < MAX_CONSULTAS_GUARDADAS:
+                # Só o SQL com placeholders: os parâmetros podem ter dados pessoais
+                self.consultas.append((sql, duracao))
+
+    def resumo(self, request, response):
+        total = time.perf_counter() - self.inicio
+        view = (self.fim_view or time.perf_counter()) - self.inicio_view if self.inicio_view else None
+        repetidas = Counter(sql for sql, _duracao in self.consultas)
+        return {
+            "metodo": request.method,
+            "caminho": request.path,
+            "status": response.status_code,
+            "view": getattr(request.resolver_match, "view_name", None),
+            "total_ms": _ms(total),
+            "view_ms": _ms(view) if view is not None else None,
+            "template_ms": _ms(self.tempo_template),
+            "sql_ms": _ms(self.tempo_sql),
+            "consultas": self.total_consultas,
+            "mais_lentas": [
+                {"sql": _abreviar(sql), "ms": _ms(duracao)}
+                for sql, duracao in sorted(self.consultas, key=lambda item: item[1], reverse=True)[:CONSULTAS_MAIS_LENTAS]
+            ],
+            # O mesmo SQL várias vezes costuma ser N+1 (ex.: acesso a FK dentro de um loop)
+            "repetidas": [{"sql": _abreviar(sql), "vezes": vezes} for sql, vezes in repetidas.most_common() if vezes > 1],
+        }
+
+
+def _ms(segundos):
+    return round(segundos * 1000, 1)
+
+
+def _abreviar(sql):
+    return sql if len(sql) <= TAMANHO_SQL_RESUMO else sql[:TAMANHO_SQL_RESUMO] + "..."
+
+
+def server_timing(resumo):
+    """Valor do cabeçalho Server-Timing a partir do ``resumo`` da medição."""
+    partes = [f'db;dur={resumo["sql_ms"]};desc="{resumo["consultas"]} consultas"']
+    if resumo["template_ms"]:
+        partes.append(f'tpl;dur={resumo["template_ms"]};desc="Templates"')
+    if resumo["view_ms"] is not None:
+        partes.append(f'view;dur={resumo["view_ms"]};desc="View"')
+    partes.append(f'total;dur={resumo["total_ms"]};desc="Total"')
+    return ", ".join(partes)
+
+
+def _pode_ver_tempos(request):
+    """Quem recebe o Server-Timing quando ele não está ligado para todos (mesmo critério do perfil)."""
+    user = getattr(request, "user", None)
+    return user is not None and pode_perfilar(user)
+
+
+class InstrumentacaoMiddleware:
+    """
+    Mede consultas, tempo de view e de templates de cada requisição.
+
+    ``view_ms`` vai do despacho para a view (``process_view``) até a resposta
+    voltar a este middleware, incluindo o render de templates; ``total_ms``
+    inclui também os middlewares seguintes a este.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.INSTRUMENTACAO_ATIVA:
+            return self.get_response(request)
+
+        medicao = Medicao()
+        token = _medicao_atual.set(medicao)
+        try:
+            with ExitStack() as pilha:
+                for conexao in connections.all():
+                    pilha.enter_context(conexao.execute_wrapper(medicao))
+                request._medicao = medicao
+                response = self.get_response(request)
+                medicao.fim_view = time.perf_counter()
+        finally:
+            _medicao_atual.reset(token)
+
+        resumo = medicao.resumo(request, response)
+        if settings.INSTRUMENTACAO_SERVER_TIMING or _pode_ver_tempos(request):
+            response["Server-Timing"] = server_timing(resumo)
+        if resumo["total_ms"] >= settings.INSTRUMENTACAO_LIMITE_MS:
+            resumo["todas_consultas"] = [{"sql": sql, "ms": _ms(duracao)} for sql, duracao in medicao.consultas]
+            logger.warning(json.dumps(resumo, ensure_ascii=False))
+        else:
+            logger.info(json.dumps(resumo, ensure_ascii=False))
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        medicao = getattr(request, "_medicao", None)
+        if medicao is not None:
+            medicao.inicio_view = time.perf_counter()
+        return None
+
+
+class _TemplateMedido(Template):
+    def render(self, context=None, request=None):
+        medicao = _medicao_atual.get()
+        if medicao is None:
+            return super().render(context, request)
+        inicio = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            medicao.tempo_template += time.perf_counter() - inicio
+
+
+class DjangoTemplatesMedidos(DjangoTemplates):
+    """Backend de templates do Django que soma o tempo de render na medição da requisição."""
+
+    def from_string(self, template_code):
+        return _TemplateMedido(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return _TemplateMedido(self.engine.get_template(template_name), self)
+        except TemplateDoesNotExist as exc:
+            reraise(exc, self)
@@ -0,0 +1,171 @@
+"""
+Perfilamento sob demanda (cProfile) de requisições de diretores e superusers.
+
+Com o cabeçalho ``X-Perfil: 1`` ou o parâmetro ``?_perfil=1``,
+``PerfilMiddleware`` roda a view dentro do cProfile e grava em
+``PERFIL_DIR`` o ``.prof`` (para snakeviz/pstats) e um ``.txt`` com as
+``PERFIL_TOP`` funções de maior tempo acumulado. Respostas em streaming
+(XLSX, ZIP) são perfiladas até o último bloco ser enviado.
+
+Cada usuário pode gerar no máximo ``PERFIL_LIMITE_POR_USUARIO`` perfis por
+``PERFIL_JANELA_SEGUNDOS``; acima disso a requisição segue sem perfil. O
+limite é contado pelos arquivos já gravados, então vale para todos os
+processos do servidor.
+"""
+
+import cProfile
+import io
+import logging
+import os
+import pstats
+import re
+import time
+from pathlib import Path
+
+from django.conf import settings
+
+from apps.usuarios.models import User
+
+logger = logging.getLogger(__name__)
+
+CABECALHO = "HTTP_X_PERFIL"
+PARAMETRO = "_perfil"
+
+
+def pode_perfilar(user):
+    return user.is_authenticated and (user.is_superuser or user.role == User.Role.DIRETOR)
+
+
+def _solicitado(request):
+    return request.META.get(CABECALHO) == "1" or request.GET.get(PARAMETRO) == "1"
+
+
+def _diretorio():
+    diretorio = Path(settings.PERFIL_DIR)
+    diretorio.mkdir(parents=True, exist_ok=True)
+    return diretorio
+
+
+def _perfis_recentes(user):
+    """Perfis gravados pelo usuário dentro da janela do limite."""
+    limite = time.time() - settings.PERFIL_JANELA_SEGUNDOS
+    return [
+        entrada
+        for entrada in os.scandir(_diretorio())
+        if entrada.name.endswith(f"_u{user.pk}.prof") and entrada.stat().st_mtime >= limite
+    ]
+
+
+def _podar():
+    """Mantém só os PERFIL_MAX_ARQUIVOS perfis mais recentes (cada um com seu .txt)."""
+    perfis = sorted(
+        (entrada for entrada in os.scandir(_diretorio()) if entrada.name.endswith(".prof")),
+        key=lambda entrada: entrada.stat().st_mtime,
+    )
+    for entrada in perfis[: max(len(perfis) - settings.PERFIL_MAX_ARQUIVOS, 0)]:
+        for caminho in (entrada.path, entrada.path[: -len(".prof")] + ".txt"):
+            try:
+                os.remove(caminho)
+            except FileNotFoundError:
+                pass
+
+
+def gravar_perfil(profiler, request, duracao):
+    """Grava ``<nome>.prof`` e ``<nome>.txt``; retorna o nome base."""
+    view = getattr(request.resolver_match, "view_name", None) or "view"
+    agora = time.time()
+    carimbo = f"{time.strftime('%Y%m%d-%H%M%S', time.localtime(agora))}{int(agora * 1000) % 1000:03d}"
+    nome = f"{carimbo}_{re.sub(r'[^A-Za-z0-9]+', '-', view)}_u{request.user.pk}"
+    diretorio = _diretorio()
+    profiler.dump_stats(diretorio / f"{nome}.prof")
+
+    resumo = io.StringIO()
+    resumo.write(f"{request.method} {request.get_full_path()} — {duracao * 1000:.0f} ms\n\n")
+    pstats.Stats(profiler, stream=resumo).sort_stats("cumulative").print_stats(settings.PERFIL_TOP)
+    (diretorio / f"{nome}.txt").write_text(resumo.getvalue())
+
+    _podar()
+    logger.info("Perfil gravado: %s (%s)", nome, request.get_full_path())
+    return nome
+
+
+class _ConteudoPerfilado:
+    """Itera o conteúdo de uma resposta em streaming com o profiler ligado, gravando no fim."""
+
+    def __init__(self, conteudo, profiler, request, duracao_view):
+        self.conteudo = iter(conteudo)
+        self.profiler = profiler
+        self.request = request
+        self.duracao = duracao_view
+        self.gravado = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        inicio = time.perf_counter()
+        self.profiler.enable()
+        try:
+            return next(self.conteudo)
+        except StopIteration:
+            self._gravar()
+            raise
+        finally:
+            self.profiler.disable()
+            self.duracao += time.perf_counter() - inicio
+
+    def _gravar(self):
+        if not self.gravado:
+            self.gravado = True
+            self.profiler.disable()
+            gravar_perfil(self.profiler, self.request, self.duracao)
+
+    def close(self):
+        # Cliente desconectou antes do fim: grava o que foi medido
+        fechar = getattr(self.conteudo, "close", None)
+        if fechar:
+            fechar()
+        self._gravar()
+
+
+class PerfilMiddleware:
+    """
+    Executa a view sob cProfile quando pedido por diretor/superuser.
+
+    Deve ser o último de ``MIDDLEWARE``: o ``process_view`` chama a própria
+    view, então os ``process_view`` seguintes não rodariam.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if getattr(request, "perfil_limitado", False):
+            response["X-Perfil"] = "limite"
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if not settings.PERFIL_ATIVO or not _solicitado(request) or not pode_perfilar(request.user):
+            return None
+        if len(_perfis_recentes(request.user)) >= settings.PERFIL_LIMITE_POR_USUARIO:
+            logger.warning("Limite de perfis atingido para o usuário %s", request.user.pk)
+            request.perfil_limitado = True
+            return None
+
+        # Evita servir do cache de relatórios: o objetivo é medir a geração
+        request.perfilando = True
+        profiler = cProfile.Profile()
+        inicio = time.perf_counter()
+        response = profiler.runcall(view_func, request, *view_args, **view_kwargs)
+        if hasattr(response, "render") and callable(response.render):
+            # TemplateResponse (class-based views) renderiza depois da view; inclui no perfil
+            response = profiler.runcall(response.render)
+        duracao = time.perf_counter() - inicio
+
+        if response.streaming:
+            response.streaming_content = _ConteudoPerfilado(response.streaming_content, profiler, request, duracao)
+            response["X-Perfil"] = "streaming"
+        else:
+            response["X-Perfil"] = gravar_perfil(profiler, request, duracao)
+        return response
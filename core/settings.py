@@ -31,19 +31,23 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
+    'core.instrumentacao.InstrumentacaoMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    # Precisa ser o último (ver core/perfil.py)
+    'core.perfil.PerfilMiddleware',
 ]
 
 ROOT_URLCONF = 'core.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates que também mede o tempo de render (core/instrumentacao.py)
+        'BACKEND': 'core.instrumentacao.DjangoTemplatesMedidos',
         'DIRS': [ BASE_DIR / 'templates' ],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -63,6 +67,10 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Banco de testes em arquivo: no SQLite em memória compartilhada uma
+        # conexão não espera o lock da outra ("table is locked"), o que impede
+        # testes de concorrência com várias conexões
+        'TEST': {'NAME': BASE_DIR / 'test_db.sqlite3'},
     }
 }
 
@@ -108,7 +116,72 @@ STORAGES = {
     },
 }
 
+# Envios vão direto para um arquivo temporário, em blocos: nenhum arquivo fica
+# inteiro na memória (o ofício é lido de lá em blocos por OficioStorage)
+FILE_UPLOAD_HANDLERS = ["django.core.files.uploadhandler.TemporaryFileUploadHandler"]
+
+# Downloads protegidos (core/utils/downloads.py): '' = o Django envia os bytes;
+# 'x-accel-redirect' (nginx, location interna DOWNLOAD_ACCEL_PREFIXO -> MEDIA_ROOT)
+# ou 'x-sendfile' (Apache/lighttpd) deixam o envio para o servidor web
+DOWNLOAD_OFFLOAD = env.str('DOWNLOAD_OFFLOAD', default='')
+DOWNLOAD_ACCEL_PREFIXO = '/protegido/'
+
+# Processos do manage.py otimizar_oficios (fotos e digitalizações do acervo)
+OFICIOS_OTIMIZAR_WORKERS = env.int('OFICIOS_OTIMIZAR_WORKERS', default=2)
+
 # Autenticação
 LOGIN_REDIRECT_URL = 'home'
 LOGOUT_REDIRECT_URL = 'home'
 LOGIN_URL = 'login'
+# Validade dos links de primeiro acesso dos alunos importados sem senha (apps/usuarios/primeiro_acesso.py)
+PASSWORD_RESET_TIMEOUT = 30 * 24 * 60 * 60
+
+# Relatórios gerados em segundo plano (manage.py processar_relatorios)
+RELATORIOS_ARQUIVOS_DIR = BASE_DIR / 'relatorios_gerados'
+RELATORIOS_JOBS_RETENCAO_DIAS = 7
+
+# Cache em disco dos arquivos de relatório (LRU limitado por tamanho)
+RELATORIOS_CACHE_DIR = BASE_DIR / 'relatorios_cache'
+RELATORIOS_CACHE_MAX_BYTES = 200 * 1024 * 1024
+
+# Validade máxima (s) do snapshot de indicadores do consolidado e do painel do diretor
+RELATORIOS_METRICAS_TTL = 60
+
+# Processos usados para renderizar PDFs de encaminhamento em lote (1 = sem pool)
+ENCAMINHAMENTOS_LOTE_WORKERS = env.int('ENCAMINHAMENTOS_LOTE_WORKERS', default=2)
+
+# Instrumentação por requisição (core/instrumentacao.py)
+INSTRUMENTACAO_ATIVA = env.bool('INSTRUMENTACAO_ATIVA', default=True)
+# Server-Timing para todos; sem ele, só diretores e superusers recebem o cabeçalho
+INSTRUMENTACAO_SERVER_TIMING = env.bool('INSTRUMENTACAO_SERVER_TIMING', default=env.bool('DEBUG', default=False))
+# Requisições mais lentas que isso (ms) são logadas como WARNING com todas as consultas
+INSTRUMENTACAO_LIMITE_MS = env.int('INSTRUMENTACAO_LIMITE_MS', default=1000)
+
+# Perfilamento sob demanda com cProfile (core/perfil.py)
+PERFIL_ATIVO = env.bool('PERFIL_ATIVO', default=True)
+PERFIL_DIR = BASE_DIR / 'perfis'
+PERFIL_LIMITE_POR_USUARIO = 5
+PERFIL_JANELA_SEGUNDOS = 60 * 60
+PERFIL_MAX_ARQUIVOS = 200
+PERFIL_TOP = 40
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'core.perfil': {
+            'handlers': ['console'],
+            'level': 'WARNING' if env.bool('DEBUG', default=False) else 'INFO',
+            'propagate': False,
+        },
+        'core.instrumentacao': {
+            'handlers': ['console'],
+            # Em desenvolvimento só as requisições lentas; o resto está no Server-Timing
+            'level': env('INSTRUMENTACAO_LOG_LEVEL', default='WARNING' if env.bool('DEBUG', default=False) else 'INFO'),
+            'propagate': False,
+        },
+    },
+}
@@ -0,0 +1,234 @@
+import json
+import os
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from apps.academico.models import Aluno
+from core.utils.ambiente_teste import SEM_MANIFEST
+from core.utils.downloads import intervalo
+from core.utils.paginacao import codificar_cursor
+
+User = get_user_model()
+
+
+class IntervaloRangeTestCase(TestCase):
+    """Leitura do cabeçalho Range (core/utils/downloads.py)."""
+
+    def test_intervalos(self):
+        self.assertEqual(intervalo("bytes=0-9", 100), (0, 9))
+        self.assertEqual(intervalo("bytes=90-", 100), (90, 99))
+        self.assertEqual(intervalo("bytes=-10", 100), (90, 99))
+        self.assertEqual(intervalo("bytes=-500", 100), (0, 99))
+        self.assertEqual(intervalo("bytes=50-500", 100), (50, 99))
+        # Inválidos ou com vários trechos: arquivo inteiro
+        for cabecalho in ("bytes=0-1,5-6", "bytes=9-2", "bytes=-", "linhas=0-1", ""):
+            self.assertIsNone(intervalo(cabecalho, 100))
+        for cabecalho in ("bytes=100-", "bytes=-0"):
+            with self.assertRaises(ValueError):
+                intervalo(cabecalho, 100)
+
+
+@override_settings(STORAGES=SEM_MANIFEST)
+class InstrumentacaoMiddlewareTestCase(TestCase):
+    """Testes da instrumentação por requisição (core/instrumentacao.py)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.diretor = User.objects.create_user(cpf="99999999999", role=User.Role.DIRETOR)
+        for numero in range(3):
+            Aluno.objects.create(user=User.objects.create_user(cpf=f"0000000000{numero}"), matricula=f"M{numero}")
+
+    def setUp(self):
+        self.client.force_login(self.diretor)
+
+    def _server_timing(self, response):
+        return {
+            parte.split(";")[0]: parte
+            for parte in (item.strip() for item in response["Server-Timing"].split(","))
+        }
+
+    def test_server_timing(self):
+        response = self.client.get(reverse("academico:aluno_list"))
+        metricas = self._server_timing(response)
+        self.assertEqual(set(metricas), {"db", "tpl", "view", "total"})
+        self.assertRegex(metricas["db"], r'^db;dur=[\d.]+;desc="\d+ consultas"$')
+
+    def test_log_estruturado_e_requisicao_lenta(self):
+        with self.assertLogs("core.instrumentacao", level="INFO") as logs:
+            self.client.get(reverse("academico:aluno_list"))
+        registro = json.loads(logs.records[-1].getMessage())
+        self.assertEqual(registro["view"], "academico:aluno_list")
+        self.assertGreater(registro["consultas"], 0)
+        self.assertNotIn("todas_consultas", registro)
+
+        with override_settings(INSTRUMENTACAO_LIMITE_MS=0), self.assertLogs("core.instrumentacao", level="WARNING") as logs:
+            self.client.get(reverse("academico:aluno_list"))
+        registro = json.loads(logs.records[-1].getMessage())
+        self.assertEqual(len(registro["todas_consultas"]), registro["consultas"])
+
+    @override_settings(INSTRUMENTACAO_SERVER_TIMING=False)
+    def test_server_timing_so_para_diretores(self):
+        self.assertIn("Server-Timing", self.client.get(reverse("academico:aluno_list")))
+        self.client.force_login(User.objects.create_user(cpf="88888888888", role=User.Role.ADMINISTRATIVO))
+        with self.assertLogs("core.instrumentacao", level="INFO"):
+            response = self.client.get(reverse("academico:aluno_list"))
+        self.assertNotIn("Server-Timing", response)
+
+    @override_settings(INSTRUMENTACAO_ATIVA=False)
+    def test_desativada(self):
+        response = self.client.get(reverse("academico:aluno_list"))
+        self.assertNotIn("Server-Timing", response)
+
+
+@override_settings(STORAGES=SEM_MANIFEST)
+class PerfilMiddlewareTestCase(TestCase):
+    """Testes do perfilamento sob demanda (core/perfil.py)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.diretor = User.objects.create_user(cpf="99999999999", role=User.Role.DIRETOR)
+        cls.administrativo = User.objects.create_user(cpf="88888888888", role=User.Role.ADMINISTRATIVO)
+
+    def setUp(self):
+        diretorio = tempfile.TemporaryDirectory()
+        self.addCleanup(diretorio.cleanup)
+        self.diretorio = diretorio.name
+        override = override_settings(
+            PERFIL_DIR=diretorio.name, PERFIL_LIMITE_POR_USUARIO=2, RELATORIOS_CACHE_DIR=diretorio.name
+        )
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def _arquivos(self, extensao):
+        return sorted(nome for nome in os.listdir(self.diretorio) if nome.endswith(extensao))
+
+    def test_grava_perfil_de_class_based_view(self):
+        self.client.force_login(self.diretor)
+        response = self.client.get(reverse("contrapartida:horas_list"), HTTP_X_PERFIL="1")
+        self.assertEqual(response.status_code, 200)
+        nome = response["X-Perfil"]
+        self.assertEqual(self._arquivos(".prof"), [f"{nome}.prof"])
+        with open(os.path.join(self.diretorio, f"{nome}.txt")) as arquivo:
+            resumo = arquivo.read()
+        self.assertIn("cumulative", resumo)
+        # O render do TemplateResponse entra no perfil
+        self.assertIn("render", resumo)
+
+    def test_streaming_grava_ao_final(self):
+        self.client.force_login(self.diretor)
+        response = self.client.get(reverse("relatorios:alunos_xlsx"), {"_perfil": "1"})
+        self.assertEqual(response["X-Perfil"], "streaming")
+        self.assertEqual(self._arquivos(".prof"), [])
+        b"".join(response.streaming_content)
+        self.assertEqual(len(self._arquivos(".prof")), 1)
+
+    def test_sem_permissao_e_limite(self):
+        self.client.force_login(self.administrativo)
+        response = self.client.get(reverse("contrapartida:horas_list"), HTTP_X_PERFIL="1")
+        self.assertNotIn("X-Perfil", response)
+
+        self.client.force_login(self.diretor)
+        for _ in range(2):
+            self.client.get(reverse("contrapartida:horas_list"), HTTP_X_PERFIL="1")
+        with self.assertLogs("core.perfil", level="WARNING"):
+            response = self.client.get(reverse("contrapartida:horas_list"), HTTP_X_PERFIL="1")
+        self.assertEqual(response["X-Perfil"], "limite")
+        self.assertEqual(len(self._arquivos(".prof")), 2)
+
+
+@override_settings(STORAGES=SEM_MANIFEST)
+class PaginacaoCursorTestCase(TestCase):
+    """Testes da paginação por cursor (core/utils/paginacao.py)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.admin = User.objects.create_user(cpf="99999999999", role=User.Role.ADMINISTRATIVO)
+        # Nomes repetidos: o desempate pelo pk precisa manter a ordem estável
+        cls.alunos = [
+            Aluno.objects.create(
+                user=User.objects.create_user(cpf=f"{numero:011d}", first_name="Aluno", last_name=f"Grupo {numero % 3}"),
+                matricula=f"P{numero}",
+            )
+            for numero in range(1, 36)
+        ]
+        cls.esperado = [
+            aluno.pk for aluno in sorted(cls.alunos, key=lambda aluno: (aluno.user.last_name, aluno.pk))
+        ]
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.admin)
+
+    def _pagina(self, **params):
+        response = self.client.get(reverse("academico:aluno_list"), params)
+        self.assertEqual(response.status_code, 200)
+        return response.context["page_obj"], [aluno.pk for aluno in response.context["alunos"]]
+
+    def test_percorre_para_frente_e_para_tras(self):
+        pagina, ids = self._pagina()
+        paginas = [ids]
+        self.assertFalse(pagina.has_previous())
+        while pagina.has_next():
+            pagina, ids = self._pagina(apos=pagina.cursor_proximo)
+            paginas.append(ids)
+        self.assertEqual([len(ids) for ids in paginas], [15, 15, 5])
+        self.assertEqual(sum(paginas, []), self.esperado)
+
+        pagina, ids = self._pagina(antes=pagina.cursor_anterior)
+        self.assertEqual(ids, paginas[1])
+        pagina, ids = self._pagina(antes=pagina.cursor_anterior)
+        self.assertEqual(ids, paginas[0])
+        self.assertFalse(pagina.has_previous())
+        self.assertTrue(pagina.has_next())
+
+    def test_filtros_e_total_em_cache(self):
+        pagina, ids = self._pagina(q="grupo 1")
+        self.assertEqual(pagina.total, 12)
+        self.assertFalse(pagina.has_other_pages())
+        response = self.client.get(reverse("academico:aluno_list"))
+        self.assertEqual(response.context["page_obj"].total, 35)
+        self.assertIn("?apos=", response.content.decode())
+
+        with CaptureQueriesContext(connection) as consultas:
+            self.client.get(reverse("academico:aluno_list"))
+        self.assertFalse(any("COUNT(" in consulta["sql"] for consulta in consultas))
+
+        # Alterar dados troca a versão (no commit) e o total é recontado
+        with self.captureOnCommitCallbacks(execute=True):
+            self.alunos[0].delete()
+        self.assertEqual(self._pagina()[0].total, 34)
+
+    def test_querystring_sem_cursor(self):
+        pagina, _ids = self._pagina(situacao="ATIVO")
+        response = self.client.get(reverse("academico:aluno_list"), {"situacao": "ATIVO", "apos": pagina.cursor_proximo})
+        self.assertEqual(response.context["querystring"], "situacao=ATIVO")
+
+    def test_cursor_invalido(self):
+        response = self.client.get(reverse("academico:aluno_list"), {"apos": "nao-e-cursor"})
+        self.assertEqual(response.status_code, 404)
+
+    def test_cursor_com_tipos_errados(self):
+        """Cursor bem formado, mas com valores que não servem para os campos da ordenação."""
+        casos = [
+            ("academico:aluno_list", [[1], [2], [3]]),
+            ("contrapartida:encaminhamento_list", ["x"]),
+            ("contrapartida:encaminhamento_list", [{"a": 1}]),
+            ("contrapartida:encaminhamento_list", [None]),
+            ("contrapartida:horas_list", ["ontem", 1]),
+            ("contrapartida:secretaria_autocomplete", ["SMS", "x"]),
+        ]
+        for url, valores in casos:
+            with self.subTest(url=url, valores=valores):
+                # O autocomplete só anda para frente
+                for parametro in ("apos",) if url.endswith("autocomplete") else ("apos", "antes"):
+                    response = self.client.get(reverse(url), {parametro: codificar_cursor(valores)})
+                    self.assertEqual(response.status_code, 404)
@@ -0,0 +1,7 @@
+"""Configurações compartilhadas pelos tests.py das apps."""
+
+# Os templates usam {% static %}; nos testes não há manifest do collectstatic
+SEM_MANIFEST = {
+    "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+}
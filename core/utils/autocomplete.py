@@ -0,0 +1,87 @@
+"""
+Autocomplete: endpoint JSON paginado e widget de formulário.
+
+Em vez de renderizar um ``<option>`` por aluno (ou secretaria, ou usuário),
+as páginas mostram só o valor selecionado e o ``static/js/autocomplete.js``
+busca as opções conforme o usuário digita. As respostas usam a mesma
+paginação por cursor das listas (``core/utils/paginacao.py``).
+
+Formato da resposta::
+
+    {"resultados": [{"id": 1, "texto": "Ana Souza", "detalhe": "2024001"}], "proximo": "<cursor>" | null}
+"""
+
+from django import forms
+from django.http import JsonResponse
+
+from .paginacao import PARAMETRO_APOS, codificar_cursor, filtro_cursor, valor_campo, valores_cursor
+
+LIMITE_PADRAO = 20
+LIMITE_MAXIMO = 50
+
+
+def _limite(request):
+    try:
+        limite = int(request.GET.get("limite", LIMITE_PADRAO))
+    except ValueError:
+        limite = LIMITE_PADRAO
+    return max(1, min(limite, LIMITE_MAXIMO))
+
+
+def resposta_autocomplete(request, queryset, ordenacao, item):
+    """
+    Uma página de opções em JSON.
+
+    Args:
+        queryset: já filtrado pelo texto digitado (``q``)
+        ordenacao: campos (ou anotações do queryset) da ordem das opções; o
+            último precisa ser único
+        item: função objeto -> dict com ``texto`` (e opcionalmente ``detalhe``)
+    """
+    limite = _limite(request)
+    cursor = request.GET.get(PARAMETRO_APOS)
+    if cursor:
+        valores = valores_cursor(queryset, ordenacao, cursor)
+        queryset = queryset.filter(filtro_cursor(ordenacao, valores))
+
+    objetos = list(queryset.order_by(*ordenacao)[: limite + 1])
+    proximo = None
+    if len(objetos) > limite:
+        objetos = objetos[:limite]
+        ultimo = objetos[-1]
+        proximo = codificar_cursor([valor_campo(ultimo, campo) for campo in ordenacao])
+    return JsonResponse({"resultados": [{"id": objeto.pk, **item(objeto)} for objeto in objetos], "proximo": proximo})
+
+
+class AutocompleteSelect(forms.Select):
+    """
+    ``Select`` que renderiza só a opção selecionada.
+
+    O campo continua sendo um ``ModelChoiceField`` comum (validação no
+    servidor); as demais opções vêm do endpoint em ``url`` pelo JavaScript.
+    O rótulo da opção selecionada usa ``label_from_instance`` do campo, então
+    o queryset do campo deve trazer o que o rótulo precisa (``select_related``).
+    """
+
+    def __init__(self, url, attrs=None, placeholder="Digite para buscar"):
+        super().__init__(attrs)
+        self.url = url
+        self.placeholder = placeholder
+
+    def build_attrs(self, base_attrs, extra_attrs=None):
+        attrs = super().build_attrs(base_attrs, extra_attrs)
+        attrs["data-autocomplete-url"] = str(self.url)
+        attrs["data-autocomplete-placeholder"] = self.placeholder
+        return attrs
+
+    def optgroups(self, name, value, attrs=None):
+        # Valores que não são pk (POST adulterado) não chegam ao filtro
+        selecionados = {str(valor) for valor in value if str(valor).isdigit()}
+        opcoes = [self.create_option(name, "", self.choices.field.empty_label or "", not selecionados, 0)]
+        if selecionados:
+            campo = self.choices.field
+            for indice, objeto in enumerate(campo.queryset.filter(pk__in=selecionados), start=1):
+                opcoes.append(
+                    self.create_option(name, str(objeto.pk), campo.label_from_instance(objeto), True, indice)
+                )
+        return [(None, opcoes, 0)]
@@ -0,0 +1,158 @@
+"""
+Envio de arquivos protegidos com Range, ETag e pedidos condicionais.
+
+``resposta_arquivo`` é chamado pela view depois de conferir o acesso:
+
+- ``If-None-Match``/``If-Modified-Since`` respondem 304 e
+  ``If-Match``/``If-Unmodified-Since`` 412 (``get_conditional_response``);
+- ``Range: bytes=a-b`` (um intervalo) responde 206 só com o trecho pedido,
+  lido do disco em blocos; com ``If-Range`` o trecho só vale se o arquivo
+  não mudou. Vários intervalos ou um cabeçalho inválido recebem o arquivo
+  inteiro, como permite a RFC 9110;
+- com ``DOWNLOAD_OFFLOAD`` o Django só confere acesso e cabeçalhos e o
+  servidor web envia os bytes: ``x-accel-redirect`` (nginx, pela location
+  interna ``DOWNLOAD_ACCEL_PREFIXO`` apontando para o ``MEDIA_ROOT``) ou
+  ``x-sendfile`` (Apache/lighttpd, pelo caminho absoluto). O servidor web
+  trata o Range nesse modo.
+"""
+
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, parse_http_date_safe
+
+OFFLOAD_ACCEL = "x-accel-redirect"
+OFFLOAD_SENDFILE = "x-sendfile"
+
+_RANGE = re.compile(r"bytes=(\d*)-(\d*)")
+
+
+class _Trecho:
+    """Arquivo limitado a ``tamanho`` bytes a partir da posição atual (corpo de um 206)."""
+
+    def __init__(self, arquivo, tamanho):
+        self.arquivo = arquivo
+        self.restante = tamanho
+
+    def read(self, quantidade=-1):
+        if self.restante <= 0:
+            return b""
+        if quantidade is None or quantidade < 0 or quantidade > self.restante:
+            quantidade = self.restante
+        dados = self.arquivo.read(quantidade)
+        self.restante -= len(dados)
+        return dados
+
+    def close(self):
+        self.arquivo.close()
+
+
+def intervalo(cabecalho, tamanho):
+    """
+    Intervalo (início, fim inclusivo) de um cabeçalho ``Range`` de um só trecho.
+
+    Returns:
+        a tupla; None se o cabeçalho é inválido ou tem vários trechos (responde
+        o arquivo inteiro)
+
+    Raises:
+        ValueError: trecho fora do arquivo (responde 416)
+    """
+    encontrado = _RANGE.fullmatch((cabecalho or "").replace(" ", ""))
+    if not encontrado or encontrado.group(1) == encontrado.group(2) == "":
+        return None
+    inicio, fim = encontrado.groups()
+    if inicio == "":
+        # bytes=-N: os N últimos bytes
+        sufixo = int(fim)
+        if sufixo == 0 or tamanho == 0:
+            raise ValueError(cabecalho)
+        return max(tamanho - sufixo, 0), tamanho - 1
+    inicio = int(inicio)
+    if fim and int(fim) < inicio:
+        return None
+    if inicio >= tamanho:
+        raise ValueError(cabecalho)
+    return inicio, (min(int(fim), tamanho - 1) if fim else tamanho - 1)
+
+
+def _if_range_confere(request, etag, modificado):
+    valor = request.headers.get("If-Range")
+    if not valor:
+        return True
+    if valor.startswith(('"', "W/")):
+        # Só ETag forte vale para If-Range
+        return not etag.startswith("W/") and valor == etag
+    return parse_http_date_safe(valor) == modificado
+
+
+def _cabecalhos(resposta, etag, modificado):
+    resposta["ETag"] = etag
+    resposta["Last-Modified"] = http_date(modificado)
+    resposta["Accept-Ranges"] = "bytes"
+    # Conteúdo de acesso restrito: o navegador guarda, mas confere a cada uso
+    patch_cache_control(resposta, private=True, no_cache=True)
+    return resposta
+
+
+def resposta_arquivo(request, caminho, nome_download, etag=None, interno=None, content_type=None):
+    """
+    Resposta com o arquivo em ``caminho`` (acesso já conferido pela view).
+
+    Args:
+        caminho: caminho absoluto no disco
+        nome_download: nome sugerido ao navegador (``Content-Disposition`` inline)
+        etag: ETag forte já entre aspas (ex.: o SHA-256 do conteúdo); sem ele,
+            usa um ETag fraco de data e tamanho
+        interno: caminho relativo ao ``MEDIA_ROOT``, usado no ``X-Accel-Redirect``
+        content_type: padrão: deduzido de ``nome_download``
+
+    Raises:
+        Http404: arquivo não existe no disco
+    """
+    try:
+        estado = os.stat(caminho)
+    except FileNotFoundError as erro:
+        raise Http404("Arquivo não encontrado.") from erro
+    modificado = int(estado.st_mtime)
+    etag = etag or f'W/"{estado.st_mtime_ns:x}-{estado.st_size:x}"'
+
+    condicional = get_conditional_response(request, etag=etag, last_modified=modificado)
+    if condicional is not None:
+        return _cabecalhos(condicional, etag, modificado)
+
+    offload = getattr(settings, "DOWNLOAD_OFFLOAD", "")
+    if offload:
+        content_type = content_type or mimetypes.guess_type(nome_download)[0] or "application/octet-stream"
+        resposta = HttpResponse(content_type=content_type)
+        if offload == OFFLOAD_ACCEL:
+            resposta["X-Accel-Redirect"] = settings.DOWNLOAD_ACCEL_PREFIXO + quote(interno)
+        else:
+            resposta["X-Sendfile"] = caminho
+        resposta["Content-Disposition"] = f"inline; filename*=UTF-8''{quote(nome_download)}"
+        return _cabecalhos(resposta, etag, modificado)
+
+    trecho = None
+    if request.method == "GET" and "Range" in request.headers and _if_range_confere(request, etag, modificado):
+        try:
+            trecho = intervalo(request.headers["Range"], estado.st_size)
+        except ValueError:
+            resposta = HttpResponse(status=416)
+            resposta["Content-Range"] = f"bytes */{estado.st_size}"
+            return _cabecalhos(resposta, etag, modificado)
+
+    arquivo = open(caminho, "rb")
+    if trecho is None:
+        resposta = FileResponse(arquivo, filename=nome_download, content_type=content_type)
+    else:
+        inicio, fim = trecho
+        arquivo.seek(inicio)
+        resposta = FileResponse(_Trecho(arquivo, fim - inicio + 1), filename=nome_download, content_type=content_type, status=206)
+        resposta["Content-Length"] = str(fim - inicio + 1)
+        resposta["Content-Range"] = f"bytes {inicio}-{fim}/{estado.st_size}"
+    return _cabecalhos(resposta, etag, modificado)
@@ -21,6 +21,10 @@ def format_phone(value: str) -> str:
         return f"({digits[:2]}) {digits[2:6]}-{digits[6:]}"
     return value
 
+def format_nome(first_name: str, last_name: str) -> str:
+    return f"{first_name or ''} {last_name or ''}".strip()
+
+
 def format_duracao_horas(valor: timedelta) -> str:
     if not valor:
         return "—"
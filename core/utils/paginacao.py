@@ -0,0 +1,192 @@
+"""
+Paginação por cursor (keyset) para as ListViews.
+
+Em vez de ``OFFSET``, cada página pede as linhas depois (``?apos=``) ou antes
+(``?antes=``) da última/primeira linha da página atual, usando as colunas de
+``ordenacao_cursor``. Uma página funda custa o mesmo que a primeira e não
+precisa de ``COUNT(*)``.
+
+O total de registros é opcional (``contar_total``) e fica no cache do Django
+enquanto a versão dos dados dos relatórios não mudar — a versão é trocada a
+cada save/delete dos modelos listados (``apps/relatorios/signals.py``).
+"""
+
+import base64
+import binascii
+import hashlib
+import json
+from urllib.parse import urlencode
+
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.http import Http404
+
+from apps.relatorios.cache import versao_dados
+
+PARAMETRO_APOS = "apos"
+PARAMETRO_ANTES = "antes"
+
+# Parâmetros que não entram no querystring repassado aos links de paginação
+PARAMETROS_PAGINACAO = ("page", PARAMETRO_APOS, PARAMETRO_ANTES)
+
+TOTAL_TIMEOUT = 10 * 60
+
+
+def codificar_cursor(valores):
+    conteudo = json.dumps(valores, default=str, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(conteudo).decode().rstrip("=")
+
+
+def decodificar_cursor(cursor):
+    try:
+        valores = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+    return valores if isinstance(valores, list) else None
+
+
+def _campo(queryset, campo):
+    """Field de ``campo`` (caminho com ``__`` ou anotação do ``queryset``, sinal de ordem ignorado)."""
+    anotacao = queryset.query.annotations.get(campo.lstrip("-"))
+    if anotacao is not None:
+        return anotacao.output_field
+    modelo = queryset.model
+    *relacoes, nome = campo.lstrip("-").split("__")
+    for relacao in relacoes:
+        modelo = modelo._meta.get_field(relacao).related_model
+    return modelo._meta.pk if nome == "pk" else modelo._meta.get_field(nome)
+
+
+def valores_cursor(queryset, ordenacao, cursor):
+    """
+    Valores do ``cursor`` convertidos pelos campos da ``ordenacao`` (``to_python``).
+
+    Raises:
+        Http404: cursor que não decodifica, com outra quantidade de valores ou
+            com valores que não servem para os campos (ex.: texto num número)
+    """
+    valores = decodificar_cursor(cursor)
+    if valores is None or len(valores) != len(ordenacao):
+        raise Http404("Página inválida.")
+    try:
+        valores = [_campo(queryset, campo).to_python(valor) for campo, valor in zip(ordenacao, valores)]
+    except (TypeError, ValueError, ValidationError) as erro:
+        raise Http404("Página inválida.") from erro
+    # As colunas da ordenação não são nulas; None não serve de limite
+    if any(valor is None for valor in valores):
+        raise Http404("Página inválida.")
+    return valores
+
+
+def valor_campo(objeto, campo):
+    """Valor de ``campo`` (caminho com ``__``, sinal de ordem ignorado) em ``objeto``."""
+    for parte in campo.lstrip("-").split("__"):
+        objeto = getattr(objeto, parte)
+    return objeto
+
+
+def filtro_cursor(ordenacao, valores, para_tras=False):
+    """
+    ``Q`` com as linhas depois de ``valores`` na ``ordenacao`` (antes, se ``para_tras``).
+
+    Para ``("nome", "pk")``: ``nome > v1 OR (nome = v1 AND pk > v2)``.
+    As colunas da ordenação não podem ser nulas.
+    """
+    filtro = Q()
+    iguais = {}
+    for campo, valor in zip(ordenacao, valores):
+        nome = campo.lstrip("-")
+        decrescente = campo.startswith("-")
+        lookup = "lt" if decrescente != para_tras else "gt"
+        filtro |= Q(**iguais, **{f"{nome}__{lookup}": valor})
+        iguais[nome] = valor
+    return filtro
+
+
+def _inverter(campo):
+    return campo[1:] if campo.startswith("-") else f"-{campo}"
+
+
+class PaginaCursor:
+    """Página de uma paginação por cursor (usada no lugar do ``page_obj`` do Django)."""
+
+    modo_cursor = True
+
+    def __init__(self, object_list, cursor_anterior=None, cursor_proximo=None, total=None):
+        self.object_list = object_list
+        self.cursor_anterior = cursor_anterior
+        self.cursor_proximo = cursor_proximo
+        self.total = total
+
+    def has_previous(self):
+        return self.cursor_anterior is not None
+
+    def has_next(self):
+        return self.cursor_proximo is not None
+
+    def has_other_pages(self):
+        return self.has_previous() or self.has_next()
+
+
+class PaginacaoCursorMixin:
+    """
+    Substitui a paginação por número de página das ListViews.
+
+    A view define ``paginate_by`` e ``ordenacao_cursor`` (ou
+    ``get_ordenacao_cursor``, quando a ordem depende da requisição); o último
+    campo da ordenação precisa ser único (normalmente ``pk``) para que o
+    cursor aponte para uma única linha. Anotações do queryset também servem
+    de campo. O contexto ganha ``querystring`` sem os parâmetros de paginação.
+    """
+
+    ordenacao_cursor = ("pk",)
+    contar_total = True
+
+    def get_ordenacao_cursor(self):
+        return self.ordenacao_cursor
+
+    def paginate_queryset(self, queryset, page_size):
+        ordenacao = list(self.get_ordenacao_cursor())
+        apos = self.request.GET.get(PARAMETRO_APOS)
+        antes = self.request.GET.get(PARAMETRO_ANTES)
+        cursor = apos or antes
+        para_tras = bool(antes) and not apos
+
+        total = self._total(queryset) if self.contar_total else None
+        if cursor:
+            valores = valores_cursor(queryset, ordenacao, cursor)
+            queryset = queryset.filter(filtro_cursor(ordenacao, valores, para_tras))
+        if para_tras:
+            ordenacao = [_inverter(campo) for campo in ordenacao]
+
+        # Uma linha a mais só para saber se existe outra página nessa direção
+        linhas = list(queryset.order_by(*ordenacao)[: page_size + 1])
+        ha_mais = len(linhas) > page_size
+        linhas = linhas[:page_size]
+        if para_tras:
+            linhas.reverse()
+
+        # Quem chegou por um cursor sempre tem página do lado de onde veio
+        tem_anterior = ha_mais if para_tras else bool(cursor)
+        tem_proxima = bool(cursor) if para_tras else ha_mais
+        cursor_anterior = self._cursor(linhas[0]) if linhas and tem_anterior else None
+        cursor_proximo = self._cursor(linhas[-1]) if linhas and tem_proxima else None
+        pagina = PaginaCursor(linhas, cursor_anterior, cursor_proximo, total)
+        return None, pagina, linhas, pagina.has_other_pages()
+
+    def _cursor(self, objeto):
+        return codificar_cursor([valor_campo(objeto, campo) for campo in self.get_ordenacao_cursor()])
+
+    def _total(self, queryset):
+        sql, params = queryset.order_by().query.sql_with_params()
+        assinatura = hashlib.sha256(f"{sql}|{params!r}".encode()).hexdigest()
+        return cache.get_or_set(f"paginacao_total:{versao_dados()}:{assinatura}", queryset.count, TOTAL_TIMEOUT)
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        query_params = self.request.GET.copy()
+        for parametro in PARAMETROS_PAGINACAO:
+            query_params.pop(parametro, None)
+        context["querystring"] = urlencode(query_params)
+        return context
@@ -0,0 +1,215 @@
+"""
+Leitura de planilhas enviadas para importação e relatório das linhas recusadas.
+
+``ler_linhas`` lê CSV (``csv.reader``) ou XLSX (openpyxl em ``read_only``)
+linha a linha, sem carregar o arquivo inteiro, e entrega cada linha como
+``{campo: valor}`` segundo um mapa de cabeçalhos. Usado pelas importações de
+alunos (``apps/academico/importacao.py``) e de horas
+(``apps/contrapartida/importacao.py``).
+
+As linhas recusadas viram um CSV em ``RELATORIOS_ARQUIVOS_DIR/importacoes``
+que só a sessão que fez a importação consegue baixar (``salvar_erros`` e
+``resposta_erros``).
+"""
+
+import codecs
+import csv
+import io
+import re
+import time
+import unicodedata
+import uuid
+from datetime import date, datetime
+from pathlib import Path
+
+from django.conf import settings
+from django.http import FileResponse, Http404
+
+from apps.usuarios.models import User
+
+EXTENSOES = (".csv", ".xlsx")
+
+FORMATOS_DATA = ("%d/%m/%Y", "%Y-%m-%d")
+
+SESSAO_ERROS = "importacoes_erros"
+# Relatórios de erro lembrados por sessão
+ERROS_POR_SESSAO = 10
+# Linhas recusadas mostradas na tela de resultado (o CSV traz todas)
+ERROS_NA_TELA = 20
+
+
+class ArquivoInvalido(ValueError):
+    """O arquivo inteiro não pode ser importado (formato, cabeçalho)."""
+
+
+def normalizar(texto):
+    """Minúsculas, sem acentos e com ``_`` no lugar de espaços e pontuação."""
+    texto = unicodedata.normalize("NFKD", str(texto or "")).encode("ascii", "ignore").decode()
+    return re.sub(r"\W+", "_", texto.strip().lower()).strip("_")
+
+
+def texto_celula(valor):
+    """Valor da célula como texto (``3.0`` do XLSX vira ``"3"``)."""
+    if valor is None:
+        return ""
+    if isinstance(valor, float) and valor.is_integer():
+        valor = int(valor)
+    return str(valor).strip()
+
+
+def data_celula(valor):
+    """Data da célula: ``date``/``datetime`` do XLSX ou texto dd/mm/aaaa ou aaaa-mm-dd. ValueError se inválida."""
+    if isinstance(valor, datetime):
+        return valor.date()
+    if isinstance(valor, date):
+        return valor
+    for formato in FORMATOS_DATA:
+        try:
+            return datetime.strptime(texto_celula(valor), formato).date()
+        except ValueError:
+            pass
+    raise ValueError(valor)
+
+
+def pode_importar(user):
+    """Importações (e demais operações em lote): diretores, administrativos e superusers."""
+    return user.is_superuser or user.role in [User.Role.DIRETOR, User.Role.ADMINISTRATIVO]
+
+
+def _cabecalho(valores, colunas, obrigatorias):
+    campos = [colunas.get(normalizar(valor)) for valor in valores]
+    faltando = []
+    for obrigatoria in obrigatorias:
+        # Tupla: basta uma das colunas
+        alternativas = obrigatoria if isinstance(obrigatoria, tuple) else (obrigatoria,)
+        if not any(campo in campos for campo in alternativas):
+            faltando.append(" ou ".join(alternativas))
+    if faltando:
+        raise ArquivoInvalido(f"Colunas obrigatórias ausentes: {', '.join(faltando)}.")
+    return campos
+
+
+def _linhas_csv(arquivo, colunas, obrigatorias):
+    amostra = arquivo.read(64 * 1024)
+    arquivo.seek(0)
+    # Planilhas salvas pelo Excel em português costumam vir em cp1252; o
+    # decoder incremental tolera a amostra cortada no meio de um caractere
+    try:
+        inicio = codecs.getincrementaldecoder("utf-8-sig")().decode(amostra)
+        encoding = "utf-8-sig"
+    except UnicodeDecodeError:
+        encoding = "cp1252"
+        inicio = amostra.decode(encoding, errors="replace")
+    try:
+        delimitador = csv.Sniffer().sniff(inicio.split("\n", 1)[0], delimiters=";,\t").delimiter
+    except csv.Error:
+        delimitador = ";"
+
+    leitor = csv.reader(io.TextIOWrapper(arquivo, encoding=encoding, newline=""), delimiter=delimitador)
+    try:
+        cabecalho = next(leitor, None)
+        if cabecalho is None:
+            raise ArquivoInvalido("Arquivo vazio.")
+        campos = _cabecalho(cabecalho, colunas, obrigatorias)
+        for numero, valores in enumerate(leitor, start=2):
+            if any(valor.strip() for valor in valores):
+                yield numero, {campo: valor for campo, valor in zip(campos, valores) if campo}
+    except UnicodeDecodeError as erro:
+        raise ArquivoInvalido("Codificação do arquivo não reconhecida; salve como CSV UTF-8.") from erro
+    except csv.Error as erro:
+        # Aspas sem fechamento fazem o campo engolir o resto do arquivo até passar do limite do csv
+        raise ArquivoInvalido(
+            f"Arquivo CSV inválido perto da linha {leitor.line_num}: confira as aspas e o tamanho dos campos."
+        ) from erro
+
+
+def _linhas_xlsx(arquivo, colunas, obrigatorias):
+    from zipfile import BadZipFile
+
+    from openpyxl import load_workbook
+    from openpyxl.utils.exceptions import InvalidFileException
+
+    try:
+        planilha = load_workbook(arquivo, read_only=True, data_only=True)
+    except (BadZipFile, InvalidFileException, KeyError) as erro:
+        raise ArquivoInvalido("Planilha XLSX inválida.") from erro
+    try:
+        linhas = planilha.active.iter_rows(values_only=True)
+        cabecalho = next(linhas, None)
+        if cabecalho is None:
+            raise ArquivoInvalido("Planilha vazia.")
+        campos = _cabecalho(cabecalho, colunas, obrigatorias)
+        for numero, valores in enumerate(linhas, start=2):
+            if any(texto_celula(valor) for valor in valores):
+                yield numero, {campo: valor for campo, valor in zip(campos, valores) if campo}
+    finally:
+        planilha.close()
+
+
+def ler_linhas(arquivo, nome, colunas, obrigatorias=()):
+    """
+    Linhas de ``arquivo`` (aberto em modo binário) como ``(número, {campo: valor})``.
+
+    Args:
+        nome: nome do arquivo; a extensão define o formato
+        colunas: cabeçalho normalizado (``normalizar``) -> campo
+        obrigatorias: campos que o cabeçalho precisa ter; uma tupla aceita
+            qualquer um dos campos
+
+    ``número`` é a linha na planilha (o cabeçalho é a linha 1). Linhas em
+    branco são puladas e colunas desconhecidas, ignoradas. Os erros de
+    formato e cabeçalho (``ArquivoInvalido``) aparecem ao começar a iterar.
+    """
+    extensao = Path(nome).suffix.lower()
+    if extensao == ".csv":
+        return _linhas_csv(arquivo, colunas, obrigatorias)
+    if extensao == ".xlsx":
+        return _linhas_xlsx(arquivo, colunas, obrigatorias)
+    raise ArquivoInvalido(f"Formato não suportado: use {' ou '.join(EXTENSOES)}.")
+
+
+def escrever_erros(erros, destino, cabecalho):
+    """
+    Relatório de erros em CSV separado por ``;`` em ``destino`` (arquivo texto).
+
+    Abra ``destino`` com ``encoding="utf-8-sig"``: o BOM faz o Excel ler os acentos.
+    """
+    escritor = csv.writer(destino, delimiter=";")
+    escritor.writerow(cabecalho)
+    escritor.writerows(erros)
+
+
+def _diretorio_erros():
+    diretorio = Path(settings.RELATORIOS_ARQUIVOS_DIR) / "importacoes"
+    diretorio.mkdir(parents=True, exist_ok=True)
+    return diretorio
+
+
+def salvar_erros(request, erros, cabecalho):
+    """Grava o relatório de erros e o associa à sessão. Retorna o token do download."""
+    diretorio = _diretorio_erros()
+    # Relatórios antigos saem junto com os arquivos dos relatórios em segundo plano
+    limite = time.time() - settings.RELATORIOS_JOBS_RETENCAO_DIAS * 24 * 60 * 60
+    for antigo in diretorio.glob("*.csv"):
+        if antigo.stat().st_mtime < limite:
+            antigo.unlink(missing_ok=True)
+
+    token = uuid.uuid4().hex
+    with open(diretorio / f"{token}.csv", "w", encoding="utf-8-sig", newline="") as destino:
+        escrever_erros(erros, destino, cabecalho)
+    tokens = request.session.get(SESSAO_ERROS, [])
+    request.session[SESSAO_ERROS] = (tokens + [token])[-ERROS_POR_SESSAO:]
+    return token
+
+
+def resposta_erros(request, token, filename):
+    """Download do relatório ``token``; 404 se não for desta sessão."""
+    caminho = _diretorio_erros() / f"{token}.csv"
+    if token not in request.session.get(SESSAO_ERROS, []) or not caminho.exists():
+        raise Http404("Relatório de erros indisponível.")
+    return FileResponse(
+        open(caminho, "rb"),
+        as_attachment=True,
+        filename=filename,
+        content_type="text/csv; charset=utf-8",
+    )
@@ -0,0 +1,144 @@
+/**
+ * Autocomplete para campos com o atributo data-autocomplete-url.
+ *
+ * - <select>: o select fica oculto (continua sendo o valor enviado) e um campo
+ *   de texto busca as opções no endpoint; só a opção escolhida existe no select.
+ * - <input type="text">: as sugestões apenas preenchem o texto do campo.
+ *
+ * O endpoint responde {"resultados": [{id, texto, detalhe}], "proximo": cursor|null}
+ * (core/utils/autocomplete.py).
+ */
+
+document.addEventListener('DOMContentLoaded', function() {
+    document.querySelectorAll('[data-autocomplete-url]').forEach(initializeAutocomplete);
+});
+
+const AUTOCOMPLETE_ESPERA_MS = 250;
+
+function initializeAutocomplete(campo) {
+    const url = campo.dataset.autocompleteUrl;
+    const isSelect = campo.tagName === 'SELECT';
+
+    const container = document.createElement('div');
+    container.className = 'relative';
+    campo.parentNode.insertBefore(container, campo);
+    container.appendChild(campo);
+
+    let input = campo;
+    if (isSelect) {
+        input = document.createElement('input');
+        input.type = 'text';
+        input.autocomplete = 'off';
+        input.className = campo.className;
+        input.placeholder = campo.dataset.autocompletePlaceholder || 'Digite para buscar';
+        const selecionada = campo.options[campo.selectedIndex];
+        input.value = selecionada && selecionada.value ? selecionada.text : '';
+        if (campo.id) {
+            // O <label for> passa a apontar para o campo visível
+            input.id = campo.id + '-busca';
+            const label = document.querySelector('label[for="' + campo.id + '"]');
+            if (label) label.htmlFor = input.id;
+        }
+        campo.classList.add('hidden');
+        container.insertBefore(input, campo);
+    }
+
+    const lista = document.createElement('ul');
+    lista.className = 'hidden absolute z-20 mt-1 w-full max-h-64 overflow-y-auto bg-white border border-gray-300 rounded-md shadow-lg text-sm';
+    lista.setAttribute('role', 'listbox');
+    container.appendChild(lista);
+
+    let espera = null;
+    let requisicao = 0;
+
+    const fechar = () => lista.classList.add('hidden');
+
+    const escolher = (item) => {
+        input.value = item.texto;
+        if (isSelect) {
+            const vazia = campo.querySelector('option[value=""]');
+            campo.innerHTML = '';
+            if (vazia) campo.appendChild(vazia);
+            campo.appendChild(new Option(item.texto, item.id, true, true));
+            campo.dispatchEvent(new Event('change', { bubbles: true }));
+        }
+        fechar();
+    };
+
+    const buscar = (apos) => {
+        // A URL do campo pode trazer filtros próprios (ex.: ?role=ALUNO)
+        const endereco = new URL(url, window.location.origin);
+        endereco.searchParams.set('q', input.value.trim());
+        if (apos) endereco.searchParams.set('apos', apos);
+        const atual = ++requisicao;
+        fetch(endereco, { headers: { 'Accept': 'application/json' } })
+            .then(resposta => resposta.ok ? resposta.json() : Promise.reject(resposta.status))
+            .then(dados => {
+                // Respostas fora de ordem (o usuário continuou digitando) são descartadas
+                if (atual !== requisicao) return;
+                renderizar(dados, Boolean(apos));
+            })
+            .catch(() => fechar());
+    };
+
+    const renderizar = (dados, continuar) => {
+        if (!continuar) lista.innerHTML = '';
+        const mais = lista.querySelector('[data-autocomplete-mais]');
+        if (mais) mais.remove();
+
+        dados.resultados.forEach(item => {
+            const opcao = document.createElement('li');
+            opcao.className = 'px-3 py-2 cursor-pointer hover:bg-primary-50';
+            opcao.setAttribute('role', 'option');
+            opcao.textContent = item.texto;
+            if (item.detalhe) {
+                const detalhe = document.createElement('span');
+                detalhe.className = 'ml-2 text-gray-500';
+                detalhe.textContent = item.detalhe;
+                opcao.appendChild(detalhe);
+            }
+            opcao.addEventListener('mousedown', event => {
+                event.preventDefault();
+                escolher(item);
+            });
+            lista.appendChild(opcao);
+        });
+
+        if (!lista.children.length) {
+            const vazio = document.createElement('li');
+            vazio.className = 'px-3 py-2 text-gray-500';
+            vazio.textContent = 'Nenhum resultado';
+            lista.appendChild(vazio);
+        }
+        if (dados.proximo) {
+            const carregar = document.createElement('li');
+            carregar.className = 'px-3 py-2 cursor-pointer text-primary-600 hover:bg-primary-50';
+            carregar.dataset.autocompleteMais = '';
+            carregar.textContent = 'Mais resultados…';
+            carregar.addEventListener('mousedown', event => {
+                event.preventDefault();
+                buscar(dados.proximo);
+            });
+            lista.appendChild(carregar);
+        }
+        lista.classList.remove('hidden');
+    };
+
+    input.addEventListener('input', () => {
+        clearTimeout(espera);
+        if (isSelect && !input.value.trim()) {
+            // Texto apagado: limpa a seleção
+            campo.value = '';
+            fechar();
+            return;
+        }
+        espera = setTimeout(() => buscar(null), AUTOCOMPLETE_ESPERA_MS);
+    });
+    input.addEventListener('focus', () => {
+        if (!input.value.trim()) buscar(null);
+    });
+    input.addEventListener('blur', fechar);
+    input.addEventListener('keydown', event => {
+        if (event.key === 'Escape') fechar();
+    });
+}